@@ -0,0 +1,319 @@
+"""
+Summary queries on an embedded columnar engine.
+
+The summary queries (busiest airports, route durations, daily counts and
+longest flights) are written once against the flights view. They run on
+the database by default. With ANALYTICS_ENGINE=duckdb and the optional
+duckdb package installed they run on DuckDB over a local Parquet copy of
+the view in ANALYTICS_DIR, which scans only the columns a query uses,
+vectorized. Indexed lookups such as read.py's most recent flights stay on
+the database, which answers them faster.
+
+The copy is exported once from a consistent snapshot of the flights view,
+recording the change feed offset of that snapshot (see change_feed.py).
+Each refresh then reads only the later changes: inserted and revised
+flights replace any previous version by icao24 and firstSeen, and the
+result is compacted into a single file by DuckDB. On PostgreSQL the
+snapshot may already hold flights whose changes are numbered after its
+offset (see change_feed.py); applying them again changes nothing. The
+copy acknowledges its offset as the "analytics" feed consumer, so changes
+are kept until it has read them. Archival does not remove flights from
+the copy, so DuckDB results keep counting archived flights while the
+database's no longer do.
+"""
+import glob
+import json
+import os
+import shutil
+import tempfile
+import pandas as pd
+from sqlalchemy import func, select, text
+
+from config.settings import ANALYTICS_ENGINE, ANALYTICS_DIR
+from change_feed import ack, read_changes, sequence_changes
+from connections.postgresql import FlightChange
+from utils.logging_config import get_logger
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Initialize logger
+logger = get_logger("analytics")
+
+# Change feed consumer name of the copy
+ANALYTICS_CONSUMER = "analytics"
+
+# Columns of the flights view kept in the copy; ids and hashes are database internals
+COPY_COLUMNS = [
+    'icao24', 'firstSeen', 'estDepartureAirport', 'lastSeen', 'estArrivalAirport', 'callsign',
+    'estDepartureAirportHorizDistance', 'estDepartureAirportVertDistance',
+    'estArrivalAirportHorizDistance', 'estArrivalAirportVertDistance',
+    'departureAirportCandidatesCount', 'arrivalAirportCandidatesCount',
+    'flight_duration_minutes', 'total_distance_km', 'airport_pair',
+    'registration', 'aircraft_type', 'aircraft_model', 'operator'
+]
+
+# Departures, first and last activity per airport; also the body of the
+# airport_departures view (see load.create_summary_views)
+AIRPORT_DEPARTURES_SQL = """
+        SELECT
+            "estDepartureAirport" AS airport_code,
+            COUNT(*) AS departure_count,
+            MIN("firstSeen") AS first_activity,
+            MAX("lastSeen") AS last_activity
+        FROM flights
+        WHERE "estDepartureAirport" IS NOT NULL
+        GROUP BY "estDepartureAirport"
+"""
+
+# Summary queries over the flights view, valid on DuckDB, PostgreSQL and SQLite
+SUMMARY_QUERIES = {
+    "airport_departures": AIRPORT_DEPARTURES_SQL + """
+        ORDER BY departure_count DESC, airport_code
+    """,
+    "route_durations": """
+        SELECT
+            airport_pair,
+            COUNT(*) AS flight_count,
+            AVG(flight_duration_minutes) AS avg_duration_minutes,
+            MIN(flight_duration_minutes) AS min_duration_minutes,
+            MAX(flight_duration_minutes) AS max_duration_minutes,
+            AVG(total_distance_km) AS avg_distance_km
+        FROM flights
+        WHERE airport_pair IS NOT NULL AND flight_duration_minutes IS NOT NULL
+        GROUP BY airport_pair
+        ORDER BY flight_count DESC, airport_pair
+    """,
+    "daily_counts": """
+        SELECT
+            "firstSeen" - "firstSeen" % 86400 AS day,
+            COUNT(*) AS flight_count,
+            COUNT(DISTINCT icao24) AS aircraft_count
+        FROM flights
+        WHERE "firstSeen" IS NOT NULL
+        GROUP BY "firstSeen" - "firstSeen" % 86400
+        ORDER BY day
+    """,
+    "flight_durations": """
+        SELECT
+            icao24, callsign, "estDepartureAirport", "estArrivalAirport", airport_pair,
+            "firstSeen", "lastSeen", flight_duration_minutes, total_distance_km
+        FROM flights
+        WHERE flight_duration_minutes IS NOT NULL
+        ORDER BY flight_duration_minutes DESC, "firstSeen", icao24
+    """
+}
+
+def duckdb_enabled(engine_name=ANALYTICS_ENGINE):
+    """Whether summary queries run on DuckDB."""
+    return engine_name == "duckdb" and duckdb is not None
+
+def quote_path(path):
+    """SQL string literal of a file path."""
+    return "'" + path.replace("'", "''") + "'"
+
+def parquet_list(paths):
+    """DuckDB list literal of Parquet files."""
+    return "[" + ", ".join(quote_path(path) for path in paths) + "]"
+
+def load_state(directory):
+    """Feed offset of the copy, or None if there is no copy."""
+    try:
+        with open(os.path.join(directory, "state.json")) as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return None
+    return state["offset"] if os.path.exists(os.path.join(directory, "flights.parquet")) else None
+
+def save_state(directory, offset):
+    """Record the feed offset of the copy."""
+    path = os.path.join(directory, "state.json")
+    with open(f"{path}.tmp", "w") as state_file:
+        json.dump({"offset": offset}, state_file)
+    os.replace(f"{path}.tmp", path)
+
+def export_snapshot(engine, staging):
+    """
+    Export the flights view to Parquet chunks from one consistent snapshot.
+
+    Returns:
+        int: Change feed offset included in the snapshot
+    """
+    sequence_changes(engine)
+    connection = engine.connect()
+    if engine.dialect.name == 'postgresql':
+        connection = connection.execution_options(isolation_level="REPEATABLE READ")
+    try:
+        with connection.begin():
+            offset = connection.execute(select(func.max(FlightChange.feed_offset))).scalar() or 0
+            columns = ", ".join(f'"{name}"' for name in COPY_COLUMNS)
+            chunks = pd.read_sql(text(f"SELECT {columns} FROM flights"), connection, chunksize=100000)
+            for number, chunk in enumerate(chunks):
+                chunk.to_parquet(os.path.join(staging, f"base-{number:05d}.parquet"), index=False)
+    finally:
+        connection.close()
+    return offset
+
+def stage_changes(engine, staging, after_offset):
+    """
+    Write the changes following an offset to Parquet chunks.
+
+    Returns:
+        int: Last staged offset
+    """
+    offset = after_offset
+    number = 0
+    while True:
+        changes = read_changes(engine, offset)
+        if changes.empty:
+            return offset
+        offset = int(changes['offset'].iloc[-1])
+        changes = changes.rename(columns={'offset': '_offset', 'change': '_change'}).drop(columns=['loaded_at'])
+        changes.to_parquet(os.path.join(staging, f"changes-{number:05d}.parquet"), index=False)
+        number += 1
+
+def compact(directory, staging):
+    """
+    Merge the current copy with the staged files into a new flights.parquet.
+
+    Each changed flight, inserted or revised, replaces the rows with its
+    icao24 and firstSeen by its latest version, so a change that is
+    already in the copy is applied again harmlessly.
+    """
+    current = [os.path.join(directory, "flights.parquet")] if load_state(directory) is not None else []
+    base = current + sorted(glob.glob(os.path.join(staging, "base-*.parquet")))
+    changes = sorted(glob.glob(os.path.join(staging, "changes-*.parquet")))
+    columns = ", ".join(f'"{name}"' for name in COPY_COLUMNS)
+
+    # Typed empty relation, so missing columns and empty inputs still line up
+    relations = [f"SELECT {columns} FROM flights_schema"]
+    relations += [f"SELECT * FROM read_parquet({parquet_list(base)}, union_by_name = true)"] if base else []
+    query = " UNION ALL BY NAME ".join(relations)
+    if changes:
+        query = f"""
+            WITH changes AS (
+                SELECT * FROM read_parquet({parquet_list(changes)}, union_by_name = true)
+            ),
+            updates AS (
+                SELECT * EXCLUDE (_offset, _change, version) FROM (
+                    SELECT *, row_number() OVER (PARTITION BY icao24, "firstSeen" ORDER BY _offset DESC) AS version
+                    FROM changes
+                ) WHERE version = 1
+            ),
+            flights AS ({query})
+            SELECT * FROM flights f
+            WHERE NOT EXISTS (
+                SELECT 1 FROM updates u WHERE u.icao24 = f.icao24 AND u."firstSeen" = f."firstSeen"
+            )
+            UNION ALL BY NAME SELECT * FROM updates
+        """
+
+    target = os.path.join(directory, "flights.parquet")
+    connection = duckdb.connect()
+    try:
+        connection.execute("""
+            CREATE TABLE flights_schema (
+                icao24 VARCHAR, "firstSeen" BIGINT, "estDepartureAirport" VARCHAR, "lastSeen" BIGINT,
+                "estArrivalAirport" VARCHAR, callsign VARCHAR,
+                "estDepartureAirportHorizDistance" BIGINT, "estDepartureAirportVertDistance" BIGINT,
+                "estArrivalAirportHorizDistance" BIGINT, "estArrivalAirportVertDistance" BIGINT,
+                "departureAirportCandidatesCount" BIGINT, "arrivalAirportCandidatesCount" BIGINT,
+                flight_duration_minutes DOUBLE, total_distance_km DOUBLE, airport_pair VARCHAR,
+                registration VARCHAR, aircraft_type VARCHAR, aircraft_model VARCHAR, operator VARCHAR
+            )
+        """)
+        connection.execute(
+            f"COPY (SELECT {columns} FROM ({query})) TO {quote_path(target + '.tmp')} "
+            "(FORMAT parquet, COMPRESSION zstd)"
+        )
+    finally:
+        connection.close()
+    os.replace(target + ".tmp", target)
+
+def refresh_copy(engine, directory=ANALYTICS_DIR):
+    """
+    Bring the local Parquet copy of the flights view up to date.
+
+    Args:
+        engine: SQLAlchemy engine
+        directory (str): Directory of the copy
+
+    Returns:
+        int: Change feed offset of the copy
+    """
+    os.makedirs(directory, exist_ok=True)
+    offset = load_state(directory)
+    staging = tempfile.mkdtemp(dir=directory)
+    try:
+        if offset is None:
+            logger.info("Exporting the flights view to %s", directory)
+            offset = export_snapshot(engine, staging)
+            compact(directory, staging)
+        else:
+            last_offset = stage_changes(engine, staging, offset)
+            if last_offset == offset:
+                return offset
+            logger.info("Applying changes %d-%d to the analytics copy", offset + 1, last_offset)
+            compact(directory, staging)
+            offset = last_offset
+        save_state(directory, offset)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    ack(engine, ANALYTICS_CONSUMER, offset)
+    return offset
+
+def summary_source(engine, engine_name=ANALYTICS_ENGINE, directory=ANALYTICS_DIR):
+    """
+    Identify where summary queries run, for result cache keys. The DuckDB
+    copy is refreshed first, so its offset is the one results are read at.
+
+    Args:
+        engine: SQLAlchemy engine
+        engine_name (str): "sql" or "duckdb"
+        directory (str): Directory of the DuckDB copy
+
+    Returns:
+        dict: "engine" and, for DuckDB, the change feed offset of the copy
+    """
+    if not duckdb_enabled(engine_name):
+        return {"engine": "sql"}
+    return {"engine": "duckdb", "copy_offset": refresh_copy(engine, directory)}
+
+def run_summary(engine, name, limit=None, engine_name=ANALYTICS_ENGINE, directory=ANALYTICS_DIR, refresh=True):
+    """
+    Run a summary query.
+
+    Args:
+        engine: SQLAlchemy engine
+        name (str): Key of SUMMARY_QUERIES
+        limit (int, optional): Maximum number of rows
+        engine_name (str): "sql" or "duckdb"; DuckDB falls back to the
+                           database if the package is not installed, and
+                           its copy also holds archived flights
+        directory (str): Directory of the DuckDB copy
+        refresh (bool): Apply new changes to the copy first
+
+    Returns:
+        pd.DataFrame: Query result
+    """
+    query = SUMMARY_QUERIES[name]
+    if limit:
+        query += f" LIMIT {int(limit)}"
+
+    if not duckdb_enabled(engine_name):
+        with engine.connect() as connection:
+            return pd.read_sql(text(query), connection)
+
+    if refresh or load_state(directory) is None:
+        refresh_copy(engine, directory)
+    connection = duckdb.connect()
+    try:
+        connection.execute(
+            f"CREATE VIEW flights AS SELECT * FROM read_parquet({quote_path(os.path.join(directory, 'flights.parquet'))})"
+        )
+        return connection.execute(query).df()
+    finally:
+        connection.close()
@@ -0,0 +1,479 @@
+"""
+Retention and archival of cold flight history.
+
+Flights older than ARCHIVE_AFTER_DAYS are moved out of flight_data into
+one zstd-compressed Parquet file per UTC day of firstSeen, in the flights
+view layout so archives don't depend on the dimension tables; with
+ARCHIVE_FORMAT=sqlite, days are written to indexed SQLite shards instead,
+which need no pyarrow and can be queried with SQL by query_archive. Every file
+is recorded in the archive_segments manifest, and the archived rows,
+those of each segment's day up to the segment's highest id, are then
+deleted from flight_data in bounded batches to keep locks and
+transactions short. Late-arriving flights loaded into archived days after
+the fact have higher ids, so they stay in flight_data until the next run
+writes them to an extra segment of their day. Segments are never
+rewritten, so reconciling loads look up archived flights by natural key
+(archived_flight_hashes) and drop revisions of them instead of storing a
+second copy.
+
+Readers union the hot table with the manifest's files for the requested
+range. Rows that are archived but not yet deleted are dropped by flight
+id and natural key, so an interrupted archival run never duplicates or
+hides flights; the next run finishes the deletes.
+"""
+import os
+import time
+from datetime import datetime, timezone
+import pandas as pd
+from sqlalchemy import BigInteger, bindparam, column, delete, func, select, table
+from sqlalchemy.orm import Session
+
+from config.settings import ARCHIVE_DIR, ARCHIVE_AFTER_DAYS, ARCHIVE_DELETE_BATCH, ARCHIVE_FORMAT
+from connections.postgresql import ArchiveSegment, FlightData, bump_load_watermark
+from connections.sqlite import query_shards, read_shard, write_shard
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("archive")
+
+DAY = 86400
+
+# File extension of each archive format
+ARCHIVE_EXTENSIONS = {"parquet": "parquet", "sqlite": "db"}
+
+# Columns of the flights view, as archived
+FLIGHT_COLUMNS = [
+    'id', 'icao24', 'firstSeen', 'estDepartureAirport', 'lastSeen', 'estArrivalAirport', 'callsign',
+    'estDepartureAirportHorizDistance', 'estDepartureAirportVertDistance',
+    'estArrivalAirportHorizDistance', 'estArrivalAirportVertDistance',
+    'departureAirportCandidatesCount', 'arrivalAirportCandidatesCount',
+    'flight_duration_minutes', 'total_distance_km', 'airport_pair', 'row_hash',
+    'registration', 'aircraft_type', 'aircraft_model', 'operator'
+]
+
+flights_view = table('flights', *[column(name) for name in FLIGHT_COLUMNS])
+
+# Natural key of a flight in the flights view layout
+ARCHIVE_KEY_COLUMNS = ['icao24', 'firstSeen']
+
+# Flights first seen in [:start, :end), most recent first. read_flights selects
+# the requested columns and leaves out the bounds it is not given
+READ_FLIGHTS_QUERY = select(flights_view).order_by(flights_view.c.lastSeen.desc())
+READ_FLIGHTS_START = flights_view.c.firstSeen >= bindparam('start', type_=BigInteger)
+READ_FLIGHTS_END = flights_view.c.firstSeen < bindparam('end', type_=BigInteger)
+
+def get_archive_boundary(engine):
+    """
+    Get the archive boundary: days of flights with an earlier firstSeen
+    are archived.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        tuple: (boundary timestamp, highest archived id), (0, 0) if nothing
+               is archived
+    """
+    try:
+        with engine.connect() as connection:
+            boundary, max_id = connection.execute(
+                select(func.max(ArchiveSegment.end_time), func.max(ArchiveSegment.max_id))
+            ).fetchone()
+            return boundary or 0, max_id or 0
+    except Exception as e:
+        logger.warning("Error getting archive boundary: %s", e)
+        return 0, 0
+
+def next_flight_day(engine, after, before):
+    """Start of the first UTC day with a flight seen in [after, before), or None."""
+    with engine.connect() as connection:
+        first_seen = connection.execute(
+            select(func.min(FlightData.firstSeen))
+            .where(FlightData.firstSeen >= after, FlightData.firstSeen < before)
+        ).scalar()
+    return None if first_seen is None else first_seen - first_seen % DAY
+
+def late_flight_days(engine, boundary):
+    """
+    Archived UTC days with flights loaded after their segments were
+    written, and the highest id archived for each.
+
+    Args:
+        engine: SQLAlchemy engine
+        boundary (int): Archive boundary
+
+    Returns:
+        dict: Day start -> highest id in the day's segments (0 if none)
+    """
+    segments = ArchiveSegment.__table__
+    archived_id = (
+        select(func.coalesce(func.max(segments.c.max_id), 0))
+        .where(segments.c.start_time <= FlightData.firstSeen, segments.c.end_time > FlightData.firstSeen)
+        .scalar_subquery()
+    )
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(FlightData.firstSeen - FlightData.firstSeen % DAY, archived_id)
+            .where(FlightData.firstSeen < boundary, FlightData.id > archived_id)
+            .distinct()
+        ).fetchall()
+    return {int(day): int(max_id) for day, max_id in rows}
+
+def write_segment(engine, df, day, directory=ARCHIVE_DIR, archive_format=ARCHIVE_FORMAT, suffix=""):
+    """
+    Write one day of flights to a Parquet file or SQLite shard and record it
+    in the manifest.
+
+    The file is written under a temporary name and renamed, so the manifest
+    never points to a partial file.
+
+    Args:
+        engine: SQLAlchemy engine
+        df (pd.DataFrame): Flights of the day, in the flights view layout
+        day (int): Start of the UTC day
+        directory (str): Archive directory
+        archive_format (str): "parquet" or "sqlite"
+        suffix (str): Appended to the file name of extra segments of a day
+
+    Returns:
+        dict: Manifest row
+    """
+    name = (f"flights-{datetime.fromtimestamp(day, timezone.utc):%Y-%m-%d}{suffix}."
+            f"{ARCHIVE_EXTENSIONS[archive_format]}")
+    path = os.path.join(directory, name)
+    if archive_format == "sqlite":
+        write_shard(path, df)
+    else:
+        df.to_parquet(f"{path}.tmp", engine='pyarrow', compression='zstd', index=False)
+        os.replace(f"{path}.tmp", path)
+
+    segment = {
+        'path': name,
+        'start_time': day,
+        'end_time': day + DAY,
+        'min_last_seen': None if df['lastSeen'].isna().all() else int(df['lastSeen'].min()),
+        'max_last_seen': None if df['lastSeen'].isna().all() else int(df['lastSeen'].max()),
+        'max_id': int(df['id'].max()),
+        'row_count': len(df),
+        'size_bytes': os.path.getsize(path),
+        'created_at': int(time.time())
+    }
+    with engine.begin() as connection:
+        connection.execute(ArchiveSegment.__table__.insert(), [segment])
+    return segment
+
+def delete_archived(engine, batch_size=ARCHIVE_DELETE_BATCH):
+    """
+    Delete archived flights from flight_data, one batch per transaction.
+
+    Each segment deletes the flights of its day up to its highest id, so
+    flights loaded into the day after the segment was written are kept.
+
+    Args:
+        engine: SQLAlchemy engine
+        batch_size (int): Rows deleted per transaction
+
+    Returns:
+        int: Number of deleted flights
+    """
+    with engine.connect() as connection:
+        segments = connection.execute(
+            select(ArchiveSegment.start_time, ArchiveSegment.end_time, ArchiveSegment.max_id)
+            .order_by(ArchiveSegment.start_time)
+        ).fetchall()
+
+    deleted = 0
+    for start_time, end_time, max_id in segments:
+        while True:
+            with Session(engine) as session:
+                ids = session.execute(
+                    select(FlightData.id)
+                    .where(FlightData.firstSeen >= start_time, FlightData.firstSeen < end_time,
+                           FlightData.id <= max_id)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+                session.execute(delete(FlightData).where(FlightData.id.in_(ids)))
+                # Cached queries on flight_data are stale (see query_cache.py)
+                bump_load_watermark(session)
+                session.commit()
+            deleted += len(ids)
+    return deleted
+
+def archive_flights(engine, older_than_days=ARCHIVE_AFTER_DAYS, directory=ARCHIVE_DIR,
+                    batch_size=ARCHIVE_DELETE_BATCH, now=None, stats=None, archive_format=ARCHIVE_FORMAT):
+    """
+    Archive the days of flights older than the retention period, then
+    delete them from flight_data.
+
+    Args:
+        engine: SQLAlchemy engine
+        older_than_days (int): Days of flights kept in flight_data
+        directory (str): Archive directory
+        batch_size (int): Rows deleted per transaction
+        now (int, optional): Current timestamp
+        stats (dict, optional): Filled with segment, row (late ones included)
+                                and byte counts
+        archive_format (str): "parquet" or "sqlite"
+
+    Returns:
+        int: Number of flights deleted from flight_data
+    """
+    stats = stats if stats is not None else {}
+    now = int(time.time()) if now is None else now
+    cutoff = now - now % DAY - older_than_days * DAY
+    os.makedirs(directory, exist_ok=True)
+
+    segments = archived = size_bytes = late = 0
+    boundary = get_archive_boundary(engine)[0]
+
+    # Late flights of archived days go to an extra segment of their day
+    for day, archived_id in sorted(late_flight_days(engine, boundary).items()):
+        query = (
+            select(flights_view)
+            .where(flights_view.c.firstSeen >= day, flights_view.c.firstSeen < day + DAY,
+                   flights_view.c.id > archived_id)
+            .order_by(flights_view.c.firstSeen)
+        )
+        with engine.connect() as connection:
+            df = pd.read_sql(query, connection)
+        if df.empty:
+            continue
+        segment = write_segment(engine, df, day, directory, archive_format, suffix=f"-{int(df['id'].max())}")
+        segments += 1
+        late += segment['row_count']
+        archived += segment['row_count']
+        size_bytes += segment['size_bytes']
+        logger.info("Archived %d late flights to %s", segment['row_count'], segment['path'])
+
+    day = next_flight_day(engine, boundary, cutoff)
+    while day is not None:
+        query = (
+            select(flights_view)
+            .where(flights_view.c.firstSeen >= day, flights_view.c.firstSeen < day + DAY)
+            .order_by(flights_view.c.firstSeen)
+        )
+        with engine.connect() as connection:
+            df = pd.read_sql(query, connection)
+        segment = write_segment(engine, df, day, directory, archive_format)
+        segments += 1
+        archived += segment['row_count']
+        size_bytes += segment['size_bytes']
+        logger.info("Archived %d flights to %s", segment['row_count'], segment['path'])
+        day = next_flight_day(engine, day + DAY, cutoff)
+
+    deleted = delete_archived(engine, batch_size)
+    stats.update({"segments": segments, "archived": archived, "late": late, "bytes": size_bytes, "deleted": deleted})
+    logger.info("Archived %d flights in %d segments (%d bytes), deleted %d from flight_data",
+                archived, segments, size_bytes, deleted)
+    return deleted
+
+def read_archive(engine, start=None, end=None, airborne=False, order='lastSeen', limit=None,
+                 columns=None, bound=None, directory=ARCHIVE_DIR):
+    """
+    Read archived flights.
+
+    Only the files whose manifest ranges can match are opened, and with a
+    limit files are read in order until no remaining file can improve the
+    result.
+
+    Args:
+        engine: SQLAlchemy engine
+        start (int, optional): Range start timestamp
+        end (int, optional): Range end timestamp
+        airborne (bool): Flights airborne during [start, end] instead of
+                         flights first seen in [start, end)
+        order (str): "lastSeen" (most recent first) or "firstSeen" (oldest first)
+        limit (int, optional): Maximum number of rows
+        columns (list, optional): Columns to read. Defaults to all.
+        bound (int, optional): Skip files whose flights all sort after this
+                               order value, e.g. the last of limit hot rows
+        directory (str): Archive directory
+
+    Returns:
+        pd.DataFrame: Matching flights in the requested order
+    """
+    segments_table = ArchiveSegment.__table__
+    query = select(segments_table)
+    if end is not None:
+        query = query.where(segments_table.c.start_time <= end if airborne else segments_table.c.start_time < end)
+    if start is not None:
+        query = query.where(
+            segments_table.c.max_last_seen >= start if airborne else segments_table.c.end_time > start
+        )
+    try:
+        with engine.connect() as connection:
+            segments = [dict(row._mapping) for row in connection.execute(query)]
+    except Exception as e:
+        logger.warning("Error reading archive manifest: %s", e)
+        segments = []
+
+    ascending = order == 'firstSeen'
+    first_value = (
+        (lambda segment: segment['start_time']) if ascending
+        else (lambda segment: -(segment['max_last_seen'] or 0))
+    )
+    segments.sort(key=first_value)
+    if bound is not None:
+        segments = [segment for segment in segments if first_value(segment) <= (bound if ascending else -bound)]
+    read_columns = None if columns is None else list(dict.fromkeys(['id', 'firstSeen', 'lastSeen', *columns]))
+
+    result = pd.DataFrame(columns=read_columns or FLIGHT_COLUMNS)
+    for segment in segments:
+        if limit and len(result) >= limit:
+            # Rows of the remaining files all sort after the current last row
+            last = result[order].iloc[limit - 1]
+            if first_value(segment) > (last if ascending else -last):
+                break
+
+        path = os.path.join(directory, segment['path'])
+        df = read_shard(path, read_columns) if path.endswith(".db") else pd.read_parquet(path, columns=read_columns)
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= (df['lastSeen'] >= start) if airborne else (df['firstSeen'] >= start)
+        if end is not None:
+            mask &= (df['firstSeen'] <= end) if airborne else (df['firstSeen'] < end)
+        df = df[mask]
+
+        result = df if result.empty else pd.concat([result, df], ignore_index=True)
+        result = result.sort_values(order, ascending=ascending, kind='stable', ignore_index=True)
+        if limit:
+            result = result.head(limit)
+
+    return result if columns is None else result[columns]
+
+def archived_flight_hashes(engine, df, directory=None):
+    """
+    Look up the archived versions of a batch's flights in archived days.
+
+    Args:
+        engine: SQLAlchemy engine
+        df (pd.DataFrame): Incoming batch with icao24 and firstSeen
+        directory (str, optional): Archive directory. Defaults to ARCHIVE_DIR.
+
+    Returns:
+        pd.Series: Row hashes of the archived versions, aligned with df,
+                   <NA> for flights that are not archived
+    """
+    hashes = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    boundary = get_archive_boundary(engine)[0]
+    cold = df[df['firstSeen'] < boundary]
+    if cold.empty:
+        return hashes
+
+    archived = read_archive(engine, int(cold['firstSeen'].min()), int(cold['firstSeen'].max()) + 1,
+                            order='firstSeen', columns=ARCHIVE_KEY_COLUMNS + ['row_hash'],
+                            directory=directory or ARCHIVE_DIR)
+    if archived.empty:
+        return hashes
+    # Extra segments of a day hold later versions
+    archived = archived.drop_duplicates(subset=ARCHIVE_KEY_COLUMNS, keep='last')
+    stored = pd.Series(archived['row_hash'].astype('Int64').array,
+                       index=pd.MultiIndex.from_frame(archived[ARCHIVE_KEY_COLUMNS].astype({'firstSeen': 'int64'})))
+    keys = pd.MultiIndex.from_frame(cold[ARCHIVE_KEY_COLUMNS].astype({'firstSeen': 'int64'}))
+    # Kept as an extension array, so 64-bit hashes never round-trip through float
+    return pd.Series(stored.reindex(keys).array, index=cold.index).reindex(df.index)
+
+def combine_with_archive(hot, archived, order='lastSeen', limit=None):
+    """
+    Union hot and archived flights, dropping archived flights still in the
+    hot table, by id or by natural key.
+
+    Args:
+        hot (pd.DataFrame): Flights read from the database
+        archived (pd.DataFrame): Flights read with read_archive
+        order (str): See read_archive
+        limit (int, optional): Maximum number of rows
+
+    Returns:
+        pd.DataFrame: Combined flights in the requested order
+    """
+    if archived.empty:
+        return hot
+    if hot.empty:
+        return archived.head(limit) if limit else archived
+    if 'id' in hot.columns and 'id' in archived.columns:
+        archived = archived[~archived['id'].isin(hot['id'])]
+    if all(name in hot.columns and name in archived.columns for name in ARCHIVE_KEY_COLUMNS):
+        hot_keys = pd.MultiIndex.from_frame(hot[ARCHIVE_KEY_COLUMNS].astype({'firstSeen': 'int64'}))
+        archived_keys = pd.MultiIndex.from_frame(archived[ARCHIVE_KEY_COLUMNS].astype({'firstSeen': 'int64'}))
+        archived = archived[~archived_keys.isin(hot_keys)]
+    combined = pd.concat([hot, archived[[name for name in hot.columns if name in archived.columns]]],
+                         ignore_index=True)
+    combined = combined.sort_values(order, ascending=order == 'firstSeen', kind='stable', ignore_index=True)
+    return combined.head(limit) if limit else combined
+
+def read_flights(engine, start=None, end=None, limit=None, columns=None, directory=ARCHIVE_DIR):
+    """
+    Read flights first seen in [start, end) from the flights view and, for
+    ranges before the archive boundary, the archive, most recent first.
+
+    Args:
+        engine: SQLAlchemy engine
+        start (int, optional): Range start timestamp
+        end (int, optional): Range end timestamp
+        limit (int, optional): Maximum number of rows
+        columns (list, optional): Columns to return. Defaults to all.
+        directory (str): Archive directory
+
+    Returns:
+        pd.DataFrame: Flights ordered by lastSeen descending
+    """
+    columns = columns or FLIGHT_COLUMNS
+    boundary = get_archive_boundary(engine)[0]
+
+    # id and natural key drop archived flights still in flight_data from the union
+    read_columns = list(dict.fromkeys(['id', *ARCHIVE_KEY_COLUMNS, 'lastSeen', *columns]))
+    query = READ_FLIGHTS_QUERY.with_only_columns(*[flights_view.c[name] for name in read_columns])
+    params = {}
+    if start is not None:
+        query = query.where(READ_FLIGHTS_START)
+        params['start'] = start
+    if end is not None:
+        query = query.where(READ_FLIGHTS_END)
+        params['end'] = end
+    if limit:
+        query = query.limit(limit)
+    with engine.connect() as connection:
+        hot = pd.read_sql(query, connection, params=params)
+
+    if boundary and (start is None or start < boundary):
+        bound = hot['lastSeen'].iloc[limit - 1] if limit and len(hot) >= limit else None
+        bound = None if pd.isna(bound) else bound
+        archived = read_archive(engine, start, min(end, boundary) if end is not None else boundary,
+                                limit=limit, columns=read_columns, bound=bound, directory=directory)
+        hot = combine_with_archive(hot, archived, limit=limit)
+    return hot[columns]
+
+def query_archive(engine, sql, start=None, end=None, params=None, directory=ARCHIVE_DIR):
+    """
+    Run a SQL query over the SQLite shards of the archived days first seen
+    in [start, end), as one flights table.
+
+    Parquet segments are not included; query them with the analytics engine.
+
+    Args:
+        engine: SQLAlchemy engine
+        sql (str): Query on the flights table
+        start (int, optional): Range start timestamp
+        end (int, optional): Range end timestamp
+        params (dict or tuple, optional): Query parameters
+        directory (str): Archive directory
+
+    Returns:
+        pd.DataFrame: Query result
+    """
+    segments_table = ArchiveSegment.__table__
+    query = select(segments_table.c.path).order_by(segments_table.c.start_time)
+    if start is not None:
+        query = query.where(segments_table.c.end_time > start)
+    if end is not None:
+        query = query.where(segments_table.c.start_time < end)
+    with engine.connect() as connection:
+        paths = connection.execute(query).scalars().all()
+
+    shards = [os.path.join(directory, path) for path in paths if path.endswith(".db")]
+    if len(shards) < len(paths):
+        logger.warning("Skipping %d Parquet segments in the archive query", len(paths) - len(shards))
+    return query_shards(sql, shards, params)
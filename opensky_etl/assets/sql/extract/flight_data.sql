@@ -1,4 +1,4 @@
--- Extract flight data from the flight_data table
+-- Extract flight data from the flights view
 -- This SQL uses Jinja2-style templating with {{variable}} syntax
 
 {% if is_incremental %}
@@ -17,7 +17,7 @@ SELECT
     departureAirportCandidatesCount, 
     arrivalAirportCandidatesCount
 FROM 
-    flight_data
+    flights
 WHERE 
     lastSeen > {{last_incremental_value}}
 ORDER BY 
@@ -38,7 +38,7 @@ SELECT
     departureAirportCandidatesCount, 
     arrivalAirportCandidatesCount
 FROM 
-    flight_data
+    flights
 ORDER BY 
     lastSeen ASC
 {% endif %}
\ No newline at end of file
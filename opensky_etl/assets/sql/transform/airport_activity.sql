@@ -1,27 +1,28 @@
 -- Analyze airport activity and create airport pairs
 -- This transformation creates an airport pair for each flight
+-- depends: flights
 
 WITH airport_pairs AS (
     SELECT 
         id,
         icao24, 
-        firstSeen, 
-        estDepartureAirport, 
-        lastSeen, 
-        estArrivalAirport, 
+        "firstSeen", 
+        "estDepartureAirport", 
+        "lastSeen", 
+        "estArrivalAirport", 
         callsign,
         
         -- Create airport pair identifier
         CASE 
-            WHEN estDepartureAirport IS NOT NULL AND estArrivalAirport IS NOT NULL
-            THEN CONCAT(estDepartureAirport, '-', estArrivalAirport)
+            WHEN "estDepartureAirport" IS NOT NULL AND "estArrivalAirport" IS NOT NULL
+            THEN "estDepartureAirport" || '-' || "estArrivalAirport"
             ELSE NULL
         END AS airport_pair
     FROM 
-        flight_data
+        flights
     {% if is_incremental %}
     WHERE 
-        lastSeen > {{last_incremental_value}}
+        "lastSeen" > {{last_incremental_value}}
     {% endif %}
 )
 
@@ -30,4 +31,4 @@ SELECT
 FROM 
     airport_pairs
 ORDER BY 
-    lastSeen ASC
\ No newline at end of file
+    "lastSeen" ASC
\ No newline at end of file
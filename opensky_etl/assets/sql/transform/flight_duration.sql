@@ -1,27 +1,28 @@
 -- Calculate flight duration in minutes
 -- This transformation uses firstSeen and lastSeen timestamps
+-- depends: flights
 
 WITH flight_duration_calc AS (
     SELECT 
         id,
         icao24, 
-        firstSeen, 
-        estDepartureAirport, 
-        lastSeen, 
-        estArrivalAirport, 
+        "firstSeen", 
+        "estDepartureAirport", 
+        "lastSeen", 
+        "estArrivalAirport", 
         callsign,
         
         -- Calculate flight duration in minutes
         CASE 
-            WHEN firstSeen IS NOT NULL AND lastSeen IS NOT NULL
-            THEN (lastSeen - firstSeen) / 60.0  -- Convert seconds to minutes
+            WHEN "firstSeen" IS NOT NULL AND "lastSeen" IS NOT NULL
+            THEN ("lastSeen" - "firstSeen") / 60.0  -- Convert seconds to minutes
             ELSE NULL
         END AS flight_duration_minutes
     FROM 
-        flight_data
+        flights
     {% if is_incremental %}
     WHERE 
-        lastSeen > {{last_incremental_value}}
+        "lastSeen" > {{last_incremental_value}}
     {% endif %}
 )
 
@@ -30,4 +31,4 @@ SELECT
 FROM 
     flight_duration_calc
 ORDER BY 
-    lastSeen ASC
\ No newline at end of file
+    "lastSeen" ASC
\ No newline at end of file
@@ -0,0 +1,17 @@
+-- Average duration and distance of each airport pair
+-- This transformation combines the per-flight transformations by flight id
+-- depends: airport_activity, flight_duration, flight_distance
+
+SELECT 
+    a.airport_pair,
+    COUNT(*) AS flights,
+    AVG(d.flight_duration_minutes) AS avg_duration_minutes,
+    AVG(t.total_distance_km) AS avg_distance_km
+FROM 
+    airport_activity a
+    JOIN flight_duration d ON d.id = a.id
+    JOIN flight_distance t ON t.id = a.id
+WHERE 
+    a.airport_pair IS NOT NULL
+GROUP BY 
+    a.airport_pair
\ No newline at end of file
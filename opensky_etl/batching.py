@@ -0,0 +1,136 @@
+"""
+Adaptive load batch size.
+
+Small transactions pay the per-commit overhead on every few rows, large
+ones hold locks for long and lose a lot of work when they fail. The
+BatchSizeTuner sizes each load transaction from the throughput measured
+on the previous ones: the next batch should take LOAD_TARGET_SECONDS at
+the smoothed rows/s, growing or shrinking by at most a factor of two per
+batch, and is halved whenever a commit takes longer than
+LOAD_COMMIT_CEILING_SECONDS. The size reached at the end of a run is
+stored per backend in load_tuning, and the next run starts from it.
+"""
+import time
+from sqlalchemy import select
+
+from config.settings import LOAD_BATCH_ROWS, LOAD_MIN_ROWS, LOAD_TARGET_SECONDS, LOAD_COMMIT_CEILING_SECONDS
+from connections.postgresql import LoadTuning
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("batching")
+
+# Weight of the latest batch in the smoothed throughput
+RATE_SMOOTHING = 0.5
+
+def get_tuned_batch_size(engine):
+    """
+    Get the batch size learned on the engine's backend.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        int: Batch size, or None before the first tuned load
+    """
+    try:
+        with engine.connect() as connection:
+            batch_size = connection.execute(
+                select(LoadTuning.batch_size).where(LoadTuning.backend == engine.dialect.name)
+            ).scalar()
+            return None if batch_size is None else int(batch_size)
+    except Exception as e:
+        logger.warning("Error getting tuned batch size: %s", e)
+        return None
+
+def save_tuned_batch_size(engine, batch_size, rows_per_second=None, commit_seconds=None):
+    """
+    Store the batch size learned on the engine's backend.
+
+    Args:
+        engine: SQLAlchemy engine
+        batch_size (int): Batch size
+        rows_per_second (float, optional): Smoothed throughput
+        commit_seconds (float, optional): Latest commit latency
+    """
+    table = LoadTuning.__table__
+    values = {
+        "batch_size": batch_size, "rows_per_second": rows_per_second,
+        "commit_seconds": commit_seconds, "updated_at": int(time.time())
+    }
+    try:
+        with engine.begin() as connection:
+            result = connection.execute(table.update().where(table.c.backend == engine.dialect.name).values(**values))
+            if not result.rowcount:
+                connection.execute(table.insert().values(backend=engine.dialect.name, **values))
+    except Exception as e:
+        logger.warning("Error saving tuned batch size: %s", e)
+
+class BatchSizeTuner:
+    """Choose the number of rows of each load transaction from measured throughput."""
+
+    def __init__(self, engine, minimum=LOAD_MIN_ROWS, maximum=LOAD_BATCH_ROWS,
+                 target_seconds=LOAD_TARGET_SECONDS, commit_ceiling=LOAD_COMMIT_CEILING_SECONDS):
+        """
+        Initialize the tuner from the size learned on the engine's backend.
+
+        Args:
+            engine: SQLAlchemy engine
+            minimum (int): Smallest batch size
+            maximum (int): Largest batch size
+            target_seconds (float): Target duration of a batch
+            commit_ceiling (float): Commit latency that halves the batch size
+        """
+        self.engine = engine
+        self.minimum = minimum
+        self.maximum = max(maximum, minimum)
+        self.target_seconds = target_seconds
+        self.commit_ceiling = commit_ceiling
+        learned = get_tuned_batch_size(engine)
+        self.size = self.clamp(learned if learned else self.maximum // 10)
+        self.rate = None
+        self.commit_seconds = None
+        self.timeline = []
+
+    def clamp(self, size):
+        """Bound a batch size to [minimum, maximum]."""
+        return int(min(max(size, self.minimum), self.maximum))
+
+    def record(self, rows, seconds, commit_seconds):
+        """
+        Record a loaded batch and choose the size of the next one.
+
+        Args:
+            rows (int): Rows in the batch
+            seconds (float): Time to load and commit the batch
+            commit_seconds (float): Time of the commit alone
+
+        Returns:
+            int: Size of the next batch
+        """
+        rate = rows / max(seconds, 1e-6)
+        self.rate = rate if self.rate is None else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.rate
+        self.commit_seconds = commit_seconds
+
+        # A short final batch says little about the size that was asked for
+        if rows >= self.size:
+            size = min(max(self.rate * self.target_seconds, self.size / 2), self.size * 2)
+        else:
+            size = self.size
+        if commit_seconds > self.commit_ceiling:
+            size = min(size, self.size / 2)
+
+        self.timeline.append({
+            "rows": rows,
+            "seconds": round(seconds, 4),
+            "commit_seconds": round(commit_seconds, 4),
+            "rows_per_second": round(rate, 1),
+            "next_size": self.clamp(size)
+        })
+        self.size = self.clamp(size)
+        return self.size
+
+    def save(self):
+        """Store the current size for the next run on this backend."""
+        if self.timeline:
+            save_tuned_batch_size(self.engine, self.size, self.rate, self.commit_seconds)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""
+Benchmark the summary queries on the database against DuckDB over the
+local Parquet copy.
+
+Synthetic flights are written to a SQLite file, the copy is exported, and
+every summary query is timed on both engines. Results are checked to be
+equal.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_analytics --flights 2000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from analytics import SUMMARY_QUERIES, refresh_copy, run_summary
+from connections.postgresql import create_schema
+from dimensions import resolve_flight_keys
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the analytics engine')
+    parser.add_argument('--flights', type=int, default=2000000, help='Number of synthetic flights')
+    parser.add_argument('--airports', type=int, default=2000, help='Number of distinct airports')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per query')
+    return parser.parse_args()
+
+def best_time(function, repeat):
+    """Best wall time of a callable in milliseconds, with its last result."""
+    best, result = np.inf, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+    airports = np.array([f"{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}X" for i in range(args.airports)])
+    weights = 1.0 / np.arange(1, args.airports + 1)
+    weights /= weights.sum()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'flights.db')}")
+        create_schema(engine)
+        copy = os.path.join(directory, 'analytics')
+
+        for offset in range(0, args.flights, 200000):
+            count = min(200000, args.flights - offset)
+            first_seen = START + rng.integers(0, 365 * 86400, count)
+            last_seen = first_seen + rng.integers(1800, 36000, count)
+            routes = rng.choice(args.airports, (count, 2), p=weights)
+            df = pd.DataFrame({
+                'icao24': [f"{address:06x}" for address in rng.integers(0, 200000, count)],
+                'firstSeen': first_seen,
+                'lastSeen': last_seen,
+                'estDepartureAirport': airports[routes[:, 0]],
+                'estArrivalAirport': airports[routes[:, 1]],
+                'flight_duration_minutes': (last_seen - first_seen) / 60.0,
+                'total_distance_km': rng.integers(1, 200, count) / 10.0
+            })
+            df = df.join(resolve_flight_keys(df, engine))
+            with engine.begin() as connection:
+                df.drop(columns=['icao24', 'estDepartureAirport', 'estArrivalAirport']).to_sql(
+                    'flight_data', connection, if_exists='append', index=False
+                )
+
+        start = time.perf_counter()
+        refresh_copy(engine, copy)
+        print(f"{args.flights} flights, copy exported in {time.perf_counter() - start:.1f} s "
+              f"({os.path.getsize(os.path.join(copy, 'flights.parquet')) / 1e6:.1f} MB)")
+
+        for name in SUMMARY_QUERIES:
+            limit = 100 if name == "flight_durations" else None
+            sql_ms, expected = best_time(lambda: run_summary(engine, name, limit=limit, engine_name="sql"), args.repeat)
+            duckdb_ms, actual = best_time(
+                lambda: run_summary(engine, name, limit=limit, engine_name="duckdb", directory=copy, refresh=False),
+                args.repeat
+            )
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_exact=False)
+            print(f"{name:<20} SQL {sql_ms:9.1f} ms   DuckDB {duckdb_ms:7.1f} ms   ({sql_ms / duckdb_ms:.1f}x)")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
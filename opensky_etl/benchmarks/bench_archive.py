@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Benchmark the hot table before and after archiving cold flight history.
+
+Synthetic days of flights are loaded into a SQLite file, then the time of
+a batch insert, of read.py's most recent flights query and of a range
+read spanning archived days are measured before and after archive_flights
+keeps the last --keep-days days. Database and archive sizes are reported.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_archive --days 120 --flights-per-day 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from archive import DAY, archive_flights, read_flights
+from connections.postgresql import create_schema
+from dimensions import resolve_flight_keys
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark archival of cold flights')
+    parser.add_argument('--days', type=int, default=120, help='Days of synthetic flights')
+    parser.add_argument('--flights-per-day', type=int, default=5000, help='Flights per day')
+    parser.add_argument('--keep-days', type=int, default=14, help='Days kept in flight_data')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+    return parser.parse_args()
+
+def best_time(function, repeat):
+    """Best wall time of a callable in milliseconds."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def synthetic_day(rng, day, count, airports):
+    """Flights first seen during a day."""
+    first_seen = START + day * DAY + rng.integers(0, DAY, count)
+    routes = rng.choice(len(airports), (count, 2))
+    return pd.DataFrame({
+        'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, count)],
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + rng.integers(1800, 36000, count),
+        'estDepartureAirport': airports[routes[:, 0]],
+        'estArrivalAirport': airports[routes[:, 1]],
+        'callsign': [f"BNC{i % 10000}" for i in range(count)]
+    })
+
+def insert_batch(engine, df):
+    """Insert a batch of keyed flights, rolled back afterwards."""
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        df.to_sql('flight_data', connection, if_exists='append', index=False)
+        transaction.rollback()
+
+def measure(engine, directory, batch, range_start, repeat):
+    """Insert, recent and range read timings in milliseconds."""
+    return (
+        best_time(lambda: insert_batch(engine, batch), repeat),
+        best_time(lambda: read_flights(engine, limit=200, directory=directory), repeat),
+        best_time(lambda: read_flights(engine, range_start, range_start + 7 * DAY, directory=directory), repeat)
+    )
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+    airports = np.array([f"A{i:03d}" for i in range(300)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, 'flights.db')
+        archive_directory = os.path.join(directory, 'archive')
+        engine = create_engine(f"sqlite:///{database}")
+        create_schema(engine)
+
+        def keyed(df):
+            """Flights with dimension keys instead of codes."""
+            df = df.join(resolve_flight_keys(df, engine))
+            return df.drop(columns=['icao24', 'estDepartureAirport', 'estArrivalAirport'])
+
+        for day in range(args.days):
+            with engine.begin() as connection:
+                keyed(synthetic_day(rng, day, args.flights_per_day, airports)).to_sql(
+                    'flight_data', connection, if_exists='append', index=False
+                )
+
+        batch = keyed(synthetic_day(rng, args.days, 2000, airports))
+        range_start = START + args.days // 3 * DAY
+        before = measure(engine, archive_directory, batch, range_start, args.repeat)
+        size_before = os.path.getsize(database)
+
+        now = START + args.days * DAY
+        start = time.perf_counter()
+        stats = {}
+        archive_flights(engine, older_than_days=args.keep_days, directory=archive_directory, now=now, stats=stats)
+        archive_seconds = time.perf_counter() - start
+        with engine.begin() as connection:
+            connection.execute(text("VACUUM"))
+        after = measure(engine, archive_directory, batch, range_start, args.repeat)
+        size_after = os.path.getsize(database)
+        engine.dispose()
+
+    print(f"{args.days} days x {args.flights_per_day} flights, keeping {args.keep_days} days")
+    print(f"Archived {stats['archived']} flights in {stats['segments']} files in {archive_seconds:.1f} s")
+    print(f"Database: {size_before / 1e6:7.1f} MB -> {size_after / 1e6:.1f} MB, "
+          f"archive files {stats['bytes'] / 1e6:.1f} MB")
+    for name, old, new in zip(("Insert 2000 flights", "Most recent 200", "7-day archived range"), before, after):
+        print(f"{name:<22} {old:8.1f} ms -> {new:8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark load throughput and transaction length by batch size.
+
+Synthetic flights are loaded into a fresh SQLite file with
+load_data_to_db, split into fixed-size transactions and into transactions
+sized by a BatchSizeTuner. Throughput, the longest transaction and, for
+the tuner, the sizes it went through are reported.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_batching --flights 300000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import sessionmaker
+
+from batching import BatchSizeTuner
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine
+from load import load_data_to_db
+from transform import transform_flight_data
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark adaptive load batch sizes')
+    parser.add_argument('--flights', type=int, default=300000, help='Number of synthetic flights')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 5000, 50000], help='Fixed batch sizes')
+    parser.add_argument('--target-seconds', type=float, default=1.0, help='Target duration of a tuned batch')
+    return parser.parse_args()
+
+def synthetic_flights(count):
+    """Transformed flights ordered by lastSeen."""
+    rng = np.random.default_rng(42)
+    first_seen = START + rng.integers(0, 30 * 86400, count)
+    airports = np.array([f"A{i:03d}" for i in range(300)])
+    df = pd.DataFrame({
+        'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, count)],
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + rng.integers(1800, 36000, count),
+        'estDepartureAirport': airports[rng.integers(0, 300, count)],
+        'estArrivalAirport': airports[rng.integers(0, 300, count)],
+        'callsign': [f"BNC{i % 10000}" for i in range(count)]
+    })
+    return transform_flight_data(df.sort_values('lastSeen', kind='stable', ignore_index=True), None)
+
+def load(df, database, next_size, record=None):
+    """Load flights in transactions of next_size() rows; returns (seconds, longest transaction)."""
+    engine = create_sqlite_engine(database)
+    create_schema(engine)
+    session = sessionmaker(bind=engine)()
+    longest = 0.0
+    start = time.perf_counter()
+    offset = 0
+    while offset < len(df):
+        chunk = df.iloc[offset:offset + next_size()].copy()
+        timings = {}
+        chunk_start = time.perf_counter()
+        load_data_to_db(chunk, engine, session, is_incremental=False, timings=timings)
+        seconds = time.perf_counter() - chunk_start
+        longest = max(longest, seconds)
+        if record:
+            record(len(chunk), seconds, timings['commit_seconds'])
+        offset += len(chunk)
+    total = time.perf_counter() - start
+    session.close()
+    engine.dispose()
+    return total, longest
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    df = synthetic_flights(args.flights)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{args.flights} flights")
+        for size in args.sizes:
+            total, longest = load(df, os.path.join(directory, f"fixed-{size}.db"), lambda: size)
+            print(f"Fixed {size:>7} rows   {args.flights / total:9.0f} rows/s   longest transaction {longest:6.2f} s")
+
+        database = os.path.join(directory, "tuned.db")
+        engine = create_sqlite_engine(database)
+        create_schema(engine)
+        tuner = BatchSizeTuner(engine, maximum=max(args.sizes), target_seconds=args.target_seconds)
+        total, longest = load(df, database, lambda: tuner.size, tuner.record)
+        tuner.save()
+        engine.dispose()
+        sizes = [tuner.timeline[0]['rows']] + [entry['next_size'] for entry in tuner.timeline]
+        print(f"Tuned              {args.flights / total:9.0f} rows/s   longest transaction {longest:6.2f} s")
+        print(f"Tuned sizes: {' -> '.join(str(size) for size in dict.fromkeys(sizes))}")
+
+if __name__ == "__main__":
+    main()
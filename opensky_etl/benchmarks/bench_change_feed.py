@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark a downstream consumer polling flight_data by lastSeen against
+reading the change feed.
+
+Synthetic batches, a share of them late-arriving flights whose lastSeen
+is older than the previous batch, are loaded into a SQLite file with
+append_changes. After each batch the consumer fetches the deltas both
+ways; total time and the number of flights each approach missed are
+reported.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_change_feed --batches 100 --flights-per-batch 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from change_feed import ack, append_changes, read_pending
+from connections.postgresql import create_schema
+from dimensions import resolve_flight_keys
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the change feed')
+    parser.add_argument('--batches', type=int, default=100, help='Number of loads')
+    parser.add_argument('--flights-per-batch', type=int, default=5000, help='Flights per load')
+    parser.add_argument('--late-share', type=float, default=0.02, help='Share of late-arriving flights per batch')
+    return parser.parse_args()
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+    airports = np.array([f"A{i:03d}" for i in range(200)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'feed.db')}")
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+
+        watermark = 0
+        poll_time = feed_time = 0.0
+        poll_missed = feed_missed = 0
+        for batch in range(args.batches):
+            batch_end = START + (batch + 1) * 3600
+            last_seen = batch_end - rng.integers(0, 3600, args.flights_per_batch)
+            late = rng.random(args.flights_per_batch) < args.late_share
+            last_seen[late] -= 7200
+            routes = rng.choice(len(airports), (args.flights_per_batch, 2))
+            df = pd.DataFrame({
+                'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, args.flights_per_batch)],
+                'firstSeen': last_seen - rng.integers(1800, 36000, args.flights_per_batch),
+                'lastSeen': last_seen,
+                'estDepartureAirport': airports[routes[:, 0]],
+                'estArrivalAirport': airports[routes[:, 1]]
+            })
+            df = df.join(resolve_flight_keys(df, engine))
+            df[['firstSeen', 'lastSeen', 'aircraft_id', 'departure_airport_id', 'arrival_airport_id', 'route_id']].to_sql(
+                'flight_data', session.connection(), if_exists='append', index=False
+            )
+            append_changes(session, df)
+            session.commit()
+
+            # Polling consumer: flights seen after its lastSeen watermark
+            start = time.perf_counter()
+            polled = pd.read_sql(
+                f"SELECT * FROM flights WHERE lastSeen > {watermark} ORDER BY lastSeen", engine
+            )
+            poll_time += time.perf_counter() - start
+            poll_missed += len(df) - len(polled)
+            if not polled.empty:
+                watermark = int(polled['lastSeen'].max())
+
+            # Feed consumer: changes after its acknowledged offset
+            start = time.perf_counter()
+            changes = read_pending(engine, "bench", limit=args.flights_per_batch * 2)
+            if not changes.empty:
+                ack(engine, "bench", int(changes['offset'].iloc[-1]))
+            feed_time += time.perf_counter() - start
+            feed_missed += len(df) - len(changes)
+
+        session.close()
+        engine.dispose()
+
+    print(f"{args.batches} loads of {args.flights_per_batch} flights, {args.late_share:.0%} late")
+    print(f"Polling flight_data: {poll_time * 1000:8.1f} ms, {poll_missed} flights missed")
+    print(f"Change feed:         {feed_time * 1000:8.1f} ms, {feed_missed} flights missed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+"""
+Benchmark the dimension-key flight_data layout against the legacy one with
+codes repeated on every row.
+
+A legacy SQLite table is filled with synthetic flights, copied and migrated
+by create_schema; both files are then compared on size and airport
+aggregations.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_dimensions --rows 1000000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import numpy as np
+from sqlalchemy import create_engine
+
+from connections.postgresql import create_schema
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark dimension tables')
+    parser.add_argument('--rows', type=int, default=500000, help='Number of synthetic flights')
+    parser.add_argument('--airports', type=int, default=3000, help='Number of distinct airports')
+    parser.add_argument('--routes', type=int, default=20000, help='Number of distinct routes')
+    parser.add_argument('--aircraft', type=int, default=20000, help='Number of distinct aircraft')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+    return parser.parse_args()
+
+def time_query(db, query, repeat):
+    """Best wall time of a query in milliseconds."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db.execute(query).fetchall()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+
+    airports = np.array([f"{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}X" for i in range(args.airports)])
+    aircraft = np.array([f"{i:06x}" for i in rng.choice(16 ** 6, args.aircraft, replace=False)])
+
+    # Routes between hub-heavy airports, flights concentrated on the busiest routes
+    weights = 1.0 / np.arange(1, args.airports + 1)
+    weights /= weights.sum()
+    pairs = np.unique(rng.choice(args.airports, (args.routes * 2, 2), p=weights), axis=0)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    pairs = pairs[rng.permutation(len(pairs))[:args.routes]]
+    route_weights = 1.0 / np.arange(1, len(pairs) + 1) ** 0.8
+    route_weights /= route_weights.sum()
+    routes = pairs[rng.choice(len(pairs), args.rows, p=route_weights)]
+    departures, arrivals = airports[routes[:, 0]], airports[routes[:, 1]]
+    first_seen = np.sort(rng.integers(1_700_000_000, 1_700_000_000 + 30 * 86400, args.rows))
+    icao24 = aircraft[rng.integers(0, args.aircraft, args.rows)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_path = os.path.join(directory, "legacy.db")
+        star_path = os.path.join(directory, "star.db")
+
+        legacy_db = sqlite3.connect(legacy_path)
+        legacy_db.execute(
+            'CREATE TABLE flight_data (id INTEGER PRIMARY KEY, icao24 VARCHAR(24), "firstSeen" INTEGER, '
+            '"estDepartureAirport" VARCHAR(4), "lastSeen" INTEGER, "estArrivalAirport" VARCHAR(4), '
+            'callsign VARCHAR(8), "estDepartureAirportHorizDistance" INTEGER, "estDepartureAirportVertDistance" INTEGER, '
+            '"estArrivalAirportHorizDistance" INTEGER, "estArrivalAirportVertDistance" INTEGER, '
+            '"departureAirportCandidatesCount" INTEGER, "arrivalAirportCandidatesCount" INTEGER, '
+            'flight_duration_minutes FLOAT, total_distance_km FLOAT, '
+            'airport_pair VARCHAR(10), row_hash BIGINT)'
+        )
+        legacy_db.executemany(
+            'INSERT INTO flight_data (icao24, "firstSeen", "estDepartureAirport", "lastSeen", "estArrivalAirport", '
+            'callsign, flight_duration_minutes, total_distance_km, airport_pair, row_hash) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (
+                (str(a), int(f), str(d), int(f) + 5400, str(r), f"FLT{i % 10000:04d}", 90.0, 1.5, f"{d}-{r}", i)
+                for i, (a, f, d, r) in enumerate(zip(icao24, first_seen, departures, arrivals))
+            )
+        )
+        # Same indexes as the model, with the airport indexes on the code columns
+        legacy_db.execute('CREATE INDEX "ix_flight_data_firstSeen" ON flight_data ("firstSeen")')
+        legacy_db.execute('CREATE INDEX "ix_flight_data_lastSeen" ON flight_data ("lastSeen")')
+        legacy_db.execute('CREATE INDEX ix_flight_data_natural_key ON flight_data (icao24, "firstSeen")')
+        legacy_db.execute('CREATE INDEX ix_legacy_departure ON flight_data ("estDepartureAirport")')
+        legacy_db.execute('CREATE INDEX ix_legacy_arrival ON flight_data ("estArrivalAirport")')
+        legacy_db.commit()
+        legacy_db.close()
+
+        shutil.copy(legacy_path, star_path)
+        migrate_start = time.perf_counter()
+        engine = create_engine(f"sqlite:///{star_path}")
+        create_schema(engine)
+        engine.dispose()
+        migrate_time = time.perf_counter() - migrate_start
+
+        legacy_db = sqlite3.connect(legacy_path)
+        star_db = sqlite3.connect(star_path)
+        # Reclaim the pages of the dropped columns before comparing sizes
+        legacy_db.execute("VACUUM")
+        star_db.execute("VACUUM")
+
+        queries = {
+            "departures per airport": (
+                'SELECT "estDepartureAirport", COUNT(*) FROM flight_data GROUP BY "estDepartureAirport"',
+                'SELECT a.code, d.n FROM (SELECT departure_airport_id, COUNT(*) AS n FROM flight_data '
+                'GROUP BY departure_airport_id) d JOIN airports a ON a.id = d.departure_airport_id'
+            ),
+            "flights per route": (
+                'SELECT airport_pair, COUNT(*) FROM flight_data GROUP BY airport_pair',
+                'SELECT r.code, s.n FROM (SELECT route_id, COUNT(*) AS n FROM flight_data '
+                'GROUP BY route_id) s JOIN routes r ON r.id = s.route_id'
+            ),
+            "flights at one airport": (
+                'SELECT COUNT(*) FROM flight_data WHERE "estDepartureAirport" = \'AAAX\' OR "estArrivalAirport" = \'AAAX\'',
+                'SELECT COUNT(*) FROM flight_data WHERE departure_airport_id = 1 OR arrival_airport_id = 1'
+            )
+        }
+
+        timings = {
+            name: (time_query(legacy_db, legacy, args.repeat), time_query(star_db, star, args.repeat))
+            for name, (legacy, star) in queries.items()
+        }
+        legacy_db.close()
+        star_db.close()
+
+        legacy_size = os.path.getsize(legacy_path)
+        star_size = os.path.getsize(star_path)
+
+    print(f"Flights: {args.rows}, airports: {args.airports}, routes: {len(pairs)}, aircraft: {args.aircraft}")
+    print(f"Legacy layout:   {legacy_size / 1e6:.1f} MB")
+    print(f"Dimension keys:  {star_size / 1e6:.1f} MB (including dimension tables), "
+          f"{legacy_size / star_size:.2f}x smaller, migrated in {migrate_time:.1f} s")
+    for name, (legacy, star) in timings.items():
+        print(f"{name:<24} legacy {legacy:8.1f} ms   keys {star:8.1f} ms   {legacy / star:.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Benchmark the project's queries without and with the managed indexes.
+
+Synthetic flights are loaded into a SQLite file (or the database of
+--database), every query of indexes.PROJECT_QUERIES is timed, the managed
+indexes are built and the queries are timed again. The time of each query
+before and after and the indexes its plan uses are reported.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_indexes --flights 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine
+from indexes import PROJECT_QUERIES, build_indexes, index_usage_report, render_query, sample_params
+from load import create_summary_views, load_data_to_db
+from transform import transform_flight_data
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark queries without and with the managed indexes')
+    parser.add_argument('--flights', type=int, default=200000, help='Number of synthetic flights')
+    parser.add_argument('--days', type=int, default=30, help='Days of flights')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs of each query, the fastest is reported')
+    parser.add_argument('--database', help='Database URL (default: a temporary SQLite file)')
+    return parser.parse_args()
+
+def synthetic_flights(count, days):
+    """Transformed flights between 300 airports."""
+    rng = np.random.default_rng(42)
+    first_seen = START + rng.integers(0, days * 86400, count)
+    airports = np.array([f"A{i:03d}" for i in range(300)])
+    df = pd.DataFrame({
+        'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, count)],
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + rng.integers(1800, 36000, count),
+        'estDepartureAirport': airports[rng.integers(0, 300, count)],
+        'estArrivalAirport': airports[rng.integers(0, 300, count)],
+        'callsign': [f"BNC{i % 10000}" for i in range(count)],
+        'estDepartureAirportHorizDistance': rng.integers(0, 5000, count),
+        'estArrivalAirportHorizDistance': rng.integers(0, 5000, count)
+    })
+    return transform_flight_data(df, None)
+
+def time_queries(engine, params, repeat):
+    """Fastest time of each project query in seconds."""
+    timings = {}
+    with engine.connect() as connection:
+        for name, sql in PROJECT_QUERIES.items():
+            sql, query_params = render_query(engine, sql, params)
+            best = float('inf')
+            for _ in range(repeat):
+                started = time.perf_counter()
+                connection.execute(text(sql), query_params).fetchall()
+                best = min(best, time.perf_counter() - started)
+            timings[name] = best
+    return timings
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database:
+            engine = create_engine(args.database)
+        else:
+            engine = create_sqlite_engine(os.path.join(directory, "flights.db"))
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+        load_data_to_db(synthetic_flights(args.flights, args.days), engine, session, is_incremental=False)
+        session.close()
+        create_summary_views(engine)
+
+        params = sample_params(engine)
+        before = time_queries(engine, params, args.repeat)
+        stats = {}
+        build_indexes(engine, stats=stats)
+        after = time_queries(engine, params, args.repeat)
+        report = index_usage_report(engine)
+
+        print(f"{args.flights} flights on {engine.dialect.name}, "
+              f"{stats['built']} indexes built in {sum(stats['seconds'].values()):.2f} s")
+        width = max(len(name) for name in PROJECT_QUERIES)
+        for name in PROJECT_QUERIES:
+            used = ', '.join(report['queries'][name].get('indexes', [])) or '-'
+            print(f"{name:<{width}}  {before[name] * 1000:9.2f} ms -> {after[name] * 1000:9.2f} ms   "
+                  f"x{before[name] / max(after[name], 1e-9):6.1f}   {used}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Benchmark AirborneIndex against the naive firstSeen/lastSeen predicate.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_intervals --rows 5000000
+"""
+import argparse
+import time
+import numpy as np
+
+from intervals import AirborneIndex
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark airborne interval queries')
+    parser.add_argument('--rows', type=int, default=2000000, help='Number of synthetic flights')
+    parser.add_argument('--queries', type=int, default=200, help='Number of queries per method')
+    parser.add_argument('--range', type=int, default=0, help='Query range length in seconds (0 = instant)')
+    return parser.parse_args()
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+
+    # 30 days of flights, mostly short-haul with a long-haul tail
+    span = 30 * 86400
+    starts = rng.integers(0, span, args.rows)
+    durations = np.where(
+        rng.random(args.rows) < 0.9,
+        rng.integers(1200, 4 * 3600, args.rows),
+        rng.integers(4 * 3600, 18 * 3600, args.rows)
+    )
+    ends = starts + durations
+    query_starts = rng.integers(0, span, args.queries)
+
+    build_start = time.perf_counter()
+    index = AirborneIndex(starts, ends)
+    build_time = time.perf_counter() - build_start
+
+    naive_start = time.perf_counter()
+    naive_results = [
+        np.flatnonzero((starts <= t + args.range) & (ends >= t)) for t in query_starts
+    ]
+    naive_time = (time.perf_counter() - naive_start) / args.queries
+
+    index_start = time.perf_counter()
+    index_results = [index.overlapping(t, t + args.range) for t in query_starts]
+    index_time = (time.perf_counter() - index_start) / args.queries
+
+    assert all(np.array_equal(a, b) for a, b in zip(naive_results, index_results))
+
+    print(f"Rows: {args.rows:,}, queries: {args.queries}, range: {args.range}s")
+    print(f"Average matches per query: {np.mean([len(r) for r in index_results]):,.0f}")
+    print(f"Index build: {build_time * 1000:.1f} ms")
+    print(f"Naive predicate: {naive_time * 1000:.3f} ms/query")
+    print(f"AirborneIndex: {index_time * 1000:.3f} ms/query ({naive_time / index_time:.0f}x)")
+
+if __name__ == "__main__":
+    main()
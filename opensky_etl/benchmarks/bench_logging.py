@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Benchmark the cost of logging calls in a hot loop.
+
+Times a loop of INFO records written synchronously to a stream and a
+rotating file (the previous setup) against the queue handler of
+setup_logging, where the loop only enqueues. Also times disabled DEBUG
+calls with an eager f-string against lazy %-style arguments, and a
+repeated message under the rate limit.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_logging --records 100000
+"""
+import argparse
+import io
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+
+from config.settings import LOG_FORMAT
+from utils.logging_config import ContextFilter, JsonFormatter, NonBlockingQueueHandler, RateLimitFilter, log_context
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark logging overhead')
+    parser.add_argument('--records', type=int, default=100000, help='Records per loop')
+    return parser.parse_args()
+
+def per_call(logger, records, message, *args):
+    """Mean microseconds per logging call."""
+    start = time.perf_counter()
+    for i in range(records):
+        logger.info(message, i, *args)
+    return (time.perf_counter() - start) / records * 1e6
+
+def make_logger(name, *handlers):
+    """Logger writing only to the given handlers."""
+    logger = logging.getLogger(f"bench.{name}")
+    logger.handlers = list(handlers)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    sql = "SELECT * FROM flights WHERE \"firstSeen\" >= 0 " * 200
+
+    with tempfile.TemporaryDirectory() as directory:
+        stream = logging.StreamHandler(io.StringIO())
+        stream.setFormatter(logging.Formatter(LOG_FORMAT))
+        file_handler = RotatingFileHandler(os.path.join(directory, "sync.log"), maxBytes=10485760, backupCount=5)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        sync_logger = make_logger("sync", stream, file_handler)
+        sync_us = per_call(sync_logger, args.records, "Window %d loaded")
+
+        queued_stream = logging.StreamHandler(io.StringIO())
+        queued_stream.setFormatter(logging.Formatter(LOG_FORMAT))
+        queued_file = RotatingFileHandler(os.path.join(directory, "queued.log"), maxBytes=10485760, backupCount=5)
+        queued_file.setFormatter(JsonFormatter())
+        handler = NonBlockingQueueHandler(queue.Queue(args.records))
+        handler.addFilter(ContextFilter())
+        listener = QueueListener(handler.queue, queued_stream, queued_file)
+        listener.start()
+        queued_logger = make_logger("queued", handler)
+        with log_context(run="bench", stage="load"):
+            queued_us = per_call(queued_logger, args.records, "Window %d loaded")
+        drain_start = time.perf_counter()
+        listener.stop()
+        drain_seconds = time.perf_counter() - drain_start
+
+        limited = NonBlockingQueueHandler(queue.Queue(args.records))
+        limited.addFilter(RateLimitFilter(interval=60, burst=10))
+        limited_us = per_call(make_logger("limited", limited), args.records, "Window %d loaded")
+
+        debug_logger = make_logger("debug", handler)
+        start = time.perf_counter()
+        for i in range(args.records):
+            debug_logger.debug(f"Processed SQL: {sql[:500]}... window {i}")
+        eager_us = (time.perf_counter() - start) / args.records * 1e6
+        start = time.perf_counter()
+        for i in range(args.records):
+            debug_logger.debug("Processed SQL: %.500s... window %d", sql, i)
+        lazy_us = (time.perf_counter() - start) / args.records * 1e6
+
+        for open_handler in (stream, file_handler, queued_stream, queued_file):
+            open_handler.close()
+
+    print(f"{args.records} records per loop")
+    print(f"INFO, synchronous handlers   {sync_us:6.2f} us/call")
+    print(f"INFO, queued (JSON file)     {queued_us:6.2f} us/call   (listener drained in {drain_seconds:.2f} s)")
+    print(f"INFO, rate-limited repeats   {limited_us:6.2f} us/call   ({len(limited.queue.queue)} kept)")
+    print(f"DEBUG off, eager f-string    {eager_us:6.2f} us/call")
+    print(f"DEBUG off, lazy arguments    {lazy_us:6.2f} us/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Benchmark peak memory of transforming and loading a large extract.
+
+Synthetic flights are transformed and loaded into a SQLite file in a fresh
+process per mode: in one batch as before, and in LOAD_BATCH_ROWS batches
+through a MemoryGovernor with --budget-mb. The peak resident set size,
+time and spilled bytes of each mode are reported.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_memory --flights 500000 --budget-mb 64
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from load import load_data_to_db
+from memory import MemoryGovernor
+from transform import transform_flight_data
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark memory-budgeted loads')
+    parser.add_argument('--flights', type=int, default=500000, help='Number of synthetic flights')
+    parser.add_argument('--batch-rows', type=int, default=50000, help='Rows per batch')
+    parser.add_argument('--budget-mb', type=int, default=64, help='Memory budget of the governor')
+    return parser.parse_args()
+
+def synthetic_flights(count):
+    """Flights as returned by the extract."""
+    rng = np.random.default_rng(42)
+    first_seen = START + rng.integers(0, 30 * 86400, count)
+    airports = np.array([f"A{i:03d}" for i in range(300)])
+    return pd.DataFrame({
+        'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, count)],
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + rng.integers(1800, 36000, count),
+        'estDepartureAirport': airports[rng.integers(0, 300, count)],
+        'estArrivalAirport': airports[rng.integers(0, 300, count)],
+        'callsign': [f"BNC{i % 10000}" for i in range(count)],
+        'estDepartureAirportHorizDistance': rng.integers(0, 5000, count),
+        'estArrivalAirportHorizDistance': rng.integers(0, 5000, count)
+    })
+
+def run(mode, args, database, results):
+    """Load the flights in one mode and report peak memory."""
+    engine = create_engine(f"sqlite:///{database}")
+    create_schema(engine)
+    session = sessionmaker(bind=engine)()
+    df = synthetic_flights(args.flights)
+    spilled = 0
+
+    start = time.perf_counter()
+    if mode == "single":
+        load_data_to_db(transform_flight_data(df, engine), engine, session, is_incremental=False)
+    else:
+        with MemoryGovernor(budget_bytes=args.budget_mb * 1024 * 1024) as governor:
+            governor.add_frame(df.sort_values('lastSeen', kind='stable'), args.batch_rows)
+            del df
+            for batch in governor.drain():
+                load_data_to_db(transform_flight_data(batch, engine), engine, session, is_incremental=False)
+            spilled = governor.stats['spilled_bytes']
+    seconds = time.perf_counter() - start
+    session.close()
+    engine.dispose()
+
+    # ru_maxrss is in kilobytes on Linux
+    results[mode] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, seconds, spilled)
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    manager = multiprocessing.Manager()
+    results = manager.dict()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("single", "governed"):
+            process = multiprocessing.Process(
+                target=run, args=(mode, args, os.path.join(directory, f"{mode}.db"), results)
+            )
+            process.start()
+            process.join()
+
+    print(f"{args.flights} flights, batches of {args.batch_rows}, budget {args.budget_mb} MB")
+    for mode in ("single", "governed"):
+        peak, seconds, spilled = results[mode]
+        print(f"{mode:<9} peak RSS {peak:8.1f} MB   {seconds:6.1f} s   spilled {spilled / 1e6:.1f} MB")
+
+if __name__ == "__main__":
+    main()
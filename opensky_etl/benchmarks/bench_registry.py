@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+"""
+Benchmark registry enrichment through the memory-mapped index against
+reading the registry CSV and merging it on every run.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_registry --aircraft 600000 --flights 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from registry import AircraftRegistry, REGISTRY_FIELDS
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark aircraft registry lookups')
+    parser.add_argument('--aircraft', type=int, default=600000, help='Aircraft in the registry')
+    parser.add_argument('--flights', type=int, default=100000, help='Flights per batch')
+    parser.add_argument('--batches', type=int, default=5, help='Batches per method')
+    return parser.parse_args()
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+
+    addresses = rng.choice(16 ** 6, args.aircraft, replace=False)
+    icao24 = pd.Series([f"{address:06x}" for address in addresses])
+    operators = np.array([f"Operator {i}" for i in range(5000)])
+    types = np.array(["A319", "A320", "A321", "B738", "B77W", "E190", "CRJ9", "AT76", "C172"])
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, "aircraftDatabase.csv")
+        pd.DataFrame({
+            'icao24': icao24,
+            'registration': [f"R-{address:05X}" for address in addresses],
+            'typecode': types[rng.integers(0, len(types), args.aircraft)],
+            'model': types[rng.integers(0, len(types), args.aircraft)],
+            'operator': operators[rng.integers(0, len(operators), args.aircraft)]
+        }).to_csv(csv_path, index=False)
+
+        # 80% of flights by registered aircraft
+        batches = [
+            pd.DataFrame({'icao24': np.where(
+                rng.random(args.flights) < 0.8,
+                icao24.to_numpy()[rng.integers(0, args.aircraft, args.flights)],
+                'ffffff'
+            )})
+            for _ in range(args.batches)
+        ]
+
+        start = time.perf_counter()
+        for batch in batches:
+            registry = pd.read_csv(csv_path, usecols=['icao24', *REGISTRY_FIELDS], dtype=str)
+            batch.merge(registry, on='icao24', how='left')
+        merge_time = (time.perf_counter() - start) / args.batches
+
+        start = time.perf_counter()
+        AircraftRegistry.build(csv_path)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for batch in batches:
+            # Opening is part of the cost a fresh worker pays
+            AircraftRegistry.open(csv_path).lookup(batch['icao24'])
+        lookup_time = (time.perf_counter() - start) / args.batches
+
+        index_dir = f"{csv_path}.index"
+        index_size = sum(os.path.getsize(os.path.join(index_dir, name)) for name in os.listdir(index_dir))
+        csv_size = os.path.getsize(csv_path)
+
+    print(f"Registry: {args.aircraft} aircraft ({csv_size / 1e6:.1f} MB CSV, {index_size / 1e6:.1f} MB index)")
+    print(f"CSV read + merge per batch:  {merge_time * 1000:8.1f} ms")
+    print(f"Index open + lookup per batch: {lookup_time * 1000:6.1f} ms ({merge_time / lookup_time:.0f}x faster)")
+    print(f"One-time index build: {build_time:.1f} s")
+
+if __name__ == "__main__":
+    main()
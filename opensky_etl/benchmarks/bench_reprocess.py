@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+Benchmark reprocessing of derived columns by number of workers.
+
+Synthetic flights are loaded into a SQLite file, their distances are
+invalidated and reprocess_flights recomputes them with each worker count
+in turn. Throughput and updated flights of each run are reported.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_reprocess --flights 50000 --workers 1 4
+"""
+import argparse
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine
+from load import load_data_to_db
+from reprocess import reprocess_flights
+from transform import transform_flight_data
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark reprocessing of derived columns')
+    parser.add_argument('--flights', type=int, default=50000, help='Number of synthetic flights')
+    parser.add_argument('--days', type=int, default=30, help='Days of flights')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help='Worker counts')
+    parser.add_argument('--chunk-seconds', type=int, default=21600, help='Window length in seconds')
+    return parser.parse_args()
+
+def synthetic_flights(count, days):
+    """Transformed flights."""
+    rng = np.random.default_rng(42)
+    first_seen = START + rng.integers(0, days * 86400, count)
+    airports = np.array([f"A{i:03d}" for i in range(300)])
+    df = pd.DataFrame({
+        'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, count)],
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + rng.integers(1800, 36000, count),
+        'estDepartureAirport': airports[rng.integers(0, 300, count)],
+        'estArrivalAirport': airports[rng.integers(0, 300, count)],
+        'callsign': [f"BNC{i % 10000}" for i in range(count)],
+        'estDepartureAirportHorizDistance': rng.integers(0, 5000, count),
+        'estArrivalAirportHorizDistance': rng.integers(0, 5000, count)
+    })
+    return transform_flight_data(df, None)
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(os.path.join(directory, "flights.db"))
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+        load_data_to_db(synthetic_flights(args.flights, args.days), engine, session, is_incremental=False)
+        session.close()
+
+        print(f"{args.flights} flights over {args.days} days, windows of {args.chunk_seconds} s")
+        for workers in args.workers:
+            with engine.begin() as connection:
+                connection.execute(text("UPDATE flight_data SET total_distance_km = NULL"))
+            stats = {}
+            reprocess_flights(engine, f"bench-{workers}", workers=workers,
+                              chunk_seconds=args.chunk_seconds, stats=stats)
+            print(f"{workers:>2} workers   {stats['flights_per_second']:9.0f} flights/s   "
+                  f"{stats['seconds']:6.1f} s   {stats['flights_updated']} updated in {stats['windows_done']} windows")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Benchmark dashboard queries answered from the traffic rollups against
+aggregating flight_data on demand.
+
+Synthetic flights are loaded into a SQLite file in daily batches through
+the dimension keys and update_rollups, then daily departures of one
+airport and monthly departures and arrivals of all airports are timed
+both ways.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_rollups --days 182 --flights-per-day 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from dimensions import resolve_flight_keys
+from rollups import query_airport_traffic, update_rollups
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark traffic rollups')
+    parser.add_argument('--days', type=int, default=182, help='Days of synthetic flights, from 2024-01-01')
+    parser.add_argument('--flights-per-day', type=int, default=5000, help='Flights per daily batch')
+    parser.add_argument('--airports', type=int, default=500, help='Number of distinct airports')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+    return parser.parse_args()
+
+def best_time(function, repeat):
+    """Best wall time of a callable in milliseconds."""
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+    airports = np.array([f"{chr(65 + i // 676 % 26)}{chr(65 + i // 26 % 26)}{chr(65 + i % 26)}X" for i in range(args.airports)])
+    weights = 1.0 / np.arange(1, args.airports + 1)
+    weights /= weights.sum()
+
+    with tempfile.TemporaryDirectory() as directory, \
+            patch.dict('rollups.ROLLUP_RETENTION_DAYS', {"hour": 0, "day": 0, "month": 0}):
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'rollups.db')}")
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+
+        rollup_time = 0.0
+        for day in range(args.days):
+            first_seen = START + day * 86400 + rng.integers(0, 86400, args.flights_per_day)
+            routes = rng.choice(args.airports, (args.flights_per_day, 2), p=weights)
+            df = pd.DataFrame({
+                'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, args.flights_per_day)],
+                'firstSeen': first_seen,
+                'lastSeen': first_seen + rng.integers(1800, 36000, args.flights_per_day),
+                'estDepartureAirport': airports[routes[:, 0]],
+                'estArrivalAirport': airports[routes[:, 1]]
+            })
+            df = df.join(resolve_flight_keys(df, engine))
+            df[['firstSeen', 'lastSeen', 'aircraft_id', 'departure_airport_id', 'arrival_airport_id', 'route_id']].to_sql(
+                'flight_data', session.connection(), if_exists='append', index=False
+            )
+
+            start = time.perf_counter()
+            update_rollups(df, session)
+            session.commit()
+            rollup_time += time.perf_counter() - start
+
+        # Monthly queries need a month-aligned end, 182 days end with June
+        end = START + args.days * 86400
+        hub = airports[0]
+        on_demand = {
+            "daily departures of one airport": lambda: session.execute(text(
+                'SELECT ("firstSeen" / 86400) * 86400 AS day, COUNT(*) FROM flight_data f '
+                'JOIN airports a ON a.id = f.departure_airport_id '
+                'WHERE a.code = :code AND "firstSeen" >= :start AND "firstSeen" < :end GROUP BY day'
+            ), {'code': hub, 'start': START, 'end': end}).fetchall(),
+            "monthly traffic of all airports": lambda: pd.concat([
+                pd.read_sql(text(
+                    f'SELECT "{column}" AS seen, {key} AS airport_id FROM flight_data WHERE {key} IS NOT NULL'
+                ), session.connection()).assign(
+                    month=lambda d: d['seen'].astype('datetime64[s]').dt.to_period('M'), kind=column
+                )
+                for column, key in (('firstSeen', 'departure_airport_id'), ('lastSeen', 'arrival_airport_id'))
+            ]).groupby(['month', 'airport_id', 'kind']).size().unstack(fill_value=0)
+        }
+        from_rollups = {
+            "daily departures of one airport": lambda: query_airport_traffic(session, START, end, airport=hub, resolution="day"),
+            "monthly traffic of all airports": lambda: query_airport_traffic(session, START, end)
+        }
+
+        print(f"Flights: {args.days * args.flights_per_day} over {args.days} days")
+        print(f"Rollup maintenance: {rollup_time / args.days * 1000:.1f} ms per daily batch")
+        for name in on_demand:
+            scan_time = best_time(on_demand[name], args.repeat)
+            rollup_query_time = best_time(from_rollups[name], args.repeat)
+            print(f"{name:32s} on demand {scan_time:8.1f} ms, rollups {rollup_query_time:7.1f} ms "
+                  f"({scan_time / rollup_query_time:.0f}x faster)")
+
+        session.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""
+Benchmark route statistics lookups against aggregating flight_data.
+
+Synthetic flights are loaded into a SQLite file in batches, timing the
+route statistics update of each batch. Then the duration count, mean,
+variance, median and 95th percentile of routes are read from route_stats
+and computed from their flights with GROUP BY and exact percentiles.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_route_stats --flights 200000 --routes 20
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine
+from load import load_data_to_db
+from route_stats import get_route_stats, update_route_stats
+from transform import transform_flight_data
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark route statistics lookups')
+    parser.add_argument('--flights', type=int, default=200000, help='Number of synthetic flights')
+    parser.add_argument('--batch', type=int, default=20000, help='Flights per load')
+    parser.add_argument('--routes', type=int, default=20, help='Routes looked up')
+    return parser.parse_args()
+
+def synthetic_flights(count, seed):
+    """Transformed flights between 40 airports with route-dependent durations."""
+    rng = np.random.default_rng(seed)
+    departures = rng.integers(0, 40, count)
+    arrivals = rng.integers(0, 40, count)
+    airports = np.array([f"A{i:03d}" for i in range(40)])
+    first_seen = START + rng.integers(0, 30 * 86400, count)
+    minutes = 30 + 5 * np.abs(departures - arrivals) + rng.gamma(4, 5, count)
+    df = pd.DataFrame({
+        'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, count)],
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + (minutes * 60).astype(np.int64),
+        'estDepartureAirport': airports[departures],
+        'estArrivalAirport': airports[arrivals],
+        'callsign': [f"BNC{i % 10000}" for i in range(count)],
+        'estDepartureAirportHorizDistance': rng.integers(0, 5000, count),
+        'estArrivalAirportHorizDistance': rng.integers(0, 5000, count)
+    })
+    return transform_flight_data(df, None)
+
+def aggregate(connection, route):
+    """Route duration statistics computed from its flights."""
+    durations = pd.read_sql(text(
+        "SELECT flight_duration_minutes FROM flights WHERE airport_pair = :route"
+    ), connection, params={"route": route})['flight_duration_minutes']
+    return {"flights": len(durations), "mean": durations.mean(), "variance": durations.var(),
+            "p50": durations.quantile(0.5), "p95": durations.quantile(0.95)}
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_sqlite_engine(os.path.join(directory, "flights.db"))
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+
+        # Time the statistics update of each batch on its own, then load it
+        update_seconds = 0.0
+        load_seconds = 0.0
+        for seed, start in enumerate(range(0, args.flights, args.batch)):
+            df = synthetic_flights(min(args.batch, args.flights - start), seed)
+            started = time.perf_counter()
+            load_data_to_db(df, engine, session, is_incremental=False)
+            load_seconds += time.perf_counter() - started
+
+            stored = pd.read_sql(text("SELECT id AS route_id, code AS airport_pair FROM routes"), session.connection())
+            keyed = df.merge(stored, on='airport_pair', how='left')
+            started = time.perf_counter()
+            update_route_stats(keyed, session)
+            update_seconds += time.perf_counter() - started
+            session.rollback()
+
+        routes = pd.read_sql(text("SELECT code FROM routes ORDER BY id LIMIT :n"), session.connection(),
+                             params={"n": args.routes})['code'].tolist()
+        session.rollback()
+
+        started = time.perf_counter()
+        lookups = {route: get_route_stats(session, route) for route in routes}
+        lookup_seconds = time.perf_counter() - started
+
+        with engine.connect() as connection:
+            started = time.perf_counter()
+            exact = {route: aggregate(connection, route) for route in routes}
+            aggregate_seconds = time.perf_counter() - started
+
+        error = max(abs(lookups[route]['p95'] - exact[route]['p95']) / exact[route]['p95'] for route in routes)
+        print(f"{args.flights} flights loaded in {load_seconds:.2f} s, "
+              f"route statistics updates {update_seconds:.2f} s of it")
+        print(f"{len(routes)} routes   lookup {lookup_seconds * 1000 / len(routes):8.3f} ms/route   "
+              f"aggregate {aggregate_seconds * 1000 / len(routes):8.3f} ms/route   "
+              f"max p95 error {error * 100:.2f}%")
+        session.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Benchmark GridIndex queries against full scans of the live positions.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_spatial --aircraft 50000
+"""
+import argparse
+import time
+import numpy as np
+
+from spatial import GridIndex, haversine_km, in_bbox
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark spatial position queries')
+    parser.add_argument('--aircraft', type=int, default=50000, help='Number of live aircraft')
+    parser.add_argument('--queries', type=int, default=500, help='Number of queries per method')
+    return parser.parse_args()
+
+def timed(function, queries):
+    """Average milliseconds per call of function over the query points."""
+    start = time.perf_counter()
+    for lat, lon in queries:
+        function(lat, lon)
+    return (time.perf_counter() - start) * 1000 / len(queries)
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+
+    # Traffic concentrated around a few hubs plus uniform background
+    hubs = rng.uniform([-40, -130], [60, 140], (40, 2))
+    hub_positions = hubs[rng.integers(0, len(hubs), args.aircraft)] + rng.normal(0, 4, (args.aircraft, 2))
+    uniform = np.column_stack([rng.uniform(-70, 75, args.aircraft), rng.uniform(-180, 180, args.aircraft)])
+    positions = np.where(rng.random((args.aircraft, 1)) < 0.7, hub_positions, uniform)
+    latitudes = np.clip(positions[:, 0], -89.9, 89.9)
+    longitudes = (positions[:, 1] + 180.0) % 360.0 - 180.0
+    keys = np.array([f"{i:06x}" for i in range(args.aircraft)], dtype=object)
+    queries = hubs[rng.integers(0, len(hubs), args.queries)]
+
+    start = time.perf_counter()
+    index = GridIndex(capacity=args.aircraft)
+    index.update(keys, latitudes, longitudes)
+    index.bbox(0, 0, 1, 1)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    moved = rng.random(args.aircraft) < 0.2
+    start = time.perf_counter()
+    index.update(keys[moved], latitudes[moved] + 0.01, longitudes[moved])
+    index.bbox(0, 0, 1, 1)
+    update_ms = (time.perf_counter() - start) * 1000
+
+    results = [
+        ("bbox 4x4 deg",
+         lambda lat, lon: keys[in_bbox(latitudes, longitudes, lat - 2, lon - 2, lat + 2, lon + 2)],
+         lambda lat, lon: index.bbox(lat - 2, lon - 2, lat + 2, lon + 2)),
+        ("radius 50 km",
+         lambda lat, lon: keys[haversine_km(lat, lon, latitudes, longitudes) <= 50],
+         lambda lat, lon: index.radius(lat, lon, 50)),
+        ("10 nearest",
+         lambda lat, lon: np.argpartition(haversine_km(lat, lon, latitudes, longitudes), 10)[:10],
+         lambda lat, lon: index.nearest(lat, lon, 10)),
+    ]
+
+    print(f"Aircraft: {args.aircraft:,}, queries: {args.queries}")
+    print(f"Build: {build_ms:.1f} ms, update of 20% + re-sort: {update_ms:.1f} ms")
+    for name, scan, indexed in results:
+        scan_ms = timed(scan, queries)
+        index_ms = timed(indexed, queries)
+        print(f"{name}: scan {scan_ms:.3f} ms, grid {index_ms:.3f} ms ({scan_ms / index_ms:.0f}x)")
+
+if __name__ == "__main__":
+    main()
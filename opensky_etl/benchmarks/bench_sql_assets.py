@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Benchmark the SQL asset graph.
+
+Synthetic flights are written to a fresh SQLite file (or the database of
+--database), then the assets of assets/sql/transform are built with
+--workers concurrent connections, rebuilt with one, and run again with
+unchanged inputs. The time of each run and the timing graph of the first
+are reported. SQLite builds assets one at a time whatever --workers is;
+point --database at PostgreSQL to measure concurrent builds.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_sql_assets --flights 500000
+"""
+import argparse
+import os
+import tempfile
+import numpy as np
+from sqlalchemy import create_engine, insert
+
+from connections.postgresql import Airport, FlightData, create_schema
+from connections.sqlite import create_sqlite_engine
+from sql_assets import format_timing_graph, run_sql_assets
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the SQL asset graph')
+    parser.add_argument('--flights', type=int, default=500000, help='Number of synthetic flights')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent asset builds')
+    parser.add_argument('--database', help='Database URL (default: a temporary SQLite file)')
+    return parser.parse_args()
+
+def write_flights(engine, count):
+    """Insert synthetic flights between 300 airports."""
+    rng = np.random.default_rng(42)
+    with engine.begin() as connection:
+        connection.execute(insert(Airport.__table__), [{"code": f"A{i:03d}"} for i in range(300)])
+        airport_ids = [row[0] for row in connection.execute(Airport.__table__.select().with_only_columns(Airport.id))]
+    airport_ids = np.array(airport_ids)
+
+    first_seen = START + rng.integers(0, 30 * 86400, count)
+    last_seen = first_seen + rng.integers(1800, 36000, count)
+    departures = airport_ids[rng.integers(0, len(airport_ids), count)]
+    arrivals = airport_ids[rng.integers(0, len(airport_ids), count)]
+    distances = rng.integers(0, 5000, (count, 2))
+    for start in range(0, count, 50000):
+        with engine.begin() as connection:
+            connection.execute(insert(FlightData.__table__), [
+                {
+                    "firstSeen": int(first_seen[i]), "lastSeen": int(last_seen[i]),
+                    "departure_airport_id": int(departures[i]), "arrival_airport_id": int(arrivals[i]),
+                    "estDepartureAirportHorizDistance": int(distances[i, 0]),
+                    "estArrivalAirportHorizDistance": int(distances[i, 1])
+                }
+                for i in range(start, min(start + 50000, count))
+            ])
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database:
+            engine = create_engine(args.database)
+        else:
+            engine = create_sqlite_engine(os.path.join(directory, "flights.db"))
+        create_schema(engine)
+        write_flights(engine, args.flights)
+
+        print(f"{args.flights} flights on {engine.dialect.name}")
+        runs = [("build", args.workers, True), ("rebuild, 1 worker", 1, True), ("unchanged", args.workers, False)]
+        for label, workers, force in runs:
+            stats = {}
+            run_sql_assets(engine, workers=workers, force=force, stats=stats)
+            print(f"{label:<18} {stats['seconds']:7.2f} s   {stats['built']} built, {stats['skipped']} skipped")
+            if label == "build":
+                print("\n".join(format_timing_graph(stats['nodes'])))
+                print(f"Critical path: {' -> '.join(stats['critical_path'])}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
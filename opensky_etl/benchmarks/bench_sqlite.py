@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+Benchmark the SQLite backend with default and tuned pragmas.
+
+Synthetic flights are written to a fresh SQLite file in small transactions,
+as per-batch loads do, while reader threads repeatedly run read.py's most
+recent flights query. Write throughput and completed reads are reported
+for the default rollback journal and for SQLITE_PRAGMAS, followed by a
+range query over per-day shards.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_sqlite --flights 200000 --readers 4
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from archive import DAY
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine, query_shards, write_shard
+from dimensions import resolve_flight_keys
+
+# 2024-01-01 00:00 UTC
+START = 1704067200
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the SQLite backend')
+    parser.add_argument('--flights', type=int, default=200000, help='Number of synthetic flights')
+    parser.add_argument('--batch-size', type=int, default=500, help='Flights per transaction')
+    parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads')
+    parser.add_argument('--days', type=int, default=30, help='Shards for the range query')
+    return parser.parse_args()
+
+def synthetic_flights(rng, count, airports):
+    """Flights spread over the shard days."""
+    first_seen = START + rng.integers(0, 30 * DAY, count)
+    routes = rng.choice(len(airports), (count, 2))
+    return pd.DataFrame({
+        'icao24': [f"{address:06x}" for address in rng.integers(0, 50000, count)],
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + rng.integers(1800, 36000, count),
+        'estDepartureAirport': airports[routes[:, 0]],
+        'estArrivalAirport': airports[routes[:, 1]],
+        'callsign': [f"BNC{i % 10000}" for i in range(count)]
+    })
+
+def run(path, pragmas, flights, batch_size, readers):
+    """Write flights in batches with concurrent readers; returns (seconds, reads, read errors)."""
+    engine = create_sqlite_engine(path, pragmas=pragmas)
+    create_schema(engine)
+    keyed = flights.join(resolve_flight_keys(flights, engine))
+    keyed = keyed.drop(columns=['icao24', 'estDepartureAirport', 'estArrivalAirport'])
+
+    done = threading.Event()
+    counts = {"reads": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def read():
+        """Run the most recent flights query until writing is done."""
+        while not done.is_set():
+            try:
+                with engine.connect() as connection:
+                    connection.execute(text(
+                        'SELECT * FROM flights ORDER BY "lastSeen" DESC LIMIT 200'
+                    )).fetchall()
+                key = "reads"
+            except Exception:
+                key = "errors"
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    for offset in range(0, len(keyed), batch_size):
+        with engine.begin() as connection:
+            keyed.iloc[offset:offset + batch_size].to_sql('flight_data', connection, if_exists='append', index=False)
+    seconds = time.perf_counter() - start
+    done.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+    return seconds, counts["reads"], counts["errors"]
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+    airports = np.array([f"A{i:03d}" for i in range(300)])
+    flights = synthetic_flights(rng, args.flights, airports)
+    default_pragmas = {"busy_timeout": 5000}
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{args.flights} flights in transactions of {args.batch_size}, {args.readers} readers")
+        for name, pragmas in (("Default", default_pragmas), ("Tuned", None)):
+            seconds, reads, errors = run(os.path.join(directory, f"{name}.db"), pragmas, flights,
+                                         args.batch_size, args.readers)
+            print(f"{name:<8} {args.flights / seconds:9.0f} flights/s   {reads / seconds:7.1f} reads/s"
+                  f"   {errors} failed reads")
+
+        paths = []
+        for day in range(args.days):
+            day_start = START + day * DAY
+            df = flights[(flights['firstSeen'] >= day_start) & (flights['firstSeen'] < day_start + DAY)]
+            paths.append(os.path.join(directory, f"flights-{day:03d}.db"))
+            write_shard(paths[-1], df)
+        start = time.perf_counter()
+        result = query_shards(
+            'SELECT "estDepartureAirport", COUNT(*) AS flights FROM flights '
+            'WHERE "firstSeen" >= ? AND "firstSeen" < ? GROUP BY "estDepartureAirport"',
+            paths, (START + 7 * DAY, START + 14 * DAY)
+        )
+        print(f"7-day range over {len(paths)} shards: {len(result)} airports in "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
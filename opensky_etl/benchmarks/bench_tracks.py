@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Benchmark encoded track storage against a row-per-point SQLite table.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_tracks --flights 500
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from tracks import encode_track, decode_track
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark trajectory storage')
+    parser.add_argument('--flights', type=int, default=500, help='Number of synthetic flights')
+    parser.add_argument('--points', type=int, default=1500, help='Points per flight')
+    return parser.parse_args()
+
+def synthetic_track(rng, points):
+    """A smooth random trajectory sampled every ~5 seconds."""
+    return pd.DataFrame({
+        'time': 1700000000 + np.cumsum(rng.integers(4, 7, points)),
+        'latitude': 50.0 + np.cumsum(rng.normal(0, 0.002, points)),
+        'longitude': 8.5 + np.cumsum(rng.normal(0.01, 0.002, points)),
+        'altitude': np.clip(np.cumsum(rng.normal(5, 40, points)), 0, 12500).round()
+    })
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+    tracks = [synthetic_track(rng, args.points) for _ in range(args.flights)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        rows_path = os.path.join(directory, "rows.db")
+        blobs_path = os.path.join(directory, "blobs.db")
+
+        rows_db = sqlite3.connect(rows_path)
+        rows_db.execute(
+            "CREATE TABLE positions (id INTEGER PRIMARY KEY, icao24 TEXT, firstSeen INTEGER, "
+            "time INTEGER, latitude REAL, longitude REAL, altitude REAL)"
+        )
+        rows_db.execute("CREATE INDEX ix_positions_flight ON positions (icao24, firstSeen, time)")
+        blobs_db = sqlite3.connect(blobs_path)
+        blobs_db.execute(
+            "CREATE TABLE flight_tracks (id INTEGER PRIMARY KEY, icao24 TEXT, firstSeen INTEGER, "
+            "points INTEGER, data BLOB)"
+        )
+        blobs_db.execute("CREATE UNIQUE INDEX ix_flight_tracks_flight ON flight_tracks (icao24, firstSeen)")
+
+        encode_start = time.perf_counter()
+        for number, track in enumerate(tracks):
+            key = f"{number:06x}"
+            first_seen = int(track['time'][0])
+            rows_db.executemany(
+                "INSERT INTO positions (icao24, firstSeen, time, latitude, longitude, altitude) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, first_seen, *row) for row in track.itertuples(index=False)]
+            )
+            blobs_db.execute(
+                "INSERT INTO flight_tracks (icao24, firstSeen, points, data) VALUES (?, ?, ?, ?)",
+                (key, first_seen, len(track), encode_track(track))
+            )
+        encode_time = time.perf_counter() - encode_start
+        rows_db.commit()
+        blobs_db.commit()
+        rows_db.execute("VACUUM")
+        blobs_db.execute("VACUUM")
+
+        keys = [(f"{number:06x}", int(track['time'][0])) for number, track in enumerate(tracks)]
+
+        start = time.perf_counter()
+        for key, first_seen in keys:
+            pd.read_sql(
+                "SELECT time, latitude, longitude, altitude FROM positions WHERE icao24 = ? AND firstSeen = ? ORDER BY time",
+                rows_db, params=(key, first_seen)
+            )
+        rows_read = (time.perf_counter() - start) / len(keys)
+
+        start = time.perf_counter()
+        for key, first_seen in keys:
+            blob = blobs_db.execute(
+                "SELECT data FROM flight_tracks WHERE icao24 = ? AND firstSeen = ?", (key, first_seen)
+            ).fetchone()[0]
+            decode_track(blob)
+        blobs_read = (time.perf_counter() - start) / len(keys)
+
+        rows_size = os.path.getsize(rows_path)
+        blobs_size = os.path.getsize(blobs_path)
+
+    print(f"Flights: {args.flights}, points per flight: {args.points}")
+    print(f"Row-per-point table: {rows_size / 1e6:.1f} MB, {rows_read * 1000:.2f} ms per track read")
+    print(f"Encoded tracks:      {blobs_size / 1e6:.1f} MB, {blobs_read * 1000:.2f} ms per track read")
+    print(f"Storage ratio: {rows_size / blobs_size:.1f}x, read speedup: {rows_read / blobs_read:.1f}x")
+    print(f"Encoding (including row inserts): {encode_time:.1f} s")
+
+if __name__ == "__main__":
+    main()
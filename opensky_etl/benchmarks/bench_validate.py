@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+"""
+Benchmark the vectorized validation rules against checking each record
+in a Python loop.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_validate --rows 1000000
+"""
+import argparse
+import re
+import time
+import numpy as np
+import pandas as pd
+
+from config.settings import VALIDATION_MAX_FLIGHT_SECONDS
+from validate import evaluate_rules
+
+AIRPORT_CODE = re.compile(r'^[A-Z0-9]{4}$')
+ICAO24 = re.compile(r'^[0-9a-fA-F]{6}$')
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark validation rules')
+    parser.add_argument('--rows', type=int, default=1000000, help='Rows per batch')
+    return parser.parse_args()
+
+def failing_row(record):
+    """Row-wise equivalent of VALIDATION_RULES."""
+    icao24, first_seen, last_seen = record['icao24'], record['firstSeen'], record['lastSeen']
+    departure, arrival = record['estDepartureAirport'], record['estArrivalAirport']
+    return (
+        pd.isna(icao24) or not ICAO24.match(icao24)
+        or last_seen < first_seen
+        or last_seen - first_seen > VALIDATION_MAX_FLIGHT_SECONDS
+        or (not pd.isna(departure) and not AIRPORT_CODE.match(departure))
+        or (not pd.isna(arrival) and not AIRPORT_CODE.match(arrival))
+    )
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(42)
+
+    airports = np.array([f"{chr(65 + i // 1000)}{i % 1000:03d}" for i in range(3000)] + ['eddf', 'LFPGX', None], dtype=object)
+    first_seen = rng.integers(1_600_000_000, 1_700_000_000, args.rows)
+    df = pd.DataFrame({
+        'icao24': np.array([f"{address:06x}" for address in rng.integers(0, 16 ** 6, args.rows)], dtype=object),
+        'firstSeen': first_seen,
+        'lastSeen': first_seen + rng.integers(-60, 30000, args.rows),
+        'estDepartureAirport': airports[rng.integers(0, len(airports), args.rows)],
+        'estArrivalAirport': airports[rng.integers(0, len(airports), args.rows)]
+    })
+
+    start = time.perf_counter()
+    failures, _ = evaluate_rules(df)
+    vectorized_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    row_wise = [failing_row(record) for record in df.to_dict('records')]
+    loop_time = time.perf_counter() - start
+
+    assert list(failures.any(axis=1)) == row_wise
+    print(f"Rows: {args.rows} ({sum(row_wise)} failing)")
+    print(f"Row-wise checks:    {loop_time * 1000:8.1f} ms")
+    print(f"Vectorized rules:   {vectorized_time * 1000:8.1f} ms ({loop_time / vectorized_time:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmark work queue throughput with a growing number of worker processes.
+
+Each worker leases units from a shared SQLite queue and simulates the
+extraction with a fixed sleep; throughput and duplicate leases are
+reported per worker count.
+
+Run from the opensky_etl directory:
+    python -m benchmarks.bench_work_queue --units 200 --fetch-ms 100
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from sqlalchemy import create_engine, text
+
+from connections.postgresql import create_schema
+from work_queue import WorkQueue
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Benchmark the work queue')
+    parser.add_argument('--units', type=int, default=200, help='Units per run')
+    parser.add_argument('--fetch-ms', type=int, default=100, help='Simulated extraction time per unit')
+    parser.add_argument('--workers', default='1,2,4,8', help='Comma-separated worker counts')
+    return parser.parse_args()
+
+def work(database, fetch_seconds, worker_id):
+    """Lease and complete units until the queue is empty."""
+    engine = create_engine(f"sqlite:///{database}")
+    queue = WorkQueue(engine, queue="bench", worker_id=worker_id)
+    while True:
+        units = queue.lease()
+        if not units:
+            break
+        time.sleep(fetch_seconds)
+        queue.complete(units[0])
+    engine.dispose()
+
+def main():
+    """Run the benchmark."""
+    args = parse_args()
+    baseline = None
+
+    for workers in [int(count) for count in args.workers.split(',')]:
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, "queue.db")
+            engine = create_engine(f"sqlite:///{database}")
+            create_schema(engine)
+            WorkQueue(engine, queue="bench").enqueue(0, args.units * 3600, interval=3600)
+
+            start = time.perf_counter()
+            processes = [
+                multiprocessing.Process(target=work, args=(database, args.fetch_ms / 1000, f"w{i}"))
+                for i in range(workers)
+            ]
+            for process in processes:
+                process.start()
+            for process in processes:
+                process.join()
+            elapsed = time.perf_counter() - start
+
+            with engine.connect() as conn:
+                done, leases = conn.execute(text(
+                    "SELECT COUNT(*), SUM(attempts) FROM work_units WHERE status = 'done'"
+                )).fetchone()
+            engine.dispose()
+
+        throughput = done / elapsed
+        baseline = baseline or throughput
+        print(f"{workers} workers: {throughput:6.1f} units/s ({throughput / baseline:.2f}x), "
+              f"{done} done, {leases - done} duplicate leases")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Change feed of loaded flights for downstream consumers.
+
+Every load appends the flights it inserted or revised to the append-only
+flight_changes table in the same transaction, one row per flight with the
+flight as JSON. Each change gets a feed offset, feed_offset. Consumers
+read the changes after their last acknowledged offset, an index range scan
+on feed_offset, and acknowledge progress in feed_consumers; they never
+query flight_data.
+
+Offsets must become visible in increasing order, or a consumer could read
+offset 11, acknowledge it and never see 10. On SQLite writes are
+serialized, so a load numbers its changes by row id when it appends them.
+On PostgreSQL concurrent loads commit in any order, so a load only
+records its transaction id and readers assign the offsets: under an
+advisory lock, sequence_changes numbers the changes of transactions older
+than the oldest one still in flight, the safe high-water mark, ordered by
+transaction and row id. Every change below the mark is committed (or rolled
+back), so offsets are never assigned out of order, and loads never wait
+for each other.
+"""
+import json
+import time
+import pandas as pd
+from sqlalchemy import delete, func, insert, select, text
+
+from config.settings import FEED_READ_LIMIT
+from connections.postgresql import FeedConsumer, FlightChange
+from dimensions import insert_ignoring_duplicates
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("change_feed")
+
+# Advisory lock serializing sequence_changes on PostgreSQL
+SEQUENCER_LOCK = 4201117
+
+# Numbers the changes of transactions below the oldest one in flight
+SEQUENCE_SQL = """
+    WITH mark AS (
+        SELECT txid_snapshot_xmin(txid_current_snapshot()) AS xmin,
+               (SELECT COALESCE(MAX(feed_offset), 0) FROM flight_changes) AS last_offset
+    ),
+    pending AS (
+        SELECT c.id, mark.last_offset + ROW_NUMBER() OVER (ORDER BY c.txid, c.id) AS feed_offset
+        FROM flight_changes c, mark
+        WHERE c.feed_offset IS NULL AND c.txid < mark.xmin
+    )
+    UPDATE flight_changes SET feed_offset = pending.feed_offset
+    FROM pending WHERE flight_changes.id = pending.id
+"""
+
+# Load bookkeeping columns left out of the payload
+INTERNAL_COLUMNS = [
+    'id', 'row_hash', 'stored_hash',
+    'aircraft_id', 'departure_airport_id', 'arrival_airport_id', 'route_id'
+]
+
+def change_rows(df, change, loaded_at):
+    """
+    Build flight_changes rows for a batch.
+
+    Args:
+        df (pd.DataFrame): Loaded flights
+        change (str): "insert" or "update"
+        loaded_at (int): Load timestamp
+
+    Returns:
+        list: Row dicts
+    """
+    payload = df.drop(columns=[column for column in INTERNAL_COLUMNS if column in df.columns])
+    records = payload.to_json(orient='records', lines=True).splitlines()
+    icao24 = df['icao24'].astype(object).where(df['icao24'].notna(), None).tolist()
+    first_seen = [None if pd.isna(value) else int(value) for value in df['firstSeen']]
+    return [
+        {
+            'change': change,
+            'icao24': icao24[i],
+            'firstSeen': first_seen[i],
+            'payload': records[i],
+            'loaded_at': loaded_at
+        }
+        for i in range(len(df))
+    ]
+
+def append_changes(session, inserted, revised=None):
+    """
+    Append a load's flights to the feed.
+
+    Changes are added to the session and committed by the caller together
+    with the flights themselves.
+
+    Args:
+        session: SQLAlchemy session
+        inserted (pd.DataFrame): Newly inserted flights
+        revised (pd.DataFrame, optional): Revised flights
+
+    Returns:
+        int: Number of appended changes
+    """
+    now = int(time.time())
+    rows = change_rows(inserted, 'insert', now) if not inserted.empty else []
+    if revised is not None and not revised.empty:
+        rows += change_rows(revised, 'update', now)
+    if not rows:
+        return 0
+
+    table = FlightChange.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        # Numbered by sequence_changes once committed (see module docstring)
+        session.execute(insert(table).values(txid=func.txid_current()), rows)
+    else:
+        session.execute(insert(table), rows)
+        session.execute(
+            table.update().where(table.c.feed_offset.is_(None)).values(feed_offset=table.c.id)
+        )
+    logger.info("Appended %d changes to the feed", len(rows))
+    return len(rows)
+
+def sequence_changes(engine):
+    """
+    Assign feed offsets to the committed changes that have none yet.
+
+    Changes written before offsets were assigned separately keep their row
+    id as offset. On PostgreSQL, the changes of transactions older than the
+    oldest transaction in flight are numbered after the highest offset, in
+    transaction and row id order.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        int: Number of changes numbered
+    """
+    table = FlightChange.__table__
+    with engine.begin() as connection:
+        # Nothing to number in the common case, without taking a write lock
+        pending = connection.execute(select(table.c.id).where(table.c.feed_offset.is_(None)).limit(1)).first()
+        if pending is None:
+            return 0
+
+        if engine.dialect.name == 'postgresql':
+            connection.execute(select(func.pg_advisory_xact_lock(SEQUENCER_LOCK)))
+        numbered = connection.execute(
+            table.update().where(table.c.feed_offset.is_(None), table.c.txid.is_(None)).values(feed_offset=table.c.id)
+        ).rowcount
+        if engine.dialect.name == 'postgresql':
+            numbered += connection.execute(text(SEQUENCE_SQL)).rowcount
+    if numbered:
+        logger.debug("Assigned %d feed offsets", numbered)
+    return numbered
+
+def read_changes(engine, after_offset=0, limit=FEED_READ_LIMIT):
+    """
+    Read changes following an offset.
+
+    Args:
+        engine: SQLAlchemy engine
+        after_offset (int): Last offset already processed
+        limit (int): Maximum number of changes
+
+    Returns:
+        pd.DataFrame: offset, change and loaded_at followed by the flight
+                      columns, in offset order
+    """
+    sequence_changes(engine)
+    table = FlightChange.__table__
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(table.c.feed_offset, table.c.change, table.c.loaded_at, table.c.payload)
+            .where(table.c.feed_offset > after_offset).order_by(table.c.feed_offset).limit(limit)
+        ).fetchall()
+
+    changes = pd.DataFrame({
+        'offset': [row[0] for row in rows],
+        'change': [row[1] for row in rows],
+        'loaded_at': [row[2] for row in rows]
+    })
+    # One decode of the whole batch instead of one per change
+    flights = pd.DataFrame(json.loads('[' + ','.join(row[3] for row in rows) + ']'))
+    return pd.concat([changes, flights], axis=1)
+
+def get_offset(engine, consumer):
+    """
+    Get a consumer's acknowledged offset.
+
+    Args:
+        engine: SQLAlchemy engine
+        consumer (str): Consumer name
+
+    Returns:
+        int: Acknowledged offset, 0 for new consumers
+    """
+    with engine.connect() as connection:
+        offset = connection.execute(
+            select(FeedConsumer.acked_offset).where(FeedConsumer.name == consumer)
+        ).scalar()
+    return offset or 0
+
+def read_pending(engine, consumer, limit=FEED_READ_LIMIT):
+    """
+    Read the changes a consumer has not acknowledged yet.
+
+    Args:
+        engine: SQLAlchemy engine
+        consumer (str): Consumer name
+        limit (int): Maximum number of changes
+
+    Returns:
+        pd.DataFrame: See read_changes
+    """
+    return read_changes(engine, get_offset(engine, consumer), limit)
+
+def ack(engine, consumer, offset):
+    """
+    Acknowledge that a consumer processed all changes up to an offset.
+    Acknowledgements never move a consumer backwards.
+
+    Args:
+        engine: SQLAlchemy engine
+        consumer (str): Consumer name
+        offset (int): Last processed offset
+    """
+    table = FeedConsumer.__table__
+    now = int(time.time())
+    with engine.begin() as connection:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.name == consumer, table.c.acked_offset < offset)
+            .values(acked_offset=offset, updated_at=now)
+        ).rowcount
+        if not updated:
+            # New consumer; a no-op if it exists with a later offset
+            connection.execute(insert_ignoring_duplicates(engine, table), [
+                {'name': consumer, 'acked_offset': offset, 'updated_at': now}
+            ])
+
+def purge_changes(engine):
+    """
+    Delete changes acknowledged by every registered consumer.
+
+    Returns:
+        int: Number of deleted changes
+    """
+    with engine.begin() as connection:
+        oldest = connection.execute(select(func.min(FeedConsumer.acked_offset))).scalar()
+        if not oldest:
+            return 0
+        deleted = connection.execute(delete(FlightChange).where(FlightChange.feed_offset <= oldest)).rowcount
+    logger.info("Purged %d acknowledged changes up to offset %d", deleted, oldest)
+    return deleted
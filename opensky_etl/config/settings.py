@@ -11,6 +11,7 @@ load_dotenv(".env")
 # OpenSky API credentials
 OPENSKY_USERNAME = os.getenv("OPENSKY_USERNAME")
 OPENSKY_PASSWORD = os.getenv("OPENSKY_PASSWORD")
+OPENSKY_API_URL = os.getenv("OPENSKY_API_URL", "https://opensky-network.org/api")
 
 # Database configuration
 DB_USERNAME = os.getenv("DB_USER")
@@ -22,15 +23,148 @@ DB_NAME = os.getenv("DB_NAME", "db-raw-opensky")
 # SQLite fallback config
 SQLITE_PATH = "flight_data.db"
 
+# SQLite tuning: WAL lets readers run concurrently with the writer, NORMAL
+# synchronous is durable in WAL mode except for the last commits on power loss
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
 # Time window for extraction (in seconds)
 EXTRACTION_WINDOW = 86400  # 24 hours
 API_INTERVAL = 7200  # 2 hours for API request chunking
 
+# Adaptive window sizing (windows never exceed the API limits above)
+MIN_API_INTERVAL = 600  # 10 minutes, smallest window after splitting
+WINDOW_TARGET_FLIGHTS = int(os.getenv("WINDOW_TARGET_FLIGHTS", "5000"))
+WINDOW_TARGET_SECONDS = float(os.getenv("WINDOW_TARGET_SECONDS", "10"))
+
+# Targeted extraction configuration
+# Comma-separated ICAO airport codes, e.g. "EDDF,LFPG,EGLL"
+TARGET_AIRPORTS = [
+    code.strip().upper()
+    for code in os.getenv("TARGET_AIRPORTS", "").split(",")
+    if code.strip()
+]
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "auto")  # auto, global or targeted
+AIRPORT_API_INTERVAL = 604800  # 7 days, limit of the departure/arrival endpoints
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "8"))
+
+# Rough payload estimates used to pick a strategy in auto mode
+GLOBAL_FLIGHTS_PER_HOUR = 6000
+AIRPORT_FLIGHTS_PER_HOUR = 25
+
+# Columns identifying a flight across API calls
+FLIGHT_KEY_COLUMNS = ["icao24", "firstSeen"]
+
+# Live state-vector ingestion
+LIVE_POLL_INTERVAL = int(os.getenv("LIVE_POLL_INTERVAL", "10"))  # seconds between polls
+LIVE_WINDOW = 900  # 15 minutes of positions kept per aircraft
+LIVE_MAX_AIRCRAFT = 60000  # Ring buffer rows, one per aircraft
+LIVE_FLUSH_INTERVAL = 60  # seconds between database flushes
+LIVE_SNAPSHOT_STEP = 60  # seconds, one stored position per aircraft and step
+GRID_CELL_DEGREES = 0.5  # Spatial grid cell size for position queries
+
+# Trajectory storage
+TRACK_BLOCK_SIZE = 256  # Points per independently decodable block
+
+# Approximate analytics sketches
+SKETCH_HLL_PRECISION = 12  # 4096 registers, ~1.6% standard error
+SKETCH_ROUTE_CAPACITY = 1000  # Routes tracked per day by the heavy-hitter sketch
+SKETCH_QUANTILE_ACCURACY = 0.01  # Relative error of quantile sketch estimates
+SKETCH_QUANTILE_MAX_BUCKETS = 512  # Beyond this the lowest buckets are merged
+
+# Traffic rollups: days of hourly/daily/monthly buckets kept, 0 keeps them forever
+ROLLUP_RETENTION_DAYS = {
+    "hour": int(os.getenv("ROLLUP_HOURLY_RETENTION_DAYS", "14")),
+    "day": int(os.getenv("ROLLUP_DAILY_RETENTION_DAYS", "730")),
+    "month": int(os.getenv("ROLLUP_MONTHLY_RETENTION_DAYS", "0"))
+}
+
+# Work queue shared by extraction workers: unit length, lease duration
+# (renewed by heartbeats) and attempts before a unit is marked failed
+WORK_UNIT_SECONDS = int(os.getenv("WORK_UNIT_SECONDS", str(API_INTERVAL)))
+WORK_LEASE_SECONDS = int(os.getenv("WORK_LEASE_SECONDS", "300"))
+WORK_MAX_ATTEMPTS = int(os.getenv("WORK_MAX_ATTEMPTS", "3"))
+
+# Validation: flights longer than this are quarantined as implausible
+VALIDATION_MAX_FLIGHT_SECONDS = int(os.getenv("VALIDATION_MAX_FLIGHT_SECONDS", "86400"))
+
+# Aircraft registry CSV used to enrich flights (e.g. OpenSky's aircraftDatabase.csv),
+# indexed next to it as <path>.index on first use; enrichment is skipped if unset
+AIRCRAFT_REGISTRY_PATH = os.getenv("AIRCRAFT_REGISTRY_PATH", "")
+
+# read.py result cache: on-disk entries (in memory only if empty) and LRU size
+READ_CACHE_DIR = os.getenv("READ_CACHE_DIR", ".query_cache")
+READ_CACHE_MAX_ENTRIES = int(os.getenv("READ_CACHE_MAX_ENTRIES", "128"))
+
+# Archival: flights first seen more than ARCHIVE_AFTER_DAYS ago are moved to
+# daily Parquet files in ARCHIVE_DIR, then deleted in batches of ARCHIVE_DELETE_BATCH
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_DELETE_BATCH = int(os.getenv("ARCHIVE_DELETE_BATCH", "10000"))
+# "parquet", or "sqlite" for per-day SQLite shards (no pyarrow needed)
+ARCHIVE_FORMAT = os.getenv("ARCHIVE_FORMAT", "parquet")
+
+# Change feed: maximum number of changes returned per read
+FEED_READ_LIMIT = int(os.getenv("FEED_READ_LIMIT", "10000"))
+
+# Summary queries: "sql" runs them on the database, "duckdb" on a local
+# Parquet copy of the flights in ANALYTICS_DIR when the optional duckdb
+# package is installed. The copy keeps archived flights, so its results
+# also count flights the database no longer holds
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "sql")
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", ".analytics")
+
 # Logging configuration
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 LOG_FILE = "etl_logs.log"
 LOG_LEVEL = "INFO"
+# "json" writes one JSON object per line with run/stage/window fields, "text" uses LOG_FORMAT
+LOG_FILE_FORMAT = os.getenv("LOG_FILE_FORMAT", "json")
+LOG_CONSOLE_FORMAT = os.getenv("LOG_CONSOLE_FORMAT", "text")
+# Records waiting for the background logging thread; further records are dropped
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Each message template is logged at most LOG_RATE_LIMIT_BURST times per
+# LOG_RATE_LIMIT_INTERVAL seconds below ERROR; 0 disables rate limiting
+LOG_RATE_LIMIT_INTERVAL = float(os.getenv("LOG_RATE_LIMIT_INTERVAL", "60"))
+LOG_RATE_LIMIT_BURST = int(os.getenv("LOG_RATE_LIMIT_BURST", "10"))
 
 # Incremental load configuration
 INCREMENTAL_COLUMN = "lastSeen"
-INCREMENTAL_TABLE = "flight_data"
\ No newline at end of file
+INCREMENTAL_TABLE = "flight_data"
+
+# Late-arrival reconciliation: seconds before the watermark that are
+# re-extracted so that revised flights get updated (0 disables)
+RECONCILE_LOOKBACK = int(os.getenv("RECONCILE_LOOKBACK", "0"))
+
+# Loads are split into batches of LOAD_BATCH_ROWS flights, each committed on
+# its own; batches beyond MEMORY_BUDGET_MB wait in Parquet files in SPILL_DIR
+# (the system temporary directory if empty)
+LOAD_BATCH_ROWS = int(os.getenv("LOAD_BATCH_ROWS", "50000"))
+# Each batch is loaded in transactions sized to take LOAD_TARGET_SECONDS at
+# the measured rows/s, halved when a commit takes over LOAD_COMMIT_CEILING_SECONDS;
+# the size learned per backend is the starting point of the next run
+LOAD_MIN_ROWS = int(os.getenv("LOAD_MIN_ROWS", "500"))
+LOAD_TARGET_SECONDS = float(os.getenv("LOAD_TARGET_SECONDS", "2.0"))
+LOAD_COMMIT_CEILING_SECONDS = float(os.getenv("LOAD_COMMIT_CEILING_SECONDS", "5.0"))
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "512"))
+SPILL_DIR = os.getenv("SPILL_DIR", "")
+
+# Reprocessing of derived columns: stored flights are recomputed in
+# firstSeen windows of REPROCESS_CHUNK_SECONDS by REPROCESS_WORKERS threads
+REPROCESS_CHUNK_SECONDS = int(os.getenv("REPROCESS_CHUNK_SECONDS", "21600"))
+REPROCESS_WORKERS = int(os.getenv("REPROCESS_WORKERS", "4"))
+
+# SQL assets (assets/sql/transform) are materialized as tables by up to
+# SQL_ASSET_WORKERS concurrent connections; set SQL_ASSETS_AFTER_LOAD=true
+# to refresh them after every load that changed flights
+SQL_ASSET_WORKERS = int(os.getenv("SQL_ASSET_WORKERS", "4"))
+SQL_ASSETS_AFTER_LOAD = os.getenv("SQL_ASSETS_AFTER_LOAD", "false").lower() == "true"
+
+# Route statistics: flights whose duration is more than ROUTE_OUTLIER_ZSCORE
+# standard deviations from their route's mean are counted as outliers, once
+# the route has ROUTE_STATS_MIN_FLIGHTS flights
+ROUTE_OUTLIER_ZSCORE = float(os.getenv("ROUTE_OUTLIER_ZSCORE", "4.0"))
+ROUTE_STATS_MIN_FLIGHTS = int(os.getenv("ROUTE_STATS_MIN_FLIGHTS", "30"))
@@ -2,7 +2,8 @@
 PostgreSQL connection module for the OpenSky ETL pipeline.
 """
 import os
-from sqlalchemy import create_engine, inspect, MetaData, Table, Column, Integer, String, Float, DateTime, Boolean
+import time
+from sqlalchemy import create_engine, inspect, MetaData, Table, Column, Integer, SmallInteger, BigInteger, String, Float, DateTime, Boolean, Index, LargeBinary, ForeignKey, Text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import text
@@ -10,6 +11,7 @@ from sqlalchemy.sql import text
 from config.settings import (
     DB_USERNAME, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME, SQLITE_PATH
 )
+from connections.sqlite import create_sqlite_engine
 from utils.logging_config import get_logger
 
 # Initialize logger
@@ -18,16 +20,66 @@ logger = get_logger("connections.postgresql")
 # Create base class for declarative models
 Base = declarative_base()
 
+# Smallint on PostgreSQL; SQLite only auto-increments INTEGER primary keys
+AirportKey = SmallInteger().with_variant(Integer(), 'sqlite')
+
+class Airport(Base):
+    """SQLAlchemy model for the airport dimension."""
+    __tablename__ = 'airports'
+    
+    id = Column(AirportKey, primary_key=True, autoincrement=True)
+    code = Column(String(4), nullable=False, unique=True)
+    
+    def __repr__(self):
+        return f"<Airport(id={self.id}, code='{self.code}')>"
+
+class Aircraft(Base):
+    """SQLAlchemy model for the aircraft dimension."""
+    __tablename__ = 'aircraft'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    icao24 = Column(String(24), nullable=False, unique=True)
+    
+    # Aircraft registry metadata, see registry.py
+    registration = Column(String(16))
+    aircraft_type = Column(String(8))
+    aircraft_model = Column(String(64))
+    operator = Column(String(128))
+    
+    def __repr__(self):
+        return f"<Aircraft(id={self.id}, icao24='{self.icao24}')>"
+
+class Route(Base):
+    """SQLAlchemy model for the route (departure-arrival airport pair) dimension."""
+    __tablename__ = 'routes'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    code = Column(String(10), nullable=False, unique=True)
+    departure_airport_id = Column(AirportKey, ForeignKey('airports.id'), nullable=False)
+    arrival_airport_id = Column(AirportKey, ForeignKey('airports.id'), nullable=False)
+    
+    __table_args__ = (
+        Index('ix_routes_airports', 'departure_airport_id', 'arrival_airport_id', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<Route(id={self.id}, code='{self.code}')>"
+
 class FlightData(Base):
-    """SQLAlchemy model for flight data."""
+    """
+    SQLAlchemy model for flight data.
+    
+    Aircraft, airports and routes are stored as keys into their dimension
+    tables; the "flights" view joins the codes back.
+    """
     __tablename__ = 'flight_data'
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    icao24 = Column(String(24))
+    aircraft_id = Column(Integer, ForeignKey('aircraft.id'))
     firstSeen = Column(Integer, index=True)
-    estDepartureAirport = Column(String(4))
+    departure_airport_id = Column(AirportKey, ForeignKey('airports.id'), index=True)
     lastSeen = Column(Integer, index=True)
-    estArrivalAirport = Column(String(4))
+    arrival_airport_id = Column(AirportKey, ForeignKey('airports.id'), index=True)
     callsign = Column(String(8))
     estDepartureAirportHorizDistance = Column(Integer)
     estDepartureAirportVertDistance = Column(Integer)
@@ -39,10 +91,303 @@ class FlightData(Base):
     # Additional columns for transformations
     flight_duration_minutes = Column(Float)
     total_distance_km = Column(Float)
-    airport_pair = Column(String(10))
+    route_id = Column(Integer, ForeignKey('routes.id'))
+    
+    # Content hash of the API columns, used to detect revised flights
+    row_hash = Column(BigInteger)
+    
+    # Standard deviations of the duration from its route's mean at load time
+    duration_zscore = Column(Float)
+    
+    __table_args__ = (
+        Index('ix_flight_data_natural_key', 'aircraft_id', 'firstSeen'),
+    )
     
     def __repr__(self):
-        return f"<Flight(icao24='{self.icao24}', callsign='{self.callsign}')>"
+        return f"<Flight(aircraft_id={self.aircraft_id}, callsign='{self.callsign}')>"
+
+# flight_data with dimension keys replaced by their codes, in the original column layout
+FLIGHTS_VIEW_SQL = """
+SELECT
+    f.id,
+    ac.icao24,
+    f."firstSeen",
+    dep.code AS "estDepartureAirport",
+    f."lastSeen",
+    arr.code AS "estArrivalAirport",
+    f.callsign,
+    f."estDepartureAirportHorizDistance",
+    f."estDepartureAirportVertDistance",
+    f."estArrivalAirportHorizDistance",
+    f."estArrivalAirportVertDistance",
+    f."departureAirportCandidatesCount",
+    f."arrivalAirportCandidatesCount",
+    f.flight_duration_minutes,
+    f.total_distance_km,
+    r.code AS airport_pair,
+    f.row_hash,
+    ac.registration,
+    ac.aircraft_type,
+    ac.aircraft_model,
+    ac.operator
+FROM
+    flight_data f
+    LEFT JOIN aircraft ac ON ac.id = f.aircraft_id
+    LEFT JOIN airports dep ON dep.id = f.departure_airport_id
+    LEFT JOIN airports arr ON arr.id = f.arrival_airport_id
+    LEFT JOIN routes r ON r.id = f.route_id
+"""
+
+# Code columns of flight_data before the dimension tables were introduced
+LEGACY_CODE_COLUMNS = ['icao24', 'estDepartureAirport', 'estArrivalAirport', 'airport_pair']
+
+# Table keeping the dropped code columns of a migrated flight_data table
+LEGACY_BACKUP_TABLE = 'flight_data_legacy_codes'
+
+# Last value of the incremental column, formatted with the table and column names
+INCREMENTAL_VALUE_SQL = 'SELECT MAX("{column}") FROM {table}'
+
+class AircraftPosition(Base):
+    """SQLAlchemy model for downsampled live aircraft positions."""
+    __tablename__ = 'aircraft_positions'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    icao24 = Column(String(24), nullable=False)
+    time = Column(Integer, nullable=False, index=True)
+    latitude = Column(Float)
+    longitude = Column(Float)
+    baro_altitude = Column(Float)
+    velocity = Column(Float)
+    true_track = Column(Float)
+    on_ground = Column(Boolean)
+    grid_cell = Column(Integer, index=True)  # See spatial.cell_ids
+    
+    __table_args__ = (
+        Index('ix_aircraft_positions_icao24_time', 'icao24', 'time'),
+    )
+    
+    def __repr__(self):
+        return f"<AircraftPosition(icao24='{self.icao24}', time={self.time})>"
+
+class FlightTrack(Base):
+    """SQLAlchemy model for delta-encoded flight trajectories (see tracks.py)."""
+    __tablename__ = 'flight_tracks'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    icao24 = Column(String(24), nullable=False)
+    firstSeen = Column(Integer, nullable=False)
+    points = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_flight_tracks_flight', 'icao24', 'firstSeen', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<FlightTrack(icao24='{self.icao24}', firstSeen={self.firstSeen}, points={self.points})>"
+
+class FlightSketch(Base):
+    """SQLAlchemy model for per-day approximate analytics sketches."""
+    __tablename__ = 'flight_sketches'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    sketch_type = Column(String(16), nullable=False)
+    sketch_key = Column(String(10), nullable=False)
+    day = Column(Integer, nullable=False)  # Days since the Unix epoch
+    payload = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_flight_sketches_lookup', 'sketch_type', 'sketch_key', 'day', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<FlightSketch(type='{self.sketch_type}', key='{self.sketch_key}', day={self.day})>"
+
+class QuarantinedFlight(Base):
+    """SQLAlchemy model for flights rejected by validation (see validate.py)."""
+    __tablename__ = 'quarantined_flights'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    icao24 = Column(String(24))
+    firstSeen = Column(Integer)
+    reasons = Column(String(255), nullable=False)  # Comma-separated reason codes
+    record = Column(Text, nullable=False)  # Extracted row as JSON
+    quarantined_at = Column(Integer, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<QuarantinedFlight(icao24='{self.icao24}', reasons='{self.reasons}')>"
+
+class AirportTraffic(Base):
+    """SQLAlchemy model for departures and arrivals per airport and time bucket (see rollups.py)."""
+    __tablename__ = 'airport_traffic'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tier = Column(String(5), nullable=False)  # hour, day or month
+    bucket = Column(Integer, nullable=False)  # Bucket start timestamp
+    airport_id = Column(AirportKey, ForeignKey('airports.id'), nullable=False)
+    departures = Column(Integer, nullable=False, default=0)
+    arrivals = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_airport_traffic_lookup', 'tier', 'airport_id', 'bucket', unique=True),
+        Index('ix_airport_traffic_bucket', 'tier', 'bucket'),
+    )
+
+    def __repr__(self):
+        return f"<AirportTraffic(tier='{self.tier}', bucket={self.bucket}, airport_id={self.airport_id})>"
+
+class RouteTraffic(Base):
+    """SQLAlchemy model for flights per route and time bucket (see rollups.py)."""
+    __tablename__ = 'route_traffic'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tier = Column(String(5), nullable=False)  # hour, day or month
+    bucket = Column(Integer, nullable=False)  # Bucket start timestamp
+    route_id = Column(Integer, ForeignKey('routes.id'), nullable=False)
+    flights = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('ix_route_traffic_lookup', 'tier', 'route_id', 'bucket', unique=True),
+        Index('ix_route_traffic_bucket', 'tier', 'bucket'),
+    )
+
+    def __repr__(self):
+        return f"<RouteTraffic(tier='{self.tier}', bucket={self.bucket}, route_id={self.route_id})>"
+
+class RouteStats(Base):
+    """SQLAlchemy model for running duration and distance statistics per route (see route_stats.py)."""
+    __tablename__ = 'route_stats'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    route_id = Column(Integer, ForeignKey('routes.id'), nullable=False)
+    metric = Column(String(16), nullable=False)  # duration (minutes) or distance (km)
+    flights = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)
+    m2 = Column(Float, nullable=False, default=0.0)  # Sum of squared deviations from the mean
+    min_value = Column(Float)
+    max_value = Column(Float)
+    sketch = Column(LargeBinary)  # sketches.QuantileSketch
+
+    __table_args__ = (
+        Index('ix_route_stats_lookup', 'route_id', 'metric', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<RouteStats(route_id={self.route_id}, metric='{self.metric}', flights={self.flights})>"
+
+class WorkUnit(Base):
+    """SQLAlchemy model for extraction work units leased by workers (see work_queue.py)."""
+    __tablename__ = 'work_units'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    queue = Column(String(32), nullable=False)
+    unit_key = Column(String(64), nullable=False)
+    start_time = Column(Integer, nullable=False)
+    end_time = Column(Integer, nullable=False)
+    airport = Column(String(4))  # Airport of a targeted unit, NULL for the global feed
+    status = Column(String(8), nullable=False, default='pending')  # pending, leased, done or failed
+    lease_owner = Column(String(64))
+    lease_expires = Column(Integer)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String(255))
+
+    __table_args__ = (
+        Index('ix_work_units_key', 'queue', 'unit_key', unique=True),
+        Index('ix_work_units_claim', 'queue', 'status', 'start_time'),
+    )
+
+    def __repr__(self):
+        return f"<WorkUnit(queue='{self.queue}', unit_key='{self.unit_key}', status='{self.status}')>"
+
+# Bigint on PostgreSQL; SQLite only auto-increments INTEGER primary keys
+FeedOffset = BigInteger().with_variant(Integer(), 'sqlite')
+
+class FlightChange(Base):
+    """SQLAlchemy model for the append-only feed of loaded flights (see change_feed.py)."""
+    __tablename__ = 'flight_changes'
+
+    id = Column(FeedOffset, primary_key=True, autoincrement=True)
+    change = Column(String(8), nullable=False)  # insert or update
+    icao24 = Column(String(24))
+    firstSeen = Column(Integer)
+    payload = Column(Text, nullable=False)  # Flight as JSON, in the flights view layout
+    loaded_at = Column(Integer, nullable=False)
+    txid = Column(BigInteger)  # Writing transaction on PostgreSQL
+    feed_offset = Column(BigInteger)  # Assigned once the change is committed
+
+    __table_args__ = (
+        Index('ix_flight_changes_offset', 'feed_offset', unique=True),
+    )
+
+    def __repr__(self):
+        return f"<FlightChange(offset={self.feed_offset}, change='{self.change}', icao24='{self.icao24}')>"
+
+class FeedConsumer(Base):
+    """SQLAlchemy model for the acknowledged offset of each change feed consumer."""
+    __tablename__ = 'feed_consumers'
+
+    name = Column(String(64), primary_key=True)
+    acked_offset = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<FeedConsumer(name='{self.name}', acked_offset={self.acked_offset})>"
+
+class ArchiveSegment(Base):
+    """SQLAlchemy model for the manifest of archived flight files (see archive.py)."""
+    __tablename__ = 'archive_segments'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    path = Column(String(255), nullable=False, unique=True)  # Relative to ARCHIVE_DIR
+    start_time = Column(Integer, nullable=False, index=True)  # firstSeen range [start_time, end_time)
+    end_time = Column(Integer, nullable=False)
+    min_last_seen = Column(Integer)
+    max_last_seen = Column(Integer)
+    max_id = Column(Integer)  # Highest archived flight_data id
+    row_count = Column(Integer, nullable=False)
+    size_bytes = Column(BigInteger, nullable=False)
+    created_at = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchiveSegment(path='{self.path}', row_count={self.row_count})>"
+
+class LoadWatermark(Base):
+    """SQLAlchemy model for the single-row load watermark, bumped by every load that changes flights."""
+    __tablename__ = 'load_watermark'
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False)
+    loaded_at = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<LoadWatermark(version={self.version}, loaded_at={self.loaded_at})>"
+
+class LoadTuning(Base):
+    """SQLAlchemy model for the load batch size learned on each backend (see batching.py)."""
+    __tablename__ = 'load_tuning'
+
+    backend = Column(String(20), primary_key=True)  # SQLAlchemy dialect name
+    batch_size = Column(Integer, nullable=False)
+    rows_per_second = Column(Float)
+    commit_seconds = Column(Float)
+    updated_at = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<LoadTuning(backend='{self.backend}', batch_size={self.batch_size})>"
+
+class SqlAsset(Base):
+    """SQLAlchemy model for the build state of each SQL asset table (see sql_assets.py)."""
+    __tablename__ = 'sql_assets'
+
+    name = Column(String(64), primary_key=True)
+    signature = Column(String(40), nullable=False)  # SHA-1 of the SQL and the input versions
+    version = Column(Integer, nullable=False)  # Incremented on every build
+    row_count = Column(Integer)
+    seconds = Column(Float)
+    built_at = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<SqlAsset(name='{self.name}', version={self.version})>"
 
 def get_db_connection():
     """
@@ -63,11 +408,11 @@ def get_db_connection():
         
         # Fall back to SQLite as a last resort
         logger.warning("Falling back to SQLite database...")
-        engine = create_engine(f"sqlite:///{SQLITE_PATH}")
+        engine = create_sqlite_engine(SQLITE_PATH)
         logger.info(f"Using SQLite database at {SQLITE_PATH}")
     
     # Create all tables if they don't exist
-    Base.metadata.create_all(engine)
+    create_schema(engine)
     
     # Create a session factory
     Session = sessionmaker(bind=engine)
@@ -79,6 +424,214 @@ def get_db_connection():
     
     return engine, session, metadata
 
+def create_schema(engine):
+    """
+    Create missing tables, upgrade existing ones and create the flights view.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    Base.metadata.create_all(engine)
+    legacy_columns = legacy_flight_columns(engine)
+    if legacy_columns:
+        # Dropping the code columns is left to an explicit migration
+        logger.warning("flight_data has the code columns %s of a pre-dimension schema, skipping the schema "
+                       "upgrade; run python main.py --migrate-legacy to move them to the dimension tables",
+                       ', '.join(legacy_columns))
+        return
+    ensure_schema(engine)
+    ensure_flights_view(engine)
+    if 'postgresql' in str(engine.url):
+        ensure_airborne_range(engine)
+
+def ensure_schema(engine):
+    """
+    Add columns and indexes declared on the models but missing from existing tables.
+    
+    create_all only creates missing tables, so databases created by earlier
+    versions of the pipeline are upgraded here.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    try:
+        inspector = inspect(engine)
+        table_names = inspector.get_table_names()
+        
+        for table in Base.metadata.sorted_tables:
+            if table.name not in table_names:
+                continue
+            
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            missing_columns = [column for column in table.columns if column.name not in existing_columns]
+            
+            with engine.begin() as connection:
+                for column in missing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    logger.info("Adding column %s to %s", column.name, table.name)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+            
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
+    except Exception as e:
+        logger.error("Error upgrading database schema: %s", e)
+
+def legacy_flight_columns(engine):
+    """
+    Find the code columns of a pre-dimension flight_data table.
+    
+    Args:
+        engine: SQLAlchemy engine
+        
+    Returns:
+        list: Names of the LEGACY_CODE_COLUMNS still in flight_data, empty
+              if flight_data is missing or already migrated
+    """
+    inspector = inspect(engine)
+    if 'flight_data' not in inspector.get_table_names():
+        return []
+    
+    columns = {column['name'] for column in inspector.get_columns('flight_data')}
+    legacy_columns = [column for column in LEGACY_CODE_COLUMNS if column in columns]
+    return legacy_columns if 'icao24' in legacy_columns else []
+
+def migrate_legacy_flight_data(engine):
+    """
+    Move the code columns of a pre-dimension flight_data table into the
+    airports, aircraft and routes tables.
+    
+    Codes are inserted into the dimensions, the key columns are backfilled
+    from them and the code columns are dropped, after copying them with
+    the flight ids to the LEGACY_BACKUP_TABLE table. Views over flight_data
+    are dropped first; the flights view is recreated by create_schema and
+    the summary views by the next load. Only run by
+    python main.py --migrate-legacy, create_schema never drops columns.
+    
+    Args:
+        engine: SQLAlchemy engine
+        
+    Returns:
+        bool: True if a legacy table was migrated
+    """
+    legacy_columns = legacy_flight_columns(engine)
+    if not legacy_columns:
+        return False
+    
+    inspector = inspect(engine)
+    if LEGACY_BACKUP_TABLE in inspector.get_table_names():
+        logger.error("Backup table %s already exists, not migrating flight_data", LEGACY_BACKUP_TABLE)
+        return False
+    
+    # Indexes on the code columns, including the old natural key, block dropping them
+    legacy_indexes = [
+        index['name'] for index in inspector.get_indexes('flight_data')
+        if set(index['column_names']) & set(legacy_columns)
+    ]
+    
+    logger.warning("Migrating flight_data codes to dimension tables: dropping columns %s, indexes %s and "
+                   "the views over flight_data; the codes are kept in %s",
+                   ', '.join(legacy_columns), ', '.join(legacy_indexes) or 'none', LEGACY_BACKUP_TABLE)
+    try:
+        with engine.begin() as connection:
+            for view in ('flight_durations', 'airport_departures', 'flights'):
+                connection.execute(text(f"DROP VIEW IF EXISTS {view}"))
+            for index in legacy_indexes:
+                connection.execute(text(f'DROP INDEX IF EXISTS "{index}"'))
+        
+        ensure_schema(engine)
+        
+        with engine.begin() as connection:
+            backup_columns = ', '.join(f'"{column}"' for column in legacy_columns)
+            connection.execute(text(f"CREATE TABLE {LEGACY_BACKUP_TABLE} AS SELECT id, {backup_columns} FROM flight_data"))
+            connection.execute(text("""
+                INSERT INTO aircraft (icao24)
+                SELECT DISTINCT icao24 FROM flight_data
+                WHERE icao24 IS NOT NULL AND icao24 NOT IN (SELECT icao24 FROM aircraft)
+            """))
+            connection.execute(text("""
+                INSERT INTO airports (code)
+                SELECT code FROM (
+                    SELECT "estDepartureAirport" AS code FROM flight_data
+                    UNION
+                    SELECT "estArrivalAirport" AS code FROM flight_data
+                ) codes
+                WHERE code IS NOT NULL AND code NOT IN (SELECT code FROM airports)
+            """))
+            connection.execute(text("""
+                UPDATE flight_data SET
+                    aircraft_id = (SELECT id FROM aircraft WHERE aircraft.icao24 = flight_data.icao24),
+                    departure_airport_id = (SELECT id FROM airports WHERE airports.code = flight_data."estDepartureAirport"),
+                    arrival_airport_id = (SELECT id FROM airports WHERE airports.code = flight_data."estArrivalAirport")
+            """))
+            connection.execute(text("""
+                INSERT INTO routes (code, departure_airport_id, arrival_airport_id)
+                SELECT DISTINCT dep.code || '-' || arr.code, f.departure_airport_id, f.arrival_airport_id
+                FROM flight_data f
+                JOIN airports dep ON dep.id = f.departure_airport_id
+                JOIN airports arr ON arr.id = f.arrival_airport_id
+                WHERE dep.code || '-' || arr.code NOT IN (SELECT code FROM routes)
+            """))
+            connection.execute(text("""
+                UPDATE flight_data SET route_id = (
+                    SELECT id FROM routes
+                    WHERE routes.departure_airport_id = flight_data.departure_airport_id
+                    AND routes.arrival_airport_id = flight_data.arrival_airport_id
+                )
+            """))
+            
+            for column in legacy_columns:
+                logger.info("Dropping column %s from flight_data", column)
+                connection.execute(text(f'ALTER TABLE flight_data DROP COLUMN "{column}"'))
+        
+        return True
+    except Exception as e:
+        logger.error("Error migrating flight_data to dimension tables: %s", e)
+        return False
+
+def ensure_flights_view(engine):
+    """
+    Create the "flights" view, flight_data with its dimension codes joined back.
+    
+    Args:
+        engine: SQLAlchemy engine
+    """
+    try:
+        with engine.begin() as connection:
+            if 'postgresql' in str(engine.url):
+                connection.execute(text(f"CREATE OR REPLACE VIEW flights AS {FLIGHTS_VIEW_SQL}"))
+            else:
+                # SQLite has no CREATE OR REPLACE VIEW
+                connection.execute(text("DROP VIEW IF EXISTS flights"))
+                connection.execute(text(f"CREATE VIEW flights AS {FLIGHTS_VIEW_SQL}"))
+    except Exception as e:
+        logger.error("Error creating flights view: %s", e)
+
+def ensure_airborne_range(engine):
+    """
+    Add the GiST-indexed "airborne" range column to flight_data on PostgreSQL.
+    
+    The column is generated from firstSeen/lastSeen so loaders don't need to
+    know about it; it backs the interval queries in intervals.py.
+    
+    Args:
+        engine: SQLAlchemy engine connected to PostgreSQL
+    """
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("""
+                ALTER TABLE flight_data ADD COLUMN IF NOT EXISTS airborne int8range
+                GENERATED ALWAYS AS (
+                    CASE WHEN "firstSeen" IS NOT NULL AND "lastSeen" IS NOT NULL
+                    THEN int8range(LEAST("firstSeen", "lastSeen"), GREATEST("firstSeen", "lastSeen"), '[]')
+                    END
+                ) STORED
+            """))
+            connection.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_flight_data_airborne ON flight_data USING gist (airborne)"
+            ))
+    except Exception as e:
+        logger.error("Error creating airborne range index: %s", e)
+
 def get_last_incremental_value(engine, table_name, column_name):
     """
     Get the last value of the incremental column for incremental loading.
@@ -96,7 +649,7 @@ def get_last_incremental_value(engine, table_name, column_name):
         if table_name in inspector.get_table_names():
             with engine.connect() as connection:
                 # Use double quotes around column name to preserve case
-                query = text(f'SELECT MAX("{column_name}") FROM {table_name}')
+                query = text(INCREMENTAL_VALUE_SQL.format(table=table_name, column=column_name))
                 result = connection.execute(query).scalar()
                 return result if result is not None else 0
         return 0
@@ -105,6 +658,41 @@ def get_last_incremental_value(engine, table_name, column_name):
         return 0
     
     
+def get_load_watermark(engine):
+    """
+    Get the current load watermark.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        int: Watermark version (0 before the first load), or None if the
+             database has no watermark table
+    """
+    try:
+        with engine.connect() as connection:
+            version = connection.execute(text("SELECT version FROM load_watermark WHERE id = 1")).scalar()
+            return version if version is not None else 0
+    except Exception as e:
+        logger.warning("Error getting load watermark: %s", e)
+        return None
+
+def bump_load_watermark(session):
+    """
+    Increment the load watermark in the session's transaction, so readers
+    see the new version together with the flights.
+
+    Args:
+        session: SQLAlchemy session
+    """
+    table = LoadWatermark.__table__
+    now = int(time.time())
+    result = session.execute(
+        table.update().where(table.c.id == 1).values(version=table.c.version + 1, loaded_at=now)
+    )
+    if not result.rowcount:
+        session.execute(table.insert().values(id=1, version=1, loaded_at=now))
+
 def execute_sql_from_file(engine, sql_file_path, params=None):
     """
     Execute SQL from a file.
@@ -137,19 +725,11 @@ def execute_sql_from_file(engine, sql_file_path, params=None):
             for key, value in params.items():
                 sql = sql.replace(f"{{{{{key}}}}}", str(value))
         
-        # Check if we're using SQLite
-        is_sqlite = 'sqlite' in str(engine.url).lower()
-        
+        # One transaction on every backend, committed once
         with engine.connect() as connection:
-            if is_sqlite:
-                # For SQLite, execute with commit
-                result = connection.execute(text(sql))
-                connection.commit()
-            else:
-                # For PostgreSQL
+            with connection.begin():
                 result = connection.execute(text(sql))
-                
-            return result.fetchall()
+                return result.fetchall() if result.returns_rows else []
     except Exception as e:
         logger.error(f"Error executing SQL from file {sql_file_path}: {e}")
         return []
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+SQLite storage backend for the OpenSky ETL pipeline.
+
+Used when PostgreSQL is unavailable, e.g. in offline and edge deployments.
+Every connection is tuned with the SQLITE_* settings: WAL journaling, so
+readers don't block the writer and each other, NORMAL synchronous, a
+larger page cache and memory-mapped reads.
+
+Flight history can also be sharded into one SQLite file per day (see
+ARCHIVE_FORMAT in archive.py). query_shards runs a query against any set
+of shards as if they were a single flights table.
+"""
+import os
+import sqlite3
+from urllib.parse import quote
+import pandas as pd
+from sqlalchemy import create_engine, event
+
+from config.settings import (
+    SQLITE_PATH, SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE, SQLITE_BUSY_TIMEOUT_MS
+)
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("connections.sqlite")
+
+# Pragmas set on every connection; a negative cache_size is in KiB
+SQLITE_PRAGMAS = {
+    "journal_mode": SQLITE_JOURNAL_MODE,
+    "synchronous": SQLITE_SYNCHRONOUS,
+    "cache_size": -SQLITE_CACHE_SIZE_KB,
+    "mmap_size": SQLITE_MMAP_SIZE,
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    "temp_store": "MEMORY"
+}
+
+# Pragmas for writing a shard once; it is renamed into place only when complete
+SHARD_WRITE_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "cache_size": -SQLITE_CACHE_SIZE_KB
+}
+
+def apply_pragmas(connection, pragmas):
+    """
+    Set pragmas on a DB-API SQLite connection.
+
+    Args:
+        connection: sqlite3 connection
+        pragmas (dict): Pragma names and values
+    """
+    cursor = connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    finally:
+        cursor.close()
+
+def shard_uri(path):
+    """Read-only SQLite URI of a shard file."""
+    return f"file:{quote(os.path.abspath(path))}?mode=ro"
+
+def create_sqlite_engine(path=SQLITE_PATH, pragmas=None):
+    """
+    Create a SQLAlchemy engine for a SQLite file with tuned pragmas.
+
+    Transactions span every statement between begin and commit, so a load
+    or a view replacement is written with a single WAL commit.
+
+    Args:
+        path (str): Database file
+        pragmas (dict, optional): Pragmas set on every connection. Defaults
+                                  to SQLITE_PRAGMAS.
+
+    Returns:
+        Engine: SQLAlchemy engine
+    """
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+        # Let SQLAlchemy emit BEGIN itself, so DDL is transactional too
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+    return engine
+
+def write_shard(path, df):
+    """
+    Write flights to a standalone SQLite shard with firstSeen and lastSeen
+    indexes.
+
+    The shard is written in one transaction under a temporary name and
+    renamed, so readers never open a partial file.
+
+    Args:
+        path (str): Shard file
+        df (pd.DataFrame): Flights, in the flights view layout
+
+    Returns:
+        int: Size of the shard in bytes
+    """
+    temporary = f"{path}.tmp"
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    connection = sqlite3.connect(temporary)
+    try:
+        apply_pragmas(connection, SHARD_WRITE_PRAGMAS)
+        df.to_sql('flights', connection, index=False, chunksize=10000)
+        connection.execute('CREATE INDEX idx_shard_first_seen ON flights ("firstSeen")')
+        connection.execute('CREATE INDEX idx_shard_last_seen ON flights ("lastSeen")')
+        connection.commit()
+    finally:
+        connection.close()
+    os.replace(temporary, path)
+    return os.path.getsize(path)
+
+def read_shard(path, columns=None):
+    """
+    Read the flights of a shard.
+
+    Args:
+        path (str): Shard file
+        columns (list, optional): Columns to read. Defaults to all.
+
+    Returns:
+        pd.DataFrame: Flights of the shard
+    """
+    selected = "*" if columns is None else ", ".join(f'"{name}"' for name in columns)
+    connection = sqlite3.connect(shard_uri(path), uri=True)
+    try:
+        apply_pragmas(connection, {"mmap_size": SQLITE_MMAP_SIZE})
+        return pd.read_sql(f"SELECT {selected} FROM flights", connection)
+    finally:
+        connection.close()
+
+def query_shards(sql, paths, params=None):
+    """
+    Run a query over several shards as one flights table.
+
+    Up to SQLite's attached database limit, the shards are attached and
+    unioned by a temporary flights view, so filters use each shard's
+    indexes. Larger sets are copied into a temporary flights table first.
+
+    Args:
+        sql (str): Query on the flights table
+        paths (list): Shard files
+        params (dict or tuple, optional): Query parameters
+
+    Returns:
+        pd.DataFrame: Query result
+    """
+    # uri=True lets the read-only file: URIs of the shards be attached
+    connection = sqlite3.connect(":memory:", uri=True)
+    try:
+        apply_pragmas(connection, {"temp_store": "MEMORY", "cache_size": -SQLITE_CACHE_SIZE_KB})
+        # Raise the attach limit up to the compile-time maximum
+        connection.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 125)
+        attach_limit = connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+        if not paths:
+            logger.warning("No shards to query")
+            return pd.DataFrame()
+
+        if len(paths) <= attach_limit:
+            for number, path in enumerate(paths):
+                connection.execute(f"ATTACH DATABASE ? AS shard{number}", (shard_uri(path),))
+            union = " UNION ALL ".join(f"SELECT * FROM shard{number}.flights" for number in range(len(paths)))
+            connection.execute(f"CREATE TEMP VIEW flights AS {union}")
+        else:
+            logger.info("Copying %d shards into a temporary table", len(paths))
+            for start in range(0, len(paths), attach_limit):
+                group = paths[start:start + attach_limit]
+                for number, path in enumerate(group):
+                    connection.execute(f"ATTACH DATABASE ? AS shard{number}", (shard_uri(path),))
+                for number in range(len(group)):
+                    if start == 0 and number == 0:
+                        connection.execute("CREATE TEMP TABLE flights AS SELECT * FROM shard0.flights")
+                    else:
+                        connection.execute(f"INSERT INTO temp.flights SELECT * FROM shard{number}.flights")
+                connection.commit()
+                for number in range(len(group)):
+                    connection.execute(f"DETACH DATABASE shard{number}")
+
+        return pd.read_sql(sql, connection, params=params)
+    finally:
+        connection.close()
@@ -0,0 +1,312 @@
+"""
+Dimension key resolution for the OpenSky ETL pipeline.
+
+flight_data stores aircraft, airports and routes as small integer keys
+into the aircraft, airports and routes tables. DimensionCache maps codes
+to keys in process, so a batch only queries the database for codes it
+has not seen before and bulk-inserts the ones that are new. Routes are
+cached by their departure and arrival airport keys rather than by code,
+so a route whose code format changed is still found. Registry
+attributes of aircraft are upserted on every batch that carries them, so
+aircraft stored before they were enriched, and registry changes, reach
+the aircraft table; rows are only written when their values differ.
+
+New dimension rows are committed on their own connection, before the
+flights referencing them are loaded. A load that fails afterwards leaves
+them unreferenced, which is safe: they only hold a code, nothing reads
+the dimension tables except through flight_data keys, and the retried
+load (or any later one) finds and reuses them instead of inserting them
+again. Inserting them in the load transaction would make concurrent
+loaders wait on each other's uncommitted codes for the whole load, and
+the cache would hand out keys rolled back with a failed load.
+"""
+import weakref
+import pandas as pd
+from sqlalchemy import insert, or_, select, tuple_
+
+from connections.postgresql import Aircraft, Airport, Route
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("dimensions")
+
+# Maximum number of codes per IN (...) lookup
+LOOKUP_CHUNK = 500
+
+# Aircraft columns filled from the registry
+AIRCRAFT_ATTRIBUTES = ['registration', 'aircraft_type', 'aircraft_model', 'operator']
+
+# Caches per engine, dropped with the engine
+_caches = weakref.WeakKeyDictionary()
+
+def insert_ignoring_duplicates(engine, table):
+    """
+    Build an INSERT that skips rows violating a unique constraint.
+
+    Concurrent loaders may insert the same new code; the loser's row is
+    skipped and its key read back.
+    """
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing()
+
+def upsert_changed(engine, table, code_column, columns):
+    """
+    Build an INSERT that stores new codes and updates the columns of
+    stored codes whose values differ.
+
+    Unchanged rows are not rewritten. On other databases than PostgreSQL
+    and SQLite stored rows are left as they are.
+    """
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif engine.dialect.name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert_ignoring_duplicates(engine, table)
+    statement = dialect_insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[code_column],
+        set_={column: statement.excluded[column] for column in columns},
+        where=or_(*(table.c[column].is_distinct_from(statement.excluded[column]) for column in columns))
+    )
+
+class DimensionCache:
+    """In-process code -> surrogate key mapping of one dimension table."""
+
+    def __init__(self, model, code_column):
+        """
+        Initialize an empty cache.
+
+        Args:
+            model: SQLAlchemy model of the dimension table
+            code_column (str): Unique natural key column
+        """
+        self.table = model.__table__
+        self.code_column = code_column
+        self.keys = {}
+        # Attribute values last written per code
+        self.attributes = {}
+
+    def __len__(self):
+        """Number of cached codes."""
+        return len(self.keys)
+
+    def _lookup(self, connection, codes):
+        """Read the keys of stored codes into the cache."""
+        code = self.table.c[self.code_column]
+        for start in range(0, len(codes), LOOKUP_CHUNK):
+            rows = connection.execute(
+                select(self.table.c.id, code).where(code.in_(codes[start:start + LOOKUP_CHUNK]))
+            ).fetchall()
+            self.keys.update((row[1], row[0]) for row in rows)
+
+    def resolve(self, engine, codes, attributes=None):
+        """
+        Map codes to surrogate keys, inserting codes not yet in the table.
+
+        Args:
+            engine: SQLAlchemy engine
+            codes (pd.Series): Codes, nulls allowed
+            attributes (callable, optional): Returns the other column values
+                of a new code's row
+
+        Returns:
+            pd.Series: Int64 keys aligned with codes, <NA> for null codes
+        """
+        unique_codes = pd.unique(codes.dropna())
+        missing = [code for code in unique_codes if code not in self.keys]
+
+        if missing:
+            with engine.begin() as connection:
+                self._lookup(connection, missing)
+                unknown = [code for code in missing if code not in self.keys]
+                if unknown:
+                    logger.debug("Inserting %d new codes into %s", len(unknown), self.table.name)
+                    connection.execute(insert_ignoring_duplicates(engine, self.table), [
+                        {self.code_column: code, **(attributes(code) if attributes else {})}
+                        for code in unknown
+                    ])
+                    self._lookup(connection, unknown)
+
+        return codes.map(self.keys).astype('Int64')
+
+    def store_attributes(self, engine, attributes):
+        """
+        Store the attribute columns of codes, inserting the codes that are
+        new. Codes whose values were already written by this cache are
+        skipped.
+
+        Args:
+            engine: SQLAlchemy engine
+            attributes (dict): Code -> dict of column values, the same
+                               columns for every code
+
+        Returns:
+            int: Number of codes written
+        """
+        changed = [(code, values) for code, values in attributes.items() if self.attributes.get(code) != values]
+        if not changed:
+            return 0
+
+        statement = upsert_changed(engine, self.table, self.code_column, list(changed[0][1]))
+        with engine.begin() as connection:
+            for start in range(0, len(changed), LOOKUP_CHUNK):
+                connection.execute(statement, [
+                    {self.code_column: code, **values} for code, values in changed[start:start + LOOKUP_CHUNK]
+                ])
+            self._lookup(connection, [code for code, _ in changed if code not in self.keys])
+
+        self.attributes.update(changed)
+        logger.debug("Stored attributes of %d codes in %s", len(changed), self.table.name)
+        return len(changed)
+
+class RouteCache(DimensionCache):
+    """
+    In-process (departure key, arrival key) -> route key mapping.
+
+    Routes are unique per airport pair; their code is only written when a
+    route is first stored, and may be renamed later (see reprocess.py).
+    """
+
+    def __init__(self):
+        """Initialize an empty cache."""
+        super().__init__(Route, 'code')
+
+    def _lookup(self, connection, pairs):
+        """Read the keys of stored airport pairs into the cache."""
+        airports = tuple_(self.table.c.departure_airport_id, self.table.c.arrival_airport_id)
+        for start in range(0, len(pairs), LOOKUP_CHUNK):
+            rows = connection.execute(
+                select(self.table.c.id, self.table.c.departure_airport_id, self.table.c.arrival_airport_id)
+                .where(airports.in_(pairs[start:start + LOOKUP_CHUNK]))
+            ).fetchall()
+            self.keys.update(((row[1], row[2]), row[0]) for row in rows)
+
+    def resolve(self, engine, departures, arrivals, codes):
+        """
+        Map airport pairs to route keys, inserting the routes not yet stored.
+
+        Args:
+            engine: SQLAlchemy engine
+            departures (pd.Series): Departure airport keys, nulls allowed
+            arrivals (pd.Series): Arrival airport keys aligned with departures
+            codes (pd.Series): Codes of the routes, used for new routes
+
+        Returns:
+            pd.Series: Int64 keys aligned with departures, <NA> for flights
+                       without both airports
+        """
+        has_route = departures.notna() & arrivals.notna()
+        pairs = pd.Series(
+            list(zip(departures[has_route].astype(int), arrivals[has_route].astype(int))),
+            index=departures.index[has_route], dtype=object
+        )
+        new_codes = dict(zip(pairs, codes[has_route]))
+        missing = [pair for pair in new_codes if pair not in self.keys]
+
+        if missing:
+            with engine.begin() as connection:
+                self._lookup(connection, missing)
+                unknown = [pair for pair in missing if pair not in self.keys]
+                if unknown:
+                    logger.debug("Inserting %d new routes", len(unknown))
+                    connection.execute(insert_ignoring_duplicates(engine, self.table), [
+                        {'code': new_codes[pair], 'departure_airport_id': pair[0], 'arrival_airport_id': pair[1]}
+                        for pair in unknown
+                    ])
+                    self._lookup(connection, unknown)
+                    # A route whose code is taken by another airport pair is skipped by the insert
+                    unresolved = [new_codes[pair] for pair in unknown if pair not in self.keys]
+                    if unresolved:
+                        logger.warning("Could not store %d routes whose code is used by another route: %s",
+                                       len(unresolved), ', '.join(unresolved[:10]))
+
+        return pairs.map(self.keys.get).reindex(departures.index).astype('Int64')
+
+def get_dimension_caches(engine):
+    """
+    Get the dimension caches of an engine.
+
+    Returns:
+        dict: DimensionCache for "aircraft", "airports" and "routes"
+    """
+    caches = _caches.get(engine)
+    if caches is None:
+        caches = {
+            'aircraft': DimensionCache(Aircraft, 'icao24'),
+            'airports': DimensionCache(Airport, 'code'),
+            'routes': RouteCache()
+        }
+        _caches[engine] = caches
+    return caches
+
+def aircraft_attributes(df):
+    """
+    Collect the registry attributes of the aircraft of an enriched batch
+    (see transform.enrich_aircraft).
+
+    Returns:
+        dict: icao24 -> registry column values, for aircraft with at least
+              one known value; empty if df has no registry columns
+    """
+    table = Aircraft.__table__
+    columns = [column for column in AIRCRAFT_ATTRIBUTES if column in df.columns]
+    if not columns:
+        return {}
+
+    metadata = df.dropna(subset=['icao24']).drop_duplicates('icao24', keep='last').set_index('icao24')[columns]
+    metadata = metadata[metadata.notna().any(axis=1)]
+    for column in columns:
+        # Truncate to the column width, PostgreSQL rejects longer strings
+        metadata[column] = metadata[column].str.slice(0, table.c[column].type.length)
+
+    return metadata.astype(object).where(metadata.notna(), None).to_dict('index')
+
+def resolve_flight_keys(df, engine):
+    """
+    Resolve the aircraft, airport and route codes of flights to dimension keys.
+
+    The route of a flight is its departure and arrival airport pair. New
+    routes are coded by the airport_pair column (see
+    transform.create_airport_pairs), or like create_airport_pairs does for
+    flights without one. New dimension rows are committed before this
+    returns, whether or not the flights are loaded (see the module
+    docstring).
+
+    Args:
+        df (pd.DataFrame): Flight data with icao24, estDepartureAirport and
+                           estArrivalAirport
+        engine: SQLAlchemy engine
+
+    Returns:
+        pd.DataFrame: Columns aircraft_id, departure_airport_id,
+                      arrival_airport_id and route_id aligned with df
+    """
+    caches = get_dimension_caches(engine)
+    departures = df['estDepartureAirport'].astype(object).where(df['estDepartureAirport'].notna(), None)
+    arrivals = df['estArrivalAirport'].astype(object).where(df['estArrivalAirport'].notna(), None)
+
+    # One lookup for both airport columns
+    airport_keys = caches['airports'].resolve(engine, pd.concat([departures, arrivals], ignore_index=True))
+    caches['aircraft'].store_attributes(engine, aircraft_attributes(df))
+    keys = pd.DataFrame({
+        'aircraft_id': caches['aircraft'].resolve(engine, df['icao24']),
+        'departure_airport_id': airport_keys.iloc[:len(df)].set_axis(df.index),
+        'arrival_airport_id': airport_keys.iloc[len(df):].set_axis(df.index)
+    })
+
+    has_route = keys['departure_airport_id'].notna() & keys['arrival_airport_id'].notna()
+    route_codes = pd.Series(None, index=df.index, dtype=object)
+    route_codes[has_route] = departures[has_route] + '-' + arrivals[has_route]
+    if 'airport_pair' in df.columns:
+        named = has_route & df['airport_pair'].notna()
+        route_codes[named] = df.loc[named, 'airport_pair']
+    keys['route_id'] = caches['routes'].resolve(
+        engine, keys['departure_airport_id'], keys['arrival_airport_id'], route_codes
+    )
+    return keys
@@ -1,26 +1,213 @@
 """
 Extract module for the OpenSky ETL pipeline.
 """
+import time
 import requests
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from datetime import datetime, timezone, timedelta
 
 from config.settings import (
-    OPENSKY_USERNAME, OPENSKY_PASSWORD, 
-    EXTRACTION_WINDOW, API_INTERVAL
+    OPENSKY_USERNAME, OPENSKY_PASSWORD, OPENSKY_API_URL,
+    EXTRACTION_WINDOW, API_INTERVAL, MIN_API_INTERVAL,
+    WINDOW_TARGET_FLIGHTS, WINDOW_TARGET_SECONDS,
+    TARGET_AIRPORTS, EXTRACTION_MODE, AIRPORT_API_INTERVAL, EXTRACTION_WORKERS,
+    GLOBAL_FLIGHTS_PER_HOUR, AIRPORT_FLIGHTS_PER_HOUR, FLIGHT_KEY_COLUMNS
 )
-from utils.logging_config import get_logger
+from utils.logging_config import get_logger, log_context
 
 # Initialize logger
 logger = get_logger("extract")
 
-def extract_flight_data(start_time=None, end_time=None):
+def fetch_flights(url):
+    """
+    Fetch a single window of flights from the OpenSky API.
+
+    Args:
+        url (str): Fully built API URL
+
+    Returns:
+        tuple: (list of flight records, or None if the request failed, and
+               a bool telling whether a smaller window may fix the failure)
+    """
+    logger.debug("Fetching data from %s", url)
+
+    try:
+        # Fetch data from OpenSky API
+        response = requests.get(url, auth=(OPENSKY_USERNAME, OPENSKY_PASSWORD))
+
+        # Check for successful response
+        if response.status_code == 200:
+            flights = response.json()
+            logger.debug("Retrieved %d flights for time window", len(flights))
+            return flights, False
+
+        # OpenSky answers 404 when a window has no flights
+        if response.status_code == 404:
+            return [], False
+
+        logger.error("Error %s: %s", response.status_code, response.text)
+        return None, response.status_code >= 500
+    except Exception as e:
+        logger.error("Exception during API request: %s", e)
+        return None, True
+
+def next_window_size(window, flights, latency, max_interval):
+    """
+    Size the next request window from the last observed payload and latency.
+
+    Windows shrink proportionally when they exceed the flight or latency
+    target and grow (at most doubling) when they are sparse, which merges
+    quiet periods into fewer requests.
+
+    Args:
+        window (int): Length of the last window in seconds
+        flights (int): Number of flights returned for it
+        latency (float): Request latency in seconds
+        max_interval (int): Largest window allowed by the endpoint
+
+    Returns:
+        int: Next window length in seconds
+    """
+    scale = min(
+        WINDOW_TARGET_FLIGHTS / max(flights, 1),
+        WINDOW_TARGET_SECONDS / max(latency, 1e-3)
+    )
+    scale = min(max(scale, 0.25), 2.0)
+    size = int(window * scale) // 60 * 60
+    return min(max(size, MIN_API_INTERVAL), max_interval)
+
+def fetch_windows(url_template, start_time, end_time, interval):
+    """
+    Fetch flights for a time range split into adaptively sized windows.
+
+    Windows that fail with a retryable error are split in half and retried
+    down to MIN_API_INTERVAL; successful windows feed next_window_size.
+    Windows that still fail are skipped and counted in "failed_windows".
+
+    Args:
+        url_template (str): URL with {begin} and {end} placeholders
+        start_time (int): Start timestamp
+        end_time (int): End timestamp
+        interval (int): Maximum window length in seconds
+
+    Returns:
+        tuple: (list of flight records, dict of window statistics)
+    """
+    flights = []
+    stats = {"requests": 0, "window_splits": 0, "window_sizes": [], "failed_windows": 0}
+
+    window = interval
+    current_start = start_time
+    while current_start < end_time:
+        current_end = min(current_start + window, end_time)
+        size = current_end - current_start
+
+        request_start = time.monotonic()
+        with log_context(window=f"{current_start}-{current_end}"):
+            window_flights, failed = fetch_flights(url_template.format(begin=current_start, end=current_end))
+        latency = time.monotonic() - request_start
+        stats["requests"] += 1
+
+        if window_flights is None and failed and size > MIN_API_INTERVAL:
+            # Retry the same start with half the window
+            window = max(size // 2, MIN_API_INTERVAL)
+            stats["window_splits"] += 1
+            logger.debug("Splitting window at %d to %d seconds", current_start, window)
+            continue
+
+        if window_flights is None:
+            logger.error("Giving up on window %d-%d", current_start, current_end)
+            stats["failed_windows"] += 1
+            window_flights = []
+        else:
+            flights.extend(window_flights)
+            stats["window_sizes"].append(size)
+        window = next_window_size(size, len(window_flights), latency, interval)
+
+        # Move to next window
+        current_start = current_end
+
+    return flights, stats
+
+def choose_extraction_strategy(start_time, end_time, airports, mode=EXTRACTION_MODE):
+    """
+    Pick between the global and the per-airport extraction strategy.
+
+    In auto mode the targeted strategy is used when the estimated number of
+    flights returned by the departure/arrival endpoints is smaller than the
+    estimated size of the global feed for the same range.
+
+    Args:
+        start_time (int): Start timestamp
+        end_time (int): End timestamp
+        airports (list): Airport codes to extract
+        mode (str): "auto", "global" or "targeted"
+
+    Returns:
+        str: "global" or "targeted"
+    """
+    if not airports or mode == "global":
+        return "global"
+    if mode == "targeted":
+        return "targeted"
+
+    hours = max(end_time - start_time, 0) / 3600.0
+    global_estimate = hours * GLOBAL_FLIGHTS_PER_HOUR
+    targeted_estimate = hours * AIRPORT_FLIGHTS_PER_HOUR * len(airports) * 2
+
+    logger.debug("Estimated payload: global=%.0f, targeted=%.0f flights", global_estimate, targeted_estimate)
+    return "targeted" if targeted_estimate < global_estimate else "global"
+
+def extract_airport_flights(start_time, end_time, airports):
+    """
+    Extract departures and arrivals of the given airports concurrently.
+
+    Args:
+        start_time (int): Start timestamp
+        end_time (int): End timestamp
+        airports (list): Airport codes to extract
+
+    Returns:
+        tuple: (list of flight records, dict of window statistics)
+    """
+    tasks = [
+        f"{OPENSKY_API_URL}/flights/{direction}?airport={airport}&begin={{begin}}&end={{end}}"
+        for airport in airports
+        for direction in ("departure", "arrival")
+    ]
+
+    all_flights = []
+    stats = {"requests": 0, "window_splits": 0, "window_sizes": [], "failed_windows": 0}
+
+    # Worker threads log with the caller's run and stage
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=EXTRACTION_WORKERS) as executor:
+        results = executor.map(
+            lambda url_template: context.copy().run(
+                fetch_windows, url_template, start_time, end_time, AIRPORT_API_INTERVAL
+            ),
+            tasks
+        )
+        for flights, task_stats in results:
+            all_flights.extend(flights)
+            stats["requests"] += task_stats["requests"]
+            stats["window_splits"] += task_stats["window_splits"]
+            stats["window_sizes"].extend(task_stats["window_sizes"])
+            stats["failed_windows"] += task_stats["failed_windows"]
+
+    return all_flights, stats
+
+def extract_flight_data(start_time=None, end_time=None, airports=None, mode=None):
     """
     Extract flight data from OpenSky API.
     
     Args:
         start_time (int, optional): Start timestamp. Defaults to 24 hours ago.
         end_time (int, optional): End timestamp. Defaults to current time.
+        airports (list, optional): Airports to extract. Defaults to TARGET_AIRPORTS.
+        mode (str, optional): "auto", "global" or "targeted". Defaults to EXTRACTION_MODE.
         
     Returns:
         pd.DataFrame: DataFrame with flight data
@@ -40,44 +227,48 @@ def extract_flight_data(start_time=None, end_time=None):
     if start_time is None:
         start_time = end_time - EXTRACTION_WINDOW  # Default to 24 hours ago
     
-    logger.info(f"Extracting flight data from {datetime.fromtimestamp(start_time, timezone.utc)} "
-                f"to {datetime.fromtimestamp(end_time, timezone.utc)}")
+    airports = TARGET_AIRPORTS if airports is None else airports
+    strategy = choose_extraction_strategy(start_time, end_time, airports, mode or EXTRACTION_MODE)
     
-    # Initialize empty list to store data
-    all_flights = []
+    logger.info("Extracting flight data from %s to %s using %s strategy",
+                datetime.fromtimestamp(start_time, timezone.utc), datetime.fromtimestamp(end_time, timezone.utc), strategy)
     
-    # Loop through intervals (to comply with OpenSky limits)
-    interval = API_INTERVAL  # 2 hours in seconds
-    current_start = start_time
-    while current_start < end_time:
-        current_end = min(current_start + interval, end_time)
-        
-        # OpenSky API URL for current window
-        url = f"https://opensky-network.org/api/flights/all?begin={current_start}&end={current_end}"
-        
-        logger.debug(f"Fetching data from {url}")
-        
-        try:
-            # Fetch data from OpenSky API
-            response = requests.get(url, auth=(OPENSKY_USERNAME, OPENSKY_PASSWORD))
-            
-            # Check for successful response
-            if response.status_code == 200:
-                flights = response.json()
-                logger.debug(f"Retrieved {len(flights)} flights for time window")
-                all_flights.extend(flights)
-            else:
-                logger.error(f"Error {response.status_code}: {response.text}")
-        except Exception as e:
-            logger.error(f"Exception during API request: {e}")
-        
-        # Move to next window
-        current_start = current_end
+    if strategy == "targeted":
+        all_flights, window_stats = extract_airport_flights(start_time, end_time, airports)
+    else:
+        # Loop through intervals (to comply with OpenSky limits)
+        all_flights, window_stats = fetch_windows(
+            f"{OPENSKY_API_URL}/flights/all?begin={{begin}}&end={{end}}",
+            start_time, end_time, API_INTERVAL
+        )
     
     # Convert collected data to DataFrame
     df_flights = pd.DataFrame(all_flights)
+    fetched = len(df_flights)
     
-    logger.info(f"Extraction complete. Retrieved {len(df_flights)} flight records.")
+    if not df_flights.empty:
+        # Keep only flights touching the configured airports
+        if airports and strategy == "global":
+            touches_airport = (
+                df_flights['estDepartureAirport'].isin(airports) |
+                df_flights['estArrivalAirport'].isin(airports)
+            )
+            df_flights = df_flights[touches_airport]
+
+        # A flight between two tracked airports is returned by both endpoints
+        if set(FLIGHT_KEY_COLUMNS).issubset(df_flights.columns):
+            df_flights = df_flights.drop_duplicates(subset=FLIGHT_KEY_COLUMNS).reset_index(drop=True)
+
+    df_flights.attrs["extract_stats"] = {
+        "strategy": strategy,
+        "airports": len(airports),
+        "flights_fetched": fetched,
+        "flights_kept": len(df_flights),
+        **window_stats
+    }
+
+    logger.info("Extraction complete. Retrieved %d flight records (%d fetched in %d requests).",
+                len(df_flights), fetched, window_stats['requests'])
     
     return df_flights
 
@@ -91,11 +282,11 @@ def extract_incremental_data(last_value):
     Returns:
         pd.DataFrame: DataFrame with new flight data
     """
-    logger.info(f"Starting incremental extraction from timestamp {last_value}")
+    logger.info("Starting incremental extraction from timestamp %s", last_value)
     
     # Convert timestamp to datetime for logging
     last_datetime = datetime.fromtimestamp(last_value, timezone.utc) if last_value else None
-    logger.info(f"Last processed timestamp: {last_datetime}")
+    logger.info("Last processed timestamp: %s", last_datetime)
     
     # Extract data from last timestamp to now
     return extract_flight_data(start_time=last_value)
\ No newline at end of file
@@ -0,0 +1,315 @@
+"""
+Composite, covering and partial indexes of flight_data, and a report of
+which of the project's queries use them.
+
+The single-column indexes declared on the models serve the incremental
+watermark and time range scans. The indexes below follow the queries that
+read flights back: the longest flights and airborne intervals. They are
+declared here rather than on the models because ensure_schema would build
+them with a plain CREATE INDEX, which blocks writes to flight_data for the
+whole build. On PostgreSQL they are built with CREATE INDEX CONCURRENTLY
+instead, so loads keep running; a concurrent build that failed leaves an
+invalid index, which is dropped and built again. SQLite builds them with
+CREATE INDEX and, as it has no INCLUDE, appends the covered columns to
+the key.
+
+index_usage_report runs EXPLAIN on the queries of PROJECT_QUERIES and maps
+every query to the indexes its plan uses, and every index to its queries.
+The queries are the statements the modules issue, imported from them, so
+the report follows their changes.
+"""
+import json
+import re
+import time
+from sqlalchemy import inspect, text
+
+from analytics import SUMMARY_QUERIES
+from archive import READ_FLIGHTS_END, READ_FLIGHTS_QUERY, READ_FLIGHTS_START
+from config.settings import INCREMENTAL_COLUMN, INCREMENTAL_TABLE
+from connections.postgresql import INCREMENTAL_VALUE_SQL
+from intervals import AIRBORNE_PREDICATE, AIRBORNE_SQL
+from load import STORED_HASHES_SQL
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("indexes")
+
+# Indexes built by build_indexes. "include" columns are carried in the
+# index without being part of the key, "where" makes a partial index
+MANAGED_INDEXES = [
+    {
+        # Airborne intervals
+        "name": "ix_flight_data_last_first_seen",
+        "table": "flight_data",
+        "columns": ["lastSeen", "firstSeen"],
+        "include": [],
+        "where": None
+    },
+    {
+        # flight_durations view: longest flights first
+        "name": "ix_flight_data_duration",
+        "table": "flight_data",
+        "columns": ["flight_duration_minutes"],
+        "include": [],
+        "where": "flight_duration_minutes IS NOT NULL"
+    }
+]
+
+# Queries issued by the project, with the module that issues them. SQL
+# strings or SQLAlchemy statements, with :start/:end (:low/:high) parameters
+PROJECT_QUERIES = {
+    **{f"analytics.{name}": sql for name, sql in SUMMARY_QUERIES.items()},
+    "view.airport_departures": "SELECT * FROM airport_departures",
+    "view.flight_durations": "SELECT * FROM flight_durations LIMIT 100",
+    "archive.read_flights": READ_FLIGHTS_QUERY.where(READ_FLIGHTS_START, READ_FLIGHTS_END).limit(1000),
+    # Without the PostgreSQL airborne range column
+    "intervals.query_airborne": AIRBORNE_SQL.format(predicate=AIRBORNE_PREDICATE),
+    "load.fetch_stored_hashes": STORED_HASHES_SQL,
+    "pipeline.incremental_value": INCREMENTAL_VALUE_SQL.format(table=INCREMENTAL_TABLE, column=INCREMENTAL_COLUMN)
+}
+
+# Index names in the plan of SQLite's EXPLAIN QUERY PLAN
+SQLITE_INDEX_PATTERN = re.compile(r'USING (?:COVERING )?INDEX (\S+)')
+
+# PostgreSQL indexes left invalid by a failed concurrent build
+INVALID_INDEXES_SQL = """
+    SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+    WHERE NOT i.indisvalid
+"""
+
+def quote(column):
+    """Quote a column name, preserving its case on PostgreSQL."""
+    return f'"{column}"'
+
+def index_ddl(index, dialect, concurrently=False):
+    """
+    Build the CREATE INDEX statement of a managed index.
+
+    Args:
+        index (dict): Entry of MANAGED_INDEXES
+        dialect (str): "postgresql" or "sqlite"
+        concurrently (bool): Build without blocking writes (PostgreSQL)
+
+    Returns:
+        str: SQL statement
+    """
+    columns = list(index['columns'])
+    include = ""
+    if index['include'] and dialect == 'postgresql':
+        include = f" INCLUDE ({', '.join(quote(column) for column in index['include'])})"
+    else:
+        columns += index['include']
+
+    sql = (f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {index['name']} "
+           f"ON {index['table']} ({', '.join(quote(column) for column in columns)}){include}")
+    if index['where']:
+        sql += f" WHERE {index['where']}"
+    return sql
+
+def build_indexes(engine, indexes=MANAGED_INDEXES, stats=None):
+    """
+    Build the managed indexes that are missing.
+
+    On PostgreSQL each index is built with CREATE INDEX CONCURRENTLY
+    outside a transaction, and invalid leftovers of failed builds are
+    dropped and built again. Tables are analyzed after a build so the
+    planner knows the new indexes.
+
+    Args:
+        engine: SQLAlchemy engine
+        indexes (list): Index declarations
+        stats (dict, optional): Filled with counts and build seconds per index
+
+    Returns:
+        bool: Success status (False if an index failed to build)
+    """
+    stats = stats if stats is not None else {}
+    stats.update({"declared": len(indexes), "built": 0, "existing": 0, "rebuilt": 0, "failed": 0, "seconds": {}})
+    dialect = engine.dialect.name
+    concurrently = dialect == 'postgresql'
+    inspector = inspect(engine)
+    existing = {
+        (table, index['name'])
+        for table in {index['table'] for index in indexes} if inspector.has_table(table)
+        for index in inspector.get_indexes(table)
+    }
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction. The SQLite
+    # engine begins one itself, committed after every statement
+    options = {"isolation_level": "AUTOCOMMIT"} if concurrently else {}
+    with engine.connect().execution_options(**options) as connection:
+        invalid = set(connection.execute(text(INVALID_INDEXES_SQL)).scalars()) if concurrently else set()
+        analyze = set()
+        for index in indexes:
+            name = index['name']
+            if name in invalid:
+                logger.warning("Index %s is invalid after a failed build, rebuilding it", name)
+                connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+                stats['rebuilt'] += 1
+            elif (index['table'], name) in existing:
+                stats['existing'] += 1
+                continue
+
+            started = time.perf_counter()
+            try:
+                connection.execute(text(index_ddl(index, dialect, concurrently)))
+                connection.commit()
+            except Exception as e:
+                connection.rollback()
+                logger.error("Error building index %s: %s", name, e)
+                stats['failed'] += 1
+                continue
+            seconds = time.perf_counter() - started
+            stats['built'] += 1
+            stats['seconds'][name] = round(seconds, 2)
+            analyze.add(index['table'])
+            logger.info("Built index %s in %.2f seconds", name, seconds)
+
+        for table in sorted(analyze):
+            connection.execute(text(f"ANALYZE {table}"))
+        connection.commit()
+
+    logger.info("Indexes: %d built, %d already present, %d failed",
+                stats['built'], stats['existing'], stats['failed'])
+    return stats['failed'] == 0
+
+def render_query(engine, sql, params=None):
+    """
+    Render a project query as SQL text with the parameters it uses.
+
+    EXPLAIN takes SQL text, so SQLAlchemy statements are compiled for the
+    engine's dialect with their parameters inline.
+
+    Args:
+        engine: SQLAlchemy engine
+        sql: SQL string or SQLAlchemy statement
+        params (dict, optional): Parameters, those the query does not use are dropped
+
+    Returns:
+        tuple: SQL string and its parameters
+    """
+    params = params or {}
+    if not isinstance(sql, str):
+        sql = str(sql.params(params).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+    return sql, {key: value for key, value in params.items() if f":{key}" in sql}
+
+def plan_indexes(engine, sql, params=None):
+    """
+    Find the indexes and full table scans in the plan of a query.
+
+    Args:
+        engine: SQLAlchemy engine
+        sql: Query, SQL string or SQLAlchemy statement
+        params (dict, optional): Query parameters
+
+    Returns:
+        dict: "indexes" and "scans", lists of index and table names
+              (plan lines on SQLite) in plan order
+    """
+    sql, params = render_query(engine, sql, params)
+    indexes = []
+    scans = []
+    with engine.connect() as connection:
+        if engine.dialect.name == 'postgresql':
+            plan = connection.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop(0)
+                if 'Index Name' in node:
+                    indexes.append(node['Index Name'])
+                elif node['Node Type'] == 'Seq Scan':
+                    scans.append(node['Relation Name'])
+                nodes += node.get('Plans', [])
+        else:
+            for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params):
+                detail = row[-1]
+                match = SQLITE_INDEX_PATTERN.search(detail)
+                if match:
+                    indexes.append(match.group(1))
+                elif detail.startswith('SCAN ') and 'PRIMARY KEY' not in detail:
+                    scans.append(detail[len('SCAN '):])
+
+    return {"indexes": list(dict.fromkeys(indexes)), "scans": list(dict.fromkeys(scans))}
+
+def sample_params(engine):
+    """
+    Parameters for PROJECT_QUERIES: the last day of stored flights, so
+    plans reflect the data.
+
+    Returns:
+        dict: start and end, and the same range as low and high
+    """
+    with engine.connect() as connection:
+        latest = connection.execute(text(
+            INCREMENTAL_VALUE_SQL.format(table=INCREMENTAL_TABLE, column=INCREMENTAL_COLUMN)
+        )).scalar() or int(time.time())
+    return {"start": latest - 86400, "end": latest, "low": latest - 86400, "high": latest}
+
+def index_usage_report(engine, queries=PROJECT_QUERIES, indexes=MANAGED_INDEXES):
+    """
+    Explain the project's queries and map them to the indexes they use.
+
+    Args:
+        engine: SQLAlchemy engine
+        queries (dict): Query name -> SQL string or SQLAlchemy statement
+        indexes (list): Managed index declarations, reported even when unused
+
+    Returns:
+        dict: "queries" (name -> plan_indexes result, or "error"),
+              "indexes" (index name -> names of the queries using it) and
+              "unused" (managed indexes no query uses)
+    """
+    params = sample_params(engine)
+    report = {"queries": {}, "indexes": {index['name']: [] for index in indexes}, "unused": []}
+    for name, sql in queries.items():
+        try:
+            plan = plan_indexes(engine, sql, params)
+        except Exception as e:
+            logger.warning("Cannot explain query %s: %s", name, e)
+            report['queries'][name] = {"error": str(e)}
+            continue
+        report['queries'][name] = plan
+        for index_name in plan['indexes']:
+            report['indexes'].setdefault(index_name, []).append(name)
+
+    report['unused'] = [index['name'] for index in indexes if not report['indexes'][index['name']]]
+    return report
+
+def format_index_report(report):
+    """
+    Lay out an index usage report as text.
+
+    Args:
+        report (dict): Result of index_usage_report
+
+    Returns:
+        list: Lines, the queries first, then the indexes
+    """
+    width = max([len(name) for name in list(report['queries']) + list(report['indexes'])] + [0])
+    lines = []
+    for name, plan in report['queries'].items():
+        if 'error' in plan:
+            lines.append(f"{name:<{width}}  error: {plan['error'].splitlines()[0]}")
+            continue
+        used = ', '.join(plan['indexes']) or '-'
+        scans = f"  (full scan: {', '.join(plan['scans'])})" if plan['scans'] else ""
+        lines.append(f"{name:<{width}}  {used}{scans}")
+    for name, used_by in report['indexes'].items():
+        lines.append(f"{name:<{width}}  used by {len(used_by)}: {', '.join(used_by) or '-'}")
+    return lines
+
+def log_index_report(engine):
+    """
+    Log which indexes the project's queries use.
+
+    Returns:
+        dict: Result of index_usage_report
+    """
+    report = index_usage_report(engine)
+    for line in format_index_report(report):
+        logger.info(line)
+    if report['unused']:
+        logger.info("Managed indexes no query uses: %s", ', '.join(report['unused']))
+    return report
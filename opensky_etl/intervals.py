@@ -0,0 +1,171 @@
+"""
+Interval queries for the OpenSky ETL pipeline: which flights were airborne
+at an instant or during a time range.
+
+Client side, AirborneIndex answers queries over a loaded time slice.
+Server side, query_airborne uses the GiST-indexed "airborne" range column
+on PostgreSQL and the firstSeen/lastSeen predicate elsewhere.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("intervals")
+
+# Upper duration bound of each bucket, in seconds
+DURATION_LEVELS = (3600, 4 * 3600, 16 * 3600, np.inf)
+
+# Flights airborne during [:start, :end], formatted with one of the predicates
+# below. Codes are joined back by the flights view
+AIRBORNE_SQL = (
+    'SELECT * FROM flights WHERE id IN (SELECT id FROM flight_data WHERE {predicate}) '
+    'ORDER BY "firstSeen"'
+)
+AIRBORNE_PREDICATE = '"firstSeen" <= :end AND "lastSeen" >= :start'
+# Uses the GiST index on the range column of PostgreSQL
+AIRBORNE_RANGE_PREDICATE = "airborne && int8range(:start, :end, '[]')"
+
+class AirborneIndex:
+    """
+    Static interval index over [firstSeen, lastSeen] flight intervals.
+
+    Intervals are bucketed by duration and sorted by start within each
+    bucket. A flight overlapping [start, end] must then start inside
+    [start - longest duration of its bucket, end], which is a contiguous
+    slice found by binary search; only that slice is filtered on its end.
+    """
+
+    def __init__(self, starts, ends, row_positions=None):
+        """
+        Build the index.
+
+        Args:
+            starts (array-like): Interval starts (firstSeen)
+            ends (array-like): Interval ends (lastSeen)
+            row_positions (array-like, optional): Position reported for each
+                interval. Defaults to 0..n-1.
+        """
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        durations = ends - starts
+        row_positions = (
+            np.arange(len(starts)) if row_positions is None
+            else np.asarray(row_positions, dtype=np.int64)
+        )
+
+        self.size = len(starts)
+        self.levels = []
+
+        lower = -np.inf
+        for upper in DURATION_LEVELS:
+            positions = np.flatnonzero((durations > lower) & (durations <= upper))
+            lower = upper
+            if not len(positions):
+                continue
+
+            order = np.argsort(starts[positions], kind='stable')
+            positions = positions[order]
+            self.levels.append((
+                starts[positions],
+                ends[positions],
+                row_positions[positions],
+                int(durations[positions].max())
+            ))
+
+    @classmethod
+    def from_frame(cls, df, start_column='firstSeen', end_column='lastSeen'):
+        """
+        Build the index from a DataFrame.
+
+        Args:
+            df (pd.DataFrame): Flight data
+            start_column (str): Interval start column
+            end_column (str): Interval end column
+
+        Returns:
+            AirborneIndex: Index whose positions refer to rows of df
+        """
+        valid = (df[start_column].notna() & df[end_column].notna()).to_numpy()
+        return cls(
+            df[start_column].to_numpy()[valid],
+            df[end_column].to_numpy()[valid],
+            row_positions=np.flatnonzero(valid)
+        )
+
+    def overlapping(self, start, end):
+        """
+        Find intervals overlapping [start, end] (bounds inclusive).
+
+        Args:
+            start (int): Range start timestamp
+            end (int): Range end timestamp
+
+        Returns:
+            np.ndarray: Sorted row positions of the matching intervals
+        """
+        matches = []
+        for level_starts, level_ends, positions, max_duration in self.levels:
+            low = np.searchsorted(level_starts, start - max_duration, side='left')
+            high = np.searchsorted(level_starts, end, side='right')
+            hits = level_ends[low:high] >= start
+            matches.append(positions[low:high][hits])
+
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(matches))
+
+    def at(self, timestamp):
+        """
+        Find intervals containing an instant.
+
+        Args:
+            timestamp (int): Unix timestamp
+
+        Returns:
+            np.ndarray: Sorted row positions of the matching intervals
+        """
+        return self.overlapping(timestamp, timestamp)
+
+def airborne_flights(df, start, end=None):
+    """
+    Select the flights of a DataFrame airborne at an instant or during a range.
+
+    Args:
+        df (pd.DataFrame): Flight data
+        start (int): Instant, or range start timestamp
+        end (int, optional): Range end timestamp. Defaults to start.
+
+    Returns:
+        pd.DataFrame: Matching flights
+    """
+    index = AirborneIndex.from_frame(df)
+    return df.iloc[index.overlapping(start, start if end is None else end)]
+
+def query_airborne(engine, start, end=None, limit=None):
+    """
+    Query the flights airborne at an instant or during a range.
+
+    Args:
+        engine: SQLAlchemy engine
+        start (int): Instant, or range start timestamp
+        end (int, optional): Range end timestamp. Defaults to start.
+        limit (int, optional): Maximum number of rows
+
+    Returns:
+        pd.DataFrame: Matching flights ordered by firstSeen
+    """
+    end = start if end is None else end
+    is_postgresql = 'postgresql' in str(engine.url)
+
+    columns = [column['name'] for column in inspect(engine).get_columns('flight_data')]
+    predicate = AIRBORNE_RANGE_PREDICATE if is_postgresql and 'airborne' in columns else AIRBORNE_PREDICATE
+    query = AIRBORNE_SQL.format(predicate=predicate)
+    if limit:
+        query += f" LIMIT {int(limit)}"
+
+    logger.debug("Querying flights airborne between %s and %s", start, end)
+    with engine.connect() as conn:
+        return pd.read_sql(text(query), conn, params={"start": int(start), "end": int(end)})
@@ -0,0 +1,251 @@
+"""
+Live state-vector ingestion for the OpenSky ETL pipeline.
+
+Positions from the /states/all endpoint are kept in a fixed-size ring
+buffer of NumPy columns (one row per aircraft, one slot per sample) and
+flushed to the aircraft_positions table as downsampled snapshots.
+"""
+import requests
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from config.settings import (
+    OPENSKY_USERNAME, OPENSKY_PASSWORD, OPENSKY_API_URL,
+    LIVE_POLL_INTERVAL, LIVE_WINDOW, LIVE_MAX_AIRCRAFT
+)
+from connections.postgresql import AircraftPosition
+from spatial import cell_ids
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("live")
+
+# Field order of a state vector in the /states/all response
+STATE_COLUMNS = [
+    'icao24', 'callsign', 'origin_country', 'time_position', 'last_contact',
+    'longitude', 'latitude', 'baro_altitude', 'on_ground', 'velocity',
+    'true_track', 'vertical_rate', 'sensors', 'geo_altitude', 'squawk',
+    'spi', 'position_source'
+]
+
+# Numeric columns stored in the ring buffer
+BUFFER_COLUMNS = ['latitude', 'longitude', 'baro_altitude', 'velocity', 'true_track']
+
+def fetch_states(api_url=OPENSKY_API_URL):
+    """
+    Fetch the current state vectors of all aircraft.
+
+    Args:
+        api_url (str): OpenSky API base URL
+
+    Returns:
+        pd.DataFrame: One row per aircraft with a known position, empty on error
+    """
+    url = f"{api_url}/states/all"
+    auth = (OPENSKY_USERNAME, OPENSKY_PASSWORD) if OPENSKY_USERNAME and OPENSKY_PASSWORD else None
+
+    try:
+        response = requests.get(url, auth=auth, timeout=30)
+        if response.status_code != 200:
+            logger.error("Error %s: %s", response.status_code, response.text)
+            return pd.DataFrame(columns=STATE_COLUMNS)
+
+        payload = response.json()
+        states = payload.get("states") or []
+        if not states:
+            return pd.DataFrame(columns=STATE_COLUMNS)
+
+        df = pd.DataFrame(states, columns=STATE_COLUMNS[:len(states[0])])
+
+        # Fall back to the response time for aircraft without a position timestamp
+        df['time_position'] = df['time_position'].fillna(payload.get("time", 0))
+        return df.dropna(subset=['latitude', 'longitude'])
+    except Exception as e:
+        logger.error("Exception during state vector request: %s", e)
+        return pd.DataFrame(columns=STATE_COLUMNS)
+
+class PositionRingBuffer:
+    """
+    Fixed-size, array-backed buffer of recent positions per aircraft.
+
+    Memory is allocated once: every column is a (max_aircraft, slots) array
+    and each aircraft owns one row used as a circular buffer. Rows of
+    aircraft not seen for `window` seconds are recycled.
+    """
+
+    def __init__(self, max_aircraft=LIVE_MAX_AIRCRAFT, window=LIVE_WINDOW,
+                 poll_interval=LIVE_POLL_INTERVAL):
+        """
+        Initialize the buffer.
+
+        Args:
+            max_aircraft (int): Number of aircraft rows
+            window (int): Seconds of history kept per aircraft
+            poll_interval (int): Expected seconds between samples
+        """
+        self.max_aircraft = max_aircraft
+        self.window = window
+        self.slots = max(int(np.ceil(window / poll_interval)), 1)
+
+        shape = (max_aircraft, self.slots)
+        self.times = np.zeros(shape, dtype=np.int64)
+        self.columns = {name: np.full(shape, np.nan, dtype=np.float32) for name in BUFFER_COLUMNS}
+        self.on_ground = np.zeros(shape, dtype=bool)
+
+        self.heads = np.zeros(max_aircraft, dtype=np.int64)
+        self.last_seen = np.zeros(max_aircraft, dtype=np.int64)
+        self.keys = np.empty(max_aircraft, dtype=object)
+        self.rows = {}
+        self.free_rows = list(range(max_aircraft - 1, -1, -1))
+        self.dropped = 0
+
+    def __len__(self):
+        """Number of aircraft currently tracked."""
+        return len(self.rows)
+
+    def nbytes(self):
+        """Approximate memory held by the buffer arrays."""
+        arrays = [self.times, self.on_ground, self.heads, self.last_seen, self.keys]
+        return sum(array.nbytes for array in arrays) + sum(a.nbytes for a in self.columns.values())
+
+    def _assign_rows(self, keys):
+        """Map aircraft keys to buffer rows, allocating rows for new aircraft."""
+        rows = np.fromiter((self.rows.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+        for position in np.flatnonzero(rows < 0):
+            if not self.free_rows:
+                self.dropped += 1
+                continue
+            row = self.free_rows.pop()
+            key = keys[position]
+            self.rows[key] = row
+            self.keys[row] = key
+            self.heads[row] = 0
+            self.times[row] = 0
+            rows[position] = row
+
+        return rows
+
+    def append(self, states):
+        """
+        Append one poll of state vectors.
+
+        Args:
+            states (pd.DataFrame): Output of fetch_states
+
+        Returns:
+            int: Number of positions written
+        """
+        if states.empty:
+            return 0
+
+        states = states.drop_duplicates(subset='icao24', keep='last')
+        rows = self._assign_rows(states['icao24'].to_numpy())
+        valid = rows >= 0
+        rows = rows[valid]
+
+        times = states['time_position'].to_numpy(dtype=np.int64)[valid]
+        slots = self.heads[rows] % self.slots
+
+        self.times[rows, slots] = times
+        for name, column in self.columns.items():
+            column[rows, slots] = states[name].to_numpy(dtype=np.float32, na_value=np.nan)[valid]
+        self.on_ground[rows, slots] = states['on_ground'].fillna(False).to_numpy(dtype=bool)[valid]
+
+        self.heads[rows] += 1
+        self.last_seen[rows] = np.maximum(self.last_seen[rows], times)
+        return len(rows)
+
+    def evict(self, now):
+        """
+        Recycle the rows of aircraft not seen within the window.
+
+        Args:
+            now (int): Current Unix timestamp
+
+        Returns:
+            int: Number of evicted aircraft
+        """
+        in_use = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        stale = in_use[self.last_seen[in_use] < now - self.window]
+
+        for row in stale:
+            del self.rows[self.keys[row]]
+            self.keys[row] = None
+            self.last_seen[row] = 0
+            self.free_rows.append(int(row))
+
+        return len(stale)
+
+    def snapshot(self, since, step):
+        """
+        Return positions newer than `since`, downsampled to one per aircraft and step.
+
+        Args:
+            since (int): Exclusive lower time bound
+            step (int): Downsampling step in seconds (latest sample kept)
+
+        Returns:
+            pd.DataFrame: Positions ordered by buffer row and time
+        """
+        rows, slots = np.nonzero((self.times > since) & (self.keys != None)[:, None])
+        if not len(rows):
+            return pd.DataFrame(columns=['icao24', 'time', *BUFFER_COLUMNS, 'on_ground'])
+
+        # Order by row then time and keep the last sample of each (row, bucket)
+        times = self.times[rows, slots]
+        order = np.lexsort((times, rows))
+        rows, slots, times = rows[order], slots[order], times[order]
+        buckets = times // step
+        is_last = np.ones(len(rows), dtype=bool)
+        is_last[:-1] = (rows[1:] != rows[:-1]) | (buckets[1:] != buckets[:-1])
+        rows, slots = rows[is_last], slots[is_last]
+
+        return pd.DataFrame({
+            'icao24': self.keys[rows],
+            'time': self.times[rows, slots],
+            **{name: column[rows, slots] for name, column in self.columns.items()},
+            'on_ground': self.on_ground[rows, slots]
+        })
+
+    def latest(self):
+        """
+        Return the latest position of every tracked aircraft.
+
+        Returns:
+            pd.DataFrame: One row per aircraft
+        """
+        rows = np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+        slots = (self.heads[rows] - 1) % self.slots
+        return pd.DataFrame({
+            'icao24': self.keys[rows],
+            'time': self.times[rows, slots],
+            **{name: column[rows, slots] for name, column in self.columns.items()},
+            'on_ground': self.on_ground[rows, slots]
+        })
+
+def load_positions(df, engine):
+    """
+    Bulk insert position snapshots into the aircraft_positions table.
+
+    Args:
+        df (pd.DataFrame): Output of PositionRingBuffer.snapshot
+        engine: SQLAlchemy engine
+
+    Returns:
+        int: Number of positions inserted
+    """
+    if df.empty:
+        return 0
+
+    try:
+        df = df.assign(grid_cell=cell_ids(df['latitude'], df['longitude']))
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        with engine.begin() as conn:
+            conn.execute(insert(AircraftPosition.__table__), records)
+        logger.info("Flushed %d positions to aircraft_positions", len(records))
+        return len(records)
+    except Exception as e:
+        logger.error("Error loading positions: %s", e)
+        return 0
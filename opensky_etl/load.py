@@ -1,17 +1,143 @@
 """
 Load module for the OpenSky ETL pipeline.
 """
+import time
 import pandas as pd
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import text
 
-from connections.postgresql import FlightData
+from config.settings import ROUTE_OUTLIER_ZSCORE
+from connections.postgresql import FlightData, bump_load_watermark
+from analytics import AIRPORT_DEPARTURES_SQL
+from archive import archived_flight_hashes
+from dimensions import resolve_flight_keys
+from sketches import update_sketches
+from rollups import update_rollups
+from route_stats import stored_route_values, update_route_stats
+from change_feed import append_changes
 from utils.logging_config import get_logger
 
 # Initialize logger
 logger = get_logger("load")
 
-def load_data_to_db(df, engine, session, is_incremental=True):
+# Columns delivered by the OpenSky flights endpoints
+REQUIRED_COLUMNS = [
+    'icao24', 'firstSeen', 'estDepartureAirport', 'lastSeen', 
+    'estArrivalAirport', 'callsign', 'estDepartureAirportHorizDistance',
+    'estDepartureAirportVertDistance', 'estArrivalAirportHorizDistance', 
+    'estArrivalAirportVertDistance', 'departureAirportCandidatesCount',
+    'arrivalAirportCandidatesCount'
+]
+
+# Columns added by the transformations
+OPTIONAL_COLUMNS = [
+    'flight_duration_minutes', 'total_distance_km', 'airport_pair'
+]
+
+# Code columns stored as keys into the dimension tables
+DIMENSION_KEY_COLUMNS = {
+    'icao24': 'aircraft_id',
+    'estDepartureAirport': 'departure_airport_id',
+    'estArrivalAirport': 'arrival_airport_id',
+    'airport_pair': 'route_id'
+}
+
+# Natural key of a stored flight
+STORED_KEY_COLUMNS = ['aircraft_id', 'firstSeen']
+
+# Ids and row hashes of the stored flights in a firstSeen range
+STORED_HASHES_SQL = (
+    'SELECT id, aircraft_id, "firstSeen", row_hash AS stored_hash '
+    'FROM flight_data WHERE "firstSeen" BETWEEN :low AND :high'
+)
+
+def compute_row_hashes(df):
+    """
+    Compute a 64-bit content hash of the API columns of each row.
+    
+    Numeric columns are hashed as float64 and text columns as strings so
+    that a flight hashes the same whether or not its batch contained nulls.
+    
+    Args:
+        df (pd.DataFrame): Flight data DataFrame with REQUIRED_COLUMNS
+        
+    Returns:
+        pd.Series: Signed 64-bit hashes aligned with df
+    """
+    canonical = pd.DataFrame(index=df.index)
+    for col in REQUIRED_COLUMNS:
+        if col in ('icao24', 'estDepartureAirport', 'estArrivalAirport', 'callsign'):
+            canonical[col] = df[col].fillna('').astype(str)
+        else:
+            canonical[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    
+    hashes = pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+    return pd.Series(hashes.view('int64'), index=df.index)
+
+def fetch_stored_hashes(engine, df):
+    """
+    Fetch ids and row hashes of stored flights in the batch's firstSeen range.
+    
+    Args:
+        engine: SQLAlchemy engine
+        df (pd.DataFrame): Incoming batch
+        
+    Returns:
+        pd.DataFrame: Columns id, aircraft_id, firstSeen, stored_hash
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['id', *STORED_KEY_COLUMNS, 'stored_hash'], dtype='Int64')
+    query = text(STORED_HASHES_SQL)
+    params = {"low": int(df['firstSeen'].min()), "high": int(df['firstSeen'].max())}
+    
+    with engine.connect() as conn:
+        rows = conn.execute(query, params).fetchall()
+    
+    # Build columns explicitly so 64-bit hashes never round-trip through float
+    stored = pd.DataFrame({
+        'id': pd.array([row[0] for row in rows], dtype='Int64'),
+        'aircraft_id': pd.array([row[1] for row in rows], dtype='Int64'),
+        'firstSeen': pd.array([row[2] for row in rows], dtype='Int64'),
+        'stored_hash': pd.array([row[3] for row in rows], dtype='Int64')
+    })
+    return stored.drop_duplicates(subset=STORED_KEY_COLUMNS, keep='last')
+
+def build_flight_record(row):
+    """
+    Build the column mapping of a FlightData row from a DataFrame row.
+    
+    Args:
+        row (pd.Series): Flight data row
+        
+    Returns:
+        dict: Column values for FlightData
+    """
+    flight_data = {}
+    
+    # Add required columns
+    for col in REQUIRED_COLUMNS:
+        if col not in DIMENSION_KEY_COLUMNS:
+            flight_data[col] = row.get(col) if col in row else None
+    
+    # Add optional transformation columns
+    for col in OPTIONAL_COLUMNS:
+        if col not in DIMENSION_KEY_COLUMNS and col in row and not pd.isna(row[col]):
+            flight_data[col] = row[col]
+    
+    # Add dimension keys
+    for key_col in DIMENSION_KEY_COLUMNS.values():
+        value = row.get(key_col)
+        flight_data[key_col] = None if value is None or pd.isna(value) else int(value)
+    
+    flight_data['row_hash'] = int(row['row_hash'])
+    
+    # Duration outlier score against the route (see route_stats.py)
+    if 'duration_zscore' in row and not pd.isna(row['duration_zscore']):
+        flight_data['duration_zscore'] = float(row['duration_zscore'])
+    return flight_data
+
+def load_data_to_db(df, engine, session, is_incremental=True, reconcile=False, stats=None, timings=None,
+                    raise_errors=False):
     """
     Load flight data into the database.
     
@@ -20,74 +146,121 @@ def load_data_to_db(df, engine, session, is_incremental=True):
         engine: SQLAlchemy engine
         session: SQLAlchemy session
         is_incremental (bool): Whether to use incremental loading
+        reconcile (bool): Compare rows with stored flights by natural key and
+                          row hash, inserting new and updating revised flights;
+                          revisions of archived flights are dropped
+        stats (dict, optional): Filled with inserted/revised/unchanged counts,
+                                dropped revisions of archived flights and the
+                                number of duration outliers
+        timings (dict, optional): Filled with the commit latency in seconds
+        raise_errors (bool): Re-raise errors after the rollback instead of
+                             returning 0
         
     Returns:
         int: Number of records loaded
     """
-    logger.info(f"Starting load operation for {len(df)} records")
+    logger.info("Starting load operation for %d records", len(df))
+    stats = stats if stats is not None else {}
     
     if df.empty:
         logger.warning("Empty DataFrame, skipping load operation")
         return 0
     
     try:
-        # Handle potential missing columns in the DataFrame
-        required_columns = [
-            'icao24', 'firstSeen', 'estDepartureAirport', 'lastSeen', 
-            'estArrivalAirport', 'callsign', 'estDepartureAirportHorizDistance',
-            'estDepartureAirportVertDistance', 'estArrivalAirportHorizDistance', 
-            'estArrivalAirportVertDistance', 'departureAirportCandidatesCount',
-            'arrivalAirportCandidatesCount'
-        ]
-        
-        # Add transformation columns if they exist
-        optional_columns = [
-            'flight_duration_minutes', 'total_distance_km', 'airport_pair'
-        ]
-        
         # Create empty columns if they don't exist
-        for col in required_columns:
+        for col in REQUIRED_COLUMNS:
             if col not in df.columns:
-                logger.warning(f"Missing column {col}, creating empty column")
+                logger.warning("Missing column %s, creating empty column", col)
                 df[col] = None
         
         # Add optional transformation columns if they don't exist
-        for col in optional_columns:
+        for col in OPTIONAL_COLUMNS:
             if col not in df.columns:
-                logger.warning(f"Missing transformation column {col}, creating empty column")
+                logger.warning("Missing transformation column %s, creating empty column", col)
                 df[col] = None
         
+        df['row_hash'] = compute_row_hashes(df)
+        # Committed separately, a failed load leaves unreferenced codes the retry reuses
+        df = df.join(resolve_flight_keys(df, engine))
+        
+        revised = pd.DataFrame()
+        unchanged = archived_revisions = 0
+        if reconcile:
+            # Archive segments are never rewritten, so archived flights are not revised
+            archived_hashes = archived_flight_hashes(engine, df)
+            is_archived = archived_hashes.notna()
+            archived_revisions = int((is_archived & (archived_hashes != df['row_hash'])).sum())
+            unchanged = int(is_archived.sum()) - archived_revisions
+            if archived_revisions:
+                logger.warning("Dropping %d revisions of archived flights", archived_revisions)
+            df = df[~is_archived]
+
+            # Only hashes are compared, full rows are never read back
+            stored = fetch_stored_hashes(engine, df)
+            merged = df.merge(stored, on=STORED_KEY_COLUMNS, how='left')
+            is_new = merged['id'].isna()
+            hash_differs = (merged['stored_hash'] != merged['row_hash']).fillna(True).astype(bool)
+            is_revised = ~is_new & hash_differs
+            unchanged += int((~is_new & ~is_revised).sum())
+            revised = merged[is_revised]
+            df = merged[is_new].drop(columns=['id', 'stored_hash'])
+        
+        # Route statistics count the new flights and swap the stored versions of
+        # revised ones for the revisions, all of which are scored against them
+        removed = stored_route_values(session, revised['id']) if not revised.empty else None
+        scores = update_route_stats(pd.concat([df, revised]) if removed is not None else df, session, removed=removed)
+        df['duration_zscore'] = scores.loc[df.index]
+        revised = revised.assign(duration_zscore=scores.loc[revised.index])
+        
         # Bulk insert approach for better performance
-        flight_records = []
-        for _, row in df.iterrows():
-            # Convert row to dictionary, handling any missing columns
-            flight_data = {}
-            
-            # Add required columns
-            for col in required_columns:
-                flight_data[col] = row.get(col) if col in row else None
-            
-            # Add optional transformation columns
-            for col in optional_columns:
-                if col in row and not pd.isna(row[col]):
-                    flight_data[col] = row[col]
-            
-            # Create FlightData object
-            flight_records.append(FlightData(**flight_data))
+        flight_records = [FlightData(**build_flight_record(row)) for _, row in df.iterrows()]
         
         # Add all records to the session
         session.bulk_save_objects(flight_records)
         
+        # Sketches, rollups and route statistics are committed atomically with the flights they count
+        update_sketches(df, session)
+        # Rollups read the stored version of revised flights, so they run before the revisions are written
+        update_rollups(df, session, revised=revised)
+        
+        if not revised.empty:
+            updates = []
+            for _, row in revised.iterrows():
+                record = build_flight_record(row)
+                record['id'] = int(row['id'])
+                updates.append(record)
+            session.bulk_update_mappings(FlightData, updates)
+        
+        # Published to feed consumers only if the load commits
+        append_changes(session, df, revised)
+        
+        # Invalidates cached read queries (see query_cache.py)
+        if flight_records or not revised.empty:
+            bump_load_watermark(session)
+        
         # Commit the transaction
+        commit_start = time.perf_counter()
         session.commit()
         
-        logger.info(f"Successfully loaded {len(flight_records)} records into the flight_data table.")
-        return len(flight_records)
+        stats.update({
+            "inserted": len(flight_records),
+            "revised": len(revised),
+            "unchanged": unchanged,
+            "archived_revisions": archived_revisions,
+            "outliers": int((scores.abs() > ROUTE_OUTLIER_ZSCORE).sum())
+        })
+        if timings is not None:
+            timings["commit_seconds"] = time.perf_counter() - commit_start
+        
+        logger.info("Successfully loaded %d records into the flight_data table (%d revised, %d unchanged).",
+                    len(flight_records), len(revised), unchanged)
+        return len(flight_records) + len(revised)
     
     except Exception as e:
         session.rollback()
-        logger.error(f"Error loading data into database: {e}")
-        logger.error(f"Exception details: {str(e)}")
+        logger.exception("Error loading data into database: %s", e)
+        if raise_errors:
+            raise
         return 0
 
 def create_or_replace_view(engine, view_name, sql):
@@ -102,36 +275,20 @@ def create_or_replace_view(engine, view_name, sql):
     Returns:
         bool: Success status
     """
-    logger.info(f"Creating or replacing view {view_name}")
+    logger.info("Creating or replacing view %s", view_name)
     
     try:
         with engine.connect() as conn:
-            # Check if we're using SQLite
-            is_sqlite = 'sqlite' in str(engine.url).lower()
-            
-            # Drop view if exists
-            if is_sqlite:
-                # SQLite specific approach
-                conn.execute(text(f"DROP VIEW IF EXISTS {view_name}"))
-                conn.commit()
-            else:
-                # PostgreSQL approach
+            # Drop and create in one transaction, so readers never miss the view
+            with conn.begin():
                 conn.execute(text(f"DROP VIEW IF EXISTS {view_name}"))
-                
-            # Create view
-            create_view_sql = f"CREATE VIEW {view_name} AS {sql}"
+                conn.execute(text(f"CREATE VIEW {view_name} AS {sql}"))
             
-            if is_sqlite:
-                conn.execute(text(create_view_sql))
-                conn.commit()
-            else:
-                conn.execute(text(create_view_sql))
-            
-            logger.info(f"Successfully created view {view_name}")
+            logger.info("Successfully created view %s", view_name)
             return True
     
     except Exception as e:
-        logger.error(f"Error creating view {view_name}: {e}")
+        logger.error("Error creating view %s: %s", view_name, e)
         return False
 
 def create_summary_views(engine):
@@ -147,21 +304,8 @@ def create_summary_views(engine):
     logger.info("Creating summary views")
     
     try:
-        # Create airport activity view
-        airport_view_sql = """
-        SELECT 
-            "estDepartureAirport" AS airport_code,
-            COUNT(*) AS departure_count,
-            MIN("firstSeen") AS first_activity,
-            MAX("lastSeen") AS last_activity
-        FROM 
-            flight_data
-        WHERE 
-            "estDepartureAirport" IS NOT NULL
-        GROUP BY 
-            "estDepartureAirport"
-        """
-        airport_result = create_or_replace_view(engine, "airport_departures", airport_view_sql)
+        # Create airport activity view, the airport_departures summary query unordered
+        airport_result = create_or_replace_view(engine, "airport_departures", AIRPORT_DEPARTURES_SQL)
         
         # Create flight duration view
         duration_view_sql = """
@@ -176,7 +320,7 @@ def create_summary_views(engine):
             "flight_duration_minutes",
             "total_distance_km"
         FROM 
-            flight_data
+            flights
         WHERE 
             "flight_duration_minutes" IS NOT NULL
         ORDER BY 
@@ -188,5 +332,5 @@ def create_summary_views(engine):
         return airport_result and duration_result
     
     except Exception as e:
-        logger.error(f"Error creating summary views: {e}")
+        logger.error("Error creating summary views: %s", e)
         return False
\ No newline at end of file
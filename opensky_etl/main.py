@@ -19,12 +19,29 @@ except ImportError:
 
 from utils.logging_config import setup_logging
 from pipelines.flight_data_pipeline import FlightDataPipeline
+from pipelines.live_state_pipeline import LiveStatePipeline
+from work_queue import WorkQueue
 
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='OpenSky ETL Pipeline')
     parser.add_argument('--full', action='store_true', help='Force full load instead of incremental')
     parser.add_argument('--log-level', default='INFO', help='Logging level')
+    parser.add_argument('--live', action='store_true', help='Poll live state vectors instead of flights')
+    parser.add_argument('--iterations', type=int, help='Number of live polls (default: run until interrupted)')
+    parser.add_argument('--worker', action='store_true', help='Share extraction with other workers through the work queue')
+    parser.add_argument('--queue', default='flights', help='Work queue name')
+    parser.add_argument('--backfill-from', type=int, help='Enqueue a backfill from this Unix timestamp')
+    parser.add_argument('--backfill-to', type=int, help='Enqueue a backfill until this Unix timestamp')
+    parser.add_argument('--archive', action='store_true', help='Move flights older than ARCHIVE_AFTER_DAYS to the archive')
+    parser.add_argument('--reprocess', metavar='JOB', help='Recompute derived columns of stored flights; rerun a job to resume it')
+    parser.add_argument('--reprocess-from', type=int, help='Reprocess flights first seen from this Unix timestamp')
+    parser.add_argument('--reprocess-to', type=int, help='Reprocess flights first seen before this Unix timestamp')
+    parser.add_argument('--workers', type=int, help='Reprocessing worker threads (default: REPROCESS_WORKERS)')
+    parser.add_argument('--assets', action='store_true', help='Build SQL assets whose inputs changed (all of them with --full)')
+    parser.add_argument('--indexes', action='store_true', help='Build missing composite and covering indexes and report their use')
+    parser.add_argument('--migrate-legacy', action='store_true', help='Move the code columns of a pre-dimension flight_data table to the dimension tables and drop them')
+    parser.add_argument('--index-report', action='store_true', help='Report which indexes the project queries use')
     return parser.parse_args()
 
 def main():
@@ -41,8 +58,32 @@ def main():
     logger.info(f"Current time: {current_time}")
     
     # Initialize and run pipeline
-    pipeline = FlightDataPipeline()
-    success = pipeline.run(force_full_load=args.full)
+    if args.live:
+        pipeline = LiveStatePipeline()
+        success = pipeline.run(iterations=args.iterations)
+    elif args.archive:
+        pipeline = FlightDataPipeline()
+        success = pipeline.run_archive()
+    elif args.migrate_legacy:
+        pipeline = FlightDataPipeline()
+        success = pipeline.run_migration()
+    elif args.assets:
+        pipeline = FlightDataPipeline()
+        success = pipeline.run_assets(force=args.full)
+    elif args.indexes or args.index_report:
+        pipeline = FlightDataPipeline()
+        success = pipeline.run_indexes(build=args.indexes)
+    elif args.reprocess:
+        pipeline = FlightDataPipeline()
+        success = pipeline.run_reprocess(args.reprocess, args.reprocess_from, args.reprocess_to, args.workers)
+    elif args.worker:
+        pipeline = FlightDataPipeline()
+        queue = WorkQueue(pipeline.engine, queue=args.queue)
+        pipeline.enqueue_work(queue, args.backfill_from, args.backfill_to)
+        success = pipeline.run_worker(queue)
+    else:
+        pipeline = FlightDataPipeline()
+        success = pipeline.run(force_full_load=args.full)
     
     # Print pipeline statistics
     stats = pipeline.get_stats()
@@ -0,0 +1,149 @@
+"""
+Memory budget for batches waiting to be transformed and loaded.
+
+The pipeline splits an extract into batches and hands them to a
+MemoryGovernor, which keeps track of the approximate size of the batches
+held in memory. Once MEMORY_BUDGET_MB would be exceeded, further batches
+are spilled to Parquet files in a temporary directory and read back one at
+a time when they are loaded, so a large extract degrades into disk I/O
+instead of growing the process until it is killed.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from collections import deque
+import pandas as pd
+
+from config.settings import MEMORY_BUDGET_MB, SPILL_DIR
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("memory")
+
+# Values sampled per object column to estimate its size
+SIZE_SAMPLE = 1000
+
+def estimate_frame_bytes(df):
+    """
+    Estimate the memory used by a DataFrame.
+
+    Fixed-width and Arrow-backed columns are measured exactly; the size of
+    Python objects in object columns is extrapolated from a sample, which
+    is much cheaper than memory_usage(deep=True) on large frames.
+
+    Args:
+        df (pd.DataFrame): Frame to measure
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    total = int(df.memory_usage(index=True, deep=False).sum())
+    if df.empty:
+        return total
+    step = max(len(df) // SIZE_SAMPLE, 1)
+    for name in df.columns[df.dtypes == object]:
+        sample = df[name].iloc[::step]
+        total += int(sum(sys.getsizeof(value) for value in sample) / len(sample) * len(df))
+    return total
+
+class MemoryGovernor:
+    """
+    FIFO of batches that stays within a memory budget by spilling to disk.
+
+    Usage:
+        with MemoryGovernor() as governor:
+            governor.add_frame(df, LOAD_BATCH_ROWS)
+            del df
+            for batch in governor.drain():
+                load(batch)
+    """
+
+    def __init__(self, budget_bytes=MEMORY_BUDGET_MB * 1024 * 1024, directory=SPILL_DIR):
+        """
+        Initialize the governor.
+
+        Args:
+            budget_bytes (int): Memory allowed for batches held in memory
+            directory (str): Parent of the spill directory. Defaults to the
+                             system temporary directory.
+        """
+        self.budget_bytes = budget_bytes
+        self.directory = directory or None
+        self.spill_directory = None
+        self.pending = deque()
+        self.held_bytes = 0
+        self.stats = {
+            "budget_bytes": budget_bytes, "batches": 0, "peak_bytes": 0,
+            "spilled_batches": 0, "spilled_rows": 0, "spilled_bytes": 0
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, df):
+        """
+        Queue a batch, spilling it to disk if it doesn't fit in the budget.
+
+        Args:
+            df (pd.DataFrame): Batch; it must not share memory with a larger
+                               frame, e.g. take a copy of a slice
+        """
+        size = estimate_frame_bytes(df)
+        self.stats["batches"] += 1
+        if self.held_bytes + size <= self.budget_bytes:
+            self.pending.append((df, size))
+            self.held_bytes += size
+            self.stats["peak_bytes"] = max(self.stats["peak_bytes"], self.held_bytes)
+            return
+
+        if self.spill_directory is None:
+            self.spill_directory = tempfile.mkdtemp(prefix="opensky-spill-", dir=self.directory)
+        path = os.path.join(self.spill_directory, f"batch-{self.stats['batches']:06d}.parquet")
+        df.to_parquet(path, index=False)
+        self.pending.append((path, 0))
+        self.stats["spilled_batches"] += 1
+        self.stats["spilled_rows"] += len(df)
+        self.stats["spilled_bytes"] += os.path.getsize(path)
+        logger.info("Memory budget of %d bytes reached, spilled %d rows to %s", self.budget_bytes, len(df), path)
+
+    def add_frame(self, df, batch_rows):
+        """
+        Queue a frame as batches of at most batch_rows rows.
+
+        The batches are copies, so the caller can drop the frame afterwards.
+
+        Args:
+            df (pd.DataFrame): Frame to split
+            batch_rows (int): Rows per batch
+        """
+        for start in range(0, len(df), batch_rows):
+            self.add(df.iloc[start:start + batch_rows].copy())
+
+    def drain(self):
+        """
+        Yield the queued batches in order, reading spilled ones back.
+
+        Yields:
+            pd.DataFrame: Next batch
+        """
+        while self.pending:
+            batch, size = self.pending.popleft()
+            if isinstance(batch, str):
+                df = pd.read_parquet(batch)
+                os.remove(batch)
+            else:
+                df = batch
+                self.held_bytes -= size
+            yield df
+
+    def close(self):
+        """Drop the queued batches and remove the spill files."""
+        self.pending.clear()
+        self.held_bytes = 0
+        if self.spill_directory is not None:
+            shutil.rmtree(self.spill_directory, ignore_errors=True)
+            self.spill_directory = None
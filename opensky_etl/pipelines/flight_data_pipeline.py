@@ -3,18 +3,28 @@ Flight data ETL pipeline.
 """
 import os
 import time
+import uuid
 from datetime import datetime, timezone
 
 from config.settings import (
-    INCREMENTAL_COLUMN, INCREMENTAL_TABLE
+    INCREMENTAL_COLUMN, INCREMENTAL_TABLE, RECONCILE_LOOKBACK,
+    EXTRACTION_WINDOW, TARGET_AIRPORTS, LOAD_BATCH_ROWS, SQL_ASSETS_AFTER_LOAD
 )
 from connections.postgresql import (
-    get_db_connection, get_last_incremental_value
+    get_db_connection, get_last_incremental_value, create_schema,
+    legacy_flight_columns, migrate_legacy_flight_data
 )
-from extract import extract_flight_data, extract_incremental_data
+from extract import extract_flight_data, extract_incremental_data, choose_extraction_strategy
+from validate import validate_flight_data
 from transform import transform_flight_data
 from load import load_data_to_db, create_summary_views
-from utils.logging_config import setup_logging, get_logger
+from archive import archive_flights
+from reprocess import reprocess_flights
+from sql_assets import run_sql_assets
+from indexes import build_indexes, log_index_report
+from memory import MemoryGovernor
+from batching import BatchSizeTuner
+from utils.logging_config import setup_logging, get_logger, bind_log_context, reset_log_context
 
 class FlightDataPipeline:
     """Flight data ETL pipeline."""
@@ -33,6 +43,16 @@ class FlightDataPipeline:
         self.records_processed = 0
         self.is_incremental = False
         self.last_value = 0
+        self.extract_stats = {}
+        self.validation_stats = {}
+        self.load_stats = {}
+        self.worker_stats = {}
+        self.archive_stats = {}
+        self.reprocess_stats = {}
+        self.asset_stats = {}
+        self.index_stats = {}
+        self.memory_stats = {}
+        self.batch_timeline = []
     
     def run(self, force_full_load=False):
         """
@@ -45,6 +65,7 @@ class FlightDataPipeline:
             bool: Success status
         """
         self.start_time = time.time()
+        context = bind_log_context(run=uuid.uuid4().hex[:12], stage="extract")
         self.logger.info("Starting flight data ETL pipeline")
         
         try:
@@ -58,12 +79,12 @@ class FlightDataPipeline:
                 )
                 
                 if self.last_value:
-                    self.logger.info(f"Running incremental load from timestamp {self.last_value}")
+                    self.logger.info("Running incremental load from timestamp %s", self.last_value)
                     last_date = datetime.fromtimestamp(self.last_value, timezone.utc)
-                    self.logger.info(f"Last processed date: {last_date}")
+                    self.logger.info("Last processed date: %s", last_date)
                     
-                    # Extract new data
-                    df = extract_incremental_data(self.last_value)
+                    # Extract new data, revisiting the lookback window for revised flights
+                    df = extract_incremental_data(max(self.last_value - RECONCILE_LOOKBACK, 0))
                 else:
                     self.logger.info("No previous data found, running full load")
                     self.is_incremental = False
@@ -72,38 +93,338 @@ class FlightDataPipeline:
                 self.logger.info("Running full load")
                 df = extract_flight_data()
             
+            self.extract_stats = df.attrs.get("extract_stats", {})
+            
             if df.empty:
                 self.logger.warning("No data extracted, ending pipeline")
                 return False
             
-            # Transform data
-            self.logger.info("Transforming data")
-            df_transformed = transform_flight_data(
-                df, self.engine, self.is_incremental, self.last_value
-            )
+            # Validate data, quarantining bad records
+            bind_log_context(stage="validate")
+            df = validate_flight_data(df, self.engine, stats=self.validation_stats)
             
-            # Load data
-            self.logger.info("Loading data to database")
-            self.records_processed = load_data_to_db(
-                df_transformed, self.engine, self.session, self.is_incremental
-            )
+            if df.empty:
+                self.logger.warning("No valid records, ending pipeline")
+                return False
+            
+            # Transform and load in batches, oldest first; batches beyond the
+            # memory budget wait on disk
+            with MemoryGovernor() as governor:
+                df = df.sort_values('lastSeen', kind='stable')
+                governor.add_frame(df, LOAD_BATCH_ROWS)
+                del df
+                self.records_processed = self.load_batches(governor)
+                self.memory_stats = governor.stats
             
             # Create summary views if we processed any records
             if self.records_processed > 0:
                 self.logger.info("Creating summary views")
                 create_summary_views(self.engine)
+                if SQL_ASSETS_AFTER_LOAD:
+                    bind_log_context(stage="assets")
+                    run_sql_assets(self.engine, stats=self.asset_stats)
             
             self.end_time = time.time()
             duration = self.end_time - self.start_time
-            self.logger.info(f"Pipeline completed in {duration:.2f} seconds")
-            self.logger.info(f"Processed {self.records_processed} records")
+            self.logger.info("Pipeline completed in %.2f seconds", duration)
+            self.logger.info("Processed %d records", self.records_processed)
             
             return True
         
         except Exception as e:
-            self.logger.error(f"Pipeline failed: {e}")
+            self.logger.error("Pipeline failed: %s", e)
+            return False
+        finally:
+            reset_log_context(context)
+            self.session.close()
+    
+    def load_batches(self, governor):
+        """
+        Transform and load the batches of a memory governor, in transactions
+        sized by a BatchSizeTuner.
+        
+        Batches are queued in lastSeen order, so when a transaction fails the
+        remaining rows are skipped and every loaded flight is older than
+        them: the next incremental run extracts them again.
+        
+        Args:
+            governor (MemoryGovernor): Queued batches
+            
+        Returns:
+            int: Number of records loaded
+        """
+        loaded = 0
+        tuner = BatchSizeTuner(self.engine)
+        try:
+            for number, batch in enumerate(governor.drain(), 1):
+                bind_log_context(stage="transform")
+                self.logger.info("Transforming batch %d of %d", number, governor.stats['batches'])
+                batch = transform_flight_data(batch, self.engine, self.is_incremental, self.last_value)
+                
+                bind_log_context(stage="load")
+                self.logger.info("Loading batch %d of %d to database in transactions of %d rows",
+                                 number, governor.stats['batches'], tuner.size)
+                start = 0
+                while start < len(batch):
+                    chunk = batch.iloc[start:start + tuner.size].copy()
+                    chunk_stats, timings = {}, {}
+                    chunk_start = time.perf_counter()
+                    loaded += load_data_to_db(
+                        chunk, self.engine, self.session, self.is_incremental,
+                        reconcile=self.is_incremental, stats=chunk_stats, timings=timings
+                    )
+                    if not chunk_stats:
+                        self.logger.error("Rows %d-%d of batch %d were not loaded, skipping the remaining rows",
+                                          start, start + len(chunk), number)
+                        return loaded
+                    tuner.record(len(chunk), time.perf_counter() - chunk_start, timings['commit_seconds'])
+                    for key, value in chunk_stats.items():
+                        self.load_stats[key] = self.load_stats.get(key, 0) + value
+                    start += len(chunk)
+        finally:
+            tuner.save()
+            self.batch_timeline = tuner.timeline
+        return loaded
+    
+    def enqueue_work(self, queue, start_time=None, end_time=None):
+        """
+        Enqueue the work units of a backfill range or, by default, of the
+        next incremental run. Workers enqueueing the same range concurrently
+        get the same units, which are only queued once.
+        
+        Args:
+            queue (WorkQueue): Queue to fill
+            start_time (int, optional): Backfill start timestamp
+            end_time (int, optional): Backfill end timestamp
+            
+        Returns:
+            int: Number of units in the range
+        """
+        backfill = start_time is not None
+        if not backfill:
+            last_value = get_last_incremental_value(self.engine, INCREMENTAL_TABLE, INCREMENTAL_COLUMN)
+            end_time = int(time.time())
+            start_time = max(last_value - RECONCILE_LOOKBACK, 0) if last_value else end_time - EXTRACTION_WINDOW
+        elif end_time is None:
+            end_time = int(time.time())
+        
+        strategy = choose_extraction_strategy(start_time, end_time, TARGET_AIRPORTS)
+        airports = TARGET_AIRPORTS if strategy == "targeted" else None
+        # Incremental runs leave the current, incomplete window for the next run
+        return queue.enqueue(start_time, end_time, airports=airports, complete_only=not backfill)
+    
+    def run_worker(self, queue, max_units=None):
+        """
+        Process work units leased from a shared queue until it is empty.
+        
+        Each unit is extracted, validated, transformed and loaded with
+        reconciliation, so a unit redone after a lost lease never inserts
+        duplicates. A unit whose extraction skipped failed API windows or
+        whose load failed is released for another attempt rather than
+        completed.
+        
+        Args:
+            queue (WorkQueue): Queue to lease units from
+            max_units (int, optional): Stop after this many units
+            
+        Returns:
+            bool: Success status (False if any unit failed)
+        """
+        self.start_time = time.time()
+        self.is_incremental = True
+        context = bind_log_context(run=uuid.uuid4().hex[:12], stage="worker")
+        self.logger.info("Starting worker %s on queue %s", queue.worker_id, queue.queue)
+        self.worker_stats = {"units_done": 0, "units_failed": 0, "leases_lost": 0}
+        
+        try:
+            while max_units is None or self.worker_stats["units_done"] + self.worker_stats["units_failed"] < max_units:
+                units = queue.lease()
+                if not units:
+                    break
+                unit = units[0]
+                bind_log_context(window=unit['unit_key'])
+                self.logger.info("Processing unit %s (attempt %s)", unit['unit_key'], unit['attempts'])
+                
+                try:
+                    with queue.keep_alive(unit) as lease_lost:
+                        airports = [unit['airport']] if unit['airport'] else None
+                        df = extract_flight_data(
+                            start_time=unit['start_time'], end_time=unit['end_time'],
+                            airports=airports, mode="targeted" if airports else None
+                        )
+                        failed_windows = df.attrs.get("extract_stats", {}).get("failed_windows", 0)
+                        if failed_windows:
+                            raise RuntimeError(f"{failed_windows} API windows failed")
+                        df = validate_flight_data(df, self.engine, stats=self.validation_stats)
+                        if not df.empty:
+                            df = transform_flight_data(df, self.engine, True, unit['start_time'])
+                            self.records_processed += load_data_to_db(
+                                df, self.engine, self.session, True,
+                                reconcile=True, stats=self.load_stats, raise_errors=True
+                            )
+                    
+                    if lease_lost.is_set() or not queue.complete(unit):
+                        self.worker_stats["leases_lost"] += 1
+                    self.worker_stats["units_done"] += 1
+                
+                except Exception as e:
+                    self.logger.error("Unit %s failed: %s", unit['unit_key'], e)
+                    queue.release(unit, error=e)
+                    self.worker_stats["units_failed"] += 1
+            
+            if self.records_processed > 0:
+                create_summary_views(self.engine)
+                if SQL_ASSETS_AFTER_LOAD:
+                    run_sql_assets(self.engine, stats=self.asset_stats)
+            
+            self.end_time = time.time()
+            self.logger.info("Worker finished in %.2f seconds: %s", self.end_time - self.start_time, self.worker_stats)
+            return self.worker_stats["units_failed"] == 0
+        
+        except Exception as e:
+            self.logger.error("Worker failed: %s", e)
+            return False
+        finally:
+            reset_log_context(context)
+            self.session.close()
+    
+    def run_archive(self):
+        """
+        Move flights older than the retention period to the archive.
+        
+        Returns:
+            bool: Success status
+        """
+        self.start_time = time.time()
+        self.logger.info("Archiving cold flight history")
+        
+        try:
+            archive_flights(self.engine, stats=self.archive_stats)
+            self.end_time = time.time()
+            self.logger.info("Archival finished in %.2f seconds", self.end_time - self.start_time)
+            return True
+        
+        except Exception as e:
+            self.logger.error("Archival failed: %s", e)
+            return False
+        finally:
+            self.session.close()
+    
+    def run_migration(self):
+        """
+        Move the code columns of a pre-dimension flight_data table to the
+        dimension tables and upgrade the schema (see
+        connections.postgresql.migrate_legacy_flight_data).
+        
+        Returns:
+            bool: Success status
+        """
+        self.start_time = time.time()
+        
+        try:
+            if not legacy_flight_columns(self.engine):
+                self.logger.info("flight_data has no legacy code columns, nothing to migrate")
+                return True
+            
+            if not migrate_legacy_flight_data(self.engine):
+                return False
+            create_schema(self.engine)
+            self.end_time = time.time()
+            self.logger.info("Migration finished in %.2f seconds", self.end_time - self.start_time)
+            return True
+        
+        except Exception as e:
+            self.logger.error("Migration failed: %s", e)
+            return False
+        finally:
+            self.session.close()
+    
+    def run_reprocess(self, job, start_time=None, end_time=None, workers=None):
+        """
+        Recompute the derived columns of stored flights (see reprocess.py).
+        
+        Args:
+            job (str): Job name; running a job again resumes it
+            start_time (int, optional): Start of the firstSeen range
+            end_time (int, optional): End of the firstSeen range
+            workers (int, optional): Worker threads
+            
+        Returns:
+            bool: Success status
+        """
+        self.start_time = time.time()
+        context = bind_log_context(run=uuid.uuid4().hex[:12], stage="reprocess")
+        self.logger.info("Reprocessing derived columns, job %s", job)
+        
+        try:
+            options = {"workers": workers} if workers else {}
+            success = reprocess_flights(
+                self.engine, job, start_time, end_time, stats=self.reprocess_stats, **options
+            )
+            self.records_processed = self.reprocess_stats.get("flights_updated", 0)
+            if self.records_processed > 0:
+                create_summary_views(self.engine)
+            self.end_time = time.time()
+            self.logger.info("Reprocessing finished in %.2f seconds", self.end_time - self.start_time)
+            return success
+        
+        except Exception as e:
+            self.logger.error("Reprocessing failed: %s", e)
+            return False
+        finally:
+            reset_log_context(context)
+            self.session.close()
+    
+    def run_assets(self, force=False):
+        """
+        Build the SQL assets whose inputs changed (see sql_assets.py).
+        
+        Args:
+            force (bool): Rebuild every asset
+            
+        Returns:
+            bool: Success status
+        """
+        self.start_time = time.time()
+        context = bind_log_context(run=uuid.uuid4().hex[:12], stage="assets")
+        
+        try:
+            success = run_sql_assets(self.engine, force=force, stats=self.asset_stats)
+            self.end_time = time.time()
+            return success
+        
+        except Exception as e:
+            self.logger.error("SQL assets failed: %s", e)
+            return False
+        finally:
+            reset_log_context(context)
+            self.session.close()
+    
+    def run_indexes(self, build=True):
+        """
+        Build the managed indexes (see indexes.py) and report which queries
+        use them.
+        
+        Args:
+            build (bool): Build missing indexes first, otherwise only report
+            
+        Returns:
+            bool: Success status
+        """
+        self.start_time = time.time()
+        context = bind_log_context(run=uuid.uuid4().hex[:12], stage="indexes")
+        
+        try:
+            success = build_indexes(self.engine, stats=self.index_stats) if build else True
+            self.index_stats["report"] = log_index_report(self.engine)["indexes"]
+            self.end_time = time.time()
+            return success
+        
+        except Exception as e:
+            self.logger.error("Index management failed: %s", e)
             return False
         finally:
+            reset_log_context(context)
             self.session.close()
     
     def get_stats(self):
@@ -119,5 +440,15 @@ class FlightDataPipeline:
             "duration_seconds": round(self.end_time - self.start_time, 2) if self.end_time and self.start_time else None,
             "records_processed": self.records_processed,
             "is_incremental": self.is_incremental,
-            "last_incremental_value": self.last_value
+            "last_incremental_value": self.last_value,
+            "extract": self.extract_stats,
+            "validation": self.validation_stats,
+            "load": self.load_stats,
+            "worker": self.worker_stats,
+            "archive": self.archive_stats,
+            "reprocess": self.reprocess_stats,
+            "assets": self.asset_stats,
+            "indexes": self.index_stats,
+            "memory": self.memory_stats,
+            "load_batches": self.batch_timeline
         }
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+Live state-vector ingestion pipeline.
+"""
+import time
+import uuid
+from datetime import datetime
+
+from config.settings import (
+    OPENSKY_API_URL, LIVE_POLL_INTERVAL, LIVE_FLUSH_INTERVAL, LIVE_SNAPSHOT_STEP
+)
+from connections.postgresql import get_db_connection
+from live import fetch_states, PositionRingBuffer, load_positions
+from utils.logging_config import get_logger, bind_log_context, reset_log_context
+
+class LiveStatePipeline:
+    """Polls live state vectors and flushes downsampled positions."""
+
+    def __init__(self, api_url=OPENSKY_API_URL, buffer=None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            api_url (str): OpenSky API base URL
+            buffer (PositionRingBuffer, optional): Buffer to fill
+        """
+        self.logger = get_logger("pipelines.live_state")
+        self.logger.info("Initializing live state pipeline")
+
+        # Get database connection
+        self.engine, self.session, self.metadata = get_db_connection()
+
+        self.api_url = api_url
+        self.buffer = buffer if buffer is not None else PositionRingBuffer()
+
+        # Track pipeline execution
+        self.start_time = None
+        self.end_time = None
+        self.polls = 0
+        self.positions_received = 0
+        self.positions_flushed = 0
+        self.last_flush = 0
+
+    def poll(self):
+        """
+        Fetch one batch of state vectors into the buffer.
+
+        Returns:
+            int: Number of positions written to the buffer
+        """
+        states = fetch_states(self.api_url)
+        written = self.buffer.append(states)
+        self.polls += 1
+        self.positions_received += written
+
+        if not states.empty:
+            self.buffer.evict(int(states['time_position'].max()))
+
+        self.logger.debug("Poll %d: %d positions, %d aircraft tracked", self.polls, written, len(self.buffer))
+        return written
+
+    def flush(self):
+        """
+        Write positions received since the last flush to the database.
+
+        Returns:
+            int: Number of positions inserted
+        """
+        snapshot = self.buffer.snapshot(self.last_flush, LIVE_SNAPSHOT_STEP)
+        if snapshot.empty:
+            return 0
+
+        inserted = load_positions(snapshot, self.engine)
+        if inserted:
+            self.last_flush = int(snapshot['time'].max())
+            self.positions_flushed += inserted
+        return inserted
+
+    def run(self, iterations=None, poll_interval=LIVE_POLL_INTERVAL):
+        """
+        Run the polling loop.
+
+        Args:
+            iterations (int, optional): Number of polls, runs forever if None
+            poll_interval (float): Seconds between polls
+
+        Returns:
+            bool: Success status
+        """
+        self.start_time = time.time()
+        context = bind_log_context(run=uuid.uuid4().hex[:12], stage="live")
+        self.logger.info("Starting live state ingestion")
+        last_flush_time = time.monotonic()
+
+        try:
+            while iterations is None or self.polls < iterations:
+                poll_start = time.monotonic()
+                self.poll()
+
+                if time.monotonic() - last_flush_time >= LIVE_FLUSH_INTERVAL:
+                    self.flush()
+                    last_flush_time = time.monotonic()
+
+                if iterations is None or self.polls < iterations:
+                    time.sleep(max(poll_interval - (time.monotonic() - poll_start), 0))
+
+            return True
+
+        except KeyboardInterrupt:
+            self.logger.info("Live state ingestion interrupted")
+            return True
+        except Exception as e:
+            self.logger.error("Live state ingestion failed: %s", e)
+            return False
+        finally:
+            self.flush()
+            self.end_time = time.time()
+            reset_log_context(context)
+            self.session.close()
+
+    def get_stats(self):
+        """
+        Get pipeline execution statistics.
+
+        Returns:
+            dict: Pipeline statistics
+        """
+        return {
+            "start_time": datetime.fromtimestamp(self.start_time) if self.start_time else None,
+            "end_time": datetime.fromtimestamp(self.end_time) if self.end_time else None,
+            "polls": self.polls,
+            "positions_received": self.positions_received,
+            "positions_flushed": self.positions_flushed,
+            "aircraft_tracked": len(self.buffer),
+            "aircraft_dropped": self.buffer.dropped,
+            "buffer_bytes": self.buffer.nbytes()
+        }
@@ -0,0 +1,242 @@
+"""
+Query result cache for the OpenSky ETL pipeline.
+
+Results of read queries are cached under a key made of the database URL,
+the whitespace-normalized query, its parameters and the current load
+watermark (see connections.postgresql.get_load_watermark). Flights only
+change when a load bumps the watermark, so a cached result is valid until
+then and never needs explicit invalidation; entries of older watermarks
+are simply never hit again and age out of the LRU.
+
+Entries live in memory and, when a directory is given, as pickled
+DataFrames on disk so that separate read.py runs share them.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+import pandas as pd
+
+from config.settings import READ_CACHE_DIR, READ_CACHE_MAX_ENTRIES
+from connections.postgresql import get_load_watermark
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("query_cache")
+
+STATS_FILE = "stats.json"
+
+def normalize_query(query):
+    """Collapse whitespace so formatting differences share an entry."""
+    return re.sub(r"\s+", " ", str(query)).strip()
+
+class QueryCache:
+    """LRU cache of query results keyed by the load watermark."""
+
+    def __init__(self, directory=READ_CACHE_DIR, max_entries=READ_CACHE_MAX_ENTRIES):
+        """
+        Initialize the cache.
+
+        Args:
+            directory (str, optional): Directory for on-disk entries,
+                                       in memory only if empty
+            max_entries (int): Entries kept in memory and on disk
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def key(self, engine, name, params, watermark):
+        """
+        Build the cache key of a query.
+
+        Args:
+            engine: SQLAlchemy engine
+            name (str): Query text or name of the query function
+            params (dict): Query parameters
+            watermark (int): Current load watermark
+
+        Returns:
+            str: Hex digest
+        """
+        payload = json.dumps([
+            engine.url.render_as_string(hide_password=True),
+            normalize_query(name),
+            params or {},
+            watermark
+        ], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key):
+        """Path of an on-disk entry."""
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """
+        Look up an entry, counting the hit or miss.
+
+        Returns:
+            pd.DataFrame: Cached result (a copy), or None
+        """
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self._touch(key)
+            self.hits += 1
+            return self.entries[key].copy()
+
+        if self.directory:
+            path = self._path(key)
+            try:
+                df = pd.read_pickle(path)
+                self._touch(key)
+                self._remember(key, df)
+                self.hits += 1
+                return df.copy()
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning("Discarding unreadable cache entry %s: %s", path, e)
+
+        self.misses += 1
+        return None
+
+    def _touch(self, key):
+        """Mark an on-disk entry as recently used; mtime orders the on-disk LRU."""
+        if self.directory:
+            try:
+                # Explicit nanoseconds, file system clocks are too coarse to order quick accesses
+                now = time.time_ns()
+                os.utime(self._path(key), ns=(now, now))
+            except FileNotFoundError:
+                pass
+
+    def put(self, key, df):
+        """Store a result in memory and on disk."""
+        self._remember(key, df.copy())
+        if not self.directory:
+            return
+
+        try:
+            # Written under a temporary name so concurrent readers never see partial files
+            fd, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                df.to_pickle(f)
+            os.replace(temporary, self._path(key))
+            self._touch(key)
+            self._evict_files()
+        except Exception as e:
+            logger.warning("Error writing cache entry: %s", e)
+
+    def _remember(self, key, df):
+        """Add an entry to the in-memory LRU."""
+        self.entries[key] = df
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _evict_files(self):
+        """Delete the least recently used on-disk entries beyond max_entries."""
+        paths = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory) if name.endswith(".pkl")
+        ]
+        if len(paths) <= self.max_entries:
+            return
+        paths.sort(key=lambda path: os.stat(path).st_mtime_ns)
+        for path in paths[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def fetch(self, engine, name, params, loader):
+        """
+        Return a cached result or compute and cache it.
+
+        Args:
+            engine: SQLAlchemy engine
+            name (str): Query text or name of the query function
+            params (dict): Parameters, part of the key
+            loader (callable): Computes the result on a miss
+
+        Returns:
+            pd.DataFrame: Query result
+        """
+        watermark = get_load_watermark(engine)
+        if watermark is None:
+            # No watermark to validate entries against
+            return loader()
+
+        key = self.key(engine, name, params, watermark)
+        df = self.get(key)
+        if df is None:
+            df = loader()
+            self.put(key, df)
+        return df
+
+    def read_sql(self, engine, query, params=None):
+        """
+        Cached equivalent of pd.read_sql.
+
+        Args:
+            engine: SQLAlchemy engine
+            query (str): SQL query
+            params (dict, optional): Query parameters
+
+        Returns:
+            pd.DataFrame: Query result
+        """
+        return self.fetch(engine, query, params, lambda: pd.read_sql(query, engine, params=params))
+
+    def stats(self):
+        """
+        Hit and miss counts of this process.
+
+        Returns:
+            dict: hits, misses, hit_rate and entries in memory
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "entries": len(self.entries)
+        }
+
+    def record_stats(self):
+        """
+        Add this process's counts to the totals kept in the cache directory,
+        so hit rates can be reported across separate read.py runs. Call
+        once, when the process is done querying.
+
+        Returns:
+            dict: Cumulative hits, misses and hit_rate
+        """
+        totals = {"hits": 0, "misses": 0}
+        if not self.directory:
+            totals.update(hits=self.hits, misses=self.misses)
+        else:
+            path = os.path.join(self.directory, STATS_FILE)
+            try:
+                with open(path) as f:
+                    totals.update(json.load(f))
+            except (FileNotFoundError, ValueError):
+                pass
+            totals["hits"] += self.hits
+            totals["misses"] += self.misses
+            try:
+                with open(path, "w") as f:
+                    json.dump({"hits": totals["hits"], "misses": totals["misses"]}, f)
+            except OSError as e:
+                logger.warning("Error writing cache statistics: %s", e)
+
+        lookups = totals["hits"] + totals["misses"]
+        totals["hit_rate"] = round(totals["hits"] / lookups, 3) if lookups else None
+        return totals
@@ -1,6 +1,6 @@
 #!/usr/bin/env python
 """
-Script to query the most recent 200 records from the flight_data table.
+Script to query the most recent 200 records from the flights view.
 """
 import os
 import pandas as pd
@@ -9,6 +9,18 @@ from dotenv import load_dotenv
 from sqlalchemy import create_engine
 import argparse
 
+from analytics import SUMMARY_QUERIES, run_summary, summary_source
+from archive import combine_with_archive, read_archive, read_flights
+from connections.sqlite import create_sqlite_engine
+from intervals import query_airborne
+from query_cache import QueryCache
+
+# Columns shown and saved
+READ_COLUMNS = [
+    'id', 'icao24', 'callsign', 'estDepartureAirport', 'estArrivalAirport', 'firstSeen', 'lastSeen',
+    'flight_duration_minutes', 'total_distance_km', 'airport_pair'
+]
+
 def parse_args():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Query recent flight data')
@@ -16,6 +28,13 @@ def parse_args():
     parser.add_argument('--sqlite', action='store_true', help='Use SQLite instead of PostgreSQL')
     parser.add_argument('--sqlite-path', default='flight_data.db', help='Path to SQLite database')
     parser.add_argument('--output', default='recent_flights.csv', help='Output CSV file name')
+    parser.add_argument('--airborne-at', type=int, help='Only flights airborne at this Unix timestamp')
+    parser.add_argument('--airborne-from', type=int, help='Only flights airborne from this Unix timestamp')
+    parser.add_argument('--airborne-to', type=int, help='Only flights airborne until this Unix timestamp')
+    parser.add_argument('--seen-from', type=int, help='Only flights first seen from this Unix timestamp')
+    parser.add_argument('--seen-to', type=int, help='Only flights first seen before this Unix timestamp')
+    parser.add_argument('--summary', choices=sorted(SUMMARY_QUERIES), help='Run a summary query instead (see analytics.py); with ANALYTICS_ENGINE=duckdb it also counts archived flights')
+    parser.add_argument('--no-cache', action='store_true', help='Always query the database')
     return parser.parse_args()
 
 def main():
@@ -28,26 +47,7 @@ def main():
     if args.sqlite:
         # Connect to SQLite database
         print(f"Connecting to SQLite database at {args.sqlite_path}")
-        engine = create_engine(f"sqlite:///{args.sqlite_path}")
-        # Regular column names for SQLite
-        query = f"""
-        SELECT 
-            id,
-            icao24, 
-            callsign,
-            estDepartureAirport, 
-            estArrivalAirport, 
-            firstSeen, 
-            lastSeen,
-            flight_duration_minutes,
-            total_distance_km,
-            airport_pair
-        FROM 
-            flight_data
-        ORDER BY 
-            lastSeen DESC
-        LIMIT {args.limit}
-        """
+        engine = create_sqlite_engine(args.sqlite_path)
     else:
         # Get PostgreSQL connection details from environment variables
         DB_USER = os.getenv("DB_USER", "postgres")
@@ -60,30 +60,40 @@ def main():
         print(f"Connecting to PostgreSQL database at {DB_HOST}")
         connection_string = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
         engine = create_engine(connection_string)
-        
-        # PostgreSQL query with quoted column names for case sensitivity
-        query = f"""
-        SELECT 
-            id,
-            "icao24", 
-            "callsign",
-            "estDepartureAirport", 
-            "estArrivalAirport", 
-            "firstSeen", 
-            "lastSeen",
-            "flight_duration_minutes",
-            "total_distance_km",
-            "airport_pair"
-        FROM 
-            flight_data
-        ORDER BY 
-            "lastSeen" DESC
-        LIMIT {args.limit}
-        """
     
     try:
+        # Results are reused until the next load bumps the watermark
+        cache = None if args.no_cache else QueryCache()
+        
         # Execute query and load into DataFrame
-        df = pd.read_sql(query, engine)
+        if args.summary:
+            # DuckDB and database results differ once flights are archived
+            params = {'summary': args.summary, 'limit': args.limit, **summary_source(engine)}
+            load = lambda: run_summary(engine, args.summary, limit=args.limit, refresh=False)
+            df = cache.fetch(engine, 'run_summary', params, load) if cache else load()
+        elif args.airborne_at is not None or args.airborne_from is not None or args.airborne_to is not None:
+            if args.airborne_at is not None:
+                start = end = args.airborne_at
+            else:
+                start = args.airborne_from if args.airborne_from is not None else args.airborne_to
+                end = args.airborne_to if args.airborne_to is not None else args.airborne_from
+            params = {'start': start, 'end': end, 'limit': args.limit}
+            # Flights of archived days are read from the archive files
+            load = lambda: combine_with_archive(
+                query_airborne(engine, start, end, limit=args.limit),
+                read_archive(engine, start, end, airborne=True, order='firstSeen', limit=args.limit),
+                order='firstSeen', limit=args.limit
+            )
+            df = cache.fetch(engine, 'query_airborne', params, load) if cache else load()
+        else:
+            params = {'start': args.seen_from, 'end': args.seen_to, 'limit': args.limit}
+            load = lambda: read_flights(engine, args.seen_from, args.seen_to, limit=args.limit, columns=READ_COLUMNS)
+            df = cache.fetch(engine, 'read_flights', params, load) if cache else load()
+        
+        if cache:
+            totals = cache.record_stats()
+            print(f"Query cache: {'hit' if cache.hits else 'miss'}, "
+                  f"hit rate {totals['hit_rate']:.0%} over {totals['hits'] + totals['misses']} lookups")
         
         # Convert Unix timestamps to readable datetime
         if 'firstSeen' in df.columns:
@@ -92,10 +102,17 @@ def main():
             df['lastSeen_time'] = pd.to_datetime(df['lastSeen'], unit='s')
         
         # Display summary information
-        print(f"\nRetrieved {len(df)} records from flight_data table")
+        print(f"\nRetrieved {len(df)} records from flights view")
         print(f"\nColumns in the result: {', '.join(df.columns)}")
         
-        if not df.empty:
+        if not df.empty and args.summary:
+            print(f"\n{args.summary}:")
+            print(df.head(10).to_string(index=False))
+            
+            # Save to CSV
+            df.to_csv(args.output, index=False)
+            print(f"\nFull results saved to {args.output}")
+        elif not df.empty:
             print("\nRecord count by departure airport:")
             departure_column = 'estDepartureAirport'
             if departure_column in df.columns:
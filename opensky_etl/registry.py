@@ -0,0 +1,205 @@
+"""
+Aircraft registry lookups for the OpenSky ETL pipeline.
+
+The registry CSV (e.g. OpenSky's aircraftDatabase.csv) is converted once
+into a directory of .npy files: the icao24 addresses as sorted uint32 keys
+and every attribute dictionary-encoded as int32 codes into a fixed-width
+table of its distinct strings. The files are memory-mapped, so lookups read only
+the pages they touch and concurrent workers share the operating system's
+page cache instead of each loading the registry.
+"""
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+from config.settings import AIRCRAFT_REGISTRY_PATH
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("registry")
+
+# Registry CSV columns and the flight columns they enrich
+REGISTRY_FIELDS = {
+    'registration': 'registration',
+    'typecode': 'aircraft_type',
+    'model': 'aircraft_model',
+    'operator': 'operator'
+}
+
+# Hex digit values by byte, 255 for anything else
+HEX_VALUES = np.full(256, 255, dtype=np.uint8)
+HEX_VALUES[np.frombuffer(b"0123456789", dtype=np.uint8)] = np.arange(10)
+HEX_VALUES[np.frombuffer(b"abcdef", dtype=np.uint8)] = np.arange(10, 16)
+HEX_VALUES[np.frombuffer(b"ABCDEF", dtype=np.uint8)] = np.arange(10, 16)
+
+# Opened registries per registry CSV
+_registries = {}
+
+def icao24_keys(values):
+    """
+    Vectorized conversion of icao24 hex addresses to integers.
+
+    Args:
+        values (pd.Series): icao24 strings, nulls allowed
+
+    Returns:
+        tuple: (uint32 keys, boolean mask of valid addresses)
+    """
+    # Unicode code points, one row per address; a 7th character means too long
+    chars = values.fillna('').to_numpy(dtype=object).astype('U7').view(np.uint32).reshape(-1, 7)
+    nibbles = HEX_VALUES[np.where(chars[:, :6] < 256, chars[:, :6], 0)].astype(np.uint32)
+
+    valid = (chars[:, 6] == 0) & (nibbles != 255).all(axis=1)
+    shifts = np.arange(20, -1, -4, dtype=np.uint32)
+    keys = (nibbles << shifts).sum(axis=1, dtype=np.uint32)
+    return keys, valid
+
+def default_index_dir(csv_path):
+    """Index directory used for a registry CSV."""
+    return f"{csv_path}.index"
+
+class AircraftRegistry:
+    """Memory-mapped, read-only aircraft registry index."""
+
+    def __init__(self, index_dir):
+        """
+        Open an index built by AircraftRegistry.build.
+
+        Args:
+            index_dir (str): Index directory
+        """
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+
+        load = lambda name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode='r')
+        self.keys = load("icao24")
+        self.fields = {
+            column: (load(f"{column}.codes"), load(f"{column}.values"))
+            for column in self.meta["fields"]
+        }
+
+    def __len__(self):
+        """Number of aircraft in the registry."""
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, csv_path, index_dir=None):
+        """
+        Convert a registry CSV into a memory-mappable index.
+
+        The index is written to a temporary directory and renamed into
+        place, so readers never see a partial index.
+
+        Args:
+            csv_path (str): Registry CSV with an icao24 column
+            index_dir (str, optional): Output directory, next to the CSV by default
+
+        Returns:
+            AircraftRegistry: The opened index
+        """
+        index_dir = index_dir or default_index_dir(csv_path)
+        logger.info("Building aircraft registry index from %s", csv_path)
+
+        header = pd.read_csv(csv_path, nrows=0).columns
+        fields = [column for column in REGISTRY_FIELDS if column in header]
+        registry = pd.read_csv(csv_path, usecols=['icao24', *fields], dtype=str, keep_default_na=False)
+
+        keys, valid = icao24_keys(registry['icao24'])
+        registry = registry[valid].assign(key=keys[valid])
+        registry = registry.drop_duplicates(subset='key', keep='last').sort_values('key')
+
+        stat = os.stat(csv_path)
+        tmp_dir = f"{index_dir}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            np.save(os.path.join(tmp_dir, "icao24.npy"), registry['key'].to_numpy(dtype=np.uint32))
+            for column in fields:
+                values, codes = np.unique(registry[column].str.strip().to_numpy(dtype=object), return_inverse=True)
+                np.save(os.path.join(tmp_dir, f"{column}.codes.npy"), codes.astype(np.int32))
+                np.save(os.path.join(tmp_dir, f"{column}.values.npy"), values.astype(str))
+
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump({
+                    "source_size": stat.st_size,
+                    "source_mtime": stat.st_mtime,
+                    "aircraft": len(registry),
+                    "fields": fields
+                }, f)
+
+            if os.path.exists(index_dir):
+                shutil.rmtree(index_dir)
+            os.rename(tmp_dir, index_dir)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        logger.info("Indexed %d aircraft into %s", len(registry), index_dir)
+        return cls(index_dir)
+
+    @classmethod
+    def open(cls, csv_path, index_dir=None):
+        """
+        Open the index of a registry CSV, building it if missing or stale.
+
+        Args:
+            csv_path (str): Registry CSV
+            index_dir (str, optional): Index directory, next to the CSV by default
+
+        Returns:
+            AircraftRegistry: The opened index
+        """
+        index_dir = index_dir or default_index_dir(csv_path)
+        try:
+            registry = cls(index_dir)
+            stat = os.stat(csv_path)
+            if (registry.meta["source_size"], registry.meta["source_mtime"]) == (stat.st_size, stat.st_mtime):
+                return registry
+            logger.info("Aircraft registry %s changed, rebuilding index", csv_path)
+        except FileNotFoundError:
+            pass
+        return cls.build(csv_path, index_dir)
+
+    def lookup(self, icao24):
+        """
+        Look up registry attributes of aircraft.
+
+        Args:
+            icao24 (pd.Series): Aircraft addresses
+
+        Returns:
+            pd.DataFrame: One column per registry field (named as in
+                          REGISTRY_FIELDS), aligned with icao24, None where
+                          the aircraft or attribute is unknown
+        """
+        keys, valid = icao24_keys(icao24)
+        positions = np.searchsorted(self.keys, keys)
+        positions[positions >= len(self.keys)] = 0
+        found = valid & (self.keys[positions] == keys) if len(self.keys) else np.zeros(len(keys), dtype=bool)
+        matched = positions[found]
+
+        result = pd.DataFrame(index=icao24.index)
+        for column, (codes, values) in self.fields.items():
+            matched_values = values[codes[matched]].astype(object)
+            matched_values[matched_values == ''] = None
+            attribute = np.full(len(keys), None, dtype=object)
+            attribute[found] = matched_values
+            result[REGISTRY_FIELDS[column]] = pd.Series(attribute, index=icao24.index, dtype=object)
+        return result
+
+def get_registry(csv_path=AIRCRAFT_REGISTRY_PATH):
+    """
+    Get the process-wide registry for a CSV, opening or building it on first use.
+
+    Returns:
+        AircraftRegistry: The registry, None if no registry file is configured
+    """
+    if not csv_path or not os.path.exists(csv_path):
+        return None
+
+    registry = _registries.get(csv_path)
+    if registry is None:
+        registry = AircraftRegistry.open(csv_path)
+        _registries[csv_path] = registry
+    return registry
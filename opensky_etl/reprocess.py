@@ -0,0 +1,258 @@
+"""
+In-place reprocessing of derived flight columns.
+
+Derived columns are computed once, when a flight is loaded, so a change
+to a transform (the distance formula, the airport pair format) leaves the
+stored flights with stale values. reprocess_flights recomputes them with
+the same transform code, without extracting anything from the API.
+
+Route codes are recomputed first, in one pass over the routes table, and
+renamed in place. The firstSeen range is then enqueued in
+REPROCESS_CHUNK_SECONDS windows on a work queue named after the job, and
+a pool of worker threads leases the windows, reads their flights from the
+flights view, runs them through transform_flight_data and writes the
+flights whose derived columns changed back with one bulk UPDATE per
+window. Updated flights are published to the change feed and bump the
+load watermark in the same transaction.
+
+The queue is the checkpoint: done windows are skipped when the same job
+is run again, failed windows are retried, and a window whose worker died
+is leased again once its lease expires. Recomputing a window twice writes the same values, so a
+window that was written but not yet marked done is harmless. Archived
+flights are not reprocessed.
+
+Once every window is done, the route statistics are rebuilt from the
+recomputed durations and distances and every flight's duration_zscore is
+scored again against them (see route_stats.py).
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm import Session
+
+from config.settings import REPROCESS_CHUNK_SECONDS, REPROCESS_WORKERS
+from connections.postgresql import Airport, FlightData, Route, WorkUnit, bump_load_watermark
+from archive import flights_view
+from change_feed import append_changes
+from route_stats import rebuild_route_stats
+from transform import transform_flight_data, create_airport_pairs
+from work_queue import WorkQueue, default_worker_id
+from utils.logging_config import get_logger, bind_log_context
+
+# Initialize logger
+logger = get_logger("reprocess")
+
+# Derived columns stored in flight_data
+DERIVED_COLUMNS = ['flight_duration_minutes', 'total_distance_km']
+
+def rename_routes(engine):
+    """
+    Recompute the code of every route with create_airport_pairs and rename
+    the routes whose code changed.
+
+    Args:
+        engine: SQLAlchemy engine
+
+    Returns:
+        int: Number of renamed routes
+    """
+    routes = Route.__table__
+    departure = Airport.__table__.alias('departure')
+    arrival = Airport.__table__.alias('arrival')
+    query = (
+        select(
+            routes.c.id, routes.c.code,
+            departure.c.code.label('estDepartureAirport'), arrival.c.code.label('estArrivalAirport')
+        )
+        .join_from(routes, departure, departure.c.id == routes.c.departure_airport_id)
+        .join(arrival, arrival.c.id == routes.c.arrival_airport_id)
+    )
+    with engine.connect() as connection:
+        df = pd.read_sql(query, connection)
+    if df.empty:
+        return 0
+
+    df = create_airport_pairs(df)
+    renamed = df[df['airport_pair'].notna() & (df['airport_pair'] != df['code'])]
+    if renamed.empty:
+        return 0
+
+    with Session(engine) as session:
+        session.execute(
+            routes.update().where(routes.c.id == bindparam('route_id')).values(code=bindparam('new_code')),
+            [{'route_id': int(route_id), 'new_code': code} for route_id, code in zip(renamed['id'], renamed['airport_pair'])]
+        )
+        bump_load_watermark(session)
+        session.commit()
+
+    logger.info("Renamed %d of %d routes", len(renamed), len(df))
+    return len(renamed)
+
+def reprocess_window(engine, start_time, end_time):
+    """
+    Recompute the derived columns of the flights of a firstSeen window and
+    write back the ones that changed.
+
+    Args:
+        engine: SQLAlchemy engine
+        start_time (int): Window start timestamp
+        end_time (int): Window end timestamp (exclusive)
+
+    Returns:
+        tuple: (flights read, flights updated)
+    """
+    query = select(flights_view).where(flights_view.c.firstSeen >= start_time, flights_view.c.firstSeen < end_time)
+    with engine.connect() as connection:
+        df = pd.read_sql(query, connection)
+    if df.empty:
+        return 0, 0
+
+    stored = df[DERIVED_COLUMNS].to_numpy(dtype='float64', na_value=np.nan)
+    df = transform_flight_data(df, engine)
+    computed = df[DERIVED_COLUMNS].to_numpy(dtype='float64', na_value=np.nan)
+    same = (computed == stored) | (np.isnan(computed) & np.isnan(stored))
+    changed = df[~same.all(axis=1)]
+    if changed.empty:
+        return len(df), 0
+
+    table = FlightData.__table__
+    statement = (
+        table.update()
+        .where(table.c.id == bindparam('flight_id'))
+        .values(**{column: bindparam(f"new_{column}") for column in DERIVED_COLUMNS})
+    )
+    rows = [
+        {
+            'flight_id': int(flight_id),
+            **{f"new_{column}": None if np.isnan(value) else float(value) for column, value in zip(DERIVED_COLUMNS, values)}
+        }
+        for flight_id, values in zip(changed['id'], computed[~same.all(axis=1)])
+    ]
+    with Session(engine) as session:
+        session.execute(statement, rows)
+        append_changes(session, pd.DataFrame(), changed)
+        bump_load_watermark(session)
+        session.commit()
+    return len(df), len(changed)
+
+def reprocess_flights(engine, job, start_time=None, end_time=None, workers=REPROCESS_WORKERS,
+                      chunk_seconds=REPROCESS_CHUNK_SECONDS, stats=None):
+    """
+    Recompute the derived columns of stored flights.
+
+    Args:
+        engine: SQLAlchemy engine
+        job (str): Job name; running a job again resumes it
+        start_time (int, optional): Start of the firstSeen range, defaults
+                                    to the oldest stored flight
+        end_time (int, optional): End of the firstSeen range, defaults to
+                                  after the newest stored flight
+        workers (int): Worker threads
+        chunk_seconds (int): Window length in seconds
+        stats (dict, optional): Filled with window, flight and route counts,
+                                and the flights the route statistics were
+                                rebuilt from
+
+    Returns:
+        bool: Success status (False if a window failed all its attempts)
+    """
+    stats = stats if stats is not None else {}
+    started = time.perf_counter()
+    queue_name = f"reprocess:{job}"
+    if len(queue_name) > WorkUnit.queue.type.length:
+        logger.error("Job name %s is too long for a work queue name", job)
+        return False
+
+    if start_time is None or end_time is None:
+        with engine.connect() as connection:
+            oldest, newest = connection.execute(
+                select(func.min(FlightData.firstSeen), func.max(FlightData.firstSeen))
+            ).one()
+        if oldest is None:
+            logger.info("No flights to reprocess")
+            return True
+        start_time = oldest if start_time is None else start_time
+        end_time = newest + 1 if end_time is None else end_time
+
+    routes_renamed = rename_routes(engine)
+
+    queue = WorkQueue(engine, queue=queue_name)
+    windows = queue.enqueue(start_time, end_time, interval=chunk_seconds)
+    retried = queue.retry_failed()
+    resumed = queue.progress().get('done', 0)
+    if resumed or retried:
+        logger.info("Resuming job %s: %d of %d windows already done, retrying %d failed",
+                    job, resumed, windows, retried)
+
+    totals = {"windows_done": 0, "window_errors": 0, "flights_read": 0, "flights_updated": 0}
+    lock = threading.Lock()
+    worker_base = default_worker_id()
+
+    def work(index):
+        """Lease and reprocess windows until the queue is empty."""
+        worker_queue = WorkQueue(engine, queue=queue_name, worker_id=f"{worker_base}-{index}")
+        while True:
+            units = worker_queue.lease()
+            if not units:
+                return
+            unit = units[0]
+            bind_log_context(window=unit['unit_key'])
+            try:
+                with worker_queue.keep_alive(unit):
+                    read, updated = reprocess_window(engine, unit['start_time'], unit['end_time'])
+                worker_queue.complete(unit)
+                outcome = "windows_done"
+            except Exception as e:
+                # Retried by any worker until the unit runs out of attempts
+                logger.error("Reprocessing window %s failed: %s", unit['unit_key'], e)
+                worker_queue.release(unit, error=e)
+                read = updated = 0
+                outcome = "window_errors"
+
+            with lock:
+                totals[outcome] += 1
+                totals["flights_read"] += read
+                totals["flights_updated"] += updated
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    "Window %s: %d flights, %d updated (%d/%d windows, %.0f flights/s)",
+                    unit['unit_key'], read, updated, resumed + totals["windows_done"], windows,
+                    totals["flights_read"] / elapsed if elapsed > 0 else 0.0
+                )
+
+    # Worker threads log with the caller's run and stage
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        for future in [executor.submit(context.copy().run, work, index) for index in range(max(workers, 1))]:
+            future.result()
+
+    progress = queue.progress()
+    finished = not progress.get('failed', 0) and not progress.get('pending', 0) and not progress.get('leased', 0)
+    # Durations changed by this run, or by the earlier run of a resumed job
+    route_stats_flights = 0
+    if finished and (totals["flights_updated"] or (resumed and totals["windows_done"])):
+        with Session(engine) as session:
+            route_stats_flights = rebuild_route_stats(session, rescore=True)
+
+    seconds = time.perf_counter() - started
+    stats.update({
+        **totals,
+        "windows": windows,
+        "windows_resumed": resumed,
+        "windows_failed": progress.get('failed', 0),
+        "windows_remaining": progress.get('pending', 0) + progress.get('leased', 0),
+        "routes_renamed": routes_renamed,
+        "route_stats_flights": route_stats_flights,
+        "seconds": round(seconds, 2),
+        "flights_per_second": round(totals["flights_read"] / seconds, 1) if seconds > 0 else 0.0
+    })
+    if stats["windows_remaining"]:
+        logger.warning("%d windows of job %s are still leased or pending; run the job again to finish them",
+                       stats["windows_remaining"], job)
+    logger.info("Reprocessed %d flights in %.2f seconds, %d updated",
+                totals["flights_read"], seconds, totals["flights_updated"])
+    return stats["windows_failed"] == 0
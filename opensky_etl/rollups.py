@@ -0,0 +1,345 @@
+"""
+Multi-resolution traffic rollups for the OpenSky ETL pipeline.
+
+Departures and arrivals per airport and flights per route are counted in
+hourly, daily and monthly buckets (airport_traffic and route_traffic
+tables). Each loaded batch is counted per hour, the hourly counts are
+summed into days and the daily ones into months, and every tier is then
+incremented in place, so a load never rescans flight_data. A revised
+flight is subtracted from the buckets of its stored version and added to
+its new ones. Old buckets are purged per tier after ROLLUP_RETENTION_DAYS.
+"""
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import delete, select, text
+
+from config.settings import ROLLUP_RETENTION_DAYS
+from connections.postgresql import Airport, AirportTraffic, FlightData, Route, RouteTraffic
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("rollups")
+
+# Finest to coarsest
+ROLLUP_TIERS = ("hour", "day", "month")
+
+SECONDS_PER_DAY = 86400
+ROWS_PER_STATEMENT = 1000
+
+# flight_data columns a flight is counted by
+ROLLUP_KEY_COLUMNS = ['firstSeen', 'lastSeen', 'departure_airport_id', 'arrival_airport_id', 'route_id']
+
+def bucket_start(timestamps, tier):
+    """
+    Start of the bucket containing each timestamp.
+
+    Args:
+        timestamps (array-like): Unix timestamps in seconds
+        tier (str): "hour", "day" or "month"
+
+    Returns:
+        np.ndarray: int64 bucket start timestamps
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if tier == "hour":
+        return timestamps - timestamps % 3600
+    if tier == "day":
+        return timestamps - timestamps % SECONDS_PER_DAY
+    # Calendar months (UTC)
+    months = timestamps.astype('datetime64[s]').astype('datetime64[M]')
+    return months.astype('datetime64[s]').astype(np.int64)
+
+def batch_rollups(df, weight=1):
+    """
+    Count a batch of flights per tier.
+
+    Departures are counted in the bucket of firstSeen, arrivals in the
+    bucket of lastSeen and routes in the bucket of firstSeen.
+
+    Args:
+        df (pd.DataFrame): Flights with firstSeen, lastSeen and the
+                           departure_airport_id, arrival_airport_id and
+                           route_id dimension keys
+        weight (int): Count of each flight, -1 to subtract flights
+
+    Returns:
+        dict: tier -> (airport counts, route counts) DataFrames
+    """
+    departed = df[df['firstSeen'].notna()]
+    arrived = df[df['lastSeen'].notna()]
+    hourly_airports = pd.concat([
+        pd.DataFrame({
+            'bucket': bucket_start(departed['firstSeen'], "hour"),
+            'airport_id': departed['departure_airport_id'].to_numpy(),
+            'departures': weight,
+            'arrivals': 0
+        }),
+        pd.DataFrame({
+            'bucket': bucket_start(arrived['lastSeen'], "hour"),
+            'airport_id': arrived['arrival_airport_id'].to_numpy(),
+            'departures': 0,
+            'arrivals': weight
+        })
+    ]).dropna(subset=['airport_id'])
+    hourly_routes = pd.DataFrame({
+        'bucket': bucket_start(departed['firstSeen'], "hour"),
+        'route_id': departed['route_id'].to_numpy(),
+        'flights': weight
+    }).dropna(subset=['route_id'])
+
+    rollups = {}
+    airports, routes = hourly_airports, hourly_routes
+    for tier in ROLLUP_TIERS:
+        # Each tier is summed from the one below it
+        airports = airports.assign(bucket=bucket_start(airports['bucket'], tier)).groupby(
+            ['bucket', 'airport_id'], as_index=False)[['departures', 'arrivals']].sum()
+        routes = routes.assign(bucket=bucket_start(routes['bucket'], tier)).groupby(
+            ['bucket', 'route_id'], as_index=False)[['flights']].sum()
+        rollups[tier] = (airports, routes)
+    return rollups
+
+def upsert_counts(session, model, key_column, tier, counts, value_columns):
+    """
+    Add counts to stored buckets, creating the buckets that do not exist.
+
+    The increment happens in the INSERT ... ON CONFLICT statement itself,
+    so concurrent loaders never overwrite each other's counts.
+
+    Args:
+        session: SQLAlchemy session
+        model: AirportTraffic or RouteTraffic
+        key_column (str): Dimension key column
+        tier (str): Rollup tier
+        counts (pd.DataFrame): bucket, key_column and value_columns
+        value_columns (list): Count columns to add
+    """
+    if counts.empty:
+        return
+
+    table = model.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    statement = dialect_insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=['tier', key_column, 'bucket'],
+        set_={column: table.c[column] + statement.excluded[column] for column in value_columns}
+    )
+
+    columns = ['bucket', key_column, *value_columns]
+    values = zip(*(counts[column].astype('int64').tolist() for column in columns))
+    rows = [dict(zip(columns, row), tier=tier) for row in values]
+    for start in range(0, len(rows), ROWS_PER_STATEMENT):
+        session.execute(statement, rows[start:start + ROWS_PER_STATEMENT])
+
+def purge_rollups(session, now=None):
+    """
+    Delete buckets older than the retention of their tier.
+
+    The bucket containing the retention cutoff is kept.
+
+    Args:
+        session: SQLAlchemy session
+        now (int, optional): Current timestamp
+
+    Returns:
+        int: Number of deleted buckets
+    """
+    now = int(time.time()) if now is None else now
+    deleted = 0
+    for tier in ROLLUP_TIERS:
+        retention = ROLLUP_RETENTION_DAYS.get(tier, 0)
+        if not retention:
+            continue
+        cutoff = int(bucket_start([now - retention * SECONDS_PER_DAY], tier)[0])
+        for model in (AirportTraffic, RouteTraffic):
+            result = session.execute(delete(model).where(model.tier == tier, model.bucket < cutoff))
+            deleted += result.rowcount or 0
+    return deleted
+
+def stored_rollup_keys(session, flight_ids):
+    """
+    Read the columns counted by the rollups of stored flights.
+
+    Args:
+        session: SQLAlchemy session
+        flight_ids (iterable): flight_data ids
+
+    Returns:
+        pd.DataFrame: firstSeen, lastSeen and dimension keys of the flights
+    """
+    table = FlightData.__table__
+    columns = [table.c[column] for column in ROLLUP_KEY_COLUMNS]
+    ids = [int(flight_id) for flight_id in flight_ids]
+    rows = []
+    for start in range(0, len(ids), ROWS_PER_STATEMENT):
+        rows += session.execute(select(*columns).where(table.c.id.in_(ids[start:start + ROWS_PER_STATEMENT]))).fetchall()
+    return pd.DataFrame(rows, columns=ROLLUP_KEY_COLUMNS)
+
+def net_counts(frames, key_column, value_columns):
+    """Sum counts of the same bucket and key, dropping the ones that cancel out."""
+    counts = pd.concat(frames).groupby(['bucket', key_column], as_index=False)[value_columns].sum()
+    return counts[(counts[value_columns] != 0).any(axis=1)]
+
+def update_rollups(df, session, revised=None):
+    """
+    Add a batch of flights to the traffic rollups and purge expired buckets.
+
+    Revised flights move their counts: the stored version of each flight
+    is subtracted and the revised one added, so the rollups must be
+    updated before the revisions are written. Changes are added to the
+    session and committed by the caller together with the flights
+    themselves.
+
+    Args:
+        df (pd.DataFrame): Newly loaded flights with dimension keys
+        session: SQLAlchemy session
+        revised (pd.DataFrame, optional): Revised flights with their
+                                          flight_data id and dimension keys
+
+    Returns:
+        int: Number of buckets written
+    """
+    batches = [batch_rollups(df)] if not df.empty else []
+    if revised is not None and not revised.empty:
+        batches.append(batch_rollups(revised))
+        batches.append(batch_rollups(stored_rollup_keys(session, revised['id']), weight=-1))
+    if not batches:
+        return 0
+
+    written = 0
+    for tier in ROLLUP_TIERS:
+        airports = net_counts([batch[tier][0] for batch in batches], 'airport_id', ['departures', 'arrivals'])
+        routes = net_counts([batch[tier][1] for batch in batches], 'route_id', ['flights'])
+        upsert_counts(session, AirportTraffic, 'airport_id', tier, airports, ['departures', 'arrivals'])
+        upsert_counts(session, RouteTraffic, 'route_id', tier, routes, ['flights'])
+        written += len(airports) + len(routes)
+
+    deleted = purge_rollups(session)
+    logger.info("Updated %d traffic rollup buckets (%d expired buckets purged)", written, deleted)
+    return written
+
+def choose_tier(start_time, end_time, resolution=None, now=None):
+    """
+    Pick the coarsest tier able to answer [start_time, end_time).
+
+    A tier can answer when both bounds fall on its bucket boundaries and
+    start_time is within its retention. Other ranges are answered from the
+    finest tier still retaining start_time, including partially covered
+    buckets.
+
+    Args:
+        start_time (int): Start timestamp, inclusive
+        end_time (int): End timestamp, exclusive
+        resolution (str, optional): Coarsest tier allowed, for series
+                                    that need finer buckets
+        now (int, optional): Current timestamp
+
+    Returns:
+        str: Tier name
+    """
+    now = int(time.time()) if now is None else now
+    tiers = ROLLUP_TIERS[:ROLLUP_TIERS.index(resolution) + 1] if resolution else ROLLUP_TIERS
+
+    def retained(tier):
+        retention = ROLLUP_RETENTION_DAYS.get(tier, 0)
+        return not retention or start_time >= bucket_start([now - retention * SECONDS_PER_DAY], tier)[0]
+
+    for tier in reversed(tiers):
+        if list(bucket_start([start_time, end_time], tier)) == [start_time, end_time] and retained(tier):
+            return tier
+    return next((tier for tier in tiers if retained(tier)), tiers[-1])
+
+def query_rollup(session, model, dimension, key_column, label, values, start_time, end_time, code, resolution):
+    """Read buckets of one rollup table from the tier chosen for the range."""
+    tier = choose_tier(start_time, end_time, resolution)
+    # Unaligned ranges include the buckets they partially cover
+    first_bucket = int(bucket_start([start_time], tier)[0])
+
+    query = (
+        select(model.bucket, dimension.code.label(label), *values)
+        .join(dimension, dimension.id == getattr(model, key_column))
+        .where(model.tier == tier, model.bucket >= first_bucket, model.bucket < end_time)
+        .order_by(model.bucket, dimension.code)
+    )
+    if code is not None:
+        query = query.where(dimension.code == code)
+
+    rows = session.execute(query)
+    result = pd.DataFrame(rows.fetchall(), columns=list(rows.keys()))
+    result.attrs["tier"] = tier
+    return result
+
+def query_airport_traffic(session, start_time, end_time, airport=None, resolution=None):
+    """
+    Read departures and arrivals per airport from the coarsest tier able
+    to answer a range.
+
+    Args:
+        session: SQLAlchemy session
+        start_time (int): Start timestamp, inclusive
+        end_time (int): End timestamp, exclusive
+        airport (str, optional): ICAO airport code, all airports if None
+        resolution (str, optional): Coarsest tier allowed (see choose_tier)
+
+    Returns:
+        pd.DataFrame: bucket, airport, departures and arrivals;
+                      df.attrs["tier"] names the tier used
+    """
+    return query_rollup(
+        session, AirportTraffic, Airport, 'airport_id', 'airport',
+        [AirportTraffic.departures, AirportTraffic.arrivals],
+        start_time, end_time, airport, resolution
+    )
+
+def query_route_traffic(session, start_time, end_time, route=None, resolution=None):
+    """
+    Read flights per route from the coarsest tier able to answer a range.
+
+    Args:
+        session: SQLAlchemy session
+        start_time (int): Start timestamp, inclusive
+        end_time (int): End timestamp, exclusive
+        route (str, optional): Route code, e.g. "EDDF-LFPG", all routes if None
+        resolution (str, optional): Coarsest tier allowed (see choose_tier)
+
+    Returns:
+        pd.DataFrame: bucket, route and flights; df.attrs["tier"] names
+                      the tier used
+    """
+    return query_rollup(
+        session, RouteTraffic, Route, 'route_id', 'route', [RouteTraffic.flights],
+        start_time, end_time, route, resolution
+    )
+
+def rebuild_rollups(session, chunk_size=100000):
+    """
+    Recount all rollups from flight_data, e.g. after upgrading an existing
+    database. Buckets older than their retention are purged again.
+
+    Args:
+        session: SQLAlchemy session
+        chunk_size (int): Flights read per chunk
+
+    Returns:
+        int: Number of flights counted
+    """
+    session.execute(delete(AirportTraffic))
+    session.execute(delete(RouteTraffic))
+
+    counted = 0
+    query = text(
+        'SELECT "firstSeen", "lastSeen", departure_airport_id, arrival_airport_id, route_id '
+        'FROM flight_data WHERE "firstSeen" IS NOT NULL AND "lastSeen" IS NOT NULL'
+    )
+    # Read in the session's transaction, which already deleted the old counts
+    for chunk in pd.read_sql(query, session.connection(), chunksize=chunk_size):
+        update_rollups(chunk, session)
+        counted += len(chunk)
+
+    session.commit()
+    logger.info("Rebuilt traffic rollups from %s flights", counted)
+    return counted
@@ -0,0 +1,449 @@
+"""
+Running duration and distance statistics per route.
+
+Every load merges its new flights into the route_stats table, one row per
+route and metric: the count, mean and sum of squared deviations (M2) of
+the values, combined with the stored ones by the parallel form of
+Welford's update, their minimum and maximum, and a QuantileSketch of the
+values for percentiles. A batch is summarized with one groupby per
+metric, so a load touches one row per route it contains and never
+rescans flight_data; reading the statistics of a route is a single
+indexed lookup.
+
+A revised flight replaces its stored version: the stored values are taken
+out of the moments by the inverse update and the revised ones added, on
+the old and the new route when the route changed. The minimum, maximum
+and sketch cannot forget values, so they keep the stored version's and
+percentiles only grow on revision until rebuild_route_stats.
+
+Each new or revised flight is scored against its route's statistics,
+including the flights of its own batch: duration_zscore is the number of
+standard deviations between its duration and the route's mean, left empty
+until the route has ROUTE_STATS_MIN_FLIGHTS flights.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, delete, select, text
+
+from config.settings import ROUTE_OUTLIER_ZSCORE, ROUTE_STATS_MIN_FLIGHTS
+from connections.postgresql import FlightData, Route, RouteStats
+from sketches import QuantileSketch
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("route_stats")
+
+# Metric -> flight column it summarizes
+ROUTE_METRICS = {"duration": "flight_duration_minutes", "distance": "total_distance_km"}
+
+MOMENT_COLUMNS = ['flights', 'mean', 'm2', 'min_value', 'max_value']
+
+# Percentiles reported by get_route_stats
+QUANTILES = (0.5, 0.95)
+
+ROWS_PER_STATEMENT = 1000
+
+def batch_route_stats(df):
+    """
+    Summarize a batch of flights per route and metric.
+
+    Args:
+        df (pd.DataFrame): Flights with route_id and the ROUTE_METRICS columns
+
+    Returns:
+        tuple: Moments DataFrame indexed by (route_id, metric) with
+               MOMENT_COLUMNS, and dict (route_id, metric) -> QuantileSketch
+    """
+    moments = []
+    sketches = {}
+    for metric, column in ROUTE_METRICS.items():
+        if column not in df.columns:
+            continue
+        values = pd.DataFrame({
+            'route_id': pd.to_numeric(df['route_id'], errors='coerce'),
+            'value': pd.to_numeric(df[column], errors='coerce')
+        }).dropna()
+        if values.empty:
+            continue
+        values['route_id'] = values['route_id'].astype('int64')
+
+        grouped = values.groupby('route_id')['value']
+        batch = grouped.agg(flights='count', mean='mean', min_value='min', max_value='max')
+        # Deviations from each route's batch mean, so M2 does not suffer cancellation
+        deviations = values['value'] - grouped.transform('mean')
+        batch['m2'] = (deviations ** 2).groupby(values['route_id']).sum()
+        moments.append(batch.assign(metric=metric).set_index('metric', append=True)[MOMENT_COLUMNS])
+
+        # Bucket counts of all routes at once
+        sketches.update({(route_id, metric): QuantileSketch() for route_id in batch.index})
+        positive = values[values['value'] > 0]
+        keys = QuantileSketch().bucket_keys(positive['value'].to_numpy())
+        buckets = positive.assign(key=keys).groupby(['route_id', 'key']).size()
+        for route_id, counts in buckets.groupby(level='route_id'):
+            sketches[(route_id, metric)].add_counts(counts.index.get_level_values('key'), counts.to_numpy())
+        zeros = (values['value'] <= 0).groupby(values['route_id']).sum()
+        for route_id, count in zeros[zeros > 0].items():
+            sketches[(route_id, metric)].zeros += int(count)
+
+    if not moments:
+        return pd.DataFrame(columns=MOMENT_COLUMNS), sketches
+    return pd.concat(moments), sketches
+
+def merge_moments(stored, batch):
+    """
+    Combine the moments of two sets of values, route by route.
+
+    Args:
+        stored (pd.DataFrame): MOMENT_COLUMNS of the stored values (0
+                               flights for new routes)
+        batch (pd.DataFrame): MOMENT_COLUMNS of the batch, same index
+
+    Returns:
+        pd.DataFrame: MOMENT_COLUMNS of all values
+    """
+    stored_flights = stored['flights'].astype('float64')
+    batch_flights = batch['flights'].astype('float64')
+    flights = stored_flights + batch_flights
+    delta = batch['mean'] - stored['mean']
+    # Share of the batch, 0 when both sides are empty
+    share = (batch_flights / flights).fillna(0)
+    return pd.DataFrame({
+        'flights': flights.astype('int64'),
+        'mean': stored['mean'] + delta * share,
+        'm2': stored['m2'] + batch['m2'] + delta ** 2 * stored_flights * share,
+        'min_value': np.fmin(stored['min_value'], batch['min_value']),
+        'max_value': np.fmax(stored['max_value'], batch['max_value'])
+    }, index=batch.index)
+
+def remove_moments(stored, removed):
+    """
+    Take a subset of the values out of their moments, route by route; the
+    inverse of merge_moments. Minimum and maximum are left as stored.
+
+    Args:
+        stored (pd.DataFrame): MOMENT_COLUMNS of all values
+        removed (pd.DataFrame): MOMENT_COLUMNS of the values to take out,
+                                same index (0 flights where none)
+
+    Returns:
+        pd.DataFrame: MOMENT_COLUMNS of the remaining values
+    """
+    stored_flights = stored['flights'].astype('float64')
+    removed_flights = removed['flights'].astype('float64')
+    flights = stored_flights - removed_flights
+    mean = ((stored_flights * stored['mean'] - removed_flights * removed['mean']) / flights).where(flights > 0, 0.0)
+    delta = removed['mean'] - mean
+    m2 = stored['m2'] - removed['m2'] - delta ** 2 * flights * removed_flights / stored_flights.where(flights > 0)
+    return pd.DataFrame({
+        'flights': flights.astype('int64'),
+        'mean': mean,
+        # Rounding can leave a tiny negative sum of squares
+        'm2': m2.fillna(0.0).clip(lower=0.0),
+        'min_value': stored['min_value'],
+        'max_value': stored['max_value']
+    }, index=stored.index)
+
+def stored_route_values(session, flight_ids):
+    """
+    Read the route and metric columns of stored flights.
+
+    Args:
+        session: SQLAlchemy session
+        flight_ids (iterable): flight_data ids
+
+    Returns:
+        pd.DataFrame: route_id and the ROUTE_METRICS columns of the flights
+    """
+    table = FlightData.__table__
+    columns = ['route_id', *ROUTE_METRICS.values()]
+    ids = [int(flight_id) for flight_id in flight_ids]
+    rows = []
+    for start in range(0, len(ids), ROWS_PER_STATEMENT):
+        rows += session.execute(
+            select(*[table.c[column] for column in columns]).where(table.c.id.in_(ids[start:start + ROWS_PER_STATEMENT]))
+        ).fetchall()
+    return pd.DataFrame(rows, columns=columns)
+
+def duration_zscores(df, moments):
+    """
+    Score the duration of each flight against its route.
+
+    Args:
+        df (pd.DataFrame): Flights with route_id and flight_duration_minutes
+        moments (pd.DataFrame): MOMENT_COLUMNS indexed by (route_id, metric)
+
+    Returns:
+        pd.Series: Z-scores aligned with df, NaN for flights without a
+                   duration or whose route has too few flights
+    """
+    if 'duration' not in moments.index.get_level_values('metric'):
+        return pd.Series(np.nan, index=df.index)
+    duration = moments.xs('duration', level='metric')
+    stddev = np.sqrt(duration['m2'] / (duration['flights'] - 1).clip(lower=1))
+    stddev = stddev.where((duration['flights'] >= ROUTE_STATS_MIN_FLIGHTS) & (stddev > 0))
+
+    route_ids = pd.to_numeric(df['route_id'], errors='coerce')
+    values = pd.to_numeric(df['flight_duration_minutes'], errors='coerce')
+    return ((values - route_ids.map(duration['mean'])) / route_ids.map(stddev)).astype('float64')
+
+def upsert_route_stats(session, batch, sketches, removed=None):
+    """
+    Merge batch statistics into the stored rows.
+
+    Missing rows are first inserted empty, then all rows of the batch's
+    routes are read locked, in route order, so concurrent loaders merge
+    one after the other instead of overwriting each other.
+
+    Args:
+        session: SQLAlchemy session
+        batch (pd.DataFrame): Result of batch_route_stats
+        sketches (dict): Result of batch_route_stats
+        removed (pd.DataFrame, optional): Moments of batch_route_stats to
+                                          take out of the stored rows first
+
+    Returns:
+        pd.DataFrame: Merged MOMENT_COLUMNS indexed by (route_id, metric)
+    """
+    if removed is not None and not removed.empty:
+        # Routes that only lose flights are merged with an empty batch
+        batch = batch.reindex(removed.index if batch.empty else batch.index.union(removed.index))
+        batch[['flights', 'mean', 'm2']] = batch[['flights', 'mean', 'm2']].fillna(0)
+    table = RouteStats.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    statement = dialect_insert(table).on_conflict_do_nothing(index_elements=['route_id', 'metric'])
+    empty = [
+        {'route_id': int(route_id), 'metric': metric, 'flights': 0, 'mean': 0.0, 'm2': 0.0}
+        for route_id, metric in batch.index
+    ]
+    for start in range(0, len(empty), ROWS_PER_STATEMENT):
+        session.execute(statement, empty[start:start + ROWS_PER_STATEMENT])
+
+    route_ids = sorted({int(route_id) for route_id, _ in batch.index})
+    rows = []
+    for start in range(0, len(route_ids), ROWS_PER_STATEMENT):
+        rows += session.execute(
+            select(table)
+            .where(table.c.route_id.in_(route_ids[start:start + ROWS_PER_STATEMENT]))
+            .order_by(table.c.route_id, table.c.metric)
+            .with_for_update()
+        ).fetchall()
+    stored = pd.DataFrame([dict(row._mapping) for row in rows]).set_index(['route_id', 'metric']).reindex(batch.index)
+
+    moments = stored[MOMENT_COLUMNS].astype('float64')
+    if removed is not None and not removed.empty:
+        taken = removed.reindex(batch.index)
+        taken[['flights', 'mean', 'm2']] = taken[['flights', 'mean', 'm2']].fillna(0)
+        moments = remove_moments(moments, taken.astype('float64'))
+    merged = merge_moments(moments, batch.astype('float64'))
+    updates = []
+    for key, stats_id, payload, flights, mean, m2, min_value, max_value in zip(
+        merged.index, stored['id'], stored['sketch'], *(merged[column] for column in MOMENT_COLUMNS)
+    ):
+        sketch = QuantileSketch.from_bytes(payload) if payload is not None else QuantileSketch()
+        if key in sketches:
+            sketch = sketch.merge(sketches[key])
+        updates.append({
+            'stats_id': int(stats_id), 'new_flights': int(flights), 'new_mean': float(mean), 'new_m2': float(m2),
+            'new_min_value': None if pd.isna(min_value) else float(min_value),
+            'new_max_value': None if pd.isna(max_value) else float(max_value),
+            'new_sketch': sketch.to_bytes()
+        })
+
+    session.execute(
+        table.update().where(table.c.id == bindparam('stats_id')).values(
+            **{column: bindparam(f"new_{column}") for column in MOMENT_COLUMNS + ['sketch']}
+        ),
+        updates
+    )
+    return merged
+
+def update_route_stats(df, session, removed=None):
+    """
+    Add a batch of flights to the route statistics and score their durations.
+
+    Changes are added to the session and committed by the caller together
+    with the flights themselves.
+
+    Args:
+        df (pd.DataFrame): Newly loaded flights and revised versions of
+                           stored ones, with route_id and derived columns
+        session: SQLAlchemy session
+        removed (pd.DataFrame, optional): Stored versions of the revised
+                                          flights (see stored_route_values),
+                                          taken out of the statistics
+
+    Returns:
+        pd.Series: Duration z-scores aligned with df (see duration_zscores)
+    """
+    scores = pd.Series(np.nan, index=df.index)
+    if df.empty or 'route_id' not in df.columns:
+        return scores
+
+    batch, sketches = batch_route_stats(df)
+    removed = batch_route_stats(removed)[0] if removed is not None and not removed.empty else None
+    if batch.empty and removed is None:
+        return scores
+
+    merged = upsert_route_stats(session, batch, sketches, removed)
+    scores = duration_zscores(df, merged)
+    outliers = int((scores.abs() > ROUTE_OUTLIER_ZSCORE).sum())
+    logger.info("Updated statistics of %d routes, %d duration outliers",
+                merged.index.get_level_values('route_id').nunique(), outliers)
+    return scores
+
+def describe(row, quantiles=QUANTILES):
+    """
+    Summary of a stored route_stats row.
+
+    Args:
+        row (RouteStats): Stored row
+        quantiles (tuple): Quantiles to estimate
+
+    Returns:
+        dict: flights, mean, variance, stddev, min, max and pNN per quantile
+    """
+    variance = row.m2 / (row.flights - 1) if row.flights > 1 else 0.0
+    sketch = QuantileSketch.from_bytes(row.sketch) if row.sketch is not None else QuantileSketch()
+    return {
+        "flights": row.flights,
+        "mean": row.mean,
+        "variance": variance,
+        "stddev": float(np.sqrt(variance)),
+        "min": row.min_value,
+        "max": row.max_value,
+        **{f"p{round(q * 100):02d}": sketch.quantile(q) for q in quantiles}
+    }
+
+def get_route_stats(session, route, metric="duration", quantiles=QUANTILES):
+    """
+    Read the statistics of a route.
+
+    Args:
+        session: SQLAlchemy session
+        route (str): Route code, e.g. "EDDF-LFPG"
+        metric (str): "duration" (minutes) or "distance" (km)
+        quantiles (tuple): Quantiles to estimate
+
+    Returns:
+        dict: Result of describe, None if the route has no flights
+    """
+    row = session.execute(
+        select(RouteStats).join(Route, Route.id == RouteStats.route_id)
+        .where(Route.code == route, RouteStats.metric == metric)
+    ).scalar_one_or_none()
+    if row is None or not row.flights:
+        return None
+    return describe(row, quantiles)
+
+def typical_duration(session, route):
+    """
+    Median flight duration of a route.
+
+    Args:
+        session: SQLAlchemy session
+        route (str): Route code, e.g. "EDDF-LFPG"
+
+    Returns:
+        float: Minutes, None if the route has no flights
+    """
+    stats = get_route_stats(session, route, "duration", quantiles=(0.5,))
+    return stats["p50"] if stats else None
+
+def route_outliers(session, start_time, end_time, threshold=ROUTE_OUTLIER_ZSCORE):
+    """
+    Read the flights whose duration was flagged as unusual for their route.
+
+    Args:
+        session: SQLAlchemy session
+        start_time (int): Start of the firstSeen range, inclusive
+        end_time (int): End of the firstSeen range, exclusive
+        threshold (float): Minimum absolute z-score
+
+    Returns:
+        pd.DataFrame: Flights of the flights view with duration_zscore,
+                      most unusual first
+    """
+    rows = session.execute(text(
+        'SELECT f.*, d.duration_zscore FROM flights f JOIN flight_data d ON d.id = f.id '
+        'WHERE d."firstSeen" >= :start AND d."firstSeen" < :end AND ABS(d.duration_zscore) > :threshold '
+        'ORDER BY ABS(d.duration_zscore) DESC'
+    ), {"start": int(start_time), "end": int(end_time), "threshold": float(threshold)})
+    return pd.DataFrame(rows.fetchall(), columns=list(rows.keys()))
+
+def rescore_durations(session, chunk_size=100000):
+    """
+    Score the duration of every stored flight against the current route
+    statistics.
+
+    Args:
+        session: SQLAlchemy session
+        chunk_size (int): Flights read and updated per chunk
+
+    Returns:
+        int: Number of flights scored
+    """
+    rows = session.execute(select(RouteStats).where(RouteStats.metric == 'duration')).scalars().all()
+    moments = pd.DataFrame(
+        [{'route_id': row.route_id, 'metric': row.metric, **{column: getattr(row, column) for column in MOMENT_COLUMNS}}
+         for row in rows],
+        columns=['route_id', 'metric', *MOMENT_COLUMNS]
+    ).set_index(['route_id', 'metric']).astype('float64')
+
+    table = FlightData.__table__
+    statement = table.update().where(table.c.id == bindparam('flight_id')).values(duration_zscore=bindparam('new_zscore'))
+    scored = 0
+    last_id = 0
+    while True:
+        # Pages by id, so the flights updated so far are never read again
+        chunk = pd.DataFrame(session.execute(
+            select(table.c.id, table.c.route_id, table.c.flight_duration_minutes)
+            .where(table.c.id > last_id).order_by(table.c.id).limit(chunk_size)
+        ).fetchall(), columns=['id', 'route_id', 'flight_duration_minutes'])
+        if chunk.empty:
+            break
+        scores = duration_zscores(chunk, moments)
+        session.execute(statement, [
+            {'flight_id': int(flight_id), 'new_zscore': None if np.isnan(score) else float(score)}
+            for flight_id, score in zip(chunk['id'], scores)
+        ])
+        scored += len(chunk)
+        last_id = int(chunk['id'].iloc[-1])
+    return scored
+
+def rebuild_route_stats(session, chunk_size=100000, rescore=False):
+    """
+    Recompute the route statistics from flight_data, e.g. after upgrading
+    an existing database or reprocessing derived columns.
+
+    Args:
+        session: SQLAlchemy session
+        chunk_size (int): Flights read per chunk
+        rescore (bool): Also score every stored flight against the rebuilt
+                        statistics; otherwise stored z-scores are left as
+                        they were
+
+    Returns:
+        int: Number of flights counted
+    """
+    session.execute(delete(RouteStats))
+
+    counted = 0
+    query = text(
+        'SELECT route_id, flight_duration_minutes, total_distance_km '
+        'FROM flight_data WHERE route_id IS NOT NULL'
+    )
+    # Read in the session's transaction, which already deleted the old statistics
+    for chunk in pd.read_sql(query, session.connection(), chunksize=chunk_size):
+        update_route_stats(chunk, session)
+        counted += len(chunk)
+
+    if rescore:
+        rescore_durations(session, chunk_size)
+
+    session.commit()
+    logger.info("Rebuilt route statistics from %d flights", counted)
+    return counted
@@ -0,0 +1,496 @@
+"""
+Approximate analytics sketches for the OpenSky ETL pipeline.
+
+Sketches are maintained per day at load time and stored in the
+flight_sketches table:
+
+- "aircraft": HyperLogLog of distinct icao24 seen at an airport
+- "routes": space-saving summary of the busiest airport pairs
+
+QuantileSketch summarizes durations and distances per route in the
+route_stats table (see route_stats.py).
+"""
+import json
+import zlib
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, select
+
+from config.settings import (
+    SKETCH_HLL_PRECISION, SKETCH_QUANTILE_ACCURACY, SKETCH_QUANTILE_MAX_BUCKETS, SKETCH_ROUTE_CAPACITY
+)
+from connections.postgresql import FlightSketch
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("sketches")
+
+SECONDS_PER_DAY = 86400
+ROWS_PER_STATEMENT = 1000
+ALL_ROUTES_KEY = "*"
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with mergeable uint8 registers."""
+
+    def __init__(self, precision=SKETCH_HLL_PRECISION, registers=None):
+        """
+        Initialize the sketch.
+
+        Args:
+            precision (int): Number of index bits, 2**precision registers
+            registers (np.ndarray, optional): Existing registers
+        """
+        self.precision = precision
+        self.registers = (
+            registers if registers is not None
+            else np.zeros(1 << precision, dtype=np.uint8)
+        )
+
+    def add_hashes(self, hashes):
+        """
+        Add 64-bit hashes to the sketch.
+
+        Args:
+            hashes (np.ndarray): uint64 hashes
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        value_bits = 64 - self.precision
+        index = (hashes >> np.uint64(value_bits)).astype(np.int64)
+
+        # Keep at most 52 value bits so the float conversion below is exact
+        value_bits = min(value_bits, 52)
+        values = hashes & np.uint64((1 << value_bits) - 1)
+
+        # frexp exponent is the bit length; rank is the position of the first set bit
+        bit_length = np.frexp(values.astype(np.float64))[1]
+        rank = (value_bits - bit_length + 1).astype(np.uint8)
+
+        np.maximum.at(self.registers, index, rank)
+
+    def add(self, values):
+        """
+        Add raw values to the sketch.
+
+        Args:
+            values (array-like): Values to count
+        """
+        values = pd.Series(values).dropna().astype(str).to_numpy(dtype=object)
+        self.add_hashes(pd.util.hash_array(values))
+
+    def merge(self, other):
+        """
+        Merge another sketch of the same precision into this one.
+
+        Args:
+            other (HyperLogLog): Sketch to merge
+
+        Returns:
+            HyperLogLog: self
+        """
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """
+        Estimate the number of distinct values.
+
+        Returns:
+            int: Cardinality estimate
+        """
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+
+        # Small range correction (linear counting)
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+
+        return int(round(estimate))
+
+    def to_bytes(self):
+        """Serialize the sketch compactly."""
+        return bytes([self.precision]) + zlib.compress(self.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, payload):
+        """Deserialize a sketch created by to_bytes."""
+        registers = np.frombuffer(zlib.decompress(payload[1:]), dtype=np.uint8).copy()
+        return cls(precision=payload[0], registers=registers)
+
+class SpaceSaving:
+    """Space-saving heavy-hitter summary keeping at most `capacity` counters."""
+
+    def __init__(self, capacity=SKETCH_ROUTE_CAPACITY, counters=None):
+        """
+        Initialize the sketch.
+
+        Args:
+            capacity (int): Maximum number of tracked keys
+            counters (dict, optional): key -> [count, overestimation error]
+        """
+        self.capacity = capacity
+        self.counters = counters if counters is not None else {}
+
+    def update(self, counts):
+        """
+        Add exact counts of a batch.
+
+        Args:
+            counts (pd.Series): Counts indexed by key (e.g. from value_counts)
+        """
+        self.merge(SpaceSaving(self.capacity, {
+            key: [int(count), 0] for key, count in counts.items()
+        }))
+
+    def merge(self, other):
+        """
+        Merge another summary into this one.
+
+        Counters of both summaries are added and the smallest ones evicted.
+        The largest evicted count is charged as error to the counters that
+        were missing from either summary.
+
+        Args:
+            other (SpaceSaving): Summary to merge
+
+        Returns:
+            SpaceSaving: self
+        """
+        merged = {key: list(value) for key, value in self.counters.items()}
+        for key, (count, error) in other.counters.items():
+            if key in merged:
+                merged[key][0] += count
+                merged[key][1] += error
+            else:
+                merged[key] = [count, error]
+
+        if len(merged) > self.capacity:
+            ranked = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)
+            evicted_max = ranked[self.capacity][1][0]
+            merged = {}
+            for key, (count, error) in ranked[:self.capacity]:
+                missing = key not in self.counters or key not in other.counters
+                merged[key] = [count, error + (evicted_max if missing else 0)]
+
+        self.counters = merged
+        return self
+
+    def top(self, n):
+        """
+        Return the n most frequent keys.
+
+        Args:
+            n (int): Number of keys
+
+        Returns:
+            list: (key, count) tuples, most frequent first
+        """
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, count) for key, (count, _) in ranked[:n]]
+
+    def to_bytes(self):
+        """Serialize the summary compactly."""
+        return zlib.compress(json.dumps({"k": self.capacity, "c": self.counters}).encode())
+
+    @classmethod
+    def from_bytes(cls, payload):
+        """Deserialize a summary created by to_bytes."""
+        data = json.loads(zlib.decompress(payload))
+        return cls(capacity=data["k"], counters=data["c"])
+
+class QuantileSketch:
+    """
+    Relative-error quantile sketch (DDSketch) with mergeable bucket counts.
+
+    Positive values are counted in logarithmic buckets, so every quantile
+    is estimated within `accuracy` of the true value; zero and negative
+    values share one bucket. When there are more than max_buckets buckets
+    the lowest ones are merged, keeping the upper quantiles accurate.
+    """
+
+    def __init__(self, accuracy=SKETCH_QUANTILE_ACCURACY, buckets=None, zeros=0,
+                 max_buckets=SKETCH_QUANTILE_MAX_BUCKETS):
+        """
+        Initialize the sketch.
+
+        Args:
+            accuracy (float): Relative error of the estimates
+            buckets (dict, optional): Bucket index -> count
+            zeros (int): Count of zero and negative values
+            max_buckets (int): Maximum number of buckets
+        """
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.buckets = buckets if buckets is not None else {}
+        self.zeros = zeros
+        self.max_buckets = max_buckets
+
+    def bucket_keys(self, values):
+        """
+        Bucket index of each positive value.
+
+        Args:
+            values (np.ndarray): Positive values
+
+        Returns:
+            np.ndarray: int64 bucket indexes
+        """
+        return np.ceil(np.log(values) / np.log(self.gamma)).astype(np.int64)
+
+    def add(self, values):
+        """
+        Add values to the sketch.
+
+        Args:
+            values (array-like): Values, NaN are ignored
+        """
+        values = pd.to_numeric(pd.Series(values), errors='coerce').dropna().to_numpy(dtype=np.float64)
+        positive = values[values > 0]
+        keys, counts = np.unique(self.bucket_keys(positive), return_counts=True)
+        self.add_counts(keys, counts, zeros=len(values) - len(positive))
+
+    def add_counts(self, keys, counts, zeros=0):
+        """
+        Add counts of bucket indexes computed with bucket_keys.
+
+        Args:
+            keys (array-like): Bucket indexes
+            counts (array-like): Count of each index
+            zeros (int): Count of zero and negative values
+        """
+        for key, count in zip(keys, counts):
+            self.buckets[int(key)] = self.buckets.get(int(key), 0) + int(count)
+        self.zeros += int(zeros)
+        self.collapse()
+
+    def collapse(self):
+        """Merge the lowest buckets until at most max_buckets remain."""
+        if len(self.buckets) <= self.max_buckets:
+            return
+        keys = sorted(self.buckets)
+        cutoff = keys[-self.max_buckets]
+        merged = sum(self.buckets.pop(key) for key in keys[:-self.max_buckets])
+        self.buckets[cutoff] += merged
+
+    def merge(self, other):
+        """
+        Merge another sketch of the same accuracy into this one.
+
+        Args:
+            other (QuantileSketch): Sketch to merge
+
+        Returns:
+            QuantileSketch: self
+        """
+        self.add_counts(list(other.buckets), list(other.buckets.values()), zeros=other.zeros)
+        return self
+
+    def count(self):
+        """Number of values added."""
+        return self.zeros + sum(self.buckets.values())
+
+    def quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1
+
+        Returns:
+            float: Estimated value, None if the sketch is empty
+        """
+        total = self.count()
+        if not total:
+            return None
+        rank = q * (total - 1)
+        if rank < self.zeros:
+            return 0.0
+        keys = sorted(self.buckets)
+        cumulative = np.cumsum([self.buckets[key] for key in keys]) + self.zeros
+        key = keys[min(int(np.searchsorted(cumulative, rank, side='right')), len(keys) - 1)]
+        # Midpoint of the bucket (gamma**(key-1), gamma**key] in relative terms
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def to_bytes(self):
+        """Serialize the sketch compactly."""
+        keys = sorted(self.buckets)
+        return zlib.compress(json.dumps({
+            "a": self.accuracy, "z": self.zeros, "k": keys, "c": [self.buckets[key] for key in keys]
+        }).encode())
+
+    @classmethod
+    def from_bytes(cls, payload):
+        """Deserialize a sketch created by to_bytes."""
+        data = json.loads(zlib.decompress(payload))
+        return cls(accuracy=data["a"], buckets=dict(zip(data["k"], data["c"])), zeros=data["z"])
+
+SKETCH_CLASSES = {"aircraft": HyperLogLog, "routes": SpaceSaving}
+
+def build_batch_sketches(df):
+    """
+    Build the sketches of a batch of flights.
+
+    Args:
+        df (pd.DataFrame): Flight data with icao24, airports, timestamps
+                           and airport_pair
+
+    Returns:
+        dict: (sketch_type, sketch_key, day) -> sketch
+    """
+    sketches = {}
+
+    # Aircraft seen departing from or arriving at each airport per day
+    visits = pd.concat([
+        pd.DataFrame({
+            'airport': df['estDepartureAirport'],
+            'day': df['firstSeen'] // SECONDS_PER_DAY,
+            'icao24': df['icao24']
+        }),
+        pd.DataFrame({
+            'airport': df['estArrivalAirport'],
+            'day': df['lastSeen'] // SECONDS_PER_DAY,
+            'icao24': df['icao24']
+        })
+    ]).dropna()
+
+    for (airport, day), group in visits.groupby(['airport', 'day']):
+        sketch = HyperLogLog()
+        sketch.add(group['icao24'])
+        sketches[("aircraft", airport, int(day))] = sketch
+
+    # Route counts per day
+    if 'airport_pair' in df.columns:
+        routes = pd.DataFrame({
+            'day': df['firstSeen'] // SECONDS_PER_DAY,
+            'airport_pair': df['airport_pair']
+        }).dropna()
+
+        for day, group in routes.groupby('day'):
+            sketch = SpaceSaving()
+            sketch.update(group['airport_pair'].value_counts())
+            sketches[("routes", ALL_ROUTES_KEY, int(day))] = sketch
+
+    return sketches
+
+def update_sketches(df, session):
+    """
+    Merge a batch of flights into the stored sketches.
+
+    Missing sketches are first inserted empty, then the sketches of the
+    batch's days are read locked, in key order, so concurrent loaders merge
+    one after the other instead of overwriting each other. Changes are
+    committed by the caller together with the flights themselves.
+
+    Args:
+        df (pd.DataFrame): Newly loaded flights
+        session: SQLAlchemy session
+
+    Returns:
+        int: Number of sketches written
+    """
+    if df.empty:
+        return 0
+
+    batch_sketches = build_batch_sketches(df)
+    if not batch_sketches:
+        return 0
+
+    table = FlightSketch.__table__
+    if session.get_bind().dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    statement = dialect_insert(table).on_conflict_do_nothing(index_elements=['sketch_type', 'sketch_key', 'day'])
+    empty = [
+        {'sketch_type': sketch_type, 'sketch_key': sketch_key, 'day': day,
+         'payload': SKETCH_CLASSES[sketch_type]().to_bytes()}
+        for sketch_type, sketch_key, day in batch_sketches
+    ]
+    for start in range(0, len(empty), ROWS_PER_STATEMENT):
+        session.execute(statement, empty[start:start + ROWS_PER_STATEMENT])
+
+    days = sorted({day for _, _, day in batch_sketches})
+    keys = sorted({sketch_key for _, sketch_key, _ in batch_sketches})
+    rows = []
+    for start in range(0, len(keys), ROWS_PER_STATEMENT):
+        rows += session.execute(
+            select(table.c.id, table.c.sketch_type, table.c.sketch_key, table.c.day, table.c.payload)
+            .where(table.c.day >= days[0], table.c.day <= days[-1],
+                   table.c.sketch_key.in_(keys[start:start + ROWS_PER_STATEMENT]))
+            .order_by(table.c.sketch_type, table.c.sketch_key, table.c.day)
+            .with_for_update()
+        ).fetchall()
+
+    updates = []
+    for row in rows:
+        sketch = batch_sketches.get((row.sketch_type, row.sketch_key, row.day))
+        if sketch is None:
+            continue
+        existing = SKETCH_CLASSES[row.sketch_type].from_bytes(row.payload)
+        updates.append({'sketch_id': row.id, 'new_payload': existing.merge(sketch).to_bytes()})
+
+    session.execute(
+        table.update().where(table.c.id == bindparam('sketch_id')).values(payload=bindparam('new_payload')),
+        updates
+    )
+    logger.info("Updated %d sketches", len(updates))
+    return len(updates)
+
+def load_sketches(session, sketch_type, sketch_key, start_time, end_time):
+    """
+    Load and merge the daily sketches covering a time range.
+
+    Args:
+        session: SQLAlchemy session
+        sketch_type (str): "aircraft" or "routes"
+        sketch_key (str): Airport code or ALL_ROUTES_KEY
+        start_time (int): Start timestamp
+        end_time (int): End timestamp
+
+    Returns:
+        HyperLogLog or SpaceSaving: Merged sketch (empty if nothing stored)
+    """
+    rows = session.query(FlightSketch.payload).filter(
+        FlightSketch.sketch_type == sketch_type,
+        FlightSketch.sketch_key == sketch_key,
+        FlightSketch.day >= start_time // SECONDS_PER_DAY,
+        FlightSketch.day <= end_time // SECONDS_PER_DAY
+    ).all()
+
+    sketch_class = SKETCH_CLASSES[sketch_type]
+    merged = sketch_class()
+    for (payload,) in rows:
+        merged.merge(sketch_class.from_bytes(payload))
+    return merged
+
+def distinct_aircraft(session, airport, start_time, end_time):
+    """
+    Estimate the number of distinct aircraft seen at an airport.
+
+    Args:
+        session: SQLAlchemy session
+        airport (str): ICAO airport code
+        start_time (int): Start timestamp (whole days are counted)
+        end_time (int): End timestamp
+
+    Returns:
+        int: Estimated distinct icao24 count
+    """
+    return load_sketches(session, "aircraft", airport, start_time, end_time).count()
+
+def top_routes(session, start_time, end_time, n=50):
+    """
+    Return the busiest airport pairs in a time range.
+
+    Args:
+        session: SQLAlchemy session
+        start_time (int): Start timestamp (whole days are counted)
+        end_time (int): End timestamp
+        n (int): Number of routes
+
+    Returns:
+        list: (airport_pair, approximate flight count) tuples
+    """
+    return load_sketches(session, "routes", ALL_ROUTES_KEY, start_time, end_time).top(n)
@@ -0,0 +1,322 @@
+"""
+Spatial grid index for aircraft positions.
+
+Positions are bucketed into a uniform lat/lon grid. In memory, GridIndex
+keeps one slot per aircraft and a cell-sorted order so a query only reads
+the cells overlapping its bounding box. In the database, the same cell id
+is stored in the indexed aircraft_positions.grid_cell column.
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from config.settings import GRID_CELL_DEGREES
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("spatial")
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180.0
+
+def grid_shape(cell_degrees=GRID_CELL_DEGREES):
+    """Number of grid rows and columns for a cell size."""
+    return int(np.ceil(180.0 / cell_degrees)), int(np.ceil(360.0 / cell_degrees))
+
+def cell_ids(latitudes, longitudes, cell_degrees=GRID_CELL_DEGREES):
+    """
+    Compute grid cell ids of positions.
+
+    Args:
+        latitudes (array-like): Latitudes in degrees
+        longitudes (array-like): Longitudes in degrees
+        cell_degrees (float): Cell size in degrees
+
+    Returns:
+        np.ndarray: int64 cell ids (row * columns + column)
+    """
+    n_rows, n_cols = grid_shape(cell_degrees)
+    latitudes = np.asarray(latitudes, dtype=np.float64)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+
+    # Only longitudes outside [-180, 180] are wrapped; 180 stays in the last
+    # column, as in bbox_cell_ranges, so boxes ending at 180 find it
+    longitudes = np.where(np.abs(longitudes) > 180.0, (longitudes + 180.0) % 360.0 - 180.0, longitudes)
+    rows = np.clip(np.floor((latitudes + 90.0) / cell_degrees), 0, n_rows - 1).astype(np.int64)
+    cols = np.clip(np.floor((longitudes + 180.0) / cell_degrees), 0, n_cols - 1).astype(np.int64)
+    return rows * n_cols + cols
+
+def bbox_cell_ranges(min_lat, min_lon, max_lat, max_lon, cell_degrees=GRID_CELL_DEGREES):
+    """
+    List the contiguous cell id ranges covering a bounding box.
+
+    A box with min_lon > max_lon crosses the antimeridian.
+
+    Returns:
+        list: (first cell id, last cell id) tuples, bounds inclusive
+    """
+    n_rows, n_cols = grid_shape(cell_degrees)
+    row_of = lambda lat: int(np.clip(np.floor((lat + 90.0) / cell_degrees), 0, n_rows - 1))
+    col_of = lambda lon: int(np.clip(np.floor((lon + 180.0) / cell_degrees), 0, n_cols - 1))
+    first_row, last_row = row_of(min_lat), row_of(max_lat)
+    first_col, last_col = col_of(min_lon), col_of(max_lon)
+
+    if min_lon <= max_lon:
+        col_spans = [(first_col, last_col)]
+    else:
+        col_spans = [(first_col, n_cols - 1), (0, last_col)]
+
+    return [
+        (row * n_cols + start, row * n_cols + end)
+        for row in range(first_row, last_row + 1)
+        for start, end in col_spans
+    ]
+
+def radius_bbox(latitude, longitude, radius_km):
+    """
+    Bounding box enclosing a circle on the sphere.
+
+    Returns:
+        tuple: (min_lat, min_lon, max_lat, max_lon)
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat, max_lat = latitude - lat_delta, latitude + lat_delta
+    if min_lat <= -90.0 or max_lat >= 90.0:
+        return max(min_lat, -90.0), -180.0, min(max_lat, 90.0), 180.0
+
+    cos_lat = np.cos(np.radians(max(abs(min_lat), abs(max_lat))))
+    lon_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    if lon_delta >= 180.0:
+        return min_lat, -180.0, max_lat, 180.0
+
+    wrap = lambda lon: (lon + 180.0) % 360.0 - 180.0
+    return min_lat, wrap(longitude - lon_delta), max_lat, wrap(longitude + lon_delta)
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Vectorized great-circle distance in kilometers."""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2 +
+        np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def in_bbox(latitudes, longitudes, min_lat, min_lon, max_lat, max_lon):
+    """Vectorized bounding box test, handling boxes across the antimeridian."""
+    in_lat = (latitudes >= min_lat) & (latitudes <= max_lat)
+    if min_lon <= max_lon:
+        return in_lat & (longitudes >= min_lon) & (longitudes <= max_lon)
+    return in_lat & ((longitudes >= min_lon) | (longitudes <= max_lon))
+
+class GridIndex:
+    """Uniform lat/lon grid over the latest position of each aircraft."""
+
+    def __init__(self, cell_degrees=GRID_CELL_DEGREES, capacity=1024):
+        """
+        Initialize an empty index.
+
+        Args:
+            cell_degrees (float): Cell size in degrees
+            capacity (int): Initial number of slots, grown on demand
+        """
+        self.cell_degrees = cell_degrees
+        self.latitudes = np.full(capacity, np.nan)
+        self.longitudes = np.full(capacity, np.nan)
+        self.cells = np.full(capacity, -1, dtype=np.int64)
+        self.keys = np.empty(capacity, dtype=object)
+        self.slots = {}
+        self.free_slots = list(range(capacity - 1, -1, -1))
+
+        # Slots sorted by cell, rebuilt lazily after updates
+        self._order = None
+        self._sorted_cells = None
+
+    @classmethod
+    def from_frame(cls, df, cell_degrees=GRID_CELL_DEGREES):
+        """
+        Build an index from positions, e.g. PositionRingBuffer.latest().
+
+        Args:
+            df (pd.DataFrame): Columns icao24, latitude, longitude
+            cell_degrees (float): Cell size in degrees
+
+        Returns:
+            GridIndex: Populated index
+        """
+        index = cls(cell_degrees, capacity=max(len(df), 1))
+        index.update(df['icao24'].to_numpy(), df['latitude'].to_numpy(), df['longitude'].to_numpy())
+        return index
+
+    def __len__(self):
+        """Number of indexed aircraft."""
+        return len(self.slots)
+
+    def _grow(self, needed):
+        """Double the slot arrays until `needed` free slots are available."""
+        capacity = len(self.cells)
+        new_capacity = capacity
+        while new_capacity - len(self.slots) < needed:
+            new_capacity *= 2
+
+        extra = new_capacity - capacity
+        self.latitudes = np.concatenate([self.latitudes, np.full(extra, np.nan)])
+        self.longitudes = np.concatenate([self.longitudes, np.full(extra, np.nan)])
+        self.cells = np.concatenate([self.cells, np.full(extra, -1, dtype=np.int64)])
+        self.keys = np.concatenate([self.keys, np.empty(extra, dtype=object)])
+        self.free_slots = list(range(new_capacity - 1, capacity - 1, -1)) + self.free_slots
+
+    def update(self, keys, latitudes, longitudes):
+        """
+        Insert or move aircraft.
+
+        Args:
+            keys (array-like): Aircraft identifiers (icao24)
+            latitudes (array-like): Latitudes in degrees
+            longitudes (array-like): Longitudes in degrees
+        """
+        keys = np.asarray(keys, dtype=object)
+        slots = np.fromiter((self.slots.get(key, -1) for key in keys), dtype=np.int64, count=len(keys))
+
+        new_positions = np.flatnonzero(slots < 0)
+        if len(new_positions) > len(self.free_slots):
+            self._grow(len(new_positions))
+        for position in new_positions:
+            key = keys[position]
+            slot = self.slots.get(key)
+            if slot is None:
+                slot = self.free_slots.pop()
+                self.slots[key] = slot
+                self.keys[slot] = key
+            slots[position] = slot
+
+        self.latitudes[slots] = latitudes
+        self.longitudes[slots] = longitudes
+        self.cells[slots] = cell_ids(latitudes, longitudes, self.cell_degrees)
+        self._order = None
+
+    def remove(self, keys):
+        """
+        Remove aircraft from the index.
+
+        Args:
+            keys (iterable): Aircraft identifiers
+        """
+        for key in keys:
+            slot = self.slots.pop(key, None)
+            if slot is None:
+                continue
+            self.keys[slot] = None
+            self.cells[slot] = -1
+            self.latitudes[slot] = self.longitudes[slot] = np.nan
+            self.free_slots.append(slot)
+        self._order = None
+
+    def _candidates(self, min_lat, min_lon, max_lat, max_lon):
+        """Slots in the cells overlapping a bounding box."""
+        if self._order is None:
+            self._order = np.argsort(self.cells, kind='stable')
+            self._sorted_cells = self.cells[self._order]
+
+        ranges = np.array(bbox_cell_ranges(min_lat, min_lon, max_lat, max_lon, self.cell_degrees))
+        starts = np.searchsorted(self._sorted_cells, ranges[:, 0], side='left')
+        ends = np.searchsorted(self._sorted_cells, ranges[:, 1], side='right')
+        if not len(starts):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._order[start:end] for start, end in zip(starts, ends)])
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Find aircraft inside a bounding box.
+
+        Args:
+            min_lat (float): Southern bound
+            min_lon (float): Western bound (greater than max_lon across the antimeridian)
+            max_lat (float): Northern bound
+            max_lon (float): Eastern bound
+
+        Returns:
+            np.ndarray: Aircraft keys
+        """
+        slots = self._candidates(min_lat, min_lon, max_lat, max_lon)
+        inside = in_bbox(self.latitudes[slots], self.longitudes[slots], min_lat, min_lon, max_lat, max_lon)
+        return self.keys[slots[inside]]
+
+    def radius(self, latitude, longitude, radius_km):
+        """
+        Find aircraft within a distance of a point.
+
+        Args:
+            latitude (float): Center latitude
+            longitude (float): Center longitude
+            radius_km (float): Radius in kilometers
+
+        Returns:
+            tuple: (keys, distances in km), nearest first
+        """
+        slots = self._candidates(*radius_bbox(latitude, longitude, radius_km))
+        distances = haversine_km(latitude, longitude, self.latitudes[slots], self.longitudes[slots])
+        inside = distances <= radius_km
+        slots, distances = slots[inside], distances[inside]
+
+        order = np.argsort(distances, kind='stable')
+        return self.keys[slots[order]], distances[order]
+
+    def nearest(self, latitude, longitude, k):
+        """
+        Find the k aircraft nearest to a point.
+
+        The search radius starts at one cell and doubles until it holds k
+        aircraft; everything within that radius is then ranked exactly.
+
+        Args:
+            latitude (float): Center latitude
+            longitude (float): Center longitude
+            k (int): Number of aircraft
+
+        Returns:
+            tuple: (keys, distances in km), nearest first
+        """
+        radius_km = self.cell_degrees * KM_PER_DEGREE
+        while True:
+            keys, distances = self.radius(latitude, longitude, radius_km)
+            if len(keys) >= k or radius_km >= np.pi * EARTH_RADIUS_KM:
+                return keys[:k], distances[:k]
+            radius_km *= 2
+
+def positions_in_bbox(engine, min_lat, min_lon, max_lat, max_lon, start=None, end=None):
+    """
+    Query stored positions inside a bounding box using the grid_cell index.
+
+    Args:
+        engine: SQLAlchemy engine
+        min_lat (float): Southern bound
+        min_lon (float): Western bound
+        max_lat (float): Northern bound
+        max_lon (float): Eastern bound
+        start (int, optional): Earliest position time
+        end (int, optional): Latest position time
+
+    Returns:
+        pd.DataFrame: Matching rows of aircraft_positions
+    """
+    ranges = bbox_cell_ranges(min_lat, min_lon, max_lat, max_lon)
+    params = {}
+    cell_filters = []
+    for i, (first, last) in enumerate(ranges):
+        cell_filters.append(f"grid_cell BETWEEN :first_{i} AND :last_{i}")
+        params[f"first_{i}"] = first
+        params[f"last_{i}"] = last
+
+    query = f"SELECT * FROM aircraft_positions WHERE ({' OR '.join(cell_filters)})"
+    if start is not None:
+        query += " AND time >= :start"
+        params["start"] = int(start)
+    if end is not None:
+        query += " AND time <= :end"
+        params["end"] = int(end)
+
+    with engine.connect() as conn:
+        df = pd.read_sql(text(query), conn, params=params)
+
+    inside = in_bbox(df['latitude'], df['longitude'], min_lat, min_lon, max_lat, max_lon)
+    return df[inside].reset_index(drop=True)
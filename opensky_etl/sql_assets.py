@@ -0,0 +1,344 @@
+"""
+DAG runner for the SQL transform assets.
+
+Every file in assets/sql/transform is an asset: a SELECT materialized as a
+table named after the file. Its inputs are declared in its header
+comment, naming other assets or tables and views loaded by the pipeline:
+
+    -- depends: flights, flight_duration
+
+An asset starts as soon as the assets it depends on are built, up to
+SQL_ASSET_WORKERS at a time, each on its own pooled connection. SQLite
+has a single writer, so there assets are built one at a time.
+
+An asset is only rebuilt when its inputs changed. Its signature hashes
+its SQL together with the load watermark, for tables loaded by the
+pipeline, and the build version of each upstream asset, and is compared
+with the signature stored in sql_assets at its last build. A build
+creates the new table, replaces the old one and records the new state in
+one transaction, so readers see either version complete.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from sqlalchemy import inspect, select, text
+
+from config.settings import SQL_ASSET_WORKERS
+from connections.postgresql import SqlAsset, get_load_watermark
+from transform import render_sql_template
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("sql_assets")
+
+# Directory of the transform assets
+ASSET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "sql", "transform")
+
+DEPENDS_PATTERN = re.compile(r'^--\s*depends:\s*(.*)$', re.IGNORECASE)
+
+# Asset names become table names
+NAME_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# Node statuses whose dependents are not run
+FAILED_STATUSES = ("failed", "upstream_failed")
+
+def parse_dependencies(sql):
+    """
+    Read the dependencies declared in the leading comment lines of an asset.
+
+    Args:
+        sql (str): Asset SQL
+
+    Returns:
+        list: Names of assets, tables or views
+    """
+    depends = []
+    for line in sql.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith('--'):
+            break
+        match = DEPENDS_PATTERN.match(line)
+        if match:
+            depends += [name.strip() for name in match.group(1).split(',') if name.strip()]
+    return depends
+
+def discover_assets(directory=ASSET_DIR):
+    """
+    Find the SQL assets of a directory.
+
+    Args:
+        directory (str): Directory of .sql files
+
+    Returns:
+        dict: name -> asset dict with name, path, sql and depends
+    """
+    assets = {}
+    for file_name in sorted(os.listdir(directory)):
+        name, extension = os.path.splitext(file_name)
+        if extension != '.sql':
+            continue
+        if not NAME_PATTERN.match(name):
+            logger.warning("Skipping SQL asset %s: not a valid table name", file_name)
+            continue
+        path = os.path.join(directory, file_name)
+        with open(path, 'r') as f:
+            sql = f.read()
+        assets[name] = {"name": name, "path": path, "sql": sql, "depends": parse_dependencies(sql)}
+    return assets
+
+def topological_order(assets):
+    """
+    Order assets so that every asset follows the assets it depends on.
+
+    Args:
+        assets (dict): Assets by name
+
+    Returns:
+        list: Asset names
+
+    Raises:
+        ValueError: If the dependencies form a cycle
+    """
+    remaining = {name: {dep for dep in asset['depends'] if dep in assets} for name, asset in assets.items()}
+    order = []
+    while remaining:
+        ready = sorted(name for name, depends in remaining.items() if depends <= set(order))
+        if not ready:
+            raise ValueError(f"Dependency cycle between SQL assets: {', '.join(sorted(remaining))}")
+        order += ready
+        for name in ready:
+            del remaining[name]
+    return order
+
+def run_graph(assets, run_node, workers=SQL_ASSET_WORKERS):
+    """
+    Run every asset once the assets it depends on have finished, up to
+    workers at a time. Dependents of a failed asset are not run.
+
+    Args:
+        assets (dict): Assets by name
+        run_node (callable): Runs an asset by name, returns a dict with its "status"
+        workers (int): Maximum number of concurrent assets
+
+    Returns:
+        dict: name -> result of run_node with name, depends, and start and
+              end in seconds since the graph started
+
+    Raises:
+        ValueError: If the dependencies form a cycle
+    """
+    topological_order(assets)
+    upstream = {name: [dep for dep in asset['depends'] if dep in assets] for name, asset in assets.items()}
+    results = {}
+    started = time.perf_counter()
+
+    def timed(name):
+        """Run a node and time it."""
+        start = time.perf_counter() - started
+        try:
+            result = run_node(name)
+        except Exception as e:
+            logger.error("SQL asset %s failed: %s", name, e)
+            result = {"status": "failed", "error": str(e)}
+        end = time.perf_counter() - started
+        return {**result, "name": name, "depends": assets[name]['depends'], "start": round(start, 4), "end": round(end, 4)}
+
+    # Worker threads log with the caller's run and stage
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        running = {}
+        waiting = set(assets)
+        while waiting or running:
+            for name in sorted(waiting):
+                if not all(dep in results for dep in upstream[name]):
+                    continue
+                waiting.discard(name)
+                if any(results[dep]['status'] in FAILED_STATUSES for dep in upstream[name]):
+                    now = round(time.perf_counter() - started, 4)
+                    results[name] = {
+                        "status": "upstream_failed", "name": name,
+                        "depends": assets[name]['depends'], "start": now, "end": now
+                    }
+                else:
+                    running[executor.submit(context.copy().run, timed, name)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+def critical_path(results):
+    """
+    Find the chain of assets that determined the graph's duration: the
+    asset that ended last, preceded by its upstream asset that ended last,
+    and so on.
+
+    Args:
+        results (dict): Result of run_graph
+
+    Returns:
+        list: Asset names, first to last
+    """
+    if not results:
+        return []
+    node = max(results.values(), key=lambda result: result['end'])
+    path = [node['name']]
+    upstream = [results[dep] for dep in node['depends'] if dep in results]
+    while upstream:
+        node = max(upstream, key=lambda result: result['end'])
+        path.append(node['name'])
+        upstream = [results[dep] for dep in node['depends'] if dep in results]
+    return path[::-1]
+
+def format_timing_graph(nodes, width=40):
+    """
+    Draw the nodes of a graph run as bars on a shared time axis.
+
+    Args:
+        nodes (list): Node results in start order
+        width (int): Width of the time axis in characters
+
+    Returns:
+        list: One line per node
+    """
+    total = max([node['end'] for node in nodes] + [1e-9])
+    name_width = max(len(node['name']) for node in nodes) if nodes else 0
+    lines = []
+    for node in nodes:
+        first = int(node['start'] / total * width)
+        last = max(int(node['end'] / total * width), first + 1)
+        bar = ' ' * first + '#' * (last - first) + ' ' * (width - last)
+        rows = f"{node['rows']} rows" if node.get('rows') is not None else ""
+        lines.append(f"{node['name']:<{name_width}} |{bar[:width]}| {node['start']:7.2f} -> {node['end']:7.2f} s "
+                     f"{node['status']:<15} {rows}")
+    return lines
+
+def load_asset_states(engine):
+    """
+    Read the stored state of every built asset.
+
+    Returns:
+        dict: name -> row of sql_assets as a dict
+    """
+    with engine.connect() as connection:
+        rows = connection.execute(select(SqlAsset.__table__)).fetchall()
+    return {row._mapping['name']: dict(row._mapping) for row in rows}
+
+def asset_signature(sql, inputs):
+    """
+    Hash an asset's SQL and the versions of its inputs.
+
+    Args:
+        sql (str): Asset SQL
+        inputs (dict): Input name -> version
+
+    Returns:
+        str: Hex digest
+    """
+    payload = json.dumps([sql, sorted(inputs.items())])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def build_asset(engine, asset, signature, version):
+    """
+    Materialize an asset as a table and record its new state.
+
+    Args:
+        engine: SQLAlchemy engine
+        asset (dict): Asset
+        signature (str): Signature of the asset's inputs
+        version (int): New build version
+
+    Returns:
+        int: Number of rows in the table
+    """
+    name = asset['name']
+    staging = f"{name}__build"
+    sql = render_sql_template(asset['sql'], engine).strip().rstrip(';')
+    table = SqlAsset.__table__
+    started = time.perf_counter()
+
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {staging}"))
+        connection.execute(text(f"CREATE TABLE {staging} AS\n{sql}"))
+        rows = connection.execute(text(f"SELECT COUNT(*) FROM {staging}")).scalar()
+        connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+        connection.execute(text(f"ALTER TABLE {staging} RENAME TO {name}"))
+
+        values = {
+            "signature": signature, "version": version, "row_count": rows,
+            "seconds": round(time.perf_counter() - started, 4), "built_at": int(time.time())
+        }
+        if not connection.execute(table.update().where(table.c.name == name).values(**values)).rowcount:
+            connection.execute(table.insert().values(name=name, **values))
+    return rows
+
+def run_sql_assets(engine, directory=ASSET_DIR, workers=SQL_ASSET_WORKERS, force=False, stats=None):
+    """
+    Build the SQL assets whose inputs changed since their last build.
+
+    Args:
+        engine: SQLAlchemy engine
+        directory (str): Directory of the assets
+        workers (int): Maximum number of assets built at once
+        force (bool): Rebuild every asset
+        stats (dict, optional): Filled with status counts, the critical
+                                path and the timing of every asset
+
+    Returns:
+        bool: Success status (False if an asset failed)
+    """
+    stats = stats if stats is not None else {}
+    started = time.perf_counter()
+
+    try:
+        assets = discover_assets(directory)
+        topological_order(assets)
+    except (OSError, ValueError) as e:
+        logger.error("Cannot run SQL assets: %s", e)
+        return False
+
+    states = load_asset_states(engine)
+    watermark = get_load_watermark(engine) or 0
+    versions = {name: state['version'] for name, state in states.items()}
+    if engine.dialect.name == 'sqlite':
+        # One writer at a time, concurrent builds would only wait for each other
+        workers = 1
+
+    def run_node(name):
+        """Build an asset unless its inputs are unchanged."""
+        asset = assets[name]
+        inputs = {dep: versions.get(dep, 0) if dep in assets else watermark for dep in asset['depends']}
+        signature = asset_signature(asset['sql'], inputs)
+        state = states.get(name)
+        if not force and state and state['signature'] == signature and inspect(engine).has_table(name):
+            return {"status": "skipped", "rows": state['row_count']}
+
+        version = (state['version'] if state else 0) + 1
+        rows = build_asset(engine, asset, signature, version)
+        versions[name] = version
+        return {"status": "built", "rows": rows}
+
+    results = run_graph(assets, run_node, workers)
+    nodes = sorted(results.values(), key=lambda node: (node['start'], node['name']))
+    seconds = time.perf_counter() - started
+    stats.update({
+        "assets": len(nodes),
+        **{status: sum(node['status'] == status for node in nodes)
+           for status in ("built", "skipped", "failed", "upstream_failed")},
+        "seconds": round(seconds, 2),
+        "critical_path": critical_path(results),
+        "nodes": nodes
+    })
+
+    for line in format_timing_graph(nodes):
+        logger.info(line)
+    logger.info("Ran %d SQL assets in %.2f seconds: %d built, %d skipped, %d failed",
+                len(nodes), seconds, stats['built'], stats['skipped'], stats['failed'] + stats['upstream_failed'])
+    return stats['failed'] == 0 and stats['upstream_failed'] == 0
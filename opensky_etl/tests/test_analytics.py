@@ -0,0 +1,113 @@
+"""
+Unit tests for the analytics module.
+"""
+import os
+import tempfile
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import analytics
+from analytics import SUMMARY_QUERIES, load_state, refresh_copy, run_summary, summary_source
+from change_feed import get_offset
+from connections.postgresql import create_schema
+from load import create_summary_views, load_data_to_db
+from transform import transform_flight_data
+
+@unittest.skipIf(analytics.duckdb is None, "duckdb is not installed")
+class TestAnalytics(unittest.TestCase):
+    """Test cases for the analytics module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directory.name, 'flights.db')}")
+        create_schema(self.engine)
+        self.copy = os.path.join(self.directory.name, "analytics")
+        self.load(pd.DataFrame({
+            'icao24': ['abc123', 'def456', 'ghi789', 'abc123', None],
+            'firstSeen': [1000, 2000, 90000, 180000, 3000],
+            'lastSeen': [4600, 9200, 93600, 183600, None],
+            'estDepartureAirport': ['EDDF', 'LFPG', 'EDDF', 'EGLL', 'EDDF'],
+            'estArrivalAirport': ['LFPG', 'EDDF', 'EGLL', None, None],
+            'callsign': ['DLH1', 'AFR2', 'DLH3', 'BAW4', None],
+            'estDepartureAirportHorizDistance': [1200, 800, 500, 3000, 100],
+            'estArrivalAirportHorizDistance': [900, 400, 700, 2000, 200]
+        }))
+
+    def tearDown(self):
+        """Remove the database and the copy."""
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def load(self, df, reconcile=False):
+        """Transform and load flights."""
+        session = sessionmaker(bind=self.engine)()
+        load_data_to_db(transform_flight_data(df, self.engine), self.engine, session, reconcile=reconcile)
+        session.close()
+
+    def assert_same_results(self):
+        """Check every summary query returns the same rows on DuckDB and SQL."""
+        for name in SUMMARY_QUERIES:
+            expected = run_summary(self.engine, name, engine_name="sql")
+            actual = run_summary(self.engine, name, engine_name="duckdb", directory=self.copy)
+            pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_exact=False, obj=name)
+
+    def test_same_results_as_sql(self):
+        """Test the copy answers like the database, before and after new loads."""
+        self.assert_same_results()
+        self.assertEqual(len(run_summary(self.engine, "airport_departures", limit=1, engine_name="duckdb",
+                                         directory=self.copy)), 1)
+
+        # An insert and a revision of an existing flight are applied incrementally
+        self.load(pd.DataFrame({
+            'icao24': ['zzz999', 'abc123'], 'firstSeen': [200000, 1000], 'lastSeen': [205000, 5000],
+            'estDepartureAirport': ['KJFK', 'EDDF'], 'estArrivalAirport': ['EDDF', 'EGLL'],
+            'callsign': ['UAL5', 'DLH1'],
+            'estDepartureAirportHorizDistance': [600, 1200], 'estArrivalAirportHorizDistance': [300, 900]
+        }), reconcile=True)
+        self.assert_same_results()
+        durations = run_summary(self.engine, "flight_durations", engine_name="duckdb", directory=self.copy)
+        revised = durations[(durations['icao24'] == 'abc123') & (durations['firstSeen'] == 1000)]
+        self.assertEqual(revised['airport_pair'].tolist(), ['EDDF-EGLL'])
+        self.assertEqual(len(durations), 5)
+
+    def test_offsets_are_acknowledged(self):
+        """Test the copy resumes from and acknowledges its feed offset."""
+        offset = refresh_copy(self.engine, self.copy)
+        self.assertEqual(offset, 5)
+        self.assertEqual(load_state(self.copy), 5)
+        self.assertEqual(get_offset(self.engine, "analytics"), 5)
+        self.assertEqual(refresh_copy(self.engine, self.copy), 5)
+
+    def test_summary_source(self):
+        """Test cache keys name the engine and the offset of the refreshed copy."""
+        self.assertEqual(summary_source(self.engine, engine_name="sql"), {"engine": "sql"})
+        self.assertEqual(summary_source(self.engine, engine_name="duckdb", directory=self.copy),
+                         {"engine": "duckdb", "copy_offset": 5})
+        self.load(pd.DataFrame({'icao24': ['zzz999'], 'firstSeen': [200000], 'lastSeen': [205000],
+                                'estDepartureAirport': ['KJFK'], 'estArrivalAirport': ['EDDF']}))
+        self.assertEqual(summary_source(self.engine, engine_name="duckdb", directory=self.copy)["copy_offset"], 6)
+
+    def test_view_matches_summary(self):
+        """Test the airport_departures view holds the rows of the summary query."""
+        create_summary_views(self.engine)
+        with self.engine.connect() as connection:
+            view = pd.read_sql("SELECT * FROM airport_departures ORDER BY departure_count DESC, airport_code",
+                               connection)
+        pd.testing.assert_frame_equal(view, run_summary(self.engine, "airport_departures", engine_name="sql"))
+
+    def test_sql_fallback(self):
+        """Test queries run on the database without duckdb."""
+        original = analytics.duckdb
+        analytics.duckdb = None
+        try:
+            result = run_summary(self.engine, "daily_counts", engine_name="duckdb", directory=self.copy)
+        finally:
+            analytics.duckdb = original
+        self.assertEqual(result['flight_count'].tolist(), [3, 1, 1])
+        self.assertFalse(os.path.exists(self.copy))
+
+if __name__ == '__main__':
+    unittest.main()
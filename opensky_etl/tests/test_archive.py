@@ -0,0 +1,194 @@
+"""
+Unit tests for the archive module.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from archive import (
+    DAY, archive_flights, combine_with_archive, get_archive_boundary, query_archive, read_archive, read_flights
+)
+from connections.postgresql import create_schema
+from load import load_data_to_db
+
+# Ten days of flights, two per day
+NOW = 10 * DAY + 3600
+
+class TestArchive(unittest.TestCase):
+    """Test cases for the archive module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine("sqlite://")
+        create_schema(self.engine)
+        first_seen = [day * DAY + offset for day in range(10) for offset in (3600, 7200)]
+        self.load(pd.DataFrame({
+            'icao24': [f"a{i:05d}" for i in range(20)],
+            'firstSeen': first_seen,
+            'lastSeen': [seen + 5400 for seen in first_seen],
+            'estDepartureAirport': ['EDDF', 'LFPG'] * 10,
+            'estArrivalAirport': ['LFPG', 'EDDF'] * 10,
+            'callsign': [f"DLH{i}" for i in range(20)]
+        }))
+
+    def tearDown(self):
+        """Remove the archive directory."""
+        self.directory.cleanup()
+
+    def load(self, df):
+        """Load flights through the loader."""
+        session = sessionmaker(bind=self.engine)()
+        load_data_to_db(df, self.engine, session)
+        session.close()
+
+    def archive(self, **kwargs):
+        """Archive flights older than three days."""
+        stats = {}
+        archive_flights(self.engine, older_than_days=3, directory=self.directory.name, now=NOW, stats=stats, **kwargs)
+        return stats
+
+    def hot_count(self):
+        """Number of flights left in flight_data."""
+        with self.engine.connect() as conn:
+            return conn.execute(text("SELECT COUNT(*) FROM flight_data")).scalar()
+
+    def test_archive_moves_cold_days(self):
+        """Test days before the cutoff move to one file each and leave flight_data."""
+        stats = self.archive(batch_size=3)
+        self.assertEqual((stats['segments'], stats['archived'], stats['deleted']), (7, 14, 14))
+        self.assertEqual(self.hot_count(), 6)
+        self.assertEqual(get_archive_boundary(self.engine), (7 * DAY, 14))
+        self.assertEqual(len(os.listdir(self.directory.name)), 7)
+
+        archived = pd.read_parquet(os.path.join(self.directory.name, "flights-1970-01-02.parquet"))
+        self.assertEqual(archived['icao24'].tolist(), ['a00002', 'a00003'])
+        self.assertEqual(archived['airport_pair'].tolist(), ['EDDF-LFPG', 'LFPG-EDDF'])
+
+        # Nothing left to archive
+        self.assertEqual(self.archive()['segments'], 0)
+
+    def test_read_flights_unions_hot_and_archive(self):
+        """Test reads return the same flights before and after archival."""
+        columns = ['icao24', 'firstSeen', 'lastSeen', 'airport_pair']
+        before = read_flights(self.engine, columns=columns)
+        ranged = read_flights(self.engine, 2 * DAY, 8 * DAY, limit=5, columns=columns)
+        self.archive()
+
+        pd.testing.assert_frame_equal(read_flights(self.engine, columns=columns, directory=self.directory.name), before)
+        pd.testing.assert_frame_equal(
+            read_flights(self.engine, 2 * DAY, 8 * DAY, limit=5, columns=columns, directory=self.directory.name),
+            ranged
+        )
+        self.assertEqual(before['icao24'].tolist()[:2], ['a00019', 'a00018'])
+        # Served from the hot table without opening archive files
+        pd.testing.assert_frame_equal(
+            read_flights(self.engine, limit=3, columns=columns, directory="/nonexistent"), before.head(3)
+        )
+
+    def test_interrupted_deletes_and_late_flights(self):
+        """Test archived rows not deleted yet are not duplicated and late flights are kept."""
+        self.archive(batch_size=0)
+        self.assertEqual(self.hot_count(), 20)
+        self.assertEqual(len(read_flights(self.engine, directory=self.directory.name)), 20)
+
+        # A late flight on an archived day goes to an extra segment of its day
+        self.load(pd.DataFrame({
+            'icao24': ['late01'], 'firstSeen': [DAY + 100], 'lastSeen': [DAY + 200],
+            'estDepartureAirport': ['EDDF'], 'estArrivalAirport': ['EGLL']
+        }))
+        stats = self.archive()
+        self.assertEqual((stats['segments'], stats['late'], stats['deleted']), (1, 1, 15))
+        self.assertEqual(self.hot_count(), 6)
+        self.assertIn("flights-1970-01-02-21.parquet", os.listdir(self.directory.name))
+        flights = read_flights(self.engine, DAY, 2 * DAY, directory=self.directory.name)
+        self.assertEqual(flights['icao24'].tolist(), ['a00003', 'a00002', 'late01'])
+
+    def test_revisions_of_archived_flights(self):
+        """Test revisions of archived flights are dropped and archived copies never duplicate hot ones."""
+        self.archive()
+        changes = "SELECT COUNT(*) FROM flight_changes"
+        with self.engine.connect() as conn:
+            counted = conn.execute(text(changes)).scalar()
+        revision = pd.DataFrame({
+            'icao24': ['a00002', 'a00003', 'late01'], 'firstSeen': [DAY + 3600, DAY + 7200, DAY + 100],
+            'lastSeen': [DAY + 9999, DAY + 7200 + 5400, DAY + 200],
+            'estDepartureAirport': ['EDDF', 'LFPG', 'EDDF'], 'estArrivalAirport': ['LFPG', 'EDDF', 'EGLL'],
+            'callsign': ['DLH2', 'DLH3', None]
+        })
+        stats = {}
+        session = sessionmaker(bind=self.engine)()
+        with patch('archive.ARCHIVE_DIR', self.directory.name):
+            load_data_to_db(revision, self.engine, session, reconcile=True, stats=stats)
+        session.close()
+        self.assertEqual((stats['inserted'], stats['revised'], stats['unchanged'], stats['archived_revisions']),
+                         (1, 0, 1, 1))
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text(changes)).scalar(), counted + 1)
+
+        flights = read_flights(self.engine, DAY, 2 * DAY, directory=self.directory.name)
+        self.assertEqual(flights['icao24'].tolist(), ['a00003', 'a00002', 'late01'])
+        self.assertEqual(flights['lastSeen'].tolist(), [DAY + 7200 + 5400, DAY + 3600 + 5400, DAY + 200])
+
+        # A copy of an archived flight in flight_data is read once
+        hot = pd.DataFrame({'id': [99], 'icao24': ['a00002'], 'firstSeen': [DAY + 3600], 'lastSeen': [DAY + 9999]})
+        archived = read_archive(self.engine, DAY, 2 * DAY, columns=list(hot.columns), directory=self.directory.name)
+        combined = combine_with_archive(hot, archived)
+        self.assertEqual(combined['icao24'].tolist(), ['a00003', 'a00002'])
+        self.assertEqual(combined['lastSeen'].iloc[1], DAY + 9999)
+
+    def test_late_flight_before_newer_days(self):
+        """Test a late flight loaded before newer days is archived, not deleted with them."""
+        self.archive()
+        self.load(pd.DataFrame({
+            'icao24': ['late01'], 'firstSeen': [DAY + 100], 'lastSeen': [DAY + 200],
+            'estDepartureAirport': ['EDDF'], 'estArrivalAirport': ['EGLL']
+        }))
+        self.load(pd.DataFrame({
+            'icao24': ['new001', 'new002'], 'firstSeen': [10 * DAY + 100, 10 * DAY + 200],
+            'lastSeen': [10 * DAY + 5000, 10 * DAY + 6000],
+            'estDepartureAirport': ['EDDF', 'LFPG'], 'estArrivalAirport': ['LFPG', 'EDDF']
+        }))
+
+        stats = {}
+        archive_flights(self.engine, older_than_days=0, directory=self.directory.name,
+                        now=NOW + 4 * DAY, stats=stats)
+        self.assertEqual((stats['archived'], stats['late'], stats['deleted']), (9, 1, 9))
+        self.assertEqual(self.hot_count(), 0)
+        flights = read_flights(self.engine, directory=self.directory.name)
+        self.assertEqual(len(flights), 23)
+        self.assertIn('late01', flights['icao24'].tolist())
+
+    def test_read_archive_airborne(self):
+        """Test airborne reads of archived flights and their union with hot flights."""
+        self.archive()
+        archived = read_archive(self.engine, 2 * DAY + 7000, 2 * DAY + 7300, airborne=True,
+                                order='firstSeen', directory=self.directory.name)
+        self.assertEqual(archived['icao24'].tolist(), ['a00004', 'a00005'])
+
+        limited = read_archive(self.engine, airborne=True, order='firstSeen', limit=3, directory=self.directory.name)
+        self.assertEqual(limited['icao24'].tolist(), ['a00000', 'a00001', 'a00002'])
+
+        hot = pd.DataFrame({'id': [5, 99], 'icao24': ['a00004', 'x'], 'firstSeen': [2 * DAY + 3600, 9 * DAY]})
+        combined = combine_with_archive(hot, archived, order='firstSeen')
+        self.assertEqual(combined['icao24'].tolist(), ['a00004', 'a00005', 'x'])
+
+    def test_sqlite_shards(self):
+        """Test days archived to SQLite shards are read and queried like Parquet files."""
+        columns = ['icao24', 'firstSeen', 'lastSeen', 'airport_pair']
+        before = read_flights(self.engine, columns=columns)
+        self.archive(archive_format="sqlite")
+        self.assertIn("flights-1970-01-02.db", os.listdir(self.directory.name))
+        pd.testing.assert_frame_equal(read_flights(self.engine, columns=columns, directory=self.directory.name), before)
+
+        result = query_archive(self.engine, "SELECT airport_pair, COUNT(*) AS flights FROM flights "
+                               "GROUP BY airport_pair ORDER BY airport_pair", start=DAY, end=5 * DAY,
+                               directory=self.directory.name)
+        self.assertEqual(result['flights'].tolist(), [4, 4])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Unit tests for the batching module.
+"""
+import unittest
+from sqlalchemy import create_engine
+
+from batching import BatchSizeTuner, get_tuned_batch_size, save_tuned_batch_size
+from connections.postgresql import create_schema
+
+class TestBatching(unittest.TestCase):
+    """Test cases for the batching module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.engine = create_engine("sqlite://")
+        create_schema(self.engine)
+
+    def tuner(self):
+        """Tuner between 100 and 100000 rows aiming at one second per batch."""
+        return BatchSizeTuner(self.engine, minimum=100, maximum=100000, target_seconds=1.0, commit_ceiling=2.0)
+
+    def test_size_follows_throughput(self):
+        """Test batches grow at most twofold toward the target duration and shrink when slow."""
+        tuner = self.tuner()
+        self.assertEqual(tuner.size, 10000)
+        # 50000 rows/s: one second is 50000 rows, reached in two doublings
+        self.assertEqual(tuner.record(10000, 0.2, 0.01), 20000)
+        self.assertEqual(tuner.record(20000, 0.4, 0.01), 40000)
+        self.assertEqual(tuner.record(40000, 0.8, 0.01), 50000)
+        # Throughput drops to 10000 rows/s
+        self.assertEqual(tuner.record(50000, 5.0, 0.01), 30000)
+        # A short final batch keeps the size
+        self.assertEqual(tuner.record(500, 0.05, 0.01), 30000)
+        self.assertEqual(len(tuner.timeline), 5)
+        self.assertEqual(tuner.timeline[0], {
+            "rows": 10000, "seconds": 0.2, "commit_seconds": 0.01, "rows_per_second": 50000.0, "next_size": 20000
+        })
+
+    def test_commit_ceiling_and_bounds(self):
+        """Test slow commits halve the size and sizes stay within bounds."""
+        tuner = self.tuner()
+        self.assertEqual(tuner.record(10000, 0.1, 3.0), 5000)
+        for _ in range(10):
+            tuner.record(tuner.size, 60.0, 3.0)
+        self.assertEqual(tuner.size, 100)
+        for _ in range(20):
+            tuner.record(tuner.size, 0.001, 0.0)
+        self.assertEqual(tuner.size, 100000)
+
+    def test_size_persisted_per_backend(self):
+        """Test the learned size is stored and used as the next starting point."""
+        self.assertIsNone(get_tuned_batch_size(self.engine))
+        tuner = self.tuner()
+        tuner.save()
+        self.assertIsNone(get_tuned_batch_size(self.engine))
+
+        tuner.record(10000, 0.5, 0.1)
+        tuner.save()
+        self.assertEqual(get_tuned_batch_size(self.engine), 20000)
+        self.assertEqual(self.tuner().size, 20000)
+
+        save_tuned_batch_size(self.engine, 7000)
+        self.assertEqual(self.tuner().size, 7000)
+
+if __name__ == '__main__':
+    unittest.main()
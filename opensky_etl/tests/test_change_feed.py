@@ -0,0 +1,95 @@
+"""
+Unit tests for the change_feed module.
+"""
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from change_feed import (
+    ack, append_changes, get_offset, purge_changes, read_changes, read_pending, sequence_changes
+)
+
+class TestChangeFeed(unittest.TestCase):
+    """Test cases for the change_feed module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.engine = create_engine("sqlite://")
+        create_schema(self.engine)
+        self.flights = pd.DataFrame({
+            'icao24': ['abc123', 'def456', 'ghi789'],
+            'firstSeen': [1000, 2000, 3000],
+            'lastSeen': [4600, 5600, 6600],
+            'estDepartureAirport': ['EDDF', 'LFPG', None],
+            'row_hash': ['h1', 'h2', 'h3'],
+            'route_id': [1, 2, None]
+        })
+
+    def append(self, inserted, revised=None):
+        """Append changes in a committed session."""
+        session = sessionmaker(bind=self.engine)()
+        count = append_changes(session, inserted, revised)
+        session.commit()
+        session.close()
+        return count
+
+    def test_append_and_read(self):
+        """Test changes are read in offset order without internal columns."""
+        revised = self.flights.iloc[:1].assign(lastSeen=4700, id=7, stored_hash='h0')
+        self.assertEqual(self.append(self.flights.iloc[1:], revised), 3)
+        self.assertEqual(self.append(pd.DataFrame()), 0)
+
+        changes = read_changes(self.engine)
+        self.assertEqual(changes['offset'].tolist(), [1, 2, 3])
+        self.assertEqual(changes['change'].tolist(), ['insert', 'insert', 'update'])
+        self.assertEqual(changes['icao24'].tolist(), ['def456', 'ghi789', 'abc123'])
+        self.assertEqual(changes['lastSeen'].tolist(), [5600, 6600, 4700])
+        self.assertTrue(pd.isna(changes['estDepartureAirport'][1]))
+        for column in ('row_hash', 'route_id', 'id', 'stored_hash'):
+            self.assertNotIn(column, changes.columns)
+
+        self.assertEqual(read_changes(self.engine, after_offset=1, limit=1)['offset'].tolist(), [2])
+        self.assertTrue(read_changes(self.engine, after_offset=3).empty)
+
+    def test_consumer_offsets(self):
+        """Test consumers resume after their acknowledged offset, which never moves back."""
+        self.append(self.flights)
+        self.assertEqual(get_offset(self.engine, "search"), 0)
+        self.assertEqual(len(read_pending(self.engine, "search")), 3)
+
+        ack(self.engine, "search", 2)
+        ack(self.engine, "search", 1)
+        self.assertEqual(get_offset(self.engine, "search"), 2)
+        self.assertEqual(read_pending(self.engine, "search")['offset'].tolist(), [3])
+
+    def test_purge_keeps_unacknowledged(self):
+        """Test only changes acknowledged by every consumer are purged."""
+        self.append(self.flights)
+        self.assertEqual(purge_changes(self.engine), 0)
+
+        ack(self.engine, "search", 3)
+        ack(self.engine, "warehouse", 1)
+        self.assertEqual(purge_changes(self.engine), 1)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT MIN(feed_offset) FROM flight_changes")).scalar(), 2)
+        self.assertEqual(read_pending(self.engine, "warehouse")['offset'].tolist(), [2, 3])
+
+    def test_legacy_changes_keep_row_ids(self):
+        """Test changes written without an offset are numbered by row id before being read."""
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO flight_changes (id, change, payload, loaded_at) VALUES "
+                "(1, 'insert', '{\"icao24\": \"abc123\"}', 0), (2, 'insert', '{\"icao24\": \"def456\"}', 0)"
+            ))
+        self.assertEqual(sequence_changes(self.engine), 2)
+        self.assertEqual(sequence_changes(self.engine), 0)
+
+        self.append(self.flights.iloc[2:])
+        changes = read_changes(self.engine)
+        self.assertEqual(changes['offset'].tolist(), [1, 2, 3])
+        self.assertEqual(changes['icao24'].tolist(), ['abc123', 'def456', 'ghi789'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Unit tests for the dimensions module.
+"""
+import unittest
+import pandas as pd
+from sqlalchemy import create_engine, inspect, text
+
+from connections.postgresql import create_schema, migrate_legacy_flight_data, LEGACY_BACKUP_TABLE, Aircraft, Airport
+from dimensions import DimensionCache, get_dimension_caches, resolve_flight_keys
+
+class TestDimensions(unittest.TestCase):
+    """Test cases for the dimensions module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.engine = create_engine("sqlite://")
+        create_schema(self.engine)
+        self.df = pd.DataFrame({
+            'icao24': ['abc123', 'def456', 'abc123'],
+            'estDepartureAirport': ['EDDF', 'LFPG', None],
+            'estArrivalAirport': ['LFPG', 'EDDF', 'EGLL']
+        }, index=[10, 11, 12])
+
+    def count(self, table):
+        """Count the rows of a table."""
+        with self.engine.connect() as conn:
+            return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+    def test_resolve_inserts_unknown_codes_once(self):
+        """Test codes are inserted once and then served from the cache."""
+        cache = DimensionCache(Airport, 'code')
+        keys = cache.resolve(self.engine, pd.Series(['EDDF', None, 'LFPG', 'EDDF']))
+
+        self.assertEqual(keys[0], keys[3])
+        self.assertNotEqual(keys[0], keys[2])
+        self.assertTrue(pd.isna(keys[1]))
+        self.assertEqual(self.count('airports'), 2)
+
+        # A fresh cache finds the stored keys instead of inserting duplicates
+        other = DimensionCache(Airport, 'code')
+        self.assertEqual(list(other.resolve(self.engine, pd.Series(['LFPG', 'EDDF']))), [keys[2], keys[0]])
+        self.assertEqual(self.count('airports'), 2)
+
+    def test_resolve_flight_keys(self):
+        """Test flights resolve to aircraft, airport and route keys."""
+        keys = resolve_flight_keys(self.df, self.engine)
+
+        self.assertEqual(list(keys.index), [10, 11, 12])
+        self.assertEqual(keys.loc[10, 'aircraft_id'], keys.loc[12, 'aircraft_id'])
+        self.assertEqual(keys.loc[10, 'departure_airport_id'], keys.loc[11, 'arrival_airport_id'])
+        self.assertTrue(pd.isna(keys.loc[12, 'route_id']))
+        self.assertEqual((self.count('aircraft'), self.count('airports'), self.count('routes')), (2, 3, 2))
+
+        with self.engine.connect() as conn:
+            route = conn.execute(text(
+                "SELECT departure_airport_id, arrival_airport_id FROM routes WHERE code = 'LFPG-EDDF'"
+            )).fetchone()
+        self.assertEqual(tuple(route), (keys.loc[11, 'departure_airport_id'], keys.loc[11, 'arrival_airport_id']))
+
+    def test_routes_resolve_by_airports(self):
+        """Test a route is found by its airports when its stored code has another format."""
+        keys = resolve_flight_keys(self.df, self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text("UPDATE routes SET code = 'EDDF>LFPG' WHERE code = 'EDDF-LFPG'"))
+
+        # Another process, whose flights carry the new code format
+        get_dimension_caches(self.engine)['routes'].keys.clear()
+        renamed = resolve_flight_keys(self.df.assign(airport_pair=['EDDF-LFPG', 'LFPG-EDDF', None]), self.engine)
+        self.assertEqual(renamed.loc[10, 'route_id'], keys.loc[10, 'route_id'])
+        self.assertEqual(self.count('routes'), 2)
+
+    def test_resolve_flight_keys_stores_registry_metadata(self):
+        """Test registry columns of enriched flights are stored on new aircraft."""
+        enriched = self.df.assign(registration=['D-AIBD', None, 'D-AIBD'], operator=['Lufthansa', None, 'Lufthansa'])
+        resolve_flight_keys(enriched, self.engine)
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT icao24, registration, operator FROM aircraft ORDER BY icao24")).fetchall()
+        self.assertEqual([tuple(row) for row in rows], [('abc123', 'D-AIBD', 'Lufthansa'), ('def456', None, None)])
+
+    def test_registry_updates_stored_aircraft(self):
+        """Test aircraft stored before enrichment get registry columns, and registry changes are applied."""
+        resolve_flight_keys(self.df, self.engine)
+        enriched = self.df.assign(registration=['D-AIBD', None, 'D-AIBD'], operator=['Lufthansa', None, 'Lufthansa'])
+        resolve_flight_keys(enriched, self.engine)
+        resolve_flight_keys(enriched.assign(operator=['Lufthansa Cargo', None, 'Lufthansa Cargo']), self.engine)
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT icao24, registration, operator FROM aircraft ORDER BY icao24")).fetchall()
+        self.assertEqual([tuple(row) for row in rows], [('abc123', 'D-AIBD', 'Lufthansa Cargo'), ('def456', None, None)])
+
+        # Values already written are not written again
+        cache = DimensionCache(Aircraft, 'icao24')
+        attributes = {'abc123': {'registration': 'D-AIBD', 'operator': 'Lufthansa'}}
+        self.assertEqual(cache.store_attributes(self.engine, attributes), 1)
+        self.assertEqual(cache.store_attributes(self.engine, attributes), 0)
+
+    def test_migrate_legacy_flight_data(self):
+        """Test a table with code columns is migrated to dimension keys."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.execute(text(
+                'CREATE TABLE flight_data (id INTEGER PRIMARY KEY, icao24 VARCHAR(24), "firstSeen" INTEGER, '
+                '"estDepartureAirport" VARCHAR(4), "lastSeen" INTEGER, "estArrivalAirport" VARCHAR(4), '
+                'callsign VARCHAR(8), airport_pair VARCHAR(10))'
+            ))
+            conn.execute(text('CREATE INDEX ix_flight_data_natural_key ON flight_data (icao24, "firstSeen")'))
+            conn.execute(text(
+                "INSERT INTO flight_data VALUES (1, 'abc123', 100, 'EDDF', 200, 'LFPG', 'DLH1', 'EDDF-LFPG'), "
+                "(2, 'def456', 150, NULL, 250, 'EDDF', 'AFR2', NULL)"
+            ))
+            conn.execute(text("CREATE VIEW airport_departures AS SELECT \"estDepartureAirport\" FROM flight_data"))
+
+        # Connecting does not drop the code columns
+        create_schema(engine)
+        self.assertIn('icao24', {column['name'] for column in inspect(engine).get_columns('flight_data')})
+
+        self.assertTrue(migrate_legacy_flight_data(engine))
+        create_schema(engine)
+
+        columns = {column['name'] for column in inspect(engine).get_columns('flight_data')}
+        self.assertNotIn('icao24', columns)
+        self.assertNotIn('airport_pair', columns)
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                'SELECT id, icao24, "estDepartureAirport", "estArrivalAirport", airport_pair, callsign '
+                'FROM flights ORDER BY id'
+            )).fetchall()
+        self.assertEqual([tuple(row) for row in rows], [
+            (1, 'abc123', 'EDDF', 'LFPG', 'EDDF-LFPG', 'DLH1'),
+            (2, 'def456', None, 'EDDF', None, 'AFR2')
+        ])
+        with engine.connect() as conn:
+            backup = conn.execute(text(f'SELECT id, icao24, airport_pair FROM {LEGACY_BACKUP_TABLE} ORDER BY id')).fetchall()
+        self.assertEqual([tuple(row) for row in backup], [(1, 'abc123', 'EDDF-LFPG'), (2, 'def456', None)])
+        self.assertFalse(migrate_legacy_flight_data(engine))
+
+        # Loads after the migration reuse the migrated keys
+        keys = resolve_flight_keys(pd.DataFrame({
+            'icao24': ['abc123'], 'estDepartureAirport': ['EDDF'], 'estArrivalAirport': ['LFPG']
+        }), engine)
+        with engine.connect() as conn:
+            stored = conn.execute(text("SELECT aircraft_id, route_id FROM flight_data WHERE id = 1")).fetchone()
+        self.assertEqual(tuple(stored), (keys.loc[0, 'aircraft_id'], keys.loc[0, 'route_id']))
+
+if __name__ == '__main__':
+    unittest.main()
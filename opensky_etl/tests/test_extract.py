@@ -6,7 +6,10 @@ from unittest.mock import patch, MagicMock
 import pandas as pd
 from datetime import datetime, timezone
 
-from extract import extract_flight_data, extract_incremental_data
+from extract import (
+    extract_flight_data, extract_incremental_data, choose_extraction_strategy,
+    fetch_windows, next_window_size
+)
 
 class TestExtract(unittest.TestCase):
     """Test cases for the extract module."""
@@ -93,6 +96,121 @@ class TestExtract(unittest.TestCase):
         # Assertions
         self.assertIsInstance(df, pd.DataFrame)
         self.assertTrue(df.empty)
+    
+    def test_choose_extraction_strategy(self):
+        """Test picking the extraction strategy from the estimated payload."""
+        start, end = 1614556800, 1614556800 + 86400
+        
+        self.assertEqual(choose_extraction_strategy(start, end, [], "auto"), "global")
+        self.assertEqual(choose_extraction_strategy(start, end, ["EDDF", "LFPG"], "auto"), "targeted")
+        self.assertEqual(choose_extraction_strategy(start, end, ["EDDF"] * 1000, "auto"), "global")
+        self.assertEqual(choose_extraction_strategy(start, end, ["EDDF"], "global"), "global")
+        self.assertEqual(choose_extraction_strategy(start, end, ["EDDF"] * 1000, "targeted"), "targeted")
+    
+    @patch('extract.OPENSKY_PASSWORD', 'secret')
+    @patch('extract.OPENSKY_USERNAME', 'user')
+    @patch('extract.requests.get')
+    def test_extract_flight_data_targeted(self, mock_get):
+        """Test per-airport extraction merges and deduplicates flights."""
+        shared_flight = {
+            "icao24": "abc123", "firstSeen": 1614556800, "lastSeen": 1614567600,
+            "estDepartureAirport": "EDDF", "estArrivalAirport": "LFPG"
+        }
+        other_flight = {
+            "icao24": "def456", "firstSeen": 1614557800, "lastSeen": 1614568600,
+            "estDepartureAirport": "EGLL", "estArrivalAirport": "LFPG"
+        }
+        
+        def side_effect(url, auth):
+            response = MagicMock()
+            response.status_code = 200
+            if "departure?airport=EDDF" in url or "arrival?airport=LFPG" in url:
+                response.json.return_value = [dict(shared_flight), dict(other_flight)]
+            else:
+                response.json.return_value = []
+            return response
+        
+        mock_get.side_effect = side_effect
+        
+        df = extract_flight_data(
+            start_time=1614556800,
+            end_time=1614567600,
+            airports=["EDDF", "LFPG"],
+            mode="targeted"
+        )
+        
+        # Four endpoint calls (2 airports x departure/arrival), duplicates removed
+        self.assertEqual(mock_get.call_count, 4)
+        self.assertEqual(len(df), 2)
+        self.assertEqual(sorted(df['icao24']), ['abc123', 'def456'])
+        self.assertEqual(df.attrs['extract_stats']['strategy'], 'targeted')
+        self.assertEqual(df.attrs['extract_stats']['flights_fetched'], 4)
+    
+    @patch('extract.OPENSKY_PASSWORD', 'secret')
+    @patch('extract.OPENSKY_USERNAME', 'user')
+    @patch('extract.requests.get')
+    def test_extract_flight_data_global_filters_airports(self, mock_get):
+        """Test the global strategy keeps only flights touching tracked airports."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = [
+            {"icao24": "abc123", "firstSeen": 1, "lastSeen": 2,
+             "estDepartureAirport": "EDDF", "estArrivalAirport": "LFPG"},
+            {"icao24": "def456", "firstSeen": 3, "lastSeen": 4,
+             "estDepartureAirport": "KJFK", "estArrivalAirport": "KLAX"}
+        ]
+        mock_get.return_value = mock_response
+        
+        df = extract_flight_data(
+            start_time=1614556800,
+            end_time=1614560400,
+            airports=["EDDF"],
+            mode="global"
+        )
+        
+        self.assertEqual(list(df['icao24']), ['abc123'])
+        self.assertEqual(df.attrs['extract_stats']['strategy'], 'global')
+    
+    def test_next_window_size(self):
+        """Test adaptive window sizing from payload and latency."""
+        # Oversized payload shrinks the window, bounded by a factor of four
+        self.assertEqual(next_window_size(7200, 10000, 1.0, 7200), 3600)
+        self.assertEqual(next_window_size(7200, 100000, 1.0, 7200), 1800)
+        # Slow responses shrink the window as well
+        self.assertEqual(next_window_size(7200, 10, 40.0, 7200), 1800)
+        # Sparse windows grow but never beyond the API limit
+        self.assertEqual(next_window_size(1800, 10, 0.1, 7200), 3600)
+        self.assertEqual(next_window_size(7200, 10, 0.1, 7200), 7200)
+    
+    @patch('extract.fetch_flights')
+    def test_fetch_windows_splits_failed_windows(self, mock_fetch):
+        """Test failed windows are split and retried."""
+        def side_effect(url):
+            begin, end = [int(part.split('=')[1]) for part in url.split('?')[1].split('&')]
+            if end - begin > 3600:
+                return None, True
+            return [{"icao24": f"a{begin}"}], False
+        
+        mock_fetch.side_effect = side_effect
+        
+        flights, stats = fetch_windows("http://test?begin={begin}&end={end}", 0, 7200, 7200)
+        
+        self.assertEqual(len(flights), 2)
+        self.assertEqual(stats['window_splits'], 1)
+        self.assertEqual(stats['window_sizes'], [3600, 3600])
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['failed_windows'], 0)
+    
+    @patch('extract.fetch_flights')
+    def test_fetch_windows_counts_failed_windows(self, mock_fetch):
+        """Test windows failing with a client error are counted, not taken as empty."""
+        mock_fetch.side_effect = [(None, False), ([{"icao24": "a1"}], False), ([], False)]
+        
+        flights, stats = fetch_windows("http://test?begin={begin}&end={end}", 0, 3 * 3600, 3600)
+        
+        self.assertEqual(len(flights), 1)
+        self.assertEqual(stats['failed_windows'], 1)
+        self.assertEqual(stats['window_splits'], 0)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
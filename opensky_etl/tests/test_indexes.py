@@ -0,0 +1,98 @@
+"""
+Unit tests for the indexes module.
+"""
+import os
+import tempfile
+import unittest
+import pandas as pd
+from sqlalchemy import inspect
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine
+from indexes import MANAGED_INDEXES, build_indexes, index_ddl, index_usage_report
+from load import load_data_to_db, create_summary_views
+from transform import transform_flight_data
+
+HOUR = 3600
+
+class TestIndexes(unittest.TestCase):
+    """Test cases for the indexes module."""
+
+    def setUp(self):
+        """Load transformed flights into a SQLite file."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_sqlite_engine(os.path.join(self.directory.name, "flights.db"))
+        create_schema(self.engine)
+        first_seen = [hour * HOUR for hour in range(200)]
+        df = pd.DataFrame({
+            'icao24': [f"a{i:05d}" for i in range(200)],
+            'firstSeen': first_seen,
+            'lastSeen': [seen + 5400 + i * 60 for i, seen in enumerate(first_seen)],
+            'estDepartureAirport': ['EDDF', 'LFPG', 'EGLL', 'LEMD'] * 50,
+            'estArrivalAirport': ['LFPG', 'EDDF', 'LEMD', None] * 50,
+            'callsign': [f"DLH{i}" for i in range(200)],
+            'estDepartureAirportHorizDistance': [1000] * 200,
+            'estArrivalAirportHorizDistance': [2000] * 200
+        })
+        session = sessionmaker(bind=self.engine)()
+        load_data_to_db(transform_flight_data(df, None), self.engine, session)
+        session.close()
+        create_summary_views(self.engine)
+
+    def tearDown(self):
+        """Remove the database."""
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_index_ddl(self):
+        """Test covered columns are INCLUDEd on PostgreSQL and appended to the key on SQLite."""
+        index = {
+            "name": "ix_test", "table": "flight_data", "columns": ["route_id", "firstSeen"],
+            "include": ["lastSeen"], "where": "route_id IS NOT NULL"
+        }
+        self.assertEqual(index_ddl(index, "postgresql", concurrently=True),
+                         'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_test ON flight_data ("route_id", "firstSeen") '
+                         'INCLUDE ("lastSeen") WHERE route_id IS NOT NULL')
+        self.assertEqual(index_ddl(index, "sqlite"),
+                         'CREATE INDEX IF NOT EXISTS ix_test ON flight_data ("route_id", "firstSeen", "lastSeen") '
+                         'WHERE route_id IS NOT NULL')
+
+    def test_build_indexes_once(self):
+        """Test missing indexes are built, present ones are left alone and failures are counted."""
+        stats = {}
+        self.assertTrue(build_indexes(self.engine, stats=stats))
+        self.assertEqual((stats['built'], stats['existing']), (len(MANAGED_INDEXES), 0))
+        names = {index['name'] for index in inspect(self.engine).get_indexes('flight_data')}
+        self.assertTrue({index['name'] for index in MANAGED_INDEXES} <= names)
+
+        stats = {}
+        self.assertTrue(build_indexes(self.engine, stats=stats))
+        self.assertEqual((stats['built'], stats['existing']), (0, len(MANAGED_INDEXES)))
+
+        broken = [{
+            "name": "ix_broken", "table": "missing_table", "columns": ["firstSeen"], "include": [], "where": None
+        }]
+        self.assertFalse(build_indexes(self.engine, indexes=broken, stats=stats))
+        self.assertEqual(stats['failed'], 1)
+
+    def test_usage_report(self):
+        """Test queries are mapped to the indexes their plans use."""
+        report = index_usage_report(self.engine)
+        self.assertEqual(report['unused'], [index['name'] for index in MANAGED_INDEXES])
+
+        build_indexes(self.engine)
+        report = index_usage_report(self.engine)
+        self.assertIn('ix_flight_data_last_first_seen', report['queries']['intervals.query_airborne']['indexes'])
+        self.assertIn('intervals.query_airborne', report['indexes']['ix_flight_data_last_first_seen'])
+        self.assertIn('ix_flight_data_firstSeen', report['queries']['load.fetch_stored_hashes']['indexes'])
+        self.assertIn('ix_flight_data_firstSeen', report['queries']['archive.read_flights']['indexes'])
+        self.assertEqual(report['unused'], [])
+        self.assertEqual(report['queries']['analytics.daily_counts']['indexes'], [])
+        self.assertTrue(report['queries']['analytics.daily_counts']['scans'])
+
+        report = index_usage_report(self.engine, queries={"broken": "SELECT * FROM missing_table"})
+        self.assertIn('error', report['queries']['broken'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Unit tests for the intervals module.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from intervals import AirborneIndex, airborne_flights, query_airborne
+from load import load_data_to_db
+
+class TestIntervals(unittest.TestCase):
+    """Test cases for the intervals module."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        self.df = pd.DataFrame({
+            'icao24': ['abc123', 'def456', 'aaa111', 'bbb222'],
+            'firstSeen': [1000, 1500, 5000, 100],
+            'lastSeen': [2000, 1600, 90000, None],
+            'estDepartureAirport': ['EDDF', 'LFPG', 'KJFK', 'EGLL'],
+            'estArrivalAirport': ['LFPG', 'EDDF', 'RJTT', 'EDDF'],
+            'callsign': ['DLH123', 'AFR456', 'JAL001', 'BAW1']
+        })
+    
+    def test_overlapping_matches_naive_predicate(self):
+        """Test index results equal the naive predicate on random intervals."""
+        rng = np.random.default_rng(0)
+        starts = rng.integers(0, 100000, 5000)
+        ends = starts + rng.integers(0, 50000, 5000)
+        index = AirborneIndex(starts, ends)
+        
+        for start in rng.integers(0, 150000, 50):
+            end = start + int(rng.integers(0, 5000))
+            expected = np.flatnonzero((starts <= end) & (ends >= start))
+            np.testing.assert_array_equal(index.overlapping(start, end), expected)
+    
+    def test_airborne_flights(self):
+        """Test selecting airborne flights from a DataFrame."""
+        self.assertEqual(list(airborne_flights(self.df, 1550)['icao24']), ['abc123', 'def456'])
+        self.assertEqual(list(airborne_flights(self.df, 1700, 6000)['icao24']), ['abc123', 'aaa111'])
+        self.assertTrue(airborne_flights(self.df, 100000).empty)
+    
+    def test_query_airborne(self):
+        """Test the SQL interval query."""
+        engine = create_engine("sqlite://")
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+        load_data_to_db(self.df.dropna(), engine, session)
+        
+        result = query_airborne(engine, 1550)
+        self.assertEqual(list(result['icao24']), ['abc123', 'def456'])
+        self.assertEqual(len(query_airborne(engine, 0, 100000, limit=2)), 2)
+        session.close()
+
+if __name__ == '__main__':
+    unittest.main()
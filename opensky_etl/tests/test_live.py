@@ -0,0 +1,103 @@
+"""
+Unit tests for the live state-vector ingestion.
+"""
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from connections.postgresql import Base
+from live import fetch_states, PositionRingBuffer, load_positions, STATE_COLUMNS
+
+def make_states(time, count, offset=0.0):
+    """Build a /states/all payload with `count` aircraft."""
+    return {
+        "time": time,
+        "states": [
+            [f"{i:06x}", f"CS{i}", "Germany", time, time, 8.5 + offset, 50.0 + i * 1e-4,
+             10000.0, False, 230.0, 90.0, 0.0, None, 10100.0, None, False, 0]
+            for i in range(count)
+        ]
+    }
+
+class MockStatesHandler(BaseHTTPRequestHandler):
+    """Serves the payload stored on the server."""
+    
+    def do_GET(self):
+        body = json.dumps(self.server.payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+class TestLive(unittest.TestCase):
+    """Test cases for the live module."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Start a local mock of the states endpoint."""
+        cls.server = HTTPServer(("127.0.0.1", 0), MockStatesHandler)
+        cls.server.payload = make_states(1700000000, 3)
+        cls.api_url = f"http://127.0.0.1:{cls.server.server_port}/api"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+    
+    def test_fetch_states_from_mock_endpoint(self):
+        """Test parsing state vectors from a local endpoint."""
+        df = fetch_states(self.api_url)
+        
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df.iloc[0]['icao24'], '000000')
+        self.assertEqual(df.iloc[2]['latitude'], 50.0002)
+    
+    def test_ring_buffer_wraps_and_evicts(self):
+        """Test the buffer keeps a fixed window per aircraft and recycles rows."""
+        buffer = PositionRingBuffer(max_aircraft=4, window=30, poll_interval=10)
+        allocated = buffer.nbytes()
+        
+        for poll in range(5):
+            payload = make_states(1000 + poll * 10, 3, offset=poll)
+            buffer.append(pd.DataFrame(payload["states"], columns=STATE_COLUMNS))
+        
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.nbytes(), allocated)
+        # Only the last three samples of each aircraft survive
+        snapshot = buffer.snapshot(0, 1)
+        self.assertEqual(sorted(snapshot[snapshot['icao24'] == '000000']['time']), [1020, 1030, 1040])
+        latest = buffer.latest()
+        self.assertTrue((latest['longitude'] == np.float32(12.5)).all())
+        
+        # Downsampling keeps the latest sample per step
+        self.assertEqual(len(buffer.snapshot(0, 60)), 3)
+        
+        # New aircraft beyond capacity are dropped, stale ones are evicted
+        extra = fetch_states(self.api_url).assign(icao24=['x1', 'x2', 'x3'])
+        buffer.append(extra)
+        self.assertEqual(buffer.dropped, 2)
+        self.assertEqual(buffer.evict(1000 + 40 + 31), 3)
+        self.assertEqual(len(buffer), 1)
+    
+    def test_load_positions(self):
+        """Test flushing a snapshot to the database."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        buffer = PositionRingBuffer(max_aircraft=10, window=60, poll_interval=10)
+        buffer.append(fetch_states(self.api_url))
+        
+        self.assertEqual(load_positions(buffer.snapshot(0, 60), engine), 3)
+        with engine.connect() as conn:
+            count = conn.execute(text("SELECT COUNT(*) FROM aircraft_positions")).scalar()
+        self.assertEqual(count, 3)
+
+if __name__ == '__main__':
+    unittest.main()
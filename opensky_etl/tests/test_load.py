@@ -5,8 +5,11 @@ import unittest
 from unittest.mock import patch, MagicMock, call
 import pandas as pd
 
-from  load import load_data_to_db, create_or_replace_view, create_summary_views
-from connections.postgresql import FlightData
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from  load import load_data_to_db, create_or_replace_view, create_summary_views, compute_row_hashes
+from connections.postgresql import create_schema, FlightData
 
 class TestLoad(unittest.TestCase):
     """Test cases for the load module."""
@@ -122,6 +125,69 @@ class TestLoad(unittest.TestCase):
         # Assertions
         self.assertTrue(result)
         self.assertEqual(mock_create_view.call_count, 2)  # Two views should be created
+    
+    def test_compute_row_hashes(self):
+        """Test row hashes ignore dtype differences and detect revisions."""
+        hashes = compute_row_hashes(self.df)
+        
+        # Same content with nullable columns promoted to float hashes the same
+        promoted = self.df.astype({'estArrivalAirportHorizDistance': 'float64'})
+        self.assertTrue((compute_row_hashes(promoted) == hashes).all())
+        
+        revised = self.df.copy()
+        revised.loc[1, 'lastSeen'] += 60
+        revised_hashes = compute_row_hashes(revised)
+        self.assertEqual(revised_hashes[0], hashes[0])
+        self.assertNotEqual(revised_hashes[1], hashes[1])
+    
+    def test_load_data_to_db_reconcile(self):
+        """Test reconciliation inserts new rows and updates only revised ones."""
+        engine = create_engine("sqlite://")
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+        
+        self.assertEqual(load_data_to_db(self.df.copy(), engine, session), 2)
+        
+        revised = self.df.copy()
+        revised.loc[1, 'lastSeen'] += 600
+        revised.loc[1, 'estArrivalAirport'] = 'EDDM'
+        stats = {}
+        result = load_data_to_db(revised, engine, session, reconcile=True, stats=stats)
+        
+        self.assertEqual(result, 1)
+        self.assertEqual(stats, {"inserted": 0, "revised": 1, "unchanged": 1, "archived_revisions": 0, "outliers": 0})
+        rows = session.query(FlightData).order_by(FlightData.id).all()
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1].lastSeen, 1614568600 + 600)
+        with engine.connect() as conn:
+            arrival = conn.execute(text('SELECT "estArrivalAirport" FROM flights WHERE id = :id'), {"id": rows[1].id}).scalar()
+        self.assertEqual(arrival, 'EDDM')
+        session.close()
+
+    def test_failed_load_keys_are_reused(self):
+        """Test dimension rows of a failed load are reused by the retry."""
+        engine = create_engine("sqlite://")
+        create_schema(engine)
+        session = sessionmaker(bind=engine)()
+        
+        with patch('opensky_etl.load.update_route_stats', side_effect=RuntimeError("boom")):
+            self.assertEqual(load_data_to_db(self.df.copy(), engine, session), 0)
+        with engine.connect() as conn:
+            counts = [conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+                      for table in ('flight_data', 'aircraft', 'airports', 'routes')]
+        self.assertEqual(counts[0], 0)
+        
+        self.assertEqual(load_data_to_db(self.df.copy(), engine, session), 2)
+        with engine.connect() as conn:
+            self.assertEqual([conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+                              for table in ('aircraft', 'airports', 'routes')], counts[1:])
+            orphans = conn.execute(text(
+                "SELECT COUNT(*) FROM airports WHERE id NOT IN (SELECT departure_airport_id FROM flight_data "
+                "WHERE departure_airport_id IS NOT NULL UNION SELECT arrival_airport_id FROM flight_data "
+                "WHERE arrival_airport_id IS NOT NULL)"
+            )).scalar()
+        self.assertEqual(orphans, 0)
+        session.close()
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
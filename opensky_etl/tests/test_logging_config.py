@@ -0,0 +1,100 @@
+"""
+Unit tests for the logging configuration.
+"""
+import glob
+import json
+import logging
+import os
+import queue
+import tempfile
+import unittest
+
+from utils.logging_config import (
+    ContextFilter, JsonFormatter, NonBlockingQueueHandler, RateLimitFilter,
+    get_logger, log_context, setup_logging, stop_logging
+)
+
+def make_record(msg, *args, level=logging.INFO, name="opensky_etl.test"):
+    """Create a log record."""
+    return logging.LogRecord(name, level, __file__, 1, msg, args, None)
+
+class TestLoggingConfig(unittest.TestCase):
+    """Test cases for the logging configuration."""
+
+    def test_json_records_carry_context(self):
+        """Test records are formatted as JSON with the bound context fields."""
+        record = make_record("Retrieved %d flights", 42)
+        with log_context(run="r1", stage="extract"):
+            with log_context(window="0-3600"):
+                ContextFilter().filter(record)
+            outside = make_record("Done")
+            ContextFilter().filter(outside)
+
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["message"], "Retrieved 42 flights")
+        self.assertEqual((entry["run"], entry["stage"], entry["window"]), ("r1", "extract", "0-3600"))
+        self.assertNotIn("window", json.loads(JsonFormatter().format(outside)))
+
+    def test_rate_limit(self):
+        """Test repeats of a template are suppressed, counted, and errors always pass."""
+        rate_limit = RateLimitFilter(interval=60, burst=2)
+        passed = [rate_limit.filter(make_record("Window %d", i)) for i in range(5)]
+        self.assertEqual(passed, [True, True, False, False, False])
+        self.assertTrue(rate_limit.filter(make_record("Other %d", 1)))
+        self.assertTrue(rate_limit.filter(make_record("Window %d", 9, level=logging.ERROR)))
+
+        # The first record of the next interval reports the suppressed ones
+        for window in rate_limit.windows.values():
+            window[0] -= 60
+        record = make_record("Window %d", 10)
+        self.assertTrue(rate_limit.filter(record))
+        self.assertEqual(record.suppressed, 3)
+
+    def test_rate_limit_prunes_windows(self):
+        """Test expired windows are dropped unless they hold suppressed records."""
+        rate_limit = RateLimitFilter(interval=60, burst=1)
+        for i in range(100):
+            rate_limit.filter(make_record(f"Unit {i} failed"))
+        rate_limit.filter(make_record("Window %d", 1))
+        rate_limit.filter(make_record("Window %d", 2))
+        self.assertEqual(len(rate_limit.windows), 101)
+
+        for window in rate_limit.windows.values():
+            window[0] -= 60
+        rate_limit.pruned -= 60
+        rate_limit.filter(make_record("Other %d", 1))
+        self.assertEqual(len(rate_limit.windows), 2)
+        record = make_record("Window %d", 3)
+        self.assertTrue(rate_limit.filter(record))
+        self.assertEqual(record.suppressed, 1)
+
+    def test_queue_handler_never_blocks(self):
+        """Test records are queued unformatted and dropped when the queue is full."""
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        payload = ["abc123"]
+        handler.handle(make_record("Payload %s", payload))
+        handler.handle(make_record("Payload %s", payload))
+        self.assertEqual(handler.dropped, 1)
+        self.assertIs(handler.queue.get_nowait().args[0], payload)
+
+    def test_setup_logging_writes_json_file(self):
+        """Test module loggers are written to the log file by the background thread."""
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                setup_logging(name="opensky_etl.test_setup")
+                with log_context(run="r2"):
+                    get_logger("test_setup.module").info("Loaded %d records", 7)
+                stop_logging()
+                with open(glob.glob("logs/*.log")[0]) as log_file:
+                    entry = json.loads(log_file.readline())
+            finally:
+                logging.getLogger("opensky_etl.test_setup").handlers.clear()
+                os.chdir(cwd)
+        self.assertEqual(entry["message"], "Loaded 7 records")
+        self.assertEqual(entry["run"], "r2")
+        self.assertEqual(entry["logger"], "opensky_etl.test_setup.module")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Unit tests for the memory module.
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from memory import MemoryGovernor, estimate_frame_bytes
+
+class TestMemory(unittest.TestCase):
+    """Test cases for the memory module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        count = 10000
+        self.df = pd.DataFrame({
+            'icao24': pd.Series([f"{i:06x}" for i in range(count)], dtype=object),
+            'firstSeen': np.arange(count, dtype='int64'),
+            'lastSeen': np.arange(count, dtype='int64') + 3600,
+            'callsign': pd.Series([f"DLH{i}" if i % 3 else None for i in range(count)], dtype=object),
+            'flight_duration_minutes': np.full(count, 60.0)
+        })
+
+    def tearDown(self):
+        """Remove the spill directory."""
+        self.directory.cleanup()
+
+    def test_estimate_frame_bytes(self):
+        """Test the estimate is close to the deep memory usage."""
+        actual = self.df.memory_usage(index=True, deep=True).sum()
+        self.assertAlmostEqual(estimate_frame_bytes(self.df) / actual, 1.0, delta=0.1)
+        self.assertEqual(estimate_frame_bytes(self.df.head(0)), self.df.head(0).memory_usage(index=True).sum())
+
+    def test_batches_within_budget_stay_in_memory(self):
+        """Test batches are queued in memory and released as they are drained."""
+        with MemoryGovernor(budget_bytes=10 ** 9, directory=self.directory.name) as governor:
+            governor.add_frame(self.df, 3000)
+            self.assertEqual(governor.stats['batches'], 4)
+            self.assertEqual(governor.stats['spilled_batches'], 0)
+            self.assertEqual(governor.stats['peak_bytes'], governor.held_bytes)
+            batches = list(governor.drain())
+            self.assertEqual(governor.held_bytes, 0)
+        pd.testing.assert_frame_equal(pd.concat(batches), self.df)
+
+    def test_spill_to_disk(self):
+        """Test batches beyond the budget are spilled, read back in order and cleaned up."""
+        # Room for the first two batches
+        budget = sum(estimate_frame_bytes(self.df.iloc[start:start + 2500].copy()) for start in (0, 2500))
+        with MemoryGovernor(budget_bytes=budget, directory=self.directory.name) as governor:
+            governor.add_frame(self.df, 2500)
+            stats = governor.stats
+            self.assertEqual((stats['batches'], stats['spilled_batches'], stats['spilled_rows']), (4, 2, 5000))
+            self.assertGreater(stats['spilled_bytes'], 0)
+            self.assertLessEqual(stats['peak_bytes'], budget)
+
+            drained = governor.drain()
+            first = next(drained)
+            pd.testing.assert_frame_equal(first, self.df.head(2500))
+        # Closing drops the remaining batches and the spill files
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+        with MemoryGovernor(budget_bytes=0, directory=self.directory.name) as governor:
+            governor.add_frame(self.df, 4000)
+            batches = list(governor.drain())
+        self.assertEqual([len(batch) for batch in batches], [4000, 4000, 2000])
+        # Text columns come back as strings with NaN for missing values
+        pd.testing.assert_frame_equal(
+            pd.concat(batches, ignore_index=True).astype(object).fillna(''), self.df.astype(object).fillna('')
+        )
+
+if __name__ == '__main__':
+    unittest.main()
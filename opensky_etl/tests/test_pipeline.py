@@ -128,6 +128,53 @@ class TestFlightDataPipeline(unittest.TestCase):
         # Verify pipeline stats
         stats = pipeline.get_stats()
         self.assertEqual(stats['records_processed'], 0)
+    
+    @patch('pipelines.flight_data_pipeline.get_db_connection')
+    @patch('pipelines.flight_data_pipeline.extract_flight_data')
+    @patch('pipelines.flight_data_pipeline.validate_flight_data')
+    @patch('pipelines.flight_data_pipeline.transform_flight_data')
+    @patch('pipelines.flight_data_pipeline.load_data_to_db')
+    @patch('pipelines.flight_data_pipeline.create_summary_views')
+    def test_pipeline_worker(
+        self, mock_create_views, mock_load, mock_transform,
+        mock_validate, mock_extract, mock_get_db
+    ):
+        """Test the worker processes leased units until the queue is empty."""
+        mock_get_db.return_value = (MagicMock(), MagicMock(), MagicMock())
+        partial_df = self.sample_df.copy()
+        partial_df.attrs["extract_stats"] = {"failed_windows": 1}
+        mock_extract.side_effect = [self.sample_df, RuntimeError("API down"), partial_df]
+        mock_validate.side_effect = lambda df, engine, stats: df
+        mock_transform.side_effect = lambda df, *args: df
+        mock_load.return_value = 2
+        
+        units = [
+            {'id': 1, 'unit_key': 'EDDF:0:7200', 'start_time': 0, 'end_time': 7200, 'airport': 'EDDF', 'attempts': 1},
+            {'id': 2, 'unit_key': '*:7200:14400', 'start_time': 7200, 'end_time': 14400, 'airport': None, 'attempts': 1},
+            {'id': 3, 'unit_key': '*:14400:21600', 'start_time': 14400, 'end_time': 21600, 'airport': None, 'attempts': 1}
+        ]
+        queue = MagicMock()
+        queue.lease.side_effect = [[units[0]], [units[1]], [units[2]], []]
+        queue.keep_alive.return_value.__enter__.return_value.is_set.return_value = False
+        
+        pipeline = FlightDataPipeline()
+        result = pipeline.run_worker(queue)
+        
+        # Failed units, including one with failed API windows, are released
+        # for another attempt
+        self.assertFalse(result)
+        mock_extract.assert_any_call(start_time=0, end_time=7200, airports=['EDDF'], mode="targeted")
+        mock_extract.assert_any_call(start_time=7200, end_time=14400, airports=None, mode=None)
+        self.assertTrue(mock_load.call_args.kwargs['reconcile'])
+        self.assertTrue(mock_load.call_args.kwargs['raise_errors'])
+        queue.complete.assert_called_once_with(units[0])
+        self.assertEqual([call.args[0] for call in queue.release.call_args_list], units[1:])
+        self.assertEqual(mock_load.call_count, 1)
+        
+        stats = pipeline.get_stats()
+        self.assertEqual(stats['records_processed'], 2)
+        self.assertEqual(stats['worker']['units_done'], 1)
+        self.assertEqual(stats['worker']['units_failed'], 2)
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""
+Unit tests for the query_cache module.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema, bump_load_watermark, get_load_watermark
+from query_cache import QueryCache, normalize_query
+
+class TestQueryCache(unittest.TestCase):
+    """Test cases for the query_cache module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.engine = create_engine("sqlite://")
+        create_schema(self.engine)
+        self.directory = tempfile.TemporaryDirectory()
+        self.loader = MagicMock(side_effect=lambda: pd.DataFrame({'n': [self.loader.call_count]}))
+
+    def tearDown(self):
+        """Remove the cache directory."""
+        self.directory.cleanup()
+
+    def bump(self):
+        """Simulate a load."""
+        session = sessionmaker(bind=self.engine)()
+        bump_load_watermark(session)
+        session.commit()
+        session.close()
+
+    def test_normalize_query(self):
+        """Test formatting differences share a key."""
+        self.assertEqual(normalize_query("SELECT *\n   FROM  flights "), "SELECT * FROM flights")
+
+    def test_watermark_invalidates(self):
+        """Test results are served from the cache until the next load."""
+        self.assertEqual(get_load_watermark(self.engine), 0)
+        cache = QueryCache(directory="")
+
+        first = cache.fetch(self.engine, "SELECT 1", {'limit': 5}, self.loader)
+        second = cache.fetch(self.engine, "SELECT  1", {'limit': 5}, self.loader)
+        self.assertEqual(self.loader.call_count, 1)
+        pd.testing.assert_frame_equal(first, second)
+
+        # Other parameters are another entry
+        cache.fetch(self.engine, "SELECT 1", {'limit': 6}, self.loader)
+        self.assertEqual(self.loader.call_count, 2)
+
+        self.bump()
+        self.bump()
+        self.assertEqual(get_load_watermark(self.engine), 2)
+        third = cache.fetch(self.engine, "SELECT 1", {'limit': 5}, self.loader)
+        self.assertEqual(self.loader.call_count, 3)
+        self.assertEqual(third['n'][0], 3)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 3, "hit_rate": 0.25, "entries": 3})
+
+    def test_lru_eviction(self):
+        """Test the least recently used entries are evicted in memory and on disk."""
+        cache = QueryCache(directory=self.directory.name, max_entries=2)
+        for query in ("a", "b", "a", "c"):
+            cache.fetch(self.engine, query, None, self.loader)
+
+        self.assertEqual(len(cache.entries), 2)
+        files = [name for name in os.listdir(self.directory.name) if name.endswith(".pkl")]
+        self.assertEqual(len(files), 2)
+
+        # "b" was evicted, "a" and "c" are still cached
+        cache.fetch(self.engine, "a", None, self.loader)
+        cache.fetch(self.engine, "c", None, self.loader)
+        self.assertEqual(self.loader.call_count, 3)
+        cache.fetch(self.engine, "b", None, self.loader)
+        self.assertEqual(self.loader.call_count, 4)
+
+    def test_disk_entries_shared_across_instances(self):
+        """Test separate processes share entries and hit-rate totals."""
+        cache = QueryCache(directory=self.directory.name)
+        cache.fetch(self.engine, "SELECT 1", None, self.loader)
+        self.assertEqual(cache.record_stats()["misses"], 1)
+
+        other = QueryCache(directory=self.directory.name)
+        result = other.fetch(self.engine, "SELECT 1", None, self.loader)
+        self.assertEqual(self.loader.call_count, 1)
+        self.assertEqual(result['n'][0], 1)
+        self.assertEqual(other.record_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5})
+
+    def test_bypass_without_watermark(self):
+        """Test databases without a watermark table are always queried."""
+        engine = create_engine("sqlite://")
+        cache = QueryCache(directory="")
+        cache.fetch(engine, "SELECT 1", None, self.loader)
+        cache.fetch(engine, "SELECT 1", None, self.loader)
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_read_sql(self):
+        """Test the cached pd.read_sql equivalent."""
+        cache = QueryCache(directory="")
+        df = cache.read_sql(self.engine, "SELECT COUNT(*) AS n FROM flight_data")
+        self.assertEqual(df['n'][0], 0)
+        self.assertIs(cache.read_sql(self.engine, "SELECT COUNT(*) AS n FROM flight_data").empty, False)
+        self.assertEqual(cache.hits, 1)
+
+if __name__ == '__main__':
+    unittest.main()
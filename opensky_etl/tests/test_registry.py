@@ -0,0 +1,73 @@
+"""
+Unit tests for the registry module.
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+
+from registry import AircraftRegistry, icao24_keys, get_registry
+
+class TestRegistry(unittest.TestCase):
+    """Test cases for the registry module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.directory.name, "aircraftDatabase.csv")
+        pd.DataFrame({
+            'icao24': ['3c6444', '4ca7b5', 'a0b1c2', 'not-hex', '3C6444'],
+            'registration': ['D-AIBD', 'EI-DPT', 'N12345', 'X', 'D-AIBE'],
+            'manufacturername': ['Airbus', 'Boeing', 'Cessna', '', 'Airbus'],
+            'typecode': ['A319', 'B738', '', 'C172', 'A319'],
+            'operator': ['Lufthansa', 'Ryanair', '', '', 'Lufthansa']
+        }).to_csv(self.csv_path, index=False)
+
+    def tearDown(self):
+        """Remove the temporary registry."""
+        self.directory.cleanup()
+
+    def test_icao24_keys(self):
+        """Test hex addresses are parsed and invalid ones flagged."""
+        keys, valid = icao24_keys(pd.Series(['3c6444', 'ABCDEF', None, '12345', '12345g', 'abcdef0']))
+        self.assertEqual(list(valid), [True, True, False, False, False, False])
+        self.assertEqual(list(keys[:2]), [0x3c6444, 0xabcdef])
+
+    def test_build_and_lookup(self):
+        """Test the index is built sorted and lookups align with the input."""
+        registry = AircraftRegistry.build(self.csv_path)
+
+        # Invalid and duplicate addresses dropped, the last duplicate wins
+        self.assertEqual(len(registry), 3)
+        self.assertTrue(np.all(np.diff(registry.keys.astype(np.int64)) > 0))
+        self.assertIsInstance(registry.keys, np.memmap)
+
+        result = registry.lookup(pd.Series(['a0b1c2', 'ffffff', '3c6444', None, '4CA7B5'], index=[5, 6, 7, 8, 9]))
+        self.assertEqual(list(result.index), [5, 6, 7, 8, 9])
+        self.assertEqual(list(result['registration']), ['N12345', None, 'D-AIBE', None, 'EI-DPT'])
+        self.assertEqual(list(result['aircraft_type']), [None, None, 'A319', None, 'B738'])
+        self.assertEqual(list(result['operator']), [None, None, 'Lufthansa', None, 'Ryanair'])
+        # Fields missing from the CSV are not reported
+        self.assertNotIn('aircraft_model', result.columns)
+
+    def test_open_rebuilds_stale_index(self):
+        """Test the index is reused until the CSV changes."""
+        registry = AircraftRegistry.open(self.csv_path)
+        self.assertEqual(AircraftRegistry.open(self.csv_path).meta, registry.meta)
+
+        with open(self.csv_path, "a") as f:
+            f.write("ffffff,G-ABCD,Airbus,A320,British Airways\n")
+        os.utime(self.csv_path, (0, registry.meta["source_mtime"] + 10))
+
+        rebuilt = AircraftRegistry.open(self.csv_path)
+        self.assertEqual(len(rebuilt), 4)
+        self.assertEqual(rebuilt.lookup(pd.Series(['ffffff']))['registration'][0], 'G-ABCD')
+
+    def test_get_registry_without_file(self):
+        """Test enrichment is disabled without a registry file."""
+        self.assertIsNone(get_registry(""))
+        self.assertIsNone(get_registry(os.path.join(self.directory.name, "missing.csv")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Unit tests for the reprocess module.
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from change_feed import read_changes
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine
+from load import load_data_to_db
+from reprocess import reprocess_flights
+from route_stats import get_route_stats
+
+HOUR = 3600
+
+class TestReprocess(unittest.TestCase):
+    """Test cases for the reprocess module."""
+
+    def setUp(self):
+        """Load untransformed flights into a SQLite file shared by the worker threads."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_sqlite_engine(os.path.join(self.directory.name, "flights.db"))
+        create_schema(self.engine)
+        first_seen = [hour * HOUR + 600 for hour in range(12)]
+        session = sessionmaker(bind=self.engine)()
+        load_data_to_db(pd.DataFrame({
+            'icao24': [f"a{i:05d}" for i in range(12)],
+            'firstSeen': first_seen,
+            'lastSeen': [seen + 5400 for seen in first_seen],
+            'estDepartureAirport': ['EDDF', 'LFPG'] * 6,
+            'estArrivalAirport': ['LFPG', 'EDDF'] * 6,
+            'callsign': [f"DLH{i}" for i in range(12)],
+            'estDepartureAirportHorizDistance': [1000] * 12,
+            'estArrivalAirportHorizDistance': [2000] * 12
+        }), self.engine, session)
+        session.close()
+
+    def tearDown(self):
+        """Remove the database."""
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def flights(self):
+        """Derived columns of the stored flights."""
+        with self.engine.connect() as conn:
+            return conn.execute(text(
+                'SELECT flight_duration_minutes, total_distance_km, airport_pair FROM flights ORDER BY "firstSeen"'
+            )).fetchall()
+
+    def test_reprocess_fills_derived_columns(self):
+        """Test stale derived columns and route codes are recomputed in parallel windows."""
+        with self.engine.begin() as conn:
+            conn.execute(text("UPDATE routes SET code = 'EDDF>LFPG' WHERE code = 'EDDF-LFPG'"))
+            conn.execute(text('UPDATE flight_data SET total_distance_km = 99.0 WHERE "firstSeen" < 7200'))
+
+        stats = {}
+        self.assertTrue(reprocess_flights(self.engine, "test", workers=3, chunk_seconds=4 * HOUR, stats=stats))
+        self.assertEqual(self.flights(), [(90.0, 3.0, 'EDDF-LFPG'), (90.0, 3.0, 'LFPG-EDDF')] * 6)
+        self.assertEqual(
+            (stats['windows'], stats['windows_done'], stats['windows_failed'], stats['windows_remaining']), (3, 3, 0, 0)
+        )
+        self.assertEqual((stats['flights_read'], stats['flights_updated'], stats['routes_renamed']), (12, 12, 1))
+
+        # Route statistics are rebuilt from the recomputed durations
+        self.assertEqual(stats['route_stats_flights'], 12)
+        session = sessionmaker(bind=self.engine)()
+        route = get_route_stats(session, 'EDDF-LFPG')
+        self.assertEqual((route['flights'], route['mean']), (6, 90.0))
+        session.close()
+
+        # Updated flights are published to the change feed
+        changes = read_changes(self.engine)
+        self.assertEqual(int((changes['change'] == 'update').sum()), 12)
+
+        # Nothing changes on a second job
+        stats = {}
+        reprocess_flights(self.engine, "again", chunk_seconds=4 * HOUR, stats=stats)
+        self.assertEqual((stats['flights_read'], stats['flights_updated'], stats['routes_renamed']), (12, 0, 0))
+        self.assertEqual(stats['route_stats_flights'], 0)
+
+    def test_resume_skips_done_windows(self):
+        """Test a job run again only processes the windows that were not done."""
+        with patch('reprocess.reprocess_window', side_effect=RuntimeError("database went away")):
+            stats = {}
+            self.assertFalse(reprocess_flights(self.engine, "resume", start_time=0, end_time=8 * HOUR,
+                                               workers=2, chunk_seconds=4 * HOUR, stats=stats))
+        self.assertEqual((stats['windows_done'], stats['windows_failed']), (0, 2))
+
+        # Failed windows are retried when the job is run again
+        stats = {}
+        self.assertTrue(reprocess_flights(self.engine, "resume", start_time=0, end_time=8 * HOUR,
+                                          chunk_seconds=4 * HOUR, stats=stats))
+        self.assertEqual((stats['windows_done'], stats['windows_failed'], stats['flights_read']), (2, 0, 8))
+
+        # Completed jobs are not redone
+        stats = {}
+        reprocess_flights(self.engine, "done", start_time=0, end_time=8 * HOUR, chunk_seconds=4 * HOUR)
+        reprocess_flights(self.engine, "done", start_time=0, end_time=8 * HOUR, chunk_seconds=4 * HOUR, stats=stats)
+        self.assertEqual((stats['windows_resumed'], stats['windows_done'], stats['flights_read']), (2, 0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Unit tests for the rollups module.
+"""
+import unittest
+from unittest.mock import patch
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import create_schema
+from dimensions import resolve_flight_keys
+from rollups import (bucket_start, choose_tier, update_rollups, purge_rollups, rebuild_rollups,
+                     query_airport_traffic, query_route_traffic)
+
+# 2024-01-31 00:00 UTC
+DAY = 1706659200
+HOUR = 3600
+
+class TestRollups(unittest.TestCase):
+    """Test cases for the rollups module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.engine = create_engine("sqlite://")
+        create_schema(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.df = pd.DataFrame({
+            'icao24': ['abc123', 'def456', 'aaa111', 'bbb222'],
+            'firstSeen': [DAY + 600, DAY + 1200, DAY + HOUR + 60, DAY + 86400 + 60],
+            'lastSeen': [DAY + HOUR + 600, DAY + 2 * HOUR, DAY + 3 * HOUR, DAY + 86400 + 2 * HOUR],
+            'estDepartureAirport': ['EDDF', 'EDDF', 'LFPG', 'EDDF'],
+            'estArrivalAirport': ['LFPG', 'LFPG', None, 'LFPG']
+        })
+        self.df = self.df.join(resolve_flight_keys(self.df, self.engine))
+        # Nothing expires relative to the 2024 test data
+        self.retention = patch.dict('rollups.ROLLUP_RETENTION_DAYS', {"hour": 0, "day": 0, "month": 0})
+        self.retention.start()
+
+    def tearDown(self):
+        """Close the session."""
+        self.retention.stop()
+        self.session.close()
+
+    def test_bucket_start(self):
+        """Test bucket boundaries of each tier, months by calendar."""
+        self.assertEqual(list(bucket_start([DAY + HOUR + 5], "hour")), [DAY + HOUR])
+        self.assertEqual(list(bucket_start([DAY + HOUR + 5], "day")), [DAY])
+        # 2024-02-01 00:00 is 1 day after DAY; January started 30 days before
+        self.assertEqual(list(bucket_start([DAY + 5, DAY + 86400 + 5], "month")), [DAY - 30 * 86400, DAY + 86400])
+
+    def test_update_and_query(self):
+        """Test each tier is incremented and queried per airport and route."""
+        update_rollups(self.df, self.session)
+        update_rollups(self.df.iloc[[0]], self.session)
+        self.session.commit()
+
+        hourly = query_airport_traffic(self.session, DAY, DAY + 3 * HOUR + 1, airport='EDDF')
+        self.assertEqual(hourly.attrs["tier"], "hour")
+        self.assertEqual(list(hourly['bucket']), [DAY])
+        self.assertEqual(list(hourly['departures']), [3])
+
+        daily = query_airport_traffic(self.session, DAY, DAY + 2 * 86400, airport='LFPG')
+        self.assertEqual(daily.attrs["tier"], "day")
+        self.assertEqual(list(daily['departures']), [1, 0])
+        self.assertEqual(list(daily['arrivals']), [3, 1])
+
+        # January and February in one monthly query
+        monthly = query_route_traffic(self.session, DAY - 30 * 86400, DAY + 30 * 86400, route='EDDF-LFPG')
+        self.assertEqual(monthly.attrs["tier"], "month")
+        self.assertEqual(list(monthly['flights']), [3, 1])
+
+        # A finer resolution can be requested for aligned ranges
+        series = query_airport_traffic(self.session, DAY, DAY + 86400, airport='EDDF', resolution="hour")
+        self.assertEqual(series.attrs["tier"], "hour")
+
+    def test_choose_tier_respects_retention(self):
+        """Test tiers whose retention does not reach the range start are skipped."""
+        now = DAY + 30 * 86400
+        with patch.dict('rollups.ROLLUP_RETENTION_DAYS', {"hour": 7, "day": 14, "month": 0}):
+            self.assertEqual(choose_tier(now - 86400, now, now=now), "day")
+            self.assertEqual(choose_tier(now - 20 * 86400, now - 19 * 86400, now=now), "month")
+            self.assertEqual(choose_tier(now - HOUR - 5, now, now=now), "hour")
+            self.assertEqual(choose_tier(now - 10 * 86400 - 5, now, now=now), "day")
+
+    def test_purge_rollups(self):
+        """Test expired buckets are deleted per tier."""
+        update_rollups(self.df, self.session)
+        with patch.dict('rollups.ROLLUP_RETENTION_DAYS', {"hour": 1, "day": 0, "month": 0}):
+            purge_rollups(self.session, now=DAY + 86400 + 3 * HOUR)
+        self.session.commit()
+
+        with self.engine.connect() as conn:
+            tiers = conn.execute(text("SELECT tier, MIN(bucket) FROM airport_traffic GROUP BY tier")).fetchall()
+        self.assertEqual(dict(tiers)["hour"], DAY + 86400)
+        self.assertEqual(dict(tiers)["day"], DAY)
+
+    def store_flights(self):
+        """Insert the test flights into flight_data, ids starting at 1."""
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                'INSERT INTO flight_data ("firstSeen", "lastSeen", departure_airport_id, arrival_airport_id, route_id) '
+                'VALUES (:first_seen, :last_seen, :departure, :arrival, :route)'
+            ), [
+                {'first_seen': int(row.firstSeen), 'last_seen': int(row.lastSeen),
+                 'departure': int(row.departure_airport_id),
+                 'arrival': None if pd.isna(row.arrival_airport_id) else int(row.arrival_airport_id),
+                 'route': None if pd.isna(row.route_id) else int(row.route_id)}
+                for row in self.df.itertuples()
+            ])
+
+    def test_revised_flights_move_counts(self):
+        """Test a revised flight is subtracted from its old buckets and added to the new ones."""
+        self.store_flights()
+        update_rollups(self.df, self.session)
+        self.session.commit()
+
+        raw = self.df[['icao24', 'firstSeen', 'lastSeen', 'estDepartureAirport', 'estArrivalAirport']]
+        revised = raw.iloc[[0]].assign(estArrivalAirport='EGLL')
+        revised = revised.join(resolve_flight_keys(revised, self.engine)).assign(id=1)
+        update_rollups(self.df.iloc[0:0], self.session, revised=revised)
+        self.session.commit()
+
+        daily = query_airport_traffic(self.session, DAY, DAY + 86400)
+        arrivals = dict(zip(daily['airport'], daily['arrivals']))
+        self.assertEqual((arrivals['LFPG'], arrivals['EGLL']), (1, 1))
+        self.assertEqual(daily['departures'].sum(), 3)
+        routes = query_route_traffic(self.session, DAY, DAY + 86400)
+        self.assertEqual(dict(zip(routes['route'], routes['flights'])), {'EDDF-LFPG': 1, 'EDDF-EGLL': 1})
+
+    def test_rebuild_rollups(self):
+        """Test rollups are recounted from flight_data."""
+        self.store_flights()
+        update_rollups(self.df, self.session)
+        self.session.commit()
+
+        self.assertEqual(rebuild_rollups(self.session), 4)
+        daily = query_airport_traffic(self.session, DAY, DAY + 2 * 86400)
+        self.assertEqual(daily['departures'].sum(), 4)
+        self.assertEqual(daily['arrivals'].sum(), 3)
+
+if __name__ == '__main__':
+    unittest.main()
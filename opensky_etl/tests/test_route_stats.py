@@ -0,0 +1,150 @@
+"""
+Unit tests for the route_stats module.
+"""
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import RouteStats, create_schema
+from connections.sqlite import create_sqlite_engine
+from load import load_data_to_db
+from route_stats import (
+    batch_route_stats, get_route_stats, merge_moments, rebuild_route_stats, route_outliers, typical_duration
+)
+from transform import transform_flight_data
+
+HOUR = 3600
+
+def flights(durations, start=0, route=('EDDF', 'LFPG')):
+    """Transformed flights of one route with the given durations in minutes."""
+    count = len(durations)
+    first_seen = [start + i * HOUR for i in range(count)]
+    df = pd.DataFrame({
+        'icao24': [f"a{i:05d}" for i in range(count)],
+        'firstSeen': first_seen,
+        'lastSeen': [seen + int(duration * 60) for seen, duration in zip(first_seen, durations)],
+        'estDepartureAirport': [route[0]] * count,
+        'estArrivalAirport': [route[1]] * count,
+        'callsign': [f"DLH{i}" for i in range(count)],
+        'estDepartureAirportHorizDistance': [1000] * count,
+        'estArrivalAirportHorizDistance': [2000] * count
+    })
+    return transform_flight_data(df, None)
+
+class TestRouteStats(unittest.TestCase):
+    """Test cases for the route_stats module."""
+
+    def setUp(self):
+        """Create an empty SQLite database."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_sqlite_engine(os.path.join(self.directory.name, "flights.db"))
+        create_schema(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        self.durations = np.random.default_rng(3).normal(80, 5, 200).round(1)
+
+    def tearDown(self):
+        """Remove the database."""
+        self.session.close()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def test_merge_moments_matches_whole(self):
+        """Test moments merged batch by batch equal those of all values at once."""
+        df = pd.DataFrame({
+            'route_id': [1] * 6 + [2] * 3,
+            'flight_duration_minutes': [60.0, 62.0, 65.0, 70.0, 58.0, 61.0, 120.0, 118.0, 125.0]
+        })
+        whole, _ = batch_route_stats(df)
+        first, _ = batch_route_stats(df.iloc[:4])
+        second, _ = batch_route_stats(df.iloc[4:])
+
+        stored = first.reindex(second.index)
+        stored[['flights', 'mean', 'm2']] = stored[['flights', 'mean', 'm2']].fillna(0)
+        merged = merge_moments(stored, second)
+        pd.testing.assert_frame_equal(merged.sort_index(), whole.sort_index(), check_dtype=False)
+        self.assertAlmostEqual(whole.loc[(1, 'duration'), 'm2'] / 5, np.var(df['flight_duration_minutes'][:6], ddof=1))
+
+    def test_loads_maintain_stats(self):
+        """Test each load merges into the stored statistics, read with one lookup."""
+        load_data_to_db(flights(self.durations[:120]), self.engine, self.session)
+        load_data_to_db(flights(self.durations[120:], start=120 * HOUR), self.engine, self.session)
+
+        stats = get_route_stats(self.session, "EDDF-LFPG")
+        # Stored durations are whole seconds
+        minutes = [int(duration * 60) / 60.0 for duration in self.durations]
+        self.assertEqual(stats['flights'], 200)
+        self.assertAlmostEqual(stats['mean'], np.mean(minutes))
+        self.assertAlmostEqual(stats['variance'], np.var(minutes, ddof=1))
+        self.assertEqual((stats['min'], stats['max']), (min(minutes), max(minutes)))
+        self.assertAlmostEqual(stats['p50'], np.quantile(minutes, 0.5), delta=np.quantile(minutes, 0.5) * 0.02)
+        self.assertAlmostEqual(stats['p95'], np.quantile(minutes, 0.95), delta=np.quantile(minutes, 0.95) * 0.02)
+
+        self.assertAlmostEqual(typical_duration(self.session, "EDDF-LFPG"), stats['p50'])
+        self.assertEqual(get_route_stats(self.session, "EDDF-LFPG", "distance")['mean'], 3.0)
+        self.assertIsNone(get_route_stats(self.session, "LFPG-EDDF"))
+
+        # Recounting from flight_data gives the same statistics
+        rebuild_route_stats(self.session)
+        self.assertAlmostEqual(get_route_stats(self.session, "EDDF-LFPG")['variance'], stats['variance'])
+        self.assertEqual(self.session.query(RouteStats).count(), 2)
+
+        # Rescoring scores every flight against the final statistics
+        rebuild_route_stats(self.session, rescore=True)
+        with self.engine.connect() as conn:
+            scores = [row[0] for row in conn.execute(text('SELECT duration_zscore FROM flight_data ORDER BY "firstSeen"'))]
+        expected = (np.array(minutes) - stats['mean']) / np.sqrt(stats['variance'])
+        np.testing.assert_allclose(scores, expected)
+
+    def test_outliers_flagged_at_load(self):
+        """Test unusual durations are scored once the route has enough flights."""
+        stats = {}
+        load_data_to_db(flights(self.durations[:10]), self.engine, self.session, stats=stats)
+        self.assertEqual(stats['outliers'], 0)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT COUNT(duration_zscore) FROM flight_data")).scalar(), 0)
+
+        batch = np.append(self.durations[10:100], [400.0])
+        load_data_to_db(flights(batch, start=10 * HOUR), self.engine, self.session, stats=stats)
+        self.assertEqual(stats['outliers'], 1)
+
+        outliers = route_outliers(self.session, 0, 200 * HOUR)
+        self.assertEqual(len(outliers), 1)
+        self.assertEqual(outliers['flight_duration_minutes'].iloc[0], 400.0)
+        self.assertGreater(outliers['duration_zscore'].iloc[0], 4)
+
+    def test_revised_flights_replace_stored_values(self):
+        """Test a revision swaps its stored duration for the new one, on both routes when it moves."""
+        durations = self.durations[:40]
+        load_data_to_db(flights(durations), self.engine, self.session)
+        minutes = [int(duration * 60) / 60.0 for duration in durations]
+
+        stats = {}
+        revised = flights([400.0])
+        load_data_to_db(revised, self.engine, self.session, reconcile=True, stats=stats)
+        self.assertEqual((stats['inserted'], stats['revised'], stats['outliers']), (0, 1, 1))
+        route = get_route_stats(self.session, "EDDF-LFPG")
+        expected = [400.0] + minutes[1:]
+        self.assertEqual(route['flights'], 40)
+        self.assertAlmostEqual(route['mean'], np.mean(expected))
+        self.assertAlmostEqual(route['variance'], np.var(expected, ddof=1))
+        self.assertEqual(route['max'], 400.0)
+        with self.engine.connect() as conn:
+            score = conn.execute(text('SELECT duration_zscore FROM flight_data WHERE "firstSeen" = 0')).scalar()
+        self.assertAlmostEqual(score, (400.0 - route['mean']) / route['stddev'])
+
+        # Moving the flight to another route takes it out of the first one. The
+        # read transaction ends first, as SQLite cannot upgrade a stale one to write
+        self.session.commit()
+        load_data_to_db(flights([70.0], route=('EDDF', 'EGLL')), self.engine, self.session, reconcile=True)
+        route = get_route_stats(self.session, "EDDF-LFPG")
+        self.assertEqual(route['flights'], 39)
+        self.assertAlmostEqual(route['mean'], np.mean(minutes[1:]))
+        self.assertAlmostEqual(route['variance'], np.var(minutes[1:], ddof=1))
+        self.assertEqual(get_route_stats(self.session, "EDDF-EGLL")['flights'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
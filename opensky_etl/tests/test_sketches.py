@@ -0,0 +1,98 @@
+"""
+Unit tests for the sketches module.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import Base
+from sketches import (
+    HyperLogLog, QuantileSketch, SpaceSaving, update_sketches, distinct_aircraft, top_routes
+)
+
+class TestSketches(unittest.TestCase):
+    """Test cases for the sketches module."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        day = 1614556800
+        self.df = pd.DataFrame({
+            'icao24': ['abc123', 'def456', 'abc123', 'fff000'],
+            'firstSeen': [day, day + 100, day + 200, day + 86400],
+            'lastSeen': [day + 3600, day + 3700, day + 3800, day + 90000],
+            'estDepartureAirport': ['EDDF', 'EDDF', 'EDDF', 'EDDF'],
+            'estArrivalAirport': ['LFPG', 'LFPG', 'EGLL', None],
+            'airport_pair': ['EDDF-LFPG', 'EDDF-LFPG', 'EDDF-EGLL', None]
+        })
+        self.day = day
+    
+    def test_hyperloglog_count_and_merge(self):
+        """Test HyperLogLog estimates and merges distinct counts."""
+        first = HyperLogLog()
+        first.add([f"a{i}" for i in range(50000)])
+        second = HyperLogLog()
+        second.add([f"a{i}" for i in range(25000, 75000)])
+        
+        self.assertAlmostEqual(first.count(), 50000, delta=50000 * 0.05)
+        merged = HyperLogLog.from_bytes(first.to_bytes()).merge(second)
+        self.assertAlmostEqual(merged.count(), 75000, delta=75000 * 0.05)
+        
+        small = HyperLogLog()
+        small.add(['x', 'y', 'z', 'x'])
+        self.assertEqual(small.count(), 3)
+    
+    def test_space_saving_top(self):
+        """Test space-saving keeps the heavy hitters within capacity."""
+        sketch = SpaceSaving(capacity=3)
+        sketch.update(pd.Series({'A': 100, 'B': 50, 'C': 10, 'D': 5}))
+        sketch.merge(SpaceSaving(3, {'B': [80, 0], 'E': [1, 0]}))
+        
+        self.assertLessEqual(len(sketch.counters), 3)
+        self.assertEqual(sketch.top(2), [('B', 130), ('A', 100)])
+        restored = SpaceSaving.from_bytes(sketch.to_bytes())
+        self.assertEqual(restored.top(3), sketch.top(3))
+    
+    def test_quantile_sketch_accuracy_and_merge(self):
+        """Test quantiles stay within the relative accuracy across merges and serialization."""
+        values = np.random.default_rng(7).lognormal(4.5, 0.6, 20000)
+        first = QuantileSketch(accuracy=0.01)
+        first.add(values[:10000])
+        second = QuantileSketch(accuracy=0.01)
+        second.add(values[10000:])
+        merged = QuantileSketch.from_bytes(first.to_bytes()).merge(second)
+        
+        self.assertEqual(merged.count(), 20000)
+        for q in (0.05, 0.5, 0.95):
+            self.assertAlmostEqual(merged.quantile(q), np.quantile(values, q), delta=np.quantile(values, q) * 0.02)
+        
+        small = QuantileSketch(max_buckets=8)
+        small.add([0, -1, np.nan, *range(1, 1001)])
+        self.assertLessEqual(len(small.buckets), 8)
+        self.assertEqual((small.count(), small.quantile(0)), (1002, 0.0))
+        self.assertAlmostEqual(small.quantile(1), 1000, delta=10)
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+    
+    def test_update_and_query_sketches(self):
+        """Test sketches are persisted, merged across batches and queried."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        
+        update_sketches(self.df.iloc[:2], session)
+        session.commit()
+        update_sketches(self.df.iloc[2:], session)
+        session.commit()
+        
+        self.assertEqual(distinct_aircraft(session, 'EDDF', self.day, self.day), 2)
+        self.assertEqual(distinct_aircraft(session, 'EDDF', self.day, self.day + 86400), 3)
+        self.assertEqual(distinct_aircraft(session, 'LFPG', self.day, self.day), 2)
+        self.assertEqual(
+            top_routes(session, self.day, self.day, n=5),
+            [('EDDF-LFPG', 2), ('EDDF-EGLL', 1)]
+        )
+        session.close()
+
+if __name__ == '__main__':
+    unittest.main()
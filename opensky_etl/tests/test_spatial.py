@@ -0,0 +1,91 @@
+"""
+Unit tests for the spatial module.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from connections.postgresql import Base
+from live import load_positions
+from spatial import GridIndex, cell_ids, haversine_km, in_bbox, positions_in_bbox
+
+class TestSpatial(unittest.TestCase):
+    """Test cases for the spatial module."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        rng = np.random.default_rng(7)
+        count = 5000
+        self.df = pd.DataFrame({
+            'icao24': [f"{i:06x}" for i in range(count)],
+            'latitude': rng.uniform(-85, 85, count),
+            'longitude': rng.uniform(-180, 180, count)
+        })
+        self.index = GridIndex.from_frame(self.df, cell_degrees=2.0)
+    
+    def test_cell_ids(self):
+        """Test cell ids wrap longitudes outside [-180, 180] and clamp latitudes and 180."""
+        self.assertEqual(cell_ids(-90.0, -180.0, 1.0), 0)
+        self.assertEqual(cell_ids(-90.0, 180.0, 1.0), 359)
+        self.assertEqual(cell_ids(-90.0, 181.5, 1.0), 1)
+        self.assertEqual(cell_ids(90.0, 179.9, 1.0), 179 * 360 + 359)
+    
+    def test_bbox_matches_scan(self):
+        """Test bounding box queries, including across the antimeridian."""
+        for box in [(40, -10, 55, 20), (-30, 170, 10, -170), (-90, -180, 90, 180)]:
+            expected = self.df['icao24'][in_bbox(self.df['latitude'], self.df['longitude'], *box)]
+            self.assertEqual(sorted(self.index.bbox(*box)), sorted(expected))
+    
+    def test_radius_and_nearest_match_scan(self):
+        """Test radius and k-nearest queries against a full scan."""
+        distances = haversine_km(50.03, 8.57, self.df['latitude'].to_numpy(), self.df['longitude'].to_numpy())
+        
+        keys, found = self.index.radius(50.03, 8.57, 800)
+        self.assertEqual(sorted(keys), sorted(self.df['icao24'][distances <= 800]))
+        self.assertTrue(np.all(np.diff(found) >= 0))
+        
+        keys, found = self.index.nearest(50.03, 8.57, 10)
+        np.testing.assert_allclose(found, np.sort(distances)[:10])
+    
+    def test_incremental_updates(self):
+        """Test moving and removing aircraft."""
+        index = GridIndex(cell_degrees=1.0, capacity=2)
+        index.update(['a', 'b', 'c'], [10.0, 20.0, 30.0], [10.0, 20.0, 30.0])
+        self.assertEqual(list(index.bbox(5, 5, 15, 15)), ['a'])
+        
+        index.update(['a'], [30.5], [30.5])
+        index.remove(['c'])
+        self.assertEqual(len(index), 2)
+        self.assertEqual(len(index.bbox(5, 5, 15, 15)), 0)
+        self.assertEqual(list(index.bbox(25, 25, 35, 35)), ['a'])
+    
+    def test_positions_in_bbox(self):
+        """Test the database query on the grid_cell column."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        positions = self.df.assign(time=1700000000, baro_altitude=1e4, velocity=200.0,
+                                   true_track=90.0, on_ground=False)
+        load_positions(positions, engine)
+        
+        result = positions_in_bbox(engine, 40, -10, 55, 20, start=1700000000)
+        expected = in_bbox(self.df['latitude'], self.df['longitude'], 40, -10, 55, 20)
+        self.assertEqual(sorted(result['icao24']), sorted(self.df['icao24'][expected]))
+
+    def test_antimeridian_edge(self):
+        """Test positions at longitude 180 are found by boxes ending there."""
+        index = GridIndex(cell_degrees=1.0)
+        index.update(['a', 'b'], [10.0, 10.0], [180.0, 179.5])
+        self.assertEqual(sorted(index.bbox(0, 170, 20, 180)), ['a', 'b'])
+        self.assertEqual(sorted(index.bbox(0, 175, 20, -175)), ['a', 'b'])
+
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        load_positions(pd.DataFrame({
+            'icao24': ['a', 'b'], 'time': 1700000000, 'latitude': 10.0, 'longitude': [180.0, 179.5],
+            'baro_altitude': 1e4, 'velocity': 200.0, 'true_track': 90.0, 'on_ground': False
+        }), engine)
+        self.assertEqual(sorted(positions_in_bbox(engine, 0, 170, 20, 180)['icao24']), ['a', 'b'])
+
+if __name__ == '__main__':
+    unittest.main()
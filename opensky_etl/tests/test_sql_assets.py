@@ -0,0 +1,129 @@
+"""
+Unit tests for the sql_assets module.
+"""
+import os
+import tempfile
+import time
+import unittest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from connections.postgresql import bump_load_watermark, create_schema
+from connections.sqlite import create_sqlite_engine
+from sql_assets import (
+    critical_path, discover_assets, parse_dependencies, run_graph, run_sql_assets, topological_order
+)
+
+ASSETS = {
+    "durations": "-- Flight durations\n-- depends: flight_data\nSELECT id, \"lastSeen\" - \"firstSeen\" AS seconds FROM flight_data",
+    "long_flights": "-- depends: durations\nSELECT id FROM durations WHERE seconds > 3600",
+    "summary": "-- depends: durations, long_flights\n"
+               "SELECT (SELECT COUNT(*) FROM durations) AS flights, (SELECT COUNT(*) FROM long_flights) AS long_flights"
+}
+
+class TestSqlAssets(unittest.TestCase):
+    """Test cases for the sql_assets module."""
+
+    def setUp(self):
+        """Write the assets and create a database with two flights."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.asset_dir = os.path.join(self.directory.name, "transform")
+        os.makedirs(self.asset_dir)
+        for name, sql in ASSETS.items():
+            self.write_asset(name, sql)
+        self.engine = create_sqlite_engine(os.path.join(self.directory.name, "flights.db"))
+        create_schema(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text('INSERT INTO flight_data ("firstSeen", "lastSeen") VALUES (0, 1800), (0, 7200)'))
+
+    def tearDown(self):
+        """Remove the database and assets."""
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def write_asset(self, name, sql):
+        """Write an asset file."""
+        with open(os.path.join(self.asset_dir, f"{name}.sql"), 'w') as f:
+            f.write(sql)
+
+    def run_assets(self, **kwargs):
+        """Run the assets and return the status of each."""
+        stats = {}
+        self.assertTrue(run_sql_assets(self.engine, directory=self.asset_dir, stats=stats, **kwargs))
+        return {node['name']: node['status'] for node in stats['nodes']}
+
+    def test_discover_and_order(self):
+        """Test dependencies are read from header comments and cycles are rejected."""
+        self.assertEqual(parse_dependencies("-- Title\n--depends: a, b\n-- depends: c\nSELECT 1\n-- depends: d"),
+                         ['a', 'b', 'c'])
+        assets = discover_assets(self.asset_dir)
+        self.assertEqual(assets['summary']['depends'], ['durations', 'long_flights'])
+        self.assertEqual(topological_order(assets), ['durations', 'long_flights', 'summary'])
+
+        assets['durations']['depends'].append('summary')
+        with self.assertRaises(ValueError):
+            topological_order(assets)
+
+    def test_run_graph_concurrency_and_failures(self):
+        """Test independent nodes overlap, dependents wait, and failures stop downstream nodes."""
+        assets = {
+            "a": {"depends": []}, "b": {"depends": ["source"]},
+            "c": {"depends": ["a", "b"]}, "d": {"depends": ["c"]}
+        }
+
+        def run_node(name):
+            time.sleep(0.1)
+            return {"status": "built"}
+
+        results = run_graph(assets, run_node, workers=2)
+        self.assertLess(results['b']['start'], results['a']['end'])
+        self.assertGreaterEqual(results['c']['start'], max(results['a']['end'], results['b']['end']))
+        self.assertEqual(critical_path(results)[-2:], ['c', 'd'])
+
+        def fail_b(name):
+            if name == "b":
+                raise RuntimeError("syntax error")
+            return {"status": "built"}
+
+        results = run_graph(assets, fail_b, workers=2)
+        self.assertEqual({name: result['status'] for name, result in results.items()},
+                         {"a": "built", "b": "failed", "c": "upstream_failed", "d": "upstream_failed"})
+        self.assertEqual(results['b']['error'], "syntax error")
+
+    def test_skip_unchanged_inputs(self):
+        """Test assets are rebuilt only when their SQL or inputs changed."""
+        self.assertEqual(self.run_assets(), {"durations": "built", "long_flights": "built", "summary": "built"})
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT flights, long_flights FROM summary")).one(), (2, 1))
+        self.assertEqual(self.run_assets(), {"durations": "skipped", "long_flights": "skipped", "summary": "skipped"})
+
+        # Changed SQL rebuilds the asset and its dependents
+        self.write_asset("long_flights", ASSETS["long_flights"].replace("3600", "600"))
+        self.assertEqual(self.run_assets(), {"durations": "skipped", "long_flights": "built", "summary": "built"})
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT long_flights FROM summary")).scalar(), 2)
+
+        # A load rebuilds everything downstream of the loaded tables
+        with Session(self.engine) as session:
+            bump_load_watermark(session)
+            session.commit()
+        self.assertEqual(self.run_assets(), {"durations": "built", "long_flights": "built", "summary": "built"})
+
+        # Dropped tables are rebuilt, force rebuilds everything
+        with self.engine.begin() as conn:
+            conn.execute(text("DROP TABLE summary"))
+        self.assertEqual(self.run_assets()["summary"], "built")
+        self.assertEqual(set(self.run_assets(force=True).values()), {"built"})
+
+    def test_failed_asset_keeps_previous_table(self):
+        """Test a failing build leaves the previous table and skips dependents."""
+        self.run_assets()
+        self.write_asset("long_flights", "-- depends: durations\nSELECT missing_column FROM durations")
+        stats = {}
+        self.assertFalse(run_sql_assets(self.engine, directory=self.asset_dir, stats=stats))
+        self.assertEqual((stats['failed'], stats['upstream_failed']), (1, 1))
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT COUNT(*) FROM long_flights")).scalar(), 1)
+
+if __name__ == '__main__':
+    unittest.main()
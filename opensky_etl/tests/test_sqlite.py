@@ -0,0 +1,82 @@
+"""
+Unit tests for the SQLite backend.
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+import pandas as pd
+from sqlalchemy import text
+
+from connections.postgresql import create_schema
+from connections.sqlite import create_sqlite_engine, query_shards, read_shard, write_shard
+from load import create_or_replace_view
+
+class TestSQLite(unittest.TestCase):
+    """Test cases for the SQLite backend."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Remove the database files."""
+        self.directory.cleanup()
+
+    def shard(self, day, count=3):
+        """Write a shard of flights for a day."""
+        path = os.path.join(self.directory.name, f"flights-{day:02d}.db")
+        write_shard(path, pd.DataFrame({
+            'id': [day * 100 + i for i in range(count)],
+            'icao24': [f"a{day:02d}{i:03d}" for i in range(count)],
+            'firstSeen': [day * 86400 + i * 600 for i in range(count)],
+            'lastSeen': [day * 86400 + i * 600 + 3600 for i in range(count)],
+            'airport_pair': ['EDDF-LFPG'] * count
+        }))
+        return path
+
+    def test_engine_pragmas(self):
+        """Test connections are tuned and the schema is created in WAL mode."""
+        engine = create_sqlite_engine(os.path.join(self.directory.name, 'flights.db'))
+        create_schema(engine)
+        with engine.connect() as connection:
+            self.assertEqual(connection.exec_driver_sql("PRAGMA journal_mode").scalar(), "wal")
+            self.assertEqual(connection.exec_driver_sql("PRAGMA synchronous").scalar(), 1)
+            self.assertEqual(connection.exec_driver_sql("PRAGMA cache_size").scalar(), -65536)
+            self.assertEqual(connection.exec_driver_sql("PRAGMA busy_timeout").scalar(), 5000)
+        engine.dispose()
+
+    def test_view_replacement_rolls_back(self):
+        """Test a failed view replacement keeps the previous view."""
+        engine = create_sqlite_engine(os.path.join(self.directory.name, 'flights.db'))
+        self.assertTrue(create_or_replace_view(engine, 'test_view', "SELECT 1 AS value"))
+        self.assertFalse(create_or_replace_view(engine, 'test_view', "SELECT value FROM"))
+        with engine.connect() as connection:
+            self.assertEqual(connection.execute(text("SELECT value FROM test_view")).scalar(), 1)
+        engine.dispose()
+
+    def test_write_and_read_shard(self):
+        """Test shards are indexed, renamed into place and read back."""
+        path = self.shard(1)
+        self.assertFalse(os.path.exists(f"{path}.tmp"))
+        with sqlite3.connect(path) as connection:
+            indexes = {row[1] for row in connection.execute("PRAGMA index_list(flights)")}
+        self.assertEqual(indexes, {'idx_shard_first_seen', 'idx_shard_last_seen'})
+        self.assertEqual(read_shard(path, ['icao24'])['icao24'].tolist(), ['a01000', 'a01001', 'a01002'])
+
+    def test_query_shards(self):
+        """Test queries see the shards as one table, beyond the attach limit too."""
+        paths = [self.shard(day) for day in range(3)]
+        result = query_shards(
+            'SELECT COUNT(*) AS flights, MAX("lastSeen") AS last FROM flights WHERE "firstSeen" >= ?',
+            paths, (600,)
+        )
+        self.assertEqual(result.iloc[0].tolist(), [8, 2 * 86400 + 1200 + 3600])
+
+        paths = [self.shard(day, count=1) for day in range(130)]
+        result = query_shards("SELECT COUNT(DISTINCT icao24) AS aircraft FROM flights", paths)
+        self.assertEqual(result['aircraft'].iloc[0], 130)
+        self.assertTrue(query_shards("SELECT 1", []).empty)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""
+Unit tests for the tracks module.
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from connections.postgresql import Base, FlightTrack
+from tracks import (
+    encode_varints, decode_varints, encode_track, decode_track, save_tracks, load_track, track_points
+)
+
+class TestTracks(unittest.TestCase):
+    """Test cases for the tracks module."""
+    
+    def setUp(self):
+        """Set up test fixtures."""
+        rng = np.random.default_rng(3)
+        points = 1000
+        self.track = pd.DataFrame({
+            'time': 1700000000 + np.cumsum(rng.integers(1, 10, points)),
+            'latitude': 50.0 + np.cumsum(rng.normal(0, 0.001, points)),
+            'longitude': 8.5 + np.cumsum(rng.normal(0.01, 0.001, points)),
+            'altitude': np.clip(np.cumsum(rng.normal(10, 30, points)), 0, 12000).round()
+        })
+    
+    def test_varint_roundtrip(self):
+        """Test varint encoding of edge values."""
+        values = np.array([0, 1, -1, 63, -64, 64, 300, -300, 2 ** 40, 2 ** 63 - 1, -2 ** 63])
+        encoded = encode_varints(values)
+        decoded, used = decode_varints(encoded + b"\x05", len(values))
+        
+        np.testing.assert_array_equal(decoded, values)
+        self.assertEqual(used, len(encoded))
+        self.assertEqual(len(encode_varints(np.array([1, -1, 60]))), 3)
+    
+    def test_track_roundtrip(self):
+        """Test tracks decode to the quantized input and are compact."""
+        blob = encode_track(self.track, block_size=128)
+        decoded = decode_track(blob)
+        
+        np.testing.assert_array_equal(decoded['time'], self.track['time'])
+        np.testing.assert_allclose(decoded['latitude'], self.track['latitude'], atol=1e-5)
+        np.testing.assert_allclose(decoded['longitude'], self.track['longitude'], atol=1e-5)
+        np.testing.assert_array_equal(decoded['altitude'], self.track['altitude'])
+        self.assertLess(len(blob), len(self.track) * 4 * 8 / 4)
+    
+    def test_range_decoding(self):
+        """Test decoding a time range returns exactly the points inside it."""
+        blob = encode_track(self.track, block_size=128)
+        start, end = int(self.track['time'][300]), int(self.track['time'][450])
+        
+        decoded = decode_track(blob, start, end)
+        expected = self.track[(self.track['time'] >= start) & (self.track['time'] <= end)]
+        np.testing.assert_array_equal(decoded['time'], expected['time'])
+        self.assertTrue(decode_track(blob, 0, 1).empty)
+    
+    def test_missing_altitude(self):
+        """Test points without altitude are kept and points without position dropped."""
+        track = self.track.copy()
+        track.loc[[0, 5, 500, 999], 'altitude'] = np.nan
+        track.loc[7, 'latitude'] = np.nan
+        blob = encode_track(track, block_size=128)
+        decoded = decode_track(blob)
+        expected = track.drop(index=7)
+        
+        self.assertEqual(track_points(blob), len(expected))
+        np.testing.assert_array_equal(decoded['time'], expected['time'])
+        np.testing.assert_array_equal(decoded['altitude'], expected['altitude'])
+    
+    def test_save_and_load_track(self):
+        """Test storing and reading tracks keyed by icao24 and firstSeen."""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        first_seen = int(self.track['time'][0])
+        positions = self.track.assign(icao24='abc123', firstSeen=first_seen)
+        
+        self.assertEqual(save_tracks(positions, session), 1)
+        self.assertEqual(save_tracks(positions.iloc[:10], session), 1)
+        
+        self.assertEqual(len(load_track(session, 'abc123', first_seen)), 10)
+        
+        positions.loc[positions.index[:3], 'longitude'] = np.nan
+        positions.loc[positions.index[3:6], 'altitude'] = np.nan
+        save_tracks(positions.iloc[:10], session)
+        self.assertEqual(session.query(FlightTrack.points).scalar(), 7)
+        self.assertEqual(len(load_track(session, 'abc123', first_seen)), 7)
+        self.assertTrue(load_track(session, 'def456', first_seen).empty)
+        session.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,8 +12,10 @@ from transform import (
     transform_flight_data,
     calculate_flight_duration,
     calculate_flight_distance,
-    create_airport_pairs
+    create_airport_pairs,
+    enrich_aircraft
 )
+from registry import AircraftRegistry
 
 class TestTransform(unittest.TestCase):
     """Test cases for the transform module."""
@@ -69,6 +71,25 @@ class TestTransform(unittest.TestCase):
         self.assertEqual(result_df.iloc[0]['airport_pair'], 'EDDF-LFPG')
         self.assertEqual(result_df.iloc[1]['airport_pair'], 'LFPG-EDDF')
     
+    def test_enrich_aircraft(self):
+        """Test enriching flights from an aircraft registry."""
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, 'aircraftDatabase.csv')
+            pd.DataFrame({
+                'icao24': ['abc123'],
+                'registration': ['D-AIBD'],
+                'typecode': ['A319'],
+                'model': ['A319-112'],
+                'operator': ['Lufthansa']
+            }).to_csv(csv_path, index=False)
+            
+            result_df = enrich_aircraft(self.df, AircraftRegistry.open(csv_path))
+        
+        # Assertions
+        self.assertEqual(list(result_df['registration']), ['D-AIBD', None])
+        self.assertEqual(result_df.iloc[0]['aircraft_type'], 'A319')
+        self.assertEqual(len(result_df), len(self.df))
+    
     @patch('opensky_etl.transform.apply_sql_transformation')
     def test_transform_flight_data(self, mock_apply_sql):
         """Test transforming flight data."""
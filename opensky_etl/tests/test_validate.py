@@ -0,0 +1,81 @@
+"""
+Unit tests for the validate module.
+"""
+import json
+import unittest
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from connections.postgresql import create_schema
+from validate import validate_flight_data, is_airport_code, reason_strings
+
+class TestValidate(unittest.TestCase):
+    """Test cases for the validate module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.df = pd.DataFrame({
+            'icao24': ['abc123', None, 'xyz!!!', 'def456', 'aaa111'],
+            'firstSeen': [1000, 1000, 1000, 5000, 1000],
+            'lastSeen': [4600, 4600, 4600, 4000, 1000 + 3 * 86400],
+            'estDepartureAirport': ['EDDF', 'EDDF', None, 'eddf', 'K1G4'],
+            'estArrivalAirport': ['LFPG', None, 'LFPGX', 'EDDF', None],
+            'callsign': ['DLH123', 'AFR456', 'BAW1', 'DLH9', 'UAL1']
+        })
+        self.engine = create_engine("sqlite://")
+        create_schema(self.engine)
+
+    def test_is_airport_code(self):
+        """Test the vectorized airport code check."""
+        result = is_airport_code(pd.Series(['EDDF', 'K1G4', 'eddf', 'EDD', 'EDDFX', None, 'ÉDDF']))
+        self.assertEqual(list(result), [True, True, False, False, False, False, False])
+
+    def test_reason_strings(self):
+        """Test reason codes are joined per row."""
+        failures = np.array([[True, False, True], [False, True, False]])
+        self.assertEqual(list(reason_strings(failures, ['a', 'b', 'c'])), ['a,c', 'b'])
+
+    def test_validate_flight_data(self):
+        """Test failing rows are quarantined with reasons and counted per rule."""
+        stats = {}
+        result = validate_flight_data(self.df, self.engine, stats=stats)
+
+        self.assertEqual(list(result['icao24']), ['abc123'])
+        self.assertEqual(stats['checked'], 5)
+        self.assertEqual(stats['passed'], 1)
+        self.assertEqual(stats['quarantined'], 4)
+        self.assertEqual(stats['rules']['null_icao24'], 1)
+        self.assertEqual(stats['rules']['malformed_icao24'], 1)
+        self.assertEqual(stats['rules']['last_seen_before_first_seen'], 1)
+        self.assertEqual(stats['rules']['implausible_duration'], 1)
+        self.assertEqual(stats['rules']['malformed_departure_airport'], 1)
+        self.assertEqual(stats['rules']['malformed_arrival_airport'], 1)
+        self.assertEqual(stats['rules']['null_first_seen'], 0)
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(
+                'SELECT icao24, "firstSeen", reasons, record FROM quarantined_flights ORDER BY id'
+            )).fetchall()
+        self.assertEqual([row[2] for row in rows], [
+            'null_icao24',
+            'malformed_icao24,malformed_arrival_airport',
+            'last_seen_before_first_seen,malformed_departure_airport',
+            'implausible_duration'
+        ])
+        self.assertEqual((rows[1][0], rows[1][1]), ('xyz!!!', 1000))
+        self.assertEqual(json.loads(rows[3][3])['callsign'], 'UAL1')
+
+    def test_validate_clean_batch(self):
+        """Test a clean batch passes unchanged without quarantine writes."""
+        clean = self.df.iloc[[0]]
+        stats = {}
+        result = validate_flight_data(clean, self.engine, stats=stats)
+
+        self.assertIs(result, clean)
+        self.assertEqual(stats['quarantined'], 0)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT COUNT(*) FROM quarantined_flights")).scalar(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
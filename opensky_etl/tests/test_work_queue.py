@@ -0,0 +1,120 @@
+"""
+Unit tests for the work_queue module.
+"""
+import os
+import tempfile
+import threading
+import unittest
+from sqlalchemy import create_engine, text
+
+from connections.postgresql import create_schema
+from work_queue import WorkQueue, unit_windows
+
+HOUR = 3600
+
+class TestWorkQueue(unittest.TestCase):
+    """Test cases for the work_queue module."""
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directory.name, 'queue.db')}")
+        create_schema(self.engine)
+
+    def tearDown(self):
+        """Remove the database."""
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def queue(self, worker_id, **kwargs):
+        """Queue handle of a worker."""
+        return WorkQueue(self.engine, queue="test", worker_id=worker_id, **kwargs)
+
+    def test_unit_windows(self):
+        """Test windows are aligned to the interval."""
+        self.assertEqual(unit_windows(HOUR + 10, 3 * HOUR + 5, HOUR), [
+            (HOUR, 2 * HOUR), (2 * HOUR, 3 * HOUR), (3 * HOUR, 3 * HOUR + 5)
+        ])
+        self.assertEqual(unit_windows(HOUR + 10, 3 * HOUR + 5, HOUR, complete_only=True), [
+            (HOUR, 2 * HOUR), (2 * HOUR, 3 * HOUR)
+        ])
+
+    def test_enqueue_deduplicates(self):
+        """Test workers enqueueing overlapping ranges share units."""
+        self.queue("a").enqueue(0, 4 * HOUR, interval=HOUR)
+        self.queue("b").enqueue(2 * HOUR + 30, 6 * HOUR, airports=None, interval=HOUR)
+        self.queue("b").enqueue(0, HOUR, airports=['EDDF', 'LFPG'], interval=HOUR)
+        self.assertEqual(self.queue("a").progress(), {'pending': 8})
+
+    def test_concurrent_leases_are_exclusive(self):
+        """Test concurrent workers never lease the same unit."""
+        self.queue("setup").enqueue(0, 40 * HOUR, interval=HOUR)
+        processed = []
+        lock = threading.Lock()
+
+        def work(worker_id):
+            queue = self.queue(worker_id)
+            while True:
+                units = queue.lease()
+                if not units:
+                    return
+                with lock:
+                    processed.append(units[0]['unit_key'])
+                self.assertTrue(queue.complete(units[0]))
+
+        threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(processed), 40)
+        self.assertEqual(len(set(processed)), 40)
+        self.assertEqual(self.queue("a").progress(), {'done': 40})
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test a unit whose worker stopped heartbeating is leased again."""
+        first, second = self.queue("a"), self.queue("b")
+        first.enqueue(0, HOUR, interval=HOUR)
+        unit = first.lease()[0]
+        self.assertEqual(second.lease(), [])
+        self.assertEqual(first.heartbeat([unit['id']]), 1)
+
+        with self.engine.begin() as conn:
+            conn.execute(text("UPDATE work_units SET lease_expires = 0"))
+
+        reclaimed = second.lease()[0]
+        self.assertEqual((reclaimed['id'], reclaimed['attempts'], reclaimed['lease_owner']), (unit['id'], 2, "b"))
+        # The first worker lost its lease
+        self.assertEqual(first.heartbeat([unit['id']]), 0)
+        self.assertFalse(first.complete(unit))
+        self.assertTrue(second.complete(reclaimed))
+
+    def test_release_retries_then_fails(self):
+        """Test released units are retried until max_attempts."""
+        queue = self.queue("a", max_attempts=2)
+        queue.enqueue(0, HOUR, interval=HOUR)
+
+        self.assertTrue(queue.release(queue.lease()[0], error="HTTP 500"))
+        self.assertEqual(queue.progress(), {'pending': 1})
+        self.assertTrue(queue.release(queue.lease()[0], error="HTTP 500"))
+        self.assertEqual(queue.progress(), {'failed': 1})
+        self.assertEqual(queue.lease(), [])
+
+        # Failed units get their attempts back
+        self.assertEqual(queue.retry_failed(), 1)
+        self.assertEqual(queue.lease()[0]['attempts'], 1)
+
+    def test_reclaim_expired(self):
+        """Test expired leases are returned to pending."""
+        queue = self.queue("a")
+        queue.enqueue(0, 2 * HOUR, interval=HOUR)
+        queue.lease(limit=2)
+        with self.engine.begin() as conn:
+            conn.execute(text("UPDATE work_units SET lease_expires = 0 WHERE start_time = 0"))
+
+        self.assertEqual(queue.reclaim_expired(), 1)
+        self.assertEqual(queue.progress(), {'leased': 1, 'pending': 1})
+
+if __name__ == '__main__':
+    unittest.main()
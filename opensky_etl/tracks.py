@@ -0,0 +1,296 @@
+"""
+Compact trajectory storage for the OpenSky ETL pipeline.
+
+A track is encoded as one binary blob: time, latitude, longitude and
+altitude are quantized to integers, delta-encoded, zigzag-mapped and
+written as LEB128 varints, column after column, in blocks of
+TRACK_BLOCK_SIZE points. A small header stores the absolute first value
+and byte offsets of every block, so a time range decodes only the blocks
+it overlaps. Points without a position are dropped; a missing altitude is
+stored as ALTITUDE_NULL and decoded as NaN.
+
+Blob layout (little endian):
+    magic "TRK1" | uint32 points | uint32 block size | uint32 blocks
+    per block: int64 first time, int64 last time, uint32 byte offset, uint32 byte length
+    block payloads
+"""
+import struct
+import requests
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from config.settings import (
+    OPENSKY_USERNAME, OPENSKY_PASSWORD, OPENSKY_API_URL, TRACK_BLOCK_SIZE
+)
+from connections.postgresql import FlightTrack
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("tracks")
+
+MAGIC = b"TRK1"
+HEADER = struct.Struct("<4sIII")
+BLOCK_HEADER = struct.Struct("<qqII")
+
+# Quantization: seconds, 1e-5 degrees (~1 m), meters
+SCALES = {'time': 1, 'latitude': 1e5, 'longitude': 1e5, 'altitude': 1}
+TRACK_COLUMNS = list(SCALES)
+
+# Quantized altitude of points without one (OpenSky sends no baro_altitude on the ground)
+ALTITUDE_NULL = -2 ** 31
+
+def encode_varints(values):
+    """
+    Vectorized zigzag + LEB128 varint encoding.
+
+    Args:
+        values (np.ndarray): int64 values
+
+    Returns:
+        bytes: Encoded values
+    """
+    values = np.asarray(values, dtype=np.int64)
+    zigzag = ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+    # Number of 7-bit groups needed by each value
+    lengths = np.ones(len(zigzag), dtype=np.int64)
+    remaining = zigzag >> np.uint64(7)
+    while remaining.any():
+        lengths += remaining > 0
+        remaining >>= np.uint64(7)
+
+    # One output byte per group: value index and group position within the value
+    owners = np.repeat(np.arange(len(zigzag)), lengths)
+    group_starts = np.cumsum(lengths) - lengths
+    positions = np.arange(len(owners)) - np.repeat(group_starts, lengths)
+
+    out = ((zigzag[owners] >> (positions * 7).astype(np.uint64)) & np.uint64(0x7F)).astype(np.uint8)
+    out[positions < np.repeat(lengths, lengths) - 1] |= 0x80
+    return out.tobytes()
+
+def decode_varints(data, count):
+    """
+    Vectorized LEB128 + zigzag decoding.
+
+    Args:
+        data (bytes or np.ndarray): Encoded bytes
+        count (int): Number of values expected
+
+    Returns:
+        tuple: (int64 values, number of bytes consumed)
+    """
+    raw = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    ends = np.flatnonzero(raw < 0x80)[:count]
+    if len(ends) < count:
+        raise ValueError("Truncated varint data")
+
+    used = int(ends[-1]) + 1 if count else 0
+    raw = raw[:used]
+    group_starts = np.concatenate([[0], ends[:-1] + 1])
+    lengths = ends - group_starts + 1
+    positions = np.arange(used) - np.repeat(group_starts, lengths)
+
+    parts = (raw & 0x7F).astype(np.uint64) << (positions * 7).astype(np.uint64)
+    zigzag = np.add.reduceat(parts, group_starts) if count else np.empty(0, dtype=np.uint64)
+    values = (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+    return values, used
+
+def quantize(track):
+    """Convert a track DataFrame to a dict of int64 columns."""
+    columns = {}
+    for column, scale in SCALES.items():
+        values = np.round(track[column].to_numpy(dtype=np.float64, na_value=np.nan) * scale)
+        if column == 'altitude':
+            values[np.isnan(values)] = ALTITUDE_NULL
+        columns[column] = values.astype(np.int64)
+    return columns
+
+def track_points(blob):
+    """Number of points of an encoded track."""
+    return HEADER.unpack_from(blob, 0)[1]
+
+def encode_track(track, block_size=TRACK_BLOCK_SIZE):
+    """
+    Encode a trajectory.
+
+    Args:
+        track (pd.DataFrame): Columns time, latitude, longitude, altitude;
+                              points without time or position are dropped
+        block_size (int): Points per independently decodable block
+
+    Returns:
+        bytes: Encoded track
+    """
+    track = track.dropna(subset=['time', 'latitude', 'longitude']).sort_values('time')
+    columns = quantize(track)
+    points = len(track)
+
+    block_headers = []
+    payloads = []
+    offset = 0
+    for start in range(0, points, block_size):
+        stop = min(start + block_size, points)
+        payload = b"".join(
+            # The first delta of each block is its absolute value
+            encode_varints(np.diff(values[start:stop], prepend=0))
+            for values in columns.values()
+        )
+        block_headers.append(BLOCK_HEADER.pack(
+            int(columns['time'][start]), int(columns['time'][stop - 1]), offset, len(payload)
+        ))
+        payloads.append(payload)
+        offset += len(payload)
+
+    return HEADER.pack(MAGIC, points, block_size, len(payloads)) + b"".join(block_headers) + b"".join(payloads)
+
+def decode_track(blob, start=None, end=None):
+    """
+    Decode a trajectory, optionally only points within a time range.
+
+    Args:
+        blob (bytes): Output of encode_track
+        start (int, optional): Earliest point time
+        end (int, optional): Latest point time
+
+    Returns:
+        pd.DataFrame: Columns time, latitude, longitude, altitude
+    """
+    magic, points, block_size, blocks = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded track")
+
+    data_start = HEADER.size + blocks * BLOCK_HEADER.size
+    block_headers = [
+        BLOCK_HEADER.unpack_from(blob, HEADER.size + block * BLOCK_HEADER.size)
+        for block in range(blocks)
+    ]
+
+    # Blocks are time ordered, so the overlapping ones are contiguous
+    selected = [
+        block for block, (first_time, last_time, _, _) in enumerate(block_headers)
+        if (start is None or last_time >= start) and (end is None or first_time <= end)
+    ]
+    decoded = {column: [] for column in TRACK_COLUMNS}
+
+    if selected:
+        first, last = selected[0], selected[-1]
+        counts = [min(block_size, points - block * block_size) for block in selected]
+        payload_start = data_start + block_headers[first][2]
+        payload_end = data_start + block_headers[last][2] + block_headers[last][3]
+
+        # One vectorized pass over all selected blocks
+        values, _ = decode_varints(
+            np.frombuffer(blob, dtype=np.uint8, count=payload_end - payload_start, offset=payload_start),
+            sum(counts) * len(TRACK_COLUMNS)
+        )
+
+        position = 0
+        for count in counts:
+            block_values = values[position:position + count * len(TRACK_COLUMNS)].reshape(len(TRACK_COLUMNS), count)
+            for column, deltas in zip(TRACK_COLUMNS, block_values):
+                decoded[column].append(np.cumsum(deltas))
+            position += count * len(TRACK_COLUMNS)
+
+    track = pd.DataFrame({
+        column: (np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)) / SCALES[column]
+        for column, parts in decoded.items()
+    })
+    track['time'] = track['time'].astype(np.int64)
+    track.loc[track['altitude'] == ALTITUDE_NULL, 'altitude'] = np.nan
+
+    if start is not None:
+        track = track[track['time'] >= start]
+    if end is not None:
+        track = track[track['time'] <= end]
+    return track.reset_index(drop=True)
+
+def fetch_track(icao24, first_seen, api_url=OPENSKY_API_URL):
+    """
+    Fetch the trajectory of a flight from the OpenSky tracks endpoint.
+
+    Args:
+        icao24 (str): Aircraft address
+        first_seen (int): Any time during the flight, usually firstSeen
+        api_url (str): OpenSky API base URL
+
+    Returns:
+        pd.DataFrame: Columns icao24, firstSeen, time, latitude, longitude,
+                      altitude; empty on error
+    """
+    url = f"{api_url}/tracks/all?icao24={icao24}&time={first_seen}"
+    try:
+        response = requests.get(url, auth=(OPENSKY_USERNAME, OPENSKY_PASSWORD))
+        if response.status_code != 200:
+            logger.error("Error %s: %s", response.status_code, response.text)
+            return pd.DataFrame(columns=['icao24', 'firstSeen', *TRACK_COLUMNS])
+
+        # Waypoints are [time, latitude, longitude, baro_altitude, true_track, on_ground]
+        path = response.json().get("path") or []
+        track = pd.DataFrame([point[:4] for point in path], columns=TRACK_COLUMNS)
+        return track.assign(icao24=icao24, firstSeen=int(first_seen))
+    except Exception as e:
+        logger.error("Exception during track request: %s", e)
+        return pd.DataFrame(columns=['icao24', 'firstSeen', *TRACK_COLUMNS])
+
+def save_tracks(positions, session):
+    """
+    Encode positions per flight and store them in the flight_tracks table.
+
+    Tracks of flights already stored are replaced.
+
+    Args:
+        positions (pd.DataFrame): Columns icao24, firstSeen, time, latitude,
+                                  longitude, altitude
+        session: SQLAlchemy session
+
+    Returns:
+        int: Number of tracks written
+    """
+    if positions.empty:
+        return 0
+
+    try:
+        written = 0
+        for (icao24, first_seen), track in positions.groupby(['icao24', 'firstSeen']):
+            blob = encode_track(track)
+            stored = session.execute(
+                select(FlightTrack).where(FlightTrack.icao24 == icao24, FlightTrack.firstSeen == int(first_seen))
+            ).scalar_one_or_none()
+
+            if stored is None:
+                session.add(FlightTrack(icao24=icao24, firstSeen=int(first_seen), points=track_points(blob), data=blob))
+            else:
+                stored.points = track_points(blob)
+                stored.data = blob
+            written += 1
+
+        session.commit()
+        logger.info("Saved %d tracks", written)
+        return written
+    except Exception as e:
+        session.rollback()
+        logger.error("Error saving tracks: %s", e)
+        return 0
+
+def load_track(session, icao24, first_seen, start=None, end=None):
+    """
+    Read the track of a flight, optionally a time range of it.
+
+    Args:
+        session: SQLAlchemy session
+        icao24 (str): Aircraft address
+        first_seen (int): Flight firstSeen
+        start (int, optional): Earliest point time
+        end (int, optional): Latest point time
+
+    Returns:
+        pd.DataFrame: Track points, empty if the flight has no track
+    """
+    blob = session.execute(
+        select(FlightTrack.data).where(FlightTrack.icao24 == icao24, FlightTrack.firstSeen == int(first_seen))
+    ).scalar_one_or_none()
+
+    if blob is None:
+        return pd.DataFrame(columns=TRACK_COLUMNS)
+    return decode_track(blob, start, end)
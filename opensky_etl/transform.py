@@ -9,10 +9,44 @@ from sqlalchemy import text
 
 from utils.logging_config import get_logger
 from connections.postgresql import execute_sql_from_file
+from registry import get_registry
 
 # Initialize logger
 logger = get_logger("transform")
 
+def render_sql_template(sql_template, engine, is_incremental=False, last_value=0):
+    """
+    Render the Jinja2-style templating of a SQL file.
+    
+    Args:
+        sql_template (str): SQL with {% if is_incremental %} blocks and
+                            {{last_incremental_value}} placeholders
+        engine: SQLAlchemy engine
+        is_incremental (bool): Whether to use incremental loading
+        last_value (int): Last incremental value
+        
+    Returns:
+        str: SQL for the engine's database
+    """
+    # Replace Jinja2-style templates
+    sql = sql_template.replace("{% if is_incremental %}", "" if is_incremental else "/*")
+    sql = sql.replace("{% endif %}", "" if is_incremental else "*/")
+    sql = sql.replace("{{last_incremental_value}}", str(last_value))
+    
+    # PostgreSQL needs quoted column names to preserve case sensitivity
+    # This is a simple replacement - for complex SQL, consider a real SQL parser
+    is_postgresql = 'postgresql' in str(engine.url)
+    if is_postgresql:
+        # Simple regex to find column references
+        column_pattern = r'([a-zA-Z][a-zA-Z0-9_]*\.[a-zA-Z][a-zA-Z0-9_]*)'
+        
+        def add_quotes(match):
+            parts = match.group(1).split('.')
+            return f'"{parts[0]}"."{parts[1]}"'
+            
+        sql = re.sub(column_pattern, add_quotes, sql)
+    return sql
+
 def apply_sql_transformation(engine, sql_path, is_incremental=False, last_value=0):
     """
     Apply SQL transformation from a file using Jinja2-style templating.
@@ -26,53 +60,37 @@ def apply_sql_transformation(engine, sql_path, is_incremental=False, last_value=
     Returns:
         pd.DataFrame: Transformed data
     """
-    logger.info(f"Applying SQL transformation from {sql_path}")
+    logger.info("Applying SQL transformation from %s", sql_path)
     
     try:
         # Correct path to look in the package directory
         script_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         full_path = os.path.join(script_dir, sql_path)
         
-        logger.debug(f"Looking for SQL file at: {full_path}")
+        logger.debug("Looking for SQL file at: %s", full_path)
         
         # Check if file exists
         if not os.path.exists(full_path):
-            logger.error(f"SQL file not found: {full_path}")
+            logger.error("SQL file not found: %s", full_path)
             return pd.DataFrame()
         
         # Read SQL file
         with open(full_path, 'r') as f:
             sql_template = f.read()
         
-        # Replace Jinja2-style templates
-        sql = sql_template.replace("{% if is_incremental %}", "" if is_incremental else "/*")
-        sql = sql.replace("{% endif %}", "" if is_incremental else "*/")
-        sql = sql.replace("{{last_incremental_value}}", str(last_value))
-        
-        # PostgreSQL needs quoted column names to preserve case sensitivity
-        # This is a simple replacement - for complex SQL, consider a real SQL parser
-        is_postgresql = 'postgresql' in str(engine.url)
-        if is_postgresql:
-            # Simple regex to find column references
-            column_pattern = r'([a-zA-Z][a-zA-Z0-9_]*\.[a-zA-Z][a-zA-Z0-9_]*)'
-            
-            def add_quotes(match):
-                parts = match.group(1).split('.')
-                return f'"{parts[0]}"."{parts[1]}"'
-                
-            sql = re.sub(column_pattern, add_quotes, sql)
+        sql = render_sql_template(sql_template, engine, is_incremental, last_value)
         
-        logger.debug(f"Processed SQL: {sql[:500]}...")  # Log first 500 chars of SQL
+        logger.debug("Processed SQL: %.500s...", sql)  # Log first 500 chars of SQL
         
         # Execute query
         with engine.connect() as conn:
             result = pd.read_sql(text(sql), conn)
             
-        logger.info(f"Transformation complete. Returned {len(result)} rows.")
+        logger.info("Transformation complete. Returned %d rows.", len(result))
         return result
     
     except Exception as e:
-        logger.error(f"Error applying SQL transformation: {e}")
+        logger.error("Error applying SQL transformation: %s", e)
         return pd.DataFrame()
 
 def transform_flight_data(df, engine, is_incremental=False, last_value=0):
@@ -88,7 +106,7 @@ def transform_flight_data(df, engine, is_incremental=False, last_value=0):
     Returns:
         pd.DataFrame: Transformed flight data
     """
-    logger.info(f"Starting flight data transformation with {len(df)} records")
+    logger.info("Starting flight data transformation with %d records", len(df))
     
     if df.empty:
         logger.warning("Empty DataFrame, skipping transformations")
@@ -99,12 +117,13 @@ def transform_flight_data(df, engine, is_incremental=False, last_value=0):
         df = calculate_flight_duration(df)
         df = calculate_flight_distance(df)
         df = create_airport_pairs(df)
+        df = enrich_aircraft(df)
         
         logger.info("Transformations applied successfully")
         return df
         
     except Exception as e:
-        logger.error(f"Error in transformations: {e}")
+        logger.error("Error in transformations: %s", e)
         return df
 
 def calculate_flight_duration(df):
@@ -123,7 +142,7 @@ def calculate_flight_duration(df):
         df['flight_duration_minutes'] = (df['lastSeen'] - df['firstSeen']) / 60.0
         return df
     except Exception as e:
-        logger.error(f"Error calculating flight duration: {e}")
+        logger.error("Error calculating flight duration: %s", e)
         return df
 
 def calculate_flight_distance(df):
@@ -146,7 +165,7 @@ def calculate_flight_distance(df):
         ) / 1000.0
         return df
     except Exception as e:
-        logger.error(f"Error calculating flight distance: {e}")
+        logger.error("Error calculating flight distance: %s", e)
         return df
 
 def create_airport_pairs(df):
@@ -170,5 +189,35 @@ def create_airport_pairs(df):
         )
         return df
     except Exception as e:
-        logger.error(f"Error creating airport pairs: {e}")
-        return df
\ No newline at end of file
+        logger.error("Error creating airport pairs: %s", e)
+        return df
+
+def enrich_aircraft(df, registry=None):
+    """
+    Add registration, aircraft type, model and operator from the aircraft registry.
+    
+    Lookups are a vectorized binary search over the memory-mapped registry
+    index (see registry.py), built from AIRCRAFT_REGISTRY_PATH on first use.
+    
+    Args:
+        df (pd.DataFrame): Flight data DataFrame
+        registry (AircraftRegistry, optional): Registry to use instead of
+                                               the configured one
+        
+    Returns:
+        pd.DataFrame: DataFrame with registry columns, unchanged if no
+                      registry is configured
+    """
+    try:
+        registry = registry if registry is not None else get_registry()
+        if registry is None:
+            return df
+        
+        logger.info("Enriching aircraft metadata")
+        metadata = registry.lookup(df['icao24'])
+        df = df.drop(columns=[col for col in metadata.columns if col in df.columns]).join(metadata)
+        logger.info("Found registry entries for %d of %d flights", metadata.notna().any(axis=1).sum(), len(df))
+        return df
+    except Exception as e:
+        logger.error("Error enriching aircraft metadata: %s", e)
+        return df
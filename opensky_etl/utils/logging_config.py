@@ -1,72 +1,251 @@
 """
 Logging configuration for the OpenSky ETL pipeline.
+
+Loggers only put records on a bounded queue; a background thread formats
+them and writes them to the console and the rotating log file, so slow
+handlers never stall the extract or load loops. Messages should use lazy
+%-style arguments, which are only formatted on that thread and only for
+enabled levels. Records carry the run, stage and window fields bound with
+log_context, and repetitive messages below ERROR are rate-limited by
+message template.
 """
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from datetime import datetime
-from config.settings import LOG_FORMAT, LOG_FILE, LOG_LEVEL
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from datetime import datetime, timezone
+from config.settings import (
+    LOG_FORMAT, LOG_FILE, LOG_LEVEL, LOG_FILE_FORMAT, LOG_CONSOLE_FORMAT, LOG_QUEUE_SIZE,
+    LOG_RATE_LIMIT_INTERVAL, LOG_RATE_LIMIT_BURST
+)
+
+# Structured fields added to every record
+CONTEXT_FIELDS = ("run", "stage", "window")
+
+_log_context = ContextVar("log_context", default={})
+
+# Listener of the background logging thread
+_listener = None
+
+def bind_log_context(**fields):
+    """
+    Add fields to the log context of the current thread or task.
+
+    Args:
+        **fields: Values of CONTEXT_FIELDS
+
+    Returns:
+        Token: Token for reset_log_context
+    """
+    return _log_context.set({**_log_context.get(), **fields})
+
+def reset_log_context(token):
+    """Restore the log context from before bind_log_context returned the token."""
+    _log_context.reset(token)
+
+@contextmanager
+def log_context(**fields):
+    """Bind fields to the log context for the duration of a block."""
+    token = bind_log_context(**fields)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+class ContextFilter(logging.Filter):
+    """Attach the log context of the calling thread or task to records."""
+
+    def filter(self, record):
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most `burst` records per message template and interval.
+
+    Records at ERROR and above always pass. The first record of a template
+    after suppression reports how many were dropped. Templates are the
+    unformatted messages, so callers log with %-style arguments. Expired
+    windows are pruned once per interval, except those holding a count of
+    suppressed records still to report.
+    """
+
+    def __init__(self, interval=LOG_RATE_LIMIT_INTERVAL, burst=LOG_RATE_LIMIT_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        # (logger, level, template) -> [window start, count, suppressed]
+        self.windows = {}
+        self.pruned = time.monotonic()
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if not self.interval or record.levelno >= logging.ERROR:
+            return True
+        now = time.monotonic()
+        key = (record.name, record.levelno, record.msg)
+        with self.lock:
+            if now - self.pruned >= self.interval:
+                self.windows = {
+                    name: window for name, window in self.windows.items()
+                    if now - window[0] < self.interval or window[2]
+                }
+                self.pruned = now
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+            elif window[1] < self.burst:
+                window[1] += 1
+                suppressed = 0
+            else:
+                window[2] += 1
+                return False
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """LOG_FORMAT, noting the number of suppressed repeats of a message."""
+
+    def format(self, record):
+        message = super().format(record)
+        if getattr(record, "suppressed", 0):
+            message += f" ({record.suppressed} similar messages suppressed)"
+        return message
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks the thread that logs.
+
+    Records are queued as they are: message arguments are formatted by the
+    listener thread. When the queue is full the record is dropped and
+    counted instead.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def create_formatter(kind):
+    """Formatter for a LOG_*_FORMAT value."""
+    return JsonFormatter() if kind == "json" else TextFormatter(LOG_FORMAT)
+
+def stop_logging():
+    """Flush queued records and stop the background logging thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
 
 def setup_logging(name="opensky_etl", log_level=None):
     """
     Configure logging for the ETL pipeline.
-    
+
     Args:
         name (str): Logger name
-        log_level (str, optional): Logging level (e.g., "INFO", "DEBUG"). 
+        log_level (str, optional): Logging level (e.g., "INFO", "DEBUG").
                                   Defaults to value from settings.
-        
+
     Returns:
         logging.Logger: Configured logger instance
     """
+    global _listener
+
     # Create logs directory if it doesn't exist
     os.makedirs("logs", exist_ok=True)
-    
+
     # Generate log filename with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_filename = f"logs/{LOG_FILE.replace('.log', '')}_{timestamp}.log"
-    
+
     # Use provided log_level or default from settings
     level = log_level if log_level else LOG_LEVEL
-    
+
     # Create logger
     logger = logging.getLogger(name)
     logger.setLevel(getattr(logging, level))
-    
+
     # Remove existing handlers if any
     if logger.handlers:
         logger.handlers.clear()
-    
+    stop_logging()
+
     # Create console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(getattr(logging, level))
-    console_format = logging.Formatter(LOG_FORMAT)
-    console_handler.setFormatter(console_format)
-    
+    console_handler.setFormatter(create_formatter(LOG_CONSOLE_FORMAT))
+
     # Create file handler
     file_handler = RotatingFileHandler(
-        log_filename, 
+        log_filename,
         maxBytes=10485760,  # 10MB
         backupCount=5
     )
     file_handler.setLevel(getattr(logging, level))
-    file_format = logging.Formatter(LOG_FORMAT)
-    file_handler.setFormatter(file_format)
-    
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    
+    file_handler.setFormatter(create_formatter(LOG_FILE_FORMAT))
+
+    # Handlers run on the listener thread; the logger only enqueues
+    queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    queue_handler.addFilter(RateLimitFilter())
+    queue_handler.addFilter(ContextFilter())
+    _listener = QueueListener(queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+    _listener.start()
+    logger.addHandler(queue_handler)
+
     return logger
 
 def get_logger(module_name):
     """
     Get a logger for a specific module.
-    
+
     Args:
         module_name (str): Module name
-        
+
     Returns:
         logging.Logger: Logger for the module
     """
-    return logging.getLogger(f"opensky_etl.{module_name}")
\ No newline at end of file
+    return logging.getLogger(f"opensky_etl.{module_name}")
+
+# Write out queued records on exit
+atexit.register(stop_logging)
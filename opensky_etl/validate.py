@@ -0,0 +1,176 @@
+"""
+Validation module for the OpenSky ETL pipeline.
+
+Runs between extract and transform. Each rule in VALIDATION_RULES maps a
+reason code to a function returning a boolean mask of the failing rows,
+evaluated over the whole batch at once. Failing rows are written in bulk
+to the quarantined_flights table with their reason codes and the rest
+continue through the pipeline.
+"""
+import time
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from config.settings import VALIDATION_MAX_FLIGHT_SECONDS
+from connections.postgresql import QuarantinedFlight
+from registry import icao24_keys
+from utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger("validate")
+
+def is_airport_code(values):
+    """
+    Vectorized check for 4-character uppercase alphanumeric ICAO airport codes.
+
+    Args:
+        values (pd.Series): Codes, nulls allowed
+
+    Returns:
+        np.ndarray: Boolean mask, False for nulls
+    """
+    # A batch holds a few thousand distinct airports, so only those are checked
+    positions, uniques = pd.factorize(values)
+    # Unicode code points, one row per code; a 5th character means too long
+    chars = np.asarray(uniques, dtype=object).astype('U5').view(np.uint32).reshape(-1, 5)
+    code = chars[:, :4]
+    is_alphanumeric = ((code >= ord('A')) & (code <= ord('Z'))) | ((code >= ord('0')) & (code <= ord('9')))
+    valid = np.append(is_alphanumeric.all(axis=1) & (chars[:, 4] == 0), False)
+    # Nulls are factorized to -1, the appended False
+    return valid[positions]
+
+def malformed_airport(column):
+    """Rule: airport code present but not a valid ICAO code."""
+    return lambda df: df[column].notna().to_numpy() & ~is_airport_code(df[column])
+
+def seconds(df, column):
+    """Timestamp column as numbers, NaN for nulls and non-numeric values."""
+    return pd.to_numeric(df[column], errors='coerce')
+
+# Reason code -> mask of failing rows
+VALIDATION_RULES = {
+    'null_icao24': lambda df: df['icao24'].isna().to_numpy(),
+    'malformed_icao24': lambda df: df['icao24'].notna().to_numpy() & ~icao24_keys(df['icao24'])[1],
+    'null_first_seen': lambda df: seconds(df, 'firstSeen').isna().to_numpy(),
+    'null_last_seen': lambda df: seconds(df, 'lastSeen').isna().to_numpy(),
+    'last_seen_before_first_seen': lambda df: (seconds(df, 'lastSeen') < seconds(df, 'firstSeen')).to_numpy(),
+    'implausible_duration': lambda df: (
+        seconds(df, 'lastSeen') - seconds(df, 'firstSeen') > VALIDATION_MAX_FLIGHT_SECONDS
+    ).to_numpy(),
+    'malformed_departure_airport': malformed_airport('estDepartureAirport'),
+    'malformed_arrival_airport': malformed_airport('estArrivalAirport')
+}
+
+def evaluate_rules(df, rules=VALIDATION_RULES):
+    """
+    Evaluate validation rules over a batch.
+
+    Args:
+        df (pd.DataFrame): Flight data
+        rules (dict): Reason code -> mask function
+
+    Returns:
+        tuple: (boolean matrix of shape (rows, rules), list of reason codes)
+    """
+    codes = list(rules)
+    failures = np.zeros((len(df), len(codes)), dtype=bool)
+    for i, code in enumerate(codes):
+        failures[:, i] = np.asarray(rules[code](df), dtype=bool)
+    return failures, codes
+
+def reason_strings(failures, codes):
+    """
+    Build comma-separated reason codes for failing rows.
+
+    Args:
+        failures (np.ndarray): Boolean matrix of failing rows only
+        codes (list): Reason codes of the matrix columns
+
+    Returns:
+        np.ndarray: One string per row
+    """
+    reasons = np.full(len(failures), '', dtype=object)
+    for i, code in enumerate(codes):
+        reasons[failures[:, i]] += code + ','
+    # Drop the trailing comma
+    return np.array([reason[:-1] for reason in reasons], dtype=object)
+
+def quarantine_records(df, reasons, engine):
+    """
+    Bulk insert failing rows into the quarantined_flights table.
+
+    Args:
+        df (pd.DataFrame): Failing rows
+        reasons (np.ndarray): Reason codes of each row
+        engine: SQLAlchemy engine
+
+    Returns:
+        int: Number of quarantined rows
+    """
+    if df.empty:
+        return 0
+
+    icao24 = df['icao24'].astype(object).where(df['icao24'].notna(), None).to_numpy()
+    first_seen = [None if pd.isna(value) else int(value) for value in seconds(df, 'firstSeen')]
+    records = df.to_json(orient='records', lines=True).splitlines()
+    now = int(time.time())
+
+    with engine.begin() as conn:
+        conn.execute(insert(QuarantinedFlight.__table__), [
+            {
+                'icao24': None if icao24[i] is None else str(icao24[i])[:24],
+                'firstSeen': first_seen[i],
+                'reasons': reasons[i],
+                'record': records[i],
+                'quarantined_at': now
+            }
+            for i in range(len(df))
+        ])
+    return len(df)
+
+def validate_flight_data(df, engine, stats=None):
+    """
+    Validate a batch, quarantining the rows that fail any rule.
+
+    Args:
+        df (pd.DataFrame): Extracted flight data
+        engine: SQLAlchemy engine
+        stats (dict, optional): Filled with checked/passed/quarantined
+                                counts and failures per rule
+
+    Returns:
+        pd.DataFrame: Rows passing every rule
+    """
+    stats = stats if stats is not None else {}
+    if df.empty:
+        return df
+
+    logger.info("Validating %d records", len(df))
+
+    try:
+        failures, codes = evaluate_rules(df)
+        failed = failures.any(axis=1)
+        stats.update({
+            "checked": len(df),
+            "passed": int((~failed).sum()),
+            "quarantined": int(failed.sum()),
+            "rules": dict(zip(codes, failures.sum(axis=0).tolist()))
+        })
+
+        if not failed.any():
+            return df
+
+        rejected = df[failed]
+        try:
+            quarantine_records(rejected, reason_strings(failures[failed], codes), engine)
+        except Exception as e:
+            logger.error("Error writing quarantined records: %s", e)
+
+        summary = ", ".join(f"{code}={count}" for code, count in stats["rules"].items() if count)
+        logger.warning("Quarantined %d of %d records (%s)", len(rejected), len(df), summary)
+        return df[~failed]
+
+    except Exception as e:
+        logger.error("Error validating data: %s", e)
+        return df
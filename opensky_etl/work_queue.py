@@ -0,0 +1,340 @@
+"""
+Lease-based work queue for the OpenSky ETL pipeline.
+
+Extraction is split into work units, one per time window and, for
+targeted extraction, per airport, stored in the work_units table. Workers
+lease units, renew the lease with heartbeats while they extract and load,
+and mark them done. A unit whose worker died becomes claimable again when
+its lease expires.
+
+On PostgreSQL a lease is a single UPDATE over a
+SELECT ... FOR UPDATE SKIP LOCKED, so workers never wait for or claim the
+same rows. SQLite has no row locks; leases are serialized with a lock file
+next to the database instead.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from sqlalchemy import and_, func, or_, select
+
+from config.settings import WORK_UNIT_SECONDS, WORK_LEASE_SECONDS, WORK_MAX_ATTEMPTS
+from connections.postgresql import WorkUnit
+from dimensions import insert_ignoring_duplicates
+from utils.logging_config import get_logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Initialize logger
+logger = get_logger("work_queue")
+
+# In-process lock for SQLite databases without a file (e.g. in-memory)
+_memory_lock = threading.Lock()
+
+def default_worker_id():
+    """Identify this worker across containers: host, process and a random suffix."""
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+def unit_windows(start_time, end_time, interval=WORK_UNIT_SECONDS, complete_only=False):
+    """
+    Split a time range into windows aligned to multiples of interval.
+
+    Aligned boundaries give every worker the same units for overlapping
+    ranges, so units enqueued by several workers are deduplicated.
+
+    Args:
+        start_time (int): Start timestamp
+        end_time (int): End timestamp
+        interval (int): Window length in seconds
+        complete_only (bool): Drop a trailing window that ends before its
+                              aligned boundary (it is enqueued once complete)
+
+    Returns:
+        list: (start, end) tuples
+    """
+    windows = []
+    current = start_time - start_time % interval
+    while current < end_time:
+        window_end = current + interval
+        if window_end > end_time:
+            if complete_only:
+                break
+            window_end = end_time
+        windows.append((current, window_end))
+        current = window_end
+    return windows
+
+class WorkQueue:
+    """Work units of one named queue, leased by this worker."""
+
+    def __init__(self, engine, queue="flights", worker_id=None,
+                 lease_seconds=WORK_LEASE_SECONDS, max_attempts=WORK_MAX_ATTEMPTS):
+        """
+        Initialize the queue.
+
+        Args:
+            engine: SQLAlchemy engine
+            queue (str): Queue name, e.g. one per backfill
+            worker_id (str, optional): Lease owner name
+            lease_seconds (int): Lease duration, renewed by heartbeats
+            max_attempts (int): Leases of a unit before it is marked failed
+        """
+        self.engine = engine
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.table = WorkUnit.__table__
+
+    @contextmanager
+    def _sqlite_lock(self):
+        """Serialize lease transactions of all processes sharing a SQLite file."""
+        database = self.engine.url.database
+        if not database or database == ":memory:" or fcntl is None:
+            with _memory_lock:
+                yield
+            return
+
+        with open(f"{database}.queue.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def enqueue(self, start_time, end_time, airports=None, interval=WORK_UNIT_SECONDS, complete_only=False):
+        """
+        Add the units of a time range, skipping units already queued.
+
+        Args:
+            start_time (int): Start timestamp
+            end_time (int): End timestamp
+            airports (list, optional): One unit per airport and window;
+                                       global windows if empty
+            interval (int): Unit length in seconds
+            complete_only (bool): See unit_windows
+
+        Returns:
+            int: Number of units in the range
+        """
+        rows = [
+            {
+                'queue': self.queue,
+                'unit_key': f"{airport or '*'}:{start}:{end}",
+                'start_time': start,
+                'end_time': end,
+                'airport': airport,
+                'status': 'pending',
+                'attempts': 0
+            }
+            for start, end in unit_windows(start_time, end_time, interval, complete_only)
+            for airport in (airports or [None])
+        ]
+        if rows:
+            with self.engine.begin() as connection:
+                connection.execute(insert_ignoring_duplicates(self.engine, self.table), rows)
+        logger.info("Enqueued %d units on queue %s", len(rows), self.queue)
+        return len(rows)
+
+    def _claimable(self, now):
+        """Pending units and units whose lease expired, with attempts left."""
+        table = self.table
+        return and_(
+            table.c.queue == self.queue,
+            table.c.attempts < self.max_attempts,
+            or_(
+                table.c.status == 'pending',
+                and_(table.c.status == 'leased', table.c.lease_expires < now)
+            )
+        )
+
+    def lease(self, limit=1):
+        """
+        Lease up to limit claimable units, oldest windows first.
+
+        Args:
+            limit (int): Maximum number of units
+
+        Returns:
+            list: Leased units as dicts
+        """
+        table = self.table
+        now = int(time.time())
+        values = {
+            'status': 'leased',
+            'lease_owner': self.worker_id,
+            'lease_expires': now + self.lease_seconds,
+            'attempts': table.c.attempts + 1
+        }
+        candidates = select(table.c.id).where(self._claimable(now)).order_by(table.c.start_time, table.c.id).limit(limit)
+
+        if self.engine.dialect.name == 'postgresql':
+            # Rows locked by other workers' leases are skipped, not waited for
+            statement = (
+                table.update()
+                .where(table.c.id.in_(candidates.with_for_update(skip_locked=True)))
+                .values(**values)
+                .returning(*table.c)
+            )
+            with self.engine.begin() as connection:
+                units = [dict(row._mapping) for row in connection.execute(statement)]
+        elif self.engine.dialect.update_returning:
+            # Writing first takes SQLite's write lock up front, waiting for
+            # other writers; a transaction that read first cannot be upgraded
+            # once another connection has committed
+            statement = table.update().where(table.c.id.in_(candidates)).values(**values).returning(*table.c)
+            with self._sqlite_lock(), self.engine.begin() as connection:
+                units = [dict(row._mapping) for row in connection.execute(statement)]
+        else:
+            with self._sqlite_lock(), self.engine.begin() as connection:
+                ids = [row[0] for row in connection.execute(candidates)]
+                if not ids:
+                    return []
+                connection.execute(table.update().where(table.c.id.in_(ids)).values(**values))
+                units = [
+                    dict(row._mapping)
+                    for row in connection.execute(select(table).where(table.c.id.in_(ids)))
+                ]
+
+        units.sort(key=lambda unit: (unit['start_time'], unit['id']))
+        if units and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Worker %s leased %s", self.worker_id, [unit['unit_key'] for unit in units])
+        return units
+
+    def _update_owned(self, unit_ids, **values):
+        """Update units still leased by this worker; returns how many were."""
+        table = self.table
+        with self.engine.begin() as connection:
+            result = connection.execute(
+                table.update()
+                .where(table.c.id.in_(unit_ids), table.c.status == 'leased', table.c.lease_owner == self.worker_id)
+                .values(**values)
+            )
+            return result.rowcount
+
+    def heartbeat(self, unit_ids):
+        """
+        Extend the leases of units held by this worker.
+
+        Args:
+            unit_ids (list): Unit ids
+
+        Returns:
+            int: Number of units still held; fewer means a lease was lost
+        """
+        return self._update_owned(unit_ids, lease_expires=int(time.time()) + self.lease_seconds)
+
+    def complete(self, unit):
+        """
+        Mark a leased unit as done.
+
+        Returns:
+            bool: False if the lease had been lost to another worker
+        """
+        return self._update_owned([unit['id']], status='done', lease_owner=None, lease_expires=None, error=None) > 0
+
+    def release(self, unit, error=None):
+        """
+        Give a leased unit back after a failure. It is retried by any worker
+        until it has been leased max_attempts times, then marked failed.
+
+        Args:
+            unit (dict): Leased unit
+            error (str, optional): Failure description
+
+        Returns:
+            bool: False if the lease had been lost to another worker
+        """
+        status = 'failed' if unit['attempts'] >= self.max_attempts else 'pending'
+        released = self._update_owned(
+            [unit['id']], status=status, lease_owner=None, lease_expires=None,
+            error=str(error)[:255] if error else None
+        )
+        return released > 0
+
+    def retry_failed(self):
+        """
+        Return failed units to pending with their attempts reset.
+
+        Returns:
+            int: Number of units returned
+        """
+        table = self.table
+        with self.engine.begin() as connection:
+            return connection.execute(
+                table.update().where(table.c.queue == self.queue, table.c.status == 'failed')
+                .values(status='pending', attempts=0, error=None)
+            ).rowcount
+
+    def reclaim_expired(self):
+        """
+        Return units with expired leases to pending, or mark them failed
+        when they have no attempts left. Leasing already claims expired
+        units; this makes them visible in progress().
+
+        Returns:
+            int: Number of reclaimed units
+        """
+        table = self.table
+        now = int(time.time())
+        expired = and_(table.c.queue == self.queue, table.c.status == 'leased', table.c.lease_expires < now)
+        with self.engine.begin() as connection:
+            failed = connection.execute(
+                table.update().where(expired, table.c.attempts >= self.max_attempts)
+                .values(status='failed', lease_owner=None, lease_expires=None, error='lease expired')
+            ).rowcount
+            reclaimed = connection.execute(
+                table.update().where(expired).values(status='pending', lease_owner=None, lease_expires=None)
+            ).rowcount
+        if failed or reclaimed:
+            logger.warning("Reclaimed %d expired units on queue %s (%d failed)", reclaimed, self.queue, failed)
+        return reclaimed + failed
+
+    def progress(self):
+        """
+        Count the units of the queue per status.
+
+        Returns:
+            dict: status -> number of units
+        """
+        table = self.table
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.status, func.count()).where(table.c.queue == self.queue).group_by(table.c.status)
+            ).fetchall()
+        return {status: count for status, count in rows}
+
+    @contextmanager
+    def keep_alive(self, unit):
+        """
+        Renew a unit's lease from a background thread while the block runs.
+
+        Yields:
+            threading.Event: Set if the lease was lost
+        """
+        lost = threading.Event()
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    if not self.heartbeat([unit['id']]):
+                        logger.warning("Lost lease on unit %s", unit['unit_key'])
+                        lost.set()
+                        return
+                except Exception as e:
+                    logger.error("Heartbeat failed for unit %s: %s", unit['unit_key'], e)
+
+        thread = threading.Thread(target=beat, name=f"heartbeat-{unit['id']}", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()